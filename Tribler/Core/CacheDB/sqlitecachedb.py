@@ -10,6 +10,7 @@ import apsw
 from apsw import CantOpenError, SQLError
 from base64 import encodestring, decodestring
 from threading import currentThread, RLock
+from time import time
 from twisted.python.threadable import isInIOThread
 
 from Tribler.Core.CacheDB.db_versions import LATEST_DB_VERSION
@@ -62,6 +63,9 @@ class SQLiteCacheDB(TaskManager):
         self._should_commit = False
         self._show_execute = False
 
+        # The total time (in seconds) spent executing queries and fetching their results
+        self.query_time = 0.0
+
     @property
     def version(self):
         """The version of this database."""
@@ -277,6 +281,7 @@ class SQLiteCacheDB(TaskManager):
             thread_name = currentThread().getName()
             self._logger.info(u"===%s===\n%s\n-----\n%s\n======\n", thread_name, sql, args)
 
+        start_time = time()
         try:
             if args is None:
                 return cur.execute(sql)
@@ -293,6 +298,8 @@ class SQLiteCacheDB(TaskManager):
                                        thread_name, type(sql), sql, args)
 
             raise msg
+        finally:
+            self.query_time += time() - start_time
 
     @blocking_call_on_reactor_thread
     def executemany(self, sql, args=None):
@@ -303,6 +310,7 @@ class SQLiteCacheDB(TaskManager):
             thread_name = currentThread().getName()
             self._logger.info(u"===%s===\n%s\n-----\n%s\n======\n", thread_name, sql, args)
 
+        start_time = time()
         try:
             if args is None:
                 result = cur.executemany(sql)
@@ -316,6 +324,8 @@ class SQLiteCacheDB(TaskManager):
             self._logger.exception(u"===%s===\nSQL Type: %s\n-----\n%s\n-----\n%s\n======\n",
                                    thread_name, type(sql), sql, args)
             raise msg
+        finally:
+            self.query_time += time() - start_time
 
     def execute_read(self, sql, args=None):
         return self.execute(sql, args)
@@ -394,7 +404,9 @@ class SQLiteCacheDB(TaskManager):
         if not find:
             return
         else:
+            start_time = time()
             find = list(find)
+            self.query_time += time() - start_time
             if len(find) > 0:
                 if len(find) > 1:
                     self._logger.debug(
@@ -411,7 +423,9 @@ class SQLiteCacheDB(TaskManager):
     def fetchall(self, sql, args=None):
         res = self.execute_read(sql, args)
         if res is not None:
+            start_time = time()
             find = list(res)
+            self.query_time += time() - start_time
             return find
         else:
             return []  # should it return None?
@@ -22,6 +22,12 @@ enabled = boolean(default=True)
 enabled = boolean(default=True)
 socks5_listen_ports = string_list(default=list('-1', '-1', '-1', '-1', '-1'))
 exitnode_enabled = boolean(default=False)
+socks5_batched_udp = boolean(default=False)
+shard_index = integer(min=0, default=0)
+shards = integer(min=1, default=1)
+max_circuit_rate = integer(min=0, default=0)
+max_relay_rate = integer(min=0, default=0)
+max_exit_rate = integer(min=0, default=0)
 
 [market_community]
 enabled = boolean(default=True)
@@ -103,12 +109,15 @@ directory = string(default='')
 [http_api]
 enabled = boolean(default=False)
 port = integer(min=-1, max=65536, default=-1)
+response_cache_ttl = float(min=0, default=2.0)
+slow_request_threshold = float(min=0, default=1.0)
 
 [resource_monitor]
 enabled = boolean(default=True)
 cpu_priority = integer(min=0, max=5, default=1)
 poll_interval = integer(min=1, default=5)
 history_size = integer(min=1, default=20)
+reactor_stall_threshold = float(min=0, default=0.25)
 
 [credit_mining]
 enabled = boolean(default=True)
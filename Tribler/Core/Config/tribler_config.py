@@ -250,6 +250,18 @@ class TriblerConfig(object):
     def get_http_api_port(self):
         return self._obtain_port('http_api', 'port')
 
+    def set_http_api_response_cache_ttl(self, value):
+        self.config['http_api']['response_cache_ttl'] = value
+
+    def get_http_api_response_cache_ttl(self):
+        return self.config['http_api']['response_cache_ttl']
+
+    def set_http_api_slow_request_threshold(self, value):
+        self.config['http_api']['slow_request_threshold'] = value
+
+    def get_http_api_slow_request_threshold(self):
+        return self.config['http_api']['slow_request_threshold']
+
     # Dispersy
 
     def set_dispersy_enabled(self, value):
@@ -469,6 +481,42 @@ class TriblerConfig(object):
     def get_tunnel_community_exitnode_enabled(self):
         return self.config['tunnel_community']['exitnode_enabled']
 
+    def set_tunnel_community_socks5_batched_udp(self, value):
+        self.config['tunnel_community']['socks5_batched_udp'] = value
+
+    def get_tunnel_community_socks5_batched_udp(self):
+        return self.config['tunnel_community']['socks5_batched_udp']
+
+    def set_tunnel_community_shard_index(self, value):
+        self.config['tunnel_community']['shard_index'] = value
+
+    def get_tunnel_community_shard_index(self):
+        return self.config['tunnel_community']['shard_index']
+
+    def set_tunnel_community_shards(self, value):
+        self.config['tunnel_community']['shards'] = value
+
+    def get_tunnel_community_shards(self):
+        return self.config['tunnel_community']['shards']
+
+    def set_tunnel_community_max_circuit_rate(self, value):
+        self.config['tunnel_community']['max_circuit_rate'] = value
+
+    def get_tunnel_community_max_circuit_rate(self):
+        return self.config['tunnel_community']['max_circuit_rate']
+
+    def set_tunnel_community_max_relay_rate(self, value):
+        self.config['tunnel_community']['max_relay_rate'] = value
+
+    def get_tunnel_community_max_relay_rate(self):
+        return self.config['tunnel_community']['max_relay_rate']
+
+    def set_tunnel_community_max_exit_rate(self, value):
+        self.config['tunnel_community']['max_exit_rate'] = value
+
+    def get_tunnel_community_max_exit_rate(self):
+        return self.config['tunnel_community']['max_exit_rate']
+
     def set_default_number_hops(self, value):
         self.config['download_defaults']['number_hops'] = value
 
@@ -655,6 +703,12 @@ class TriblerConfig(object):
     def get_resource_monitor_history_size(self):
         return self.config['resource_monitor']['history_size']
 
+    def set_resource_monitor_reactor_stall_threshold(self, value):
+        self.config['resource_monitor']['reactor_stall_threshold'] = value
+
+    def get_resource_monitor_reactor_stall_threshold(self):
+        return self.config['resource_monitor']['reactor_stall_threshold']
+
     # Credit mining
     def set_credit_mining_enabled(self, value):
         self.config['credit_mining']['enabled'] = value
@@ -204,6 +204,27 @@ class DownloadState(object):
         @return A float (0..1) """
         return self.vod.get('vod_prebuf_frac_consec', 0)
 
+    def get_vod_bitrate(self):
+        """ Returns the measured bitrate of the Video-On-Demand stream.
+        @return The bitrate in bytes per second """
+        return self.vod.get('vod_bitrate', 0)
+
+    def get_vod_buffered_bytes(self):
+        """ Returns the number of bytes ahead of the play head of the Video-On-Demand stream that have been downloaded.
+        @return An integer """
+        return self.vod.get('vod_buffered_bytes', 0)
+
+    def get_vod_buffered_time(self):
+        """ Returns the number of seconds of video ahead of the play head of the Video-On-Demand stream that have been
+        downloaded, at the measured bitrate.
+        @return A float """
+        return self.vod.get('vod_buffered_time', 0.0)
+
+    def get_vod_stalls(self):
+        """ Returns the number of times the Video-On-Demand stream had to wait for a piece.
+        @return An integer """
+        return self.vod.get('vod_stalls', 0)
+
     def is_vod(self):
         """ Returns if this download is currently in vod mode
         @return A Boolean"""
@@ -10,6 +10,7 @@ import random
 import sys
 import time
 from binascii import hexlify
+from collections import defaultdict
 from traceback import print_exc
 from twisted.internet import reactor
 from twisted.internet.defer import Deferred, CancelledError, succeed
@@ -25,6 +26,7 @@ from Tribler.Core.Libtorrent import checkHandleAndSynchronize
 from Tribler.Core.TorrentDef import TorrentDefNoMetainfo, TorrentDef
 from Tribler.Core.Utilities import maketorrent
 from Tribler.Core.Utilities.torrent_utils import get_info_from_handle
+from Tribler.Core.Video.VODScheduler import VODScheduler, SCHEDULE_INTERVAL
 from Tribler.Core.exceptions import SaveResumeDataError
 from Tribler.Core.osutils import fix_filebasename
 from Tribler.Core.simpledefs import DLSTATUS_SEEDING, DLSTATUS_STOPPED, DLMODE_VOD, DLMODE_NORMAL, \
@@ -32,6 +34,11 @@ from Tribler.Core.simpledefs import DLSTATUS_SEEDING, DLSTATUS_STOPPED, DLMODE_V
 from Tribler.pyipv8.ipv8.taskmanager import TaskManager
 
 
+# The number of seconds between two checks of the pieces that are waited for, in case their piece_finished_alert has
+# been dropped
+PIECE_CHECK_INTERVAL = 2
+
+
 if sys.platform == "win32":
     try:
         import ctypes
@@ -139,6 +146,8 @@ class LibtorrentDownloadImpl(DownloadConfigInterface, TaskManager):
 
         self.max_prebuffsize = 5 * 1024 * 1024
 
+        self.vod_scheduler = None
+
         self.pstate_for_restart = None
 
         self.cew_scheduled = False
@@ -149,6 +158,7 @@ class LibtorrentDownloadImpl(DownloadConfigInterface, TaskManager):
 
         self.deferreds_resume = []
         self.deferreds_handle = []
+        self.deferreds_piece = defaultdict(list)  # Map: piece index -> deferreds that wait for the piece
         self.deferred_added = Deferred()
         self.deferred_removed = Deferred()
 
@@ -374,13 +384,34 @@ class LibtorrentDownloadImpl(DownloadConfigInterface, TaskManager):
             self.set_byte_priority([(self.get_vod_fileindex(), 0, self.prebuffsize)], 1)
             self.set_byte_priority([(self.get_vod_fileindex(), -self.endbuffsize, -1)], 1)
 
+            if not self.vod_scheduler or self.vod_scheduler.fileindex != self.get_vod_fileindex():
+                self.stop_vod_scheduler()
+                self.vod_scheduler = VODScheduler(self.get_vod_fileindex())
+                self.register_task("vod_scheduler", LoopingCall(self.schedule_vod_pieces))\
+                    .start(SCHEDULE_INTERVAL, now=False)
+
             self._logger.debug("LibtorrentDownloadImpl: going into VOD mode %s", filename)
         else:
+            self.stop_vod_scheduler()
             self.handle.set_sequential_download(False)
             self.handle.set_priority(0 if self.get_credit_mining() else 1)
             if self.get_vod_fileindex() >= 0:
                 self.set_byte_priority([(self.get_vod_fileindex(), 0, -1)], 1)
 
+    @checkHandleAndSynchronize()
+    def schedule_vod_pieces(self):
+        """
+        Give the pieces ahead of the play heads of the VOD streams a deadline.
+        """
+        if self.vod_scheduler:
+            self.vod_scheduler.schedule(self.handle)
+
+    def stop_vod_scheduler(self):
+        self.cancel_pending_task("vod_scheduler")
+        if self.vod_scheduler:
+            self.vod_scheduler.stop(self.handle)
+            self.vod_scheduler = None
+
     def get_vod_fileindex(self):
         if self.vod_index is not None:
             return self.vod_index
@@ -414,6 +445,48 @@ class LibtorrentDownloadImpl(DownloadConfigInterface, TaskManager):
             return float(pieces_have) / pieces_all
         return 0.0
 
+    @checkHandleAndSynchronize(False)
+    def has_piece(self, piece):
+        """
+        Returns whether a piece has been downloaded and its hash has been checked.
+        """
+        return self.handle.have_piece(piece)
+
+    def wait_for_piece(self, piece):
+        """
+        Returns a deferred that fires with the index of a piece when the piece has been downloaded, which is reported
+        by a piece_finished_alert. These alerts have to be enabled with LibtorrentMgr.set_progress_alerts_enabled.
+        Since alerts can be dropped when the alert queue is full, the pieces are also checked periodically. The
+        deferred is cancelled when the download is stopped.
+        """
+        if self.has_piece(piece):
+            return succeed(piece)
+
+        deferred = Deferred(lambda d: self.deferreds_piece[piece].remove(d))
+        self.deferreds_piece[piece].append(deferred)
+        if not self.is_pending_task_active("check_pieces"):
+            self.register_task("check_pieces", LoopingCall(self.check_pieces)).start(PIECE_CHECK_INTERVAL, now=False)
+        return deferred
+
+    def check_pieces(self):
+        """
+        Fire the deferreds of the pieces that have been downloaded without a piece_finished_alert.
+        """
+        for piece in [piece for piece, deferreds in self.deferreds_piece.items() if deferreds]:
+            if self.has_piece(piece):
+                for deferred in self.deferreds_piece.pop(piece):
+                    deferred.callback(piece)
+
+        if not any(self.deferreds_piece.itervalues()):
+            self.deferreds_piece.clear()
+            self.cancel_pending_task("check_pieces")
+
+    def cancel_piece_deferreds(self):
+        for deferreds in self.deferreds_piece.values():
+            for deferred in list(deferreds):
+                deferred.cancel()
+        self.deferreds_piece.clear()
+
     @checkHandleAndSynchronize('')
     def get_pieces_base64(self):
         """
@@ -500,7 +573,8 @@ class LibtorrentDownloadImpl(DownloadConfigInterface, TaskManager):
 
         alert_types = ('tracker_reply_alert', 'tracker_error_alert', 'tracker_warning_alert', 'metadata_received_alert',
                        'file_renamed_alert', 'performance_alert', 'torrent_checked_alert', 'torrent_finished_alert',
-                       'save_resume_data_alert', 'save_resume_data_failed_alert', 'state_update_alert')
+                       'save_resume_data_alert', 'save_resume_data_failed_alert', 'state_update_alert',
+                       'piece_finished_alert')
 
         if alert_type in alert_types:
             getattr(self, 'on_' + alert_type)(alert)
@@ -542,6 +616,10 @@ class LibtorrentDownloadImpl(DownloadConfigInterface, TaskManager):
         # empties the deferred list
         self.deferreds_resume = []
 
+    def on_piece_finished_alert(self, alert):
+        for deferred in self.deferreds_piece.pop(alert.piece_index, []):
+            deferred.callback(alert.piece_index)
+
     def on_tracker_reply_alert(self, alert):
         self.tracker_status[alert.url] = [alert.num_peers, 'Working']
 
@@ -778,6 +856,8 @@ class LibtorrentDownloadImpl(DownloadConfigInterface, TaskManager):
         """
         vod = {'vod_prebuf_frac': self.calc_prebuf_frac(),
                'vod_prebuf_frac_consec': self.calc_prebuf_frac(True)} if self.get_mode() == DLMODE_VOD else {}
+        if vod and self.vod_scheduler:
+            vod.update(self.vod_scheduler.get_buffer_health())
 
         return DownloadState(self, self.lt_status, self.error, vod)
 
@@ -947,6 +1027,7 @@ class LibtorrentDownloadImpl(DownloadConfigInterface, TaskManager):
     def network_stop(self, removestate, removecontent):
         """ Called by network thread, but safe for any """
         self.shutdown_task_manager()
+        self.cancel_piece_deferreds()
 
         out = None
         with self.dllock:
@@ -36,6 +36,10 @@ from Tribler.pyipv8.ipv8.taskmanager import TaskManager
 LTSTATE_FILENAME = "lt.state"
 METAINFO_CACHE_PERIOD = 5 * 60
 DHT_CHECK_RETRIES = 1
+# The number of alerts a session queues between two alert checks, the default of libtorrent and the size used while
+# the progress alerts are enabled, which include an alert for every downloaded block
+DEFAULT_ALERT_QUEUE_SIZE = 1000
+PROGRESS_ALERT_QUEUE_SIZE = 50000
 DEFAULT_DHT_ROUTERS = [
     ("dht.libtorrent.org", 25401),
     ("router.bittorrent.com", 6881),
@@ -227,6 +231,22 @@ class LibtorrentMgr(TaskManager):
 
         return self.ltsessions[hops]
 
+    def set_progress_alerts_enabled(self, hops, enabled):
+        """
+        Enable or disable the progress alerts of a libtorrent session, like the piece_finished_alert. These alerts are
+        only enabled while a video is streamed, since libtorrent also sends one for every block that is downloaded. The
+        alert queue is enlarged meanwhile, so these alerts do not push the other alerts out of the queue.
+        """
+        alert_mask = self.default_alert_mask
+        if enabled:
+            alert_mask |= lt.alert.category_t.progress_notification
+        ltsession = self.get_session(hops)
+        ltsession.set_alert_mask(alert_mask)
+
+        settings = ltsession.get_settings()
+        settings['alert_queue_size'] = PROGRESS_ALERT_QUEUE_SIZE if enabled else DEFAULT_ALERT_QUEUE_SIZE
+        ltsession.set_settings(settings)
+
     def set_proxy_settings(self, ltsession, ptype, server=None, auth=None):
         """
         Apply the proxy settings to a libtorrent session. This mechanism changed significantly in libtorrent 1.1.0.
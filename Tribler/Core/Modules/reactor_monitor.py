@@ -0,0 +1,166 @@
+import logging
+import os
+import time
+from collections import deque
+from threading import Event, Lock, Thread, current_thread
+
+from twisted.internet.task import LoopingCall
+
+from Tribler.Core.Utilities.instrumentation import get_thread_stack
+from Tribler.pyipv8.ipv8.taskmanager import TaskManager
+
+HEARTBEAT_INTERVAL = 0.1
+MAX_LAG_SAMPLES = 3000
+MAX_RECENT_STALLS = 50
+MIN_SAMPLE_INTERVAL = 0.02
+
+
+class ReactorStallSampler(Thread):
+    """
+    This thread samples the stack of the reactor thread while the reactor is late with processing a heartbeat by more
+    than the stall threshold, which is when the monitor counts a stall.
+    """
+
+    def __init__(self, monitor, threshold):
+        super(ReactorStallSampler, self).__init__()
+        self.setDaemon(True)
+        self.setName(self.__class__.__name__)
+        self.monitor = monitor
+        self.threshold = threshold
+        self.interval = max(threshold / 5.0, MIN_SAMPLE_INTERVAL)
+        self.stop_event = Event()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            monitor = self.monitor
+            if monitor.reactor_thread_id is None or monitor.get_lag(time.time()) < self.threshold:
+                continue
+
+            stack = get_thread_stack(monitor.reactor_thread_id)
+            if stack:
+                monitor.add_stack_sample(stack)
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+
+class ReactorMonitor(TaskManager):
+    """
+    This class measures how late the Twisted reactor processes a periodic heartbeat. When the reactor is blocked for
+    longer than the stall threshold, the stack of the reactor thread is sampled. The samples are aggregated as
+    collapsed stacks, which can be turned into a flamegraph with flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, stall_threshold, log_dir):
+        super(ReactorMonitor, self).__init__()
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.stall_threshold = stall_threshold
+        self.log_dir = log_dir
+
+        self.reactor_thread_id = None
+        self.last_heartbeat = time.time()
+        self.lag_samples = deque(maxlen=MAX_LAG_SAMPLES)
+        self.max_lag = 0.0
+        self.num_stalls = 0
+        self.recent_stalls = deque(maxlen=MAX_RECENT_STALLS)
+
+        self.stacks_lock = Lock()
+        self.collapsed_stacks = {}
+        self.num_stack_samples = 0
+        self.sampler = None
+
+    def start(self):
+        self.last_heartbeat = time.time()
+        self.register_task("reactor_heartbeat", LoopingCall(self.heartbeat)).start(HEARTBEAT_INTERVAL, now=False)
+        self.sampler = ReactorStallSampler(self, self.stall_threshold)
+        self.sampler.start()
+
+    def stop(self):
+        self.shutdown_task_manager()
+        if self.sampler:
+            self.sampler.stop()
+            self.sampler = None
+
+    def get_lag(self, now):
+        """
+        Returns how late the reactor is at a specific time with processing the heartbeat that follows the last one.
+        """
+        return max(now - self.last_heartbeat - HEARTBEAT_INTERVAL, 0.0)
+
+    def heartbeat(self):
+        """
+        Called by the reactor every heartbeat interval. The lag is the time the heartbeat was processed too late.
+        """
+        now = time.time()
+        if self.reactor_thread_id is None:
+            self.reactor_thread_id = current_thread().ident
+
+        lag = self.get_lag(now)
+        self.last_heartbeat = now
+        self.lag_samples.append(lag)
+        self.max_lag = max(self.max_lag, lag)
+
+        if lag > self.stall_threshold:
+            self.num_stalls += 1
+            self.recent_stalls.append({"time": now, "lag": lag})
+            self._logger.warning("The reactor has been blocked for %.3f seconds", lag)
+
+    def add_stack_sample(self, stack):
+        """
+        Add a stack sample of the reactor thread, given as a list of frames with the outermost frame first.
+        """
+        collapsed_stack = ";".join(frame.replace(";", ":") for frame in stack)
+        with self.stacks_lock:
+            self.collapsed_stacks[collapsed_stack] = self.collapsed_stacks.get(collapsed_stack, 0) + 1
+            self.num_stack_samples += 1
+
+    def get_lag_percentile(self, percentile, sorted_lags):
+        if not sorted_lags:
+            return 0.0
+        return sorted_lags[min(int(percentile / 100.0 * len(sorted_lags)), len(sorted_lags) - 1)]
+
+    def get_statistics_dict(self):
+        """
+        Return a dictionary with the recent reactor lag percentiles and stalls.
+        """
+        sorted_lags = sorted(self.lag_samples)
+        return {
+            "heartbeat_interval": HEARTBEAT_INTERVAL,
+            "stall_threshold": self.stall_threshold,
+            "lag": {
+                "samples": len(sorted_lags),
+                "p50": self.get_lag_percentile(50, sorted_lags),
+                "p90": self.get_lag_percentile(90, sorted_lags),
+                "p99": self.get_lag_percentile(99, sorted_lags),
+                "max": self.max_lag
+            },
+            "stalls": self.num_stalls,
+            "recent_stalls": list(self.recent_stalls),
+            "stack_samples": self.num_stack_samples
+        }
+
+    def get_collapsed_stacks(self):
+        """
+        Return the aggregated stack samples in the collapsed stack format, one "frame;frame;frame count" per line.
+        """
+        with self.stacks_lock:
+            stacks = self.collapsed_stacks.items()
+        return "".join("%s %d\n" % (stack, count) for stack, count in sorted(stacks))
+
+    def write_collapsed_stacks(self):
+        """
+        Write the collapsed stacks to the log directory and return the path of the written file.
+        """
+        if not os.path.exists(self.log_dir):
+            os.makedirs(self.log_dir)
+
+        file_path = os.path.join(self.log_dir, 'reactor_stalls_%d.collapsed' % int(time.time()))
+        with open(file_path, 'w') as stacks_file:
+            stacks_file.write(self.get_collapsed_stacks())
+        return file_path
+
+    def clear_stack_samples(self):
+        with self.stacks_lock:
+            self.collapsed_stacks = {}
+            self.num_stack_samples = 0
@@ -5,6 +5,7 @@ import time
 import psutil
 from twisted.internet.task import LoopingCall
 
+from Tribler.Core.Modules.reactor_monitor import ReactorMonitor
 from Tribler.Core.simpledefs import SIGNAL_LOW_SPACE, SIGNAL_RESOURCE_CHECK
 from Tribler.pyipv8.ipv8.taskmanager import TaskManager
 
@@ -40,17 +41,29 @@ class ResourceMonitor(TaskManager):
         self.profiler_start_time = None
         self.profiler_running = False
 
+        self.reactor_monitor = None
+
     def start(self):
         """
         Start the resource monitor by scheduling a LoopingCall.
+        Also start monitoring reactor stalls if a stall threshold has been configured.
         """
         self.register_task("check_resources", LoopingCall(self.check_resources)).start(
             self.session.config.get_resource_monitor_poll_interval(), now=False)
 
+        stall_threshold = self.session.config.get_resource_monitor_reactor_stall_threshold()
+        if stall_threshold > 0:
+            self.reactor_monitor = ReactorMonitor(stall_threshold, self.session.config.get_log_dir())
+            self.reactor_monitor.start()
+
     def stop(self):
         if HAS_YAPPI and self.profiler_running:
             self.stop_profiler()
 
+        if self.reactor_monitor:
+            self.reactor_monitor.stop()
+            self.reactor_monitor = None
+
         self.shutdown_task_manager()
 
     def start_profiler(self):
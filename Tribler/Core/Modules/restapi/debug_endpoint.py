@@ -33,7 +33,8 @@ class DebugEndpoint(resource.Resource):
         child_handler_dict = {"circuits": DebugCircuitsEndpoint, "open_files": DebugOpenFilesEndpoint,
                               "open_sockets": DebugOpenSocketsEndpoint, "threads": DebugThreadsEndpoint,
                               "cpu": DebugCPUEndpoint, "memory": DebugMemoryEndpoint,
-                              "log": DebugLogEndpoint, "profiler": DebugProfilerEndpoint}
+                              "log": DebugLogEndpoint, "profiler": DebugProfilerEndpoint, "rest": DebugRESTEndpoint,
+                              "reactor": DebugReactorEndpoint}
 
         for path, child_cls in child_handler_dict.iteritems():
             self.putChild(path, child_cls(session))
@@ -52,7 +53,10 @@ class DebugCircuitsEndpoint(resource.Resource):
         """
         .. http:get:: /debug/circuits
 
-        A GET request to this endpoint returns information about the built circuits in the tunnel community.
+        A GET request to this endpoint returns information about the built circuits in the tunnel community. The
+        socks5 traffic of a circuit is the traffic that has been dispatched between the circuit and the SOCKS5 servers.
+        The scheduler section contains the traffic of the circuits that we relay or exit, per traffic class and per
+        circuit.
 
             **Example request**:
 
@@ -77,8 +81,33 @@ class DebugCircuitsEndpoint(resource.Resource):
                         }, {
                             "host": "39.95.147.20:8965"
                         }],
+                        "socks5_traffic": {
+                            "packets_up": 3,
+                            "bytes_up": 45,
+                            "packets_down": 2,
+                            "bytes_down": 49
+                        },
                         ...
-                    }, ...]
+                    }, ...],
+                    "scheduler": {
+                        "classes": {
+                            "relay": {
+                                "packets_sent": 120,
+                                "bytes_sent": 178320,
+                                "packets_delayed": 14,
+                                "packets_dropped": 0,
+                                "bytes_dropped": 0
+                            },
+                            "exit": {...}
+                        },
+                        "circuits": [{
+                            "id": 5678,
+                            "traffic_class": "relay",
+                            "queued": 2,
+                            "packets_sent": 120,
+                            ...
+                        }, ...]
+                    }
                 }
         """
         tunnel_community = self.session.lm.tunnel_community
@@ -95,9 +124,13 @@ class DebugCircuitsEndpoint(resource.Resource):
                 hops_array.append({'host': 'unknown' if 'UNKNOWN HOST' in hop.host else '%s:%s' % (hop.host, hop.port)})
 
             item['hops'] = hops_array
+
+            counters = tunnel_community.dispatcher.circuit_counters.get(circuit_id)
+            item['socks5_traffic'] = counters.to_dict() if counters else None
             circuits_json.append(item)
 
-        return json.dumps({'circuits': circuits_json})
+        return json.dumps({'circuits': circuits_json,
+                           'scheduler': tunnel_community.traffic_scheduler.get_statistics()})
 
 
 class DebugOpenFilesEndpoint(resource.Resource):
@@ -532,3 +565,201 @@ class DebugProfilerEndpoint(resource.Resource):
         """
         file_path = self.session.lm.resource_monitor.stop_profiler()
         return json.dumps({"success": True, "profiler_file": file_path})
+
+
+class DebugRESTEndpoint(resource.Resource):
+    """
+    This class handles requests for performance statistics of the HTTP API.
+    """
+
+    def __init__(self, session):
+        resource.Resource.__init__(self)
+        self.session = session
+
+    def render_GET(self, request):
+        """
+        .. http:get:: /debug/rest
+
+        A GET request to this endpoint returns latency statistics of the requests made to the HTTP API, per endpoint.
+        The handler, database and serialization times (in seconds) only include the processing on the reactor thread.
+        The most recent requests that took longer than the slow request threshold are returned as well.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X GET http://localhost:8085/debug/rest
+
+            **Example response**:
+
+            .. sourcecode:: javascript
+
+                {
+                    "slow_request_threshold": 1.0,
+                    "endpoints": {
+                        "GET ChannelsDiscoveredEndpoint": {
+                            "requests": 12,
+                            "cache_hits": 8,
+                            "errors": 0,
+                            "slow_requests": 1,
+                            "latency": {
+                                "count": 12,
+                                "mean": 0.34,
+                                "max": 1.23,
+                                "p50": 0.25,
+                                "p90": 0.5,
+                                "p99": 1.23,
+                                "buckets": [[0.001, 0], ..., ["+Inf", 0]]
+                            },
+                            "handler_time": 4.12,
+                            "db_time": 3.65,
+                            "serialization_time": 0.21,
+                            "bytes_written": 384923
+                        }, ...
+                    },
+                    "slow_requests": [{
+                        "method": "GET",
+                        "path": "/channels/discovered",
+                        "endpoint": "ChannelsDiscoveredEndpoint",
+                        "cache_hit": false,
+                        "code": 200,
+                        "time": 1504015291.214,
+                        "latency": 1.23,
+                        "handler_time": 1.22,
+                        "db_time": 1.05,
+                        "serialization_time": 0.1,
+                        "bytes_written": 32034,
+                        "stack": ["file.py:12 function", ...]
+                    }, ...]
+                }
+        """
+        return json.dumps(self.session.lm.api_manager.statistics.get_statistics_dict())
+
+
+class DebugReactorEndpoint(resource.Resource):
+    """
+    This class handles requests for information about the responsiveness of the Twisted reactor.
+    """
+
+    def __init__(self, session):
+        resource.Resource.__init__(self)
+        self.session = session
+        self.putChild("stacks", DebugReactorStacksEndpoint(session))
+
+    def get_reactor_monitor(self):
+        return self.session.lm.resource_monitor.reactor_monitor if self.session.lm.resource_monitor else None
+
+    def render_GET(self, request):
+        """
+        .. http:get:: /debug/reactor
+
+        A GET request to this endpoint returns percentiles of the recent reactor lag (in seconds), which is the delay
+        with which the reactor processes a periodic heartbeat, and information about reactor stalls, i.e. heartbeats
+        that have been delayed longer than the stall threshold.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X GET http://localhost:8085/debug/reactor
+
+            **Example response**:
+
+            .. sourcecode:: javascript
+
+                {
+                    "heartbeat_interval": 0.1,
+                    "stall_threshold": 0.25,
+                    "lag": {
+                        "samples": 3000,
+                        "p50": 0.0012,
+                        "p90": 0.0041,
+                        "p99": 0.083,
+                        "max": 2.43
+                    },
+                    "stalls": 3,
+                    "recent_stalls": [{
+                        "time": 1504015291.214,
+                        "lag": 2.43
+                    }, ...],
+                    "stack_samples": 121
+                }
+        """
+        reactor_monitor = self.get_reactor_monitor()
+        if not reactor_monitor:
+            request.setResponseCode(http.NOT_FOUND)
+            return json.dumps({"error": "reactor monitor not enabled"})
+
+        return json.dumps(reactor_monitor.get_statistics_dict())
+
+
+class DebugReactorStacksEndpoint(resource.Resource):
+    """
+    This class handles requests for the stacks sampled while the reactor was stalled.
+    """
+
+    def __init__(self, session):
+        resource.Resource.__init__(self)
+        self.session = session
+
+    def get_reactor_monitor(self):
+        return self.session.lm.resource_monitor.reactor_monitor if self.session.lm.resource_monitor else None
+
+    def render_GET(self, request):
+        """
+        .. http:get:: /debug/reactor/stacks
+
+        A GET request to this endpoint returns the stacks of the reactor thread that have been sampled while the
+        reactor was stalled, in the collapsed stack format that can be turned into a flamegraph. The file is also
+        written to the log directory.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X GET http://localhost:8085/debug/reactor/stacks
+
+            **Example response**:
+
+            .. sourcecode:: none
+
+                run_tribler.py:42 run;.../base.py:1243 mainLoop;...;sqlitecachedb.py:290 execute 37
+                ...
+        """
+        reactor_monitor = self.get_reactor_monitor()
+        if not reactor_monitor:
+            request.setResponseCode(http.NOT_FOUND)
+            return json.dumps({"error": "reactor monitor not enabled"})
+
+        file_path = reactor_monitor.write_collapsed_stacks()
+        request.setHeader(b'content-type', 'text/plain')
+        request.setHeader(b'Content-Disposition', 'attachment; filename=%s' % os.path.basename(file_path))
+        return reactor_monitor.get_collapsed_stacks()
+
+    def render_DELETE(self, request):
+        """
+        .. http:delete:: /debug/reactor/stacks
+
+        A DELETE request to this endpoint clears the sampled stacks of the reactor thread.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X DELETE http://localhost:8085/debug/reactor/stacks
+
+            **Example response**:
+
+            .. sourcecode:: javascript
+
+                {
+                    "success": true
+                }
+        """
+        reactor_monitor = self.get_reactor_monitor()
+        if not reactor_monitor:
+            request.setResponseCode(http.NOT_FOUND)
+            return json.dumps({"error": "reactor monitor not enabled"})
+
+        reactor_monitor.clear_stack_samples()
+        return json.dumps({"success": True})
@@ -183,6 +183,10 @@ class DownloadsEndpoint(DownloadBaseEndpoint):
                         "vod_mod": True,
                         "vod_prebuffering_progress": 0.89,
                         "vod_prebuffering_progress_consec": 0.86,
+                        "vod_bitrate": 524288,
+                        "vod_buffered_bytes": 7340032,
+                        "vod_buffered_time": 14.0,
+                        "vod_stalls": 1,
                         "error": "",
                         "time_added": 1484819242,
                     }
@@ -231,6 +235,10 @@ class DownloadsEndpoint(DownloadBaseEndpoint):
                              "total_pieces": tdef.get_nr_pieces(), "vod_mode": download.get_mode() == DLMODE_VOD,
                              "vod_prebuffering_progress": state.get_vod_prebuffering_progress(),
                              "vod_prebuffering_progress_consec": state.get_vod_prebuffering_progress_consec(),
+                             "vod_bitrate": state.get_vod_bitrate(),
+                             "vod_buffered_bytes": state.get_vod_buffered_bytes(),
+                             "vod_buffered_time": state.get_vod_buffered_time(),
+                             "vod_stalls": state.get_vod_stalls(),
                              "error": repr(state.get_error()) if state.get_error() else "",
                              "time_added": download.get_time_added(),
                              "credit_mining": download.get_credit_mining()}
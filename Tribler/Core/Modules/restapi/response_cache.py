@@ -0,0 +1,139 @@
+"""
+This module contains a short-lived cache for responses of the Tribler HTTP API.
+"""
+import hashlib
+import re
+import time
+import zlib
+
+# Only responses of these endpoints (and their children) are stored in the cache.
+CACHEABLE_ENDPOINTS = ("channels/discovered", "settings", "torrentinfo", "statistics")
+
+# Responses smaller than this number of bytes are not worth compressing.
+GZIP_MIN_RESPONSE_SIZE = 1024
+GZIP_COMPRESSION_LEVEL = 6
+
+MAX_CACHE_ENTRIES = 256
+
+_gzip_accepted = re.compile(r"(^|[\s,])gzip($|[\s,;])")
+
+
+def accepts_gzip(accept_encoding):
+    """
+    Return whether the value of an Accept-Encoding header indicates that the client accepts gzip content.
+    """
+    return accept_encoding is not None and _gzip_accepted.search(accept_encoding) is not None
+
+
+def gzip_compress(data):
+    """
+    Compress data to the gzip format.
+    """
+    compressor = zlib.compressobj(GZIP_COMPRESSION_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def is_cacheable_path(path):
+    """
+    Return whether the responses of the endpoint at a specific path may be cached.
+    """
+    path = path.strip('/')
+    return any(path == endpoint or path.startswith(endpoint + '/') for endpoint in CACHEABLE_ENDPOINTS)
+
+
+def get_cache_key(path, args):
+    """
+    Build the cache key of a request from its path and its (query) arguments.
+    """
+    return path, tuple(sorted((key, tuple(values)) for key, values in args.iteritems()))
+
+
+def etag_matches(etag, if_none_match):
+    """
+    Return whether an ETag is matched by the value of an If-None-Match header.
+    """
+    if if_none_match is None:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    return '*' in candidates or etag in candidates
+
+
+class CachedResponse(object):
+    """
+    A response body that has been rendered by one of the endpoints, together with its validator and the name of the
+    endpoint that rendered it.
+    """
+
+    def __init__(self, body, content_type, timestamp, endpoint=None):
+        self.body = body
+        self.content_type = content_type
+        self.timestamp = timestamp
+        self.endpoint = endpoint
+        self.etag = 'W/"%s"' % hashlib.sha1(body).hexdigest()
+        self._gzipped_body = None
+
+    @property
+    def gzipped_body(self):
+        if self._gzipped_body is None:
+            self._gzipped_body = gzip_compress(self.body)
+        return self._gzipped_body
+
+
+class ResponseCache(object):
+    """
+    This class keeps rendered responses of cacheable GET requests for a short period of time.
+    Entries are keyed by the path of a request and its arguments, and are dropped as soon as a request that modifies
+    state (i.e. a PUT, POST, PATCH or DELETE) is made to an endpoint with the same top-level path.
+    """
+
+    def __init__(self, ttl, max_entries=MAX_CACHE_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = {}
+
+    @property
+    def enabled(self):
+        return self.ttl > 0
+
+    def get(self, key):
+        """
+        Return the cached response for a specific key, or None if there is no fresh response available.
+        """
+        cached_response = self.entries.get(key)
+        if cached_response is None:
+            return None
+        if time.time() - cached_response.timestamp > self.ttl:
+            del self.entries[key]
+            return None
+        return cached_response
+
+    def put(self, key, body, content_type, endpoint=None):
+        """
+        Store a rendered response body and return the corresponding CachedResponse object.
+        """
+        cached_response = CachedResponse(body, content_type, time.time(), endpoint)
+        if not self.enabled:
+            return cached_response
+
+        if key not in self.entries and len(self.entries) >= self.max_entries:
+            self.remove_expired()
+            if len(self.entries) >= self.max_entries:
+                oldest_key = min(self.entries, key=lambda entry_key: self.entries[entry_key].timestamp)
+                del self.entries[oldest_key]
+
+        self.entries[key] = cached_response
+        return cached_response
+
+    def remove_expired(self):
+        now = time.time()
+        for key in [key for key, response in self.entries.iteritems() if now - response.timestamp > self.ttl]:
+            del self.entries[key]
+
+    def invalidate(self, path):
+        """
+        Drop all cached responses that share the top-level endpoint with the given path.
+        """
+        endpoint = path.strip('/').split('/')[0]
+        for key in self.entries.keys():
+            if key[0].strip('/').split('/')[0] == endpoint:
+                del self.entries[key]
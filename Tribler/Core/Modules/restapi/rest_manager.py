@@ -1,10 +1,14 @@
 import logging
+from threading import current_thread
 from traceback import format_tb
 from twisted.internet import reactor
 from twisted.internet.defer import maybeDeferred
 from twisted.python.compat import intToBytes
 from twisted.web import server, http
 
+from Tribler.Core.Modules.restapi.response_cache import ResponseCache, accepts_gzip, etag_matches, \
+    get_cache_key, gzip_compress, is_cacheable_path, GZIP_MIN_RESPONSE_SIZE
+from Tribler.Core.Modules.restapi.rest_statistics import RESTStatistics, RequestRecord
 from Tribler.Core.Modules.restapi.root_endpoint import RootEndpoint
 import Tribler.Core.Utilities.json_util as json
 from Tribler.pyipv8.ipv8.taskmanager import TaskManager
@@ -21,20 +25,26 @@ class RESTManager(TaskManager):
         self.session = session
         self.site = None
         self.root_endpoint = None
+        self.statistics = None
 
     def start(self):
         """
         Starts the HTTP API with the listen port as specified in the session configuration.
         """
         self.root_endpoint = RootEndpoint(self.session)
+        self.statistics = RESTStatistics(self.session, self.session.config.get_http_api_slow_request_threshold())
+        self.statistics.start()
         site = server.Site(resource=self.root_endpoint)
         site.requestFactory = RESTRequest
+        site.response_cache = ResponseCache(self.session.config.get_http_api_response_cache_ttl())
+        site.rest_statistics = self.statistics
         self.site = reactor.listenTCP(self.session.config.get_http_api_port(), site, interface="127.0.0.1")
 
     def stop(self):
         """
         Stop the HTTP API and return a deferred that fires when the server has shut down.
         """
+        self.statistics.stop()
         return maybeDeferred(self.site.stopListening)
 
 
@@ -42,12 +52,60 @@ class RESTRequest(server.Request):
     """
     This class overrides the write(data) method to do a safe write only when channel is not None and gracefully
     takes care of unhandled exceptions raised during the processing of any request.
+
+    Responses of cacheable GET requests are buffered until the request finishes, so they can be stored in the
+    response cache of the site and validated with an ETag. Responses that exceed a size threshold are gzip-encoded
+    when the client accepts this. The timings of every request are reported to the statistics of the site.
     """
     defaultContentType = b"text/json"
 
     def __init__(self, *args, **kw):
         server.Request.__init__(self, *args, **kw)
         self._logger = logging.getLogger(self.__class__.__name__)
+        self.cache_key = None
+        self.body_buffer = None
+        self.endpoint = None
+        self.statistics = None
+        self.record = None
+
+    def process(self):
+        self.statistics = getattr(self.channel.site, 'rest_statistics', None)
+        if self.statistics is not None:
+            self.record = RequestRecord(self.method, self.path)
+
+        response_cache = getattr(self.channel.site, 'response_cache', None)
+        if response_cache is not None:
+            if self.method == b"GET" and is_cacheable_path(self.path):
+                self.cache_key = get_cache_key(self.path, self.args)
+                cached_response = response_cache.get(self.cache_key)
+                if cached_response:
+                    if self.record:
+                        self.record.endpoint = cached_response.endpoint
+                        self.record.cache_hit = True
+                    self.site = self.channel.site
+                    self.setHeader(b'server', server.version)
+                    self.setHeader(b'date', http.datetimeToString())
+                    self.write_cached_response(cached_response)
+                    self.finish()
+                    return
+                self.body_buffer = []
+            elif self.method not in (b"GET", b"HEAD"):
+                response_cache.invalidate(self.path)
+
+        if self.record:
+            self.statistics.render_started(self.record, current_thread().ident)
+            try:
+                server.Request.process(self)
+            finally:
+                self.statistics.render_finished(self.record)
+        else:
+            server.Request.process(self)
+
+    def render(self, resrc):
+        self.endpoint = resrc.__class__.__name__
+        if self.record:
+            self.record.endpoint = self.endpoint
+        server.Request.render(self, resrc)
 
     def processingFailed(self, failure):
         self._logger.exception(failure)
@@ -73,5 +131,67 @@ class RESTRequest(server.Request):
         """
         Writes data only if request has not finished and channel is not None
         """
-        if not self.finished and self.channel:
-            server.Request.write(self, data)
+        if self.finished or not self.channel:
+            return
+
+        if self.body_buffer is not None:
+            self.body_buffer.append(data)
+            return
+
+        # We only compress the response if we are writing the complete body at once
+        content_length = self.responseHeaders.getRawHeaders(b'content-length')
+        if not self.startedWriting and content_length and content_length[0] == intToBytes(len(data)) \
+                and self.should_compress(len(data)):
+            data = gzip_compress(data)
+            self.set_gzip_headers(len(data))
+
+        if self.record:
+            self.record.bytes_written += len(data)
+        server.Request.write(self, data)
+
+    def finish(self):
+        if self.body_buffer is not None and not self.finished and self.channel:
+            body = b''.join(self.body_buffer)
+            self.body_buffer = None
+            if self.code == http.OK:
+                content_type = (self.responseHeaders.getRawHeaders(b'content-type') or [self.defaultContentType])[0]
+                cached_response = self.site.response_cache.put(self.cache_key, body, content_type, self.endpoint)
+                self.write_cached_response(cached_response)
+            else:
+                self.setHeader(b'content-length', intToBytes(len(body)))
+                self.write(body)
+
+        if self.record and not self.finished:
+            self.statistics.request_finished(self.record, self.code)
+        return server.Request.finish(self)
+
+    def should_compress(self, length):
+        return length >= GZIP_MIN_RESPONSE_SIZE and not self.responseHeaders.hasHeader(b'content-encoding') \
+            and accepts_gzip(self.getHeader(b'accept-encoding'))
+
+    def set_gzip_headers(self, length):
+        self.setHeader(b'content-encoding', b'gzip')
+        self.setHeader(b'vary', b'Accept-Encoding')
+        self.setHeader(b'content-length', intToBytes(length))
+
+    def write_cached_response(self, cached_response):
+        """
+        Write a (cached) response, or an empty 304 response if the client already has the right version of it.
+        """
+        self.setHeader(b'etag', cached_response.etag)
+        self.setHeader(b'content-type', cached_response.content_type)
+        if etag_matches(cached_response.etag, self.getHeader(b'if-none-match')):
+            self.setResponseCode(http.NOT_MODIFIED)
+            self.responseHeaders.removeHeader(b'content-length')
+            return
+
+        if self.should_compress(len(cached_response.body)):
+            body = cached_response.gzipped_body
+            self.set_gzip_headers(len(body))
+        else:
+            body = cached_response.body
+            self.setHeader(b'content-length', intToBytes(len(body)))
+
+        if self.record:
+            self.record.bytes_written += len(body)
+        server.Request.write(self, body)
@@ -0,0 +1,254 @@
+"""
+This module contains code to gather performance statistics of the requests made to the Tribler HTTP API.
+"""
+import logging
+import time
+from bisect import bisect_left
+from collections import deque
+from threading import Event, Thread
+
+import Tribler.Core.Utilities.json_util as json
+from Tribler.Core.Utilities.instrumentation import get_thread_stack
+
+# Upper bounds (in seconds) of the buckets of the latency histograms
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+MAX_SLOW_REQUESTS = 20
+MIN_SAMPLE_INTERVAL = 0.05
+
+
+class LatencyHistogram(object):
+    """
+    A histogram with fixed bucket boundaries that keeps track of request latencies.
+    """
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def get_percentile(self, percentile):
+        """
+        Estimate a percentile (between 0 and 100) of the latencies, by returning the upper bound of the bucket that
+        contains it. The maximum latency is returned for values that exceed the last bucket.
+        """
+        if not self.count:
+            return 0.0
+
+        rank = percentile / 100.0 * self.count
+        cumulative = 0
+        for ind, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= rank and bucket_count:
+                return min(self.bounds[ind], self.max) if ind < len(self.bounds) else self.max
+        return self.max
+
+    def to_dict(self):
+        buckets = [[bound, count] for bound, count in zip(self.bounds, self.counts)]
+        buckets.append(["+Inf", self.counts[-1]])
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.get_percentile(50),
+            "p90": self.get_percentile(90),
+            "p99": self.get_percentile(99),
+            "buckets": buckets
+        }
+
+
+class RequestRecord(object):
+    """
+    The measurements of a single request made to the HTTP API.
+    The handler, database and serialisation times only cover the synchronous processing of a request on the reactor
+    thread, the latency covers the processing until the response has been finished.
+    """
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.endpoint = None
+        self.cache_hit = False
+        self.code = None
+        self.start_time = time.time()
+        self.render_start_time = None
+        self.thread_id = None
+        self.latency = 0.0
+        self.handler_time = 0.0
+        self.db_time = 0.0
+        self.serialization_time = 0.0
+        self.bytes_written = 0
+        self.stack = None
+
+    def to_dict(self):
+        return {
+            "method": self.method,
+            "path": self.path,
+            "endpoint": self.endpoint,
+            "cache_hit": self.cache_hit,
+            "code": self.code,
+            "time": self.start_time,
+            "latency": self.latency,
+            "handler_time": self.handler_time,
+            "db_time": self.db_time,
+            "serialization_time": self.serialization_time,
+            "bytes_written": self.bytes_written,
+            "stack": self.stack
+        }
+
+
+class EndpointStatistics(object):
+    """
+    The aggregated measurements of all requests made to a specific endpoint.
+    """
+
+    def __init__(self):
+        self.num_requests = 0
+        self.num_cache_hits = 0
+        self.num_errors = 0
+        self.num_slow_requests = 0
+        self.latency = LatencyHistogram()
+        self.handler_time = 0.0
+        self.db_time = 0.0
+        self.serialization_time = 0.0
+        self.bytes_written = 0
+
+    def add_request(self, record):
+        self.num_requests += 1
+        if record.cache_hit:
+            self.num_cache_hits += 1
+        if record.code >= 500:
+            self.num_errors += 1
+        self.latency.add(record.latency)
+        self.handler_time += record.handler_time
+        self.db_time += record.db_time
+        self.serialization_time += record.serialization_time
+        self.bytes_written += record.bytes_written
+
+    def to_dict(self):
+        return {
+            "requests": self.num_requests,
+            "cache_hits": self.num_cache_hits,
+            "errors": self.num_errors,
+            "slow_requests": self.num_slow_requests,
+            "latency": self.latency.to_dict(),
+            "handler_time": self.handler_time,
+            "db_time": self.db_time,
+            "serialization_time": self.serialization_time,
+            "bytes_written": self.bytes_written
+        }
+
+
+class SlowRequestSampler(Thread):
+    """
+    This thread samples the stack of the reactor thread when the synchronous processing of a request takes longer
+    than the slow request threshold.
+    """
+
+    def __init__(self, statistics, threshold):
+        super(SlowRequestSampler, self).__init__()
+        self.setDaemon(True)
+        self.setName(self.__class__.__name__)
+        self.statistics = statistics
+        self.threshold = threshold
+        self.interval = max(threshold / 2.0, MIN_SAMPLE_INTERVAL)
+        self.stop_event = Event()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            record = self.statistics.active_record
+            if record is None or record.stack is not None or time.time() - record.render_start_time < self.threshold:
+                continue
+
+            stack = get_thread_stack(record.thread_id)
+            # Only keep the sample if the reactor thread is still processing the same request
+            if self.statistics.active_record is record:
+                record.stack = stack
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+
+class RESTStatistics(object):
+    """
+    This class keeps per-endpoint statistics of the requests made to the HTTP API and logs requests that exceed
+    the slow request threshold.
+    """
+
+    def __init__(self, session, slow_request_threshold):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.session = session
+        self.slow_request_threshold = slow_request_threshold
+        self.endpoints = {}
+        self.slow_requests = deque(maxlen=MAX_SLOW_REQUESTS)
+        self.active_record = None
+        self.sampler = None
+
+    def start(self):
+        if self.slow_request_threshold > 0:
+            self.sampler = SlowRequestSampler(self, self.slow_request_threshold)
+            self.sampler.start()
+
+    def stop(self):
+        if self.sampler:
+            self.sampler.stop()
+            self.sampler = None
+
+    def get_db_time(self):
+        sqlite_db = self.session.sqlite_db
+        return sqlite_db.query_time if sqlite_db else 0.0
+
+    def render_started(self, record, thread_id):
+        record.thread_id = thread_id
+        record.render_start_time = time.time()
+        record.db_time = self.get_db_time()
+        record.serialization_time = json.get_dumps_time()
+        self.active_record = record
+
+    def render_finished(self, record):
+        self.active_record = None
+        record.handler_time = time.time() - record.render_start_time
+        record.db_time = self.get_db_time() - record.db_time
+        record.serialization_time = json.get_dumps_time() - record.serialization_time
+
+        # The request might have been finished during the rendering
+        if record.code is not None:
+            self.add_request(record)
+
+    def request_finished(self, record, code):
+        record.code = code
+        record.latency = time.time() - record.start_time
+        if self.active_record is not record:
+            self.add_request(record)
+
+    def add_request(self, record):
+        key = "%s %s" % (record.method, record.endpoint)
+        endpoint_statistics = self.endpoints.get(key)
+        if endpoint_statistics is None:
+            endpoint_statistics = self.endpoints[key] = EndpointStatistics()
+        endpoint_statistics.add_request(record)
+
+        if 0 < self.slow_request_threshold < record.latency:
+            endpoint_statistics.num_slow_requests += 1
+            self.slow_requests.append(record)
+            self._logger.warning("Slow request %s %s (%s) took %.3fs: handler %.3fs, database %.3fs, "
+                                 "serialisation %.3fs, %d bytes written%s", record.method, record.path,
+                                 record.endpoint, record.latency, record.handler_time, record.db_time,
+                                 record.serialization_time, record.bytes_written,
+                                 ", reactor stack:\n  " + "\n  ".join(record.stack) if record.stack else "")
+
+    def get_statistics_dict(self):
+        return {
+            "slow_request_threshold": self.slow_request_threshold,
+            "endpoints": {key: statistics.to_dict() for key, statistics in self.endpoints.iteritems()},
+            "slow_requests": [record.to_dict() for record in self.slow_requests]
+        }
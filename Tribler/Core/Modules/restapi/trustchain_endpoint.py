@@ -14,7 +14,8 @@ class TrustchainEndpoint(resource.Resource):
         child_handler_dict = {
             "statistics": TrustchainStatsEndpoint,
             "blocks": TrustchainBlocksEndpoint,
-            "bootstrap": TrustchainBootstrapEndpoint
+            "bootstrap": TrustchainBootstrapEndpoint,
+            "crawler": TrustchainCrawlerEndpoint
         }
 
         for path, child_cls in child_handler_dict.iteritems():
@@ -222,3 +223,44 @@ class TrustchainBootstrapEndpoint(TrustchainBaseEndpoint):
 
         result = triblerchain_community.bootstrap_new_identity(amount)
         return json.dumps(result)
+
+
+class TrustchainCrawlerEndpoint(TrustchainBaseEndpoint):
+    """
+    This class handles requests regarding the progress of the TriblerChain crawler.
+    """
+
+    def render_GET(self, request):
+        """
+        .. http:get:: /trustchain/crawler
+
+        A GET request to this endpoint returns the number of crawled blocks and identities, and the rate at which
+        they are crawled. This endpoint is only available when Tribler runs as a TriblerChain crawler.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X GET http://localhost:8085/trustchain/crawler
+
+            **Example response**:
+
+            .. sourcecode:: javascript
+
+                {
+                    "crawler": {
+                        "blocks": 1383722,
+                        "identities": 20417,
+                        "blocks_per_second": 283.5,
+                        "identities_per_second": 4.2,
+                        "crawls_in_flight": 50,
+                        "crawls_queued": 312
+                    }
+                }
+        """
+        get_crawl_statistics = getattr(self.session.lm.triblerchain_community, 'get_crawl_statistics', None)
+        if not get_crawl_statistics:
+            request.setResponseCode(http.NOT_FOUND)
+            return json.dumps({"error": "triblerchain crawler not found"})
+
+        return json.dumps({'crawler': get_crawl_statistics()})
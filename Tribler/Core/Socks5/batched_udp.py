@@ -0,0 +1,245 @@
+"""
+Batched datagram I/O for the SOCKS5 UDP relay.
+
+On Linux, the recvmmsg and sendmmsg system calls receive and send many datagrams at once. This module provides a
+Twisted UDP port that uses these calls (through ctypes) when they are available. On other platforms, or when the C
+library does not provide them, the regular Twisted UDP port should be used instead, see is_batched_udp_supported.
+"""
+import ctypes
+import ctypes.util
+import errno
+import logging
+import socket
+import struct
+import sys
+
+from twisted.internet import udp
+
+MSG_DONTWAIT = 0x40
+
+# The IPv4 address in a sockaddr_in structure is in network byte order, so it is packed in the native byte order
+IN_ADDR_STRUCT = struct.Struct("=I")
+
+# The errors that indicate that there is nothing to read at the moment
+READ_IGNORE_ERRORS = (errno.EAGAIN, errno.EINTR, errno.EWOULDBLOCK)
+
+logger = logging.getLogger(__name__)
+
+
+class IOVec(ctypes.Structure):
+    # The base is a char pointer (instead of a void pointer), so a str can be assigned to it without copying it
+    _fields_ = [("iov_base", ctypes.c_char_p),
+                ("iov_len", ctypes.c_size_t)]
+
+
+class MsgHdr(ctypes.Structure):
+    _fields_ = [("msg_name", ctypes.c_void_p),
+                ("msg_namelen", ctypes.c_uint32),
+                ("msg_iov", ctypes.POINTER(IOVec)),
+                ("msg_iovlen", ctypes.c_size_t),
+                ("msg_control", ctypes.c_void_p),
+                ("msg_controllen", ctypes.c_size_t),
+                ("msg_flags", ctypes.c_int)]
+
+
+class MMsgHdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", MsgHdr),
+                ("msg_len", ctypes.c_uint)]
+
+
+class SockAddrIn(ctypes.Structure):
+    _fields_ = [("sin_family", ctypes.c_ushort),
+                ("sin_port", ctypes.c_uint16),
+                ("sin_addr", ctypes.c_uint32),
+                ("sin_zero", ctypes.c_char * 8)]
+
+
+def _load_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    except OSError:
+        return None
+
+    if not hasattr(libc, "recvmmsg") or not hasattr(libc, "sendmmsg"):
+        return None
+
+    libc.recvmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(MMsgHdr), ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+    libc.recvmmsg.restype = ctypes.c_int
+    libc.sendmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(MMsgHdr), ctypes.c_uint, ctypes.c_int]
+    libc.sendmmsg.restype = ctypes.c_int
+    return libc
+
+
+libc = _load_libc()
+
+
+def is_batched_udp_supported():
+    """
+    Return whether datagrams can be received and sent in batches on this platform.
+    """
+    return libc is not None
+
+
+def _raise_errno():
+    error_number = ctypes.get_errno()
+    raise socket.error(error_number, errno.errorcode.get(error_number, "unknown error"))
+
+
+class MMsgBuffers(object):
+    """
+    The preallocated message headers, addresses and buffers that are passed to recvmmsg and sendmmsg.
+    """
+
+    def __init__(self, batch_size, max_packet_size=0):
+        self.batch_size = batch_size
+        self.max_packet_size = max_packet_size
+
+        self.messages = (MMsgHdr * batch_size)()
+        self.addresses = (SockAddrIn * batch_size)()
+        self.iovecs = (IOVec * batch_size)()
+        self.buffers = []
+
+        # Indexing a ctypes array creates a new wrapper object every time, so we keep lists with the elements
+        self.message_list = list(self.messages)
+        self.address_list = list(self.addresses)
+        self.iovec_list = list(self.iovecs)
+        self.sent_addresses = [None] * batch_size
+
+        for message, address, iovec in zip(self.message_list, self.address_list, self.iovec_list):
+            message.msg_hdr.msg_name = ctypes.addressof(address)
+            message.msg_hdr.msg_namelen = ctypes.sizeof(SockAddrIn)
+            message.msg_hdr.msg_iov = ctypes.pointer(iovec)
+            message.msg_hdr.msg_iovlen = 1
+            address.sin_family = socket.AF_INET
+
+            # Only the receiving side needs buffers, sent datagrams are passed to the kernel without copying them
+            if max_packet_size:
+                buf = ctypes.create_string_buffer(max_packet_size)
+                self.buffers.append(buf)
+                iovec.iov_base = ctypes.cast(buf, ctypes.c_char_p)
+                iovec.iov_len = max_packet_size
+
+    def receive(self, fd):
+        """
+        Receive a batch of IPv4 datagrams from a non-blocking socket.
+        @return: a list with (data, (host, port)) tuples
+        """
+        received = libc.recvmmsg(fd, self.messages, self.batch_size, MSG_DONTWAIT, None)
+        if received < 0:
+            _raise_errno()
+
+        datagrams = []
+        address_size = ctypes.sizeof(SockAddrIn)
+        for index in xrange(received):
+            message = self.message_list[index]
+            address = self.address_list[index]
+            host = socket.inet_ntoa(IN_ADDR_STRUCT.pack(address.sin_addr))
+            datagrams.append((ctypes.string_at(self.buffers[index], message.msg_len),
+                              (host, socket.ntohs(address.sin_port))))
+            # The kernel has overwritten the length of the address
+            message.msg_hdr.msg_namelen = address_size
+        return datagrams
+
+    def send(self, fd, datagrams):
+        """
+        Send at most batch_size IPv4 datagrams over a non-blocking socket.
+        @param datagrams: a list with (data, (host, port)) tuples
+        @return: the number of datagrams that have been sent
+        """
+        count = min(len(datagrams), self.batch_size)
+        for index in xrange(count):
+            data, address = datagrams[index]
+            iovec = self.iovec_list[index]
+            iovec.iov_base = data
+            iovec.iov_len = len(data)
+
+            # Usually, all datagrams are sent to the same address, so we only update the address when it changes
+            if self.sent_addresses[index] != address:
+                self.address_list[index].sin_port = socket.htons(address[1])
+                self.address_list[index].sin_addr, = IN_ADDR_STRUCT.unpack(socket.inet_aton(address[0]))
+                self.sent_addresses[index] = address
+
+        sent = libc.sendmmsg(fd, self.messages, count, MSG_DONTWAIT)
+        if sent < 0:
+            _raise_errno()
+        return sent
+
+
+class BatchedUDPPort(udp.Port):
+    """
+    A Twisted UDP port that receives datagrams with recvmmsg and that can send datagrams with sendmmsg.
+    The protocol still gets a datagramReceived call for every datagram, but the reactor only wakes up and calls
+    into the kernel once for every batch of datagrams.
+    """
+
+    def __init__(self, port, proto, interface='', maxPacketSize=8192, reactor=None, batch_size=64):
+        udp.Port.__init__(self, port, proto, interface=interface, maxPacketSize=maxPacketSize, reactor=reactor)
+        self.receive_buffers = MMsgBuffers(batch_size, maxPacketSize)
+        self.send_buffers = MMsgBuffers(batch_size)
+        self.pending_datagrams = []
+        self.flush_call = None
+
+    def doRead(self):
+        if self.addressFamily != socket.AF_INET:
+            return udp.Port.doRead(self)
+
+        read = 0
+        while read < self.maxThroughput:
+            try:
+                datagrams = self.receive_buffers.receive(self.fileno())
+            except socket.error as exc:
+                if exc.args[0] in READ_IGNORE_ERRORS:
+                    return
+                if exc.args[0] == errno.ECONNREFUSED:
+                    if self._connectedAddr:
+                        self.protocol.connectionRefused()
+                    return
+                raise
+
+            for data, address in datagrams:
+                read += len(data)
+                try:
+                    self.protocol.datagramReceived(data, address)
+                except Exception:
+                    logger.exception("Unhandled exception while processing a datagram")
+
+            if len(datagrams) < self.receive_buffers.batch_size:
+                return
+
+    def write_batched(self, datagram, address):
+        """
+        Queue a datagram, the queued datagrams are sent at once during the next reactor iteration.
+        """
+        self.pending_datagrams.append((datagram, address))
+        if not self.flush_call:
+            self.flush_call = self.reactor.callLater(0, self.flush)
+
+    def flush(self):
+        """
+        Send all queued datagrams. If sendmmsg fails, the remaining datagrams are sent one by one.
+        """
+        self.flush_call = None
+        datagrams, self.pending_datagrams = self.pending_datagrams, []
+
+        sent = 0
+        try:
+            while sent < len(datagrams):
+                sent += self.send_buffers.send(self.fileno(), datagrams[sent:sent + self.send_buffers.batch_size])
+        except socket.error as exc:
+            logger.debug("Batched send failed (%s), sending %d datagrams one by one", exc, len(datagrams) - sent)
+            for datagram, address in datagrams[sent:]:
+                try:
+                    self.write(datagram, address)
+                except socket.error:
+                    # Just like the network would, we drop datagrams that the socket cannot handle right now
+                    pass
+
+    def connectionLost(self, reason=None):
+        if self.flush_call:
+            self.flush_call.cancel()
+            self.flush_call = None
+        self.pending_datagrams = []
+        udp.Port.connectionLost(self, reason)
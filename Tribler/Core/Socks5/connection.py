@@ -152,7 +152,7 @@ class Socks5Connection(Protocol):
         # The DST.ADDR and DST.PORT fields contain the address and port that the client expects
         # to use to send UDP datagrams on for the association.  The server MAY use this information
         # to limit access to the association.
-        self._udp_socket = SocksUDPConnection(self, request.destination)
+        self._udp_socket = SocksUDPConnection(self, request.destination, batched=self.socksserver.batched_udp)
         ip = self.transport.getHost().host
         port = self._udp_socket.get_listen_port()
 
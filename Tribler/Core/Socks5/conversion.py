@@ -23,6 +23,9 @@ REP_TTL_EXPIRED = 0x06
 REP_COMMAND_NOT_SUPPORTED = 0x07
 REP_ADDRESS_TYPE_NOT_SUPPORTED = 0x08
 
+UDP_HEADER_STRUCT = struct.Struct("!HBB")
+UDP_IPV4_ADDRESS_STRUCT = struct.Struct("!4sH")
+
 
 logger = logging.getLogger(__name__)
 
@@ -63,9 +66,11 @@ class UdpRequest(object):
     @param address_type: whether we deal with an IPv4 or IPv6 address
     @param str destination_address: the destination host
     @param int destination_port: the destination port
-    @param str payload: the payload
+    @param str|memoryview payload: the payload
     """
 
+    __slots__ = ['rsv', 'frag', 'address_type', 'destination_host', 'destination_port', 'payload']
+
     def __init__(self, rsv, frag, address_type, destination_address,
                  destination_port, payload):
         self.rsv = rsv
@@ -210,26 +215,49 @@ def encode_reply(version, rep, rsv, address_type, bind_address, bind_port):
 
 def decode_udp_packet(data):
     """
-    Decodes a SOCKS5 UDP packet
+    Decodes a SOCKS5 UDP packet. The payload is not copied, it is a memoryview of the packet data.
     @param str data: the raw packet data
     @return: An UdpRequest object containing the parsed data
     @rtype: UdpRequest
     """
-    offset = 0
-    (rsv, frag, address_type) = struct.unpack_from("!HBB", data, offset)
-    offset += 4
+    (rsv, frag, address_type) = UDP_HEADER_STRUCT.unpack_from(data, 0)
 
-    offset, destination_address = __decode_address(address_type, offset, data)
+    if address_type == ADDRESS_TYPE_IPV4:
+        # Fast path for the most common address type
+        packed_address, destination_port = UDP_IPV4_ADDRESS_STRUCT.unpack_from(data, UDP_HEADER_STRUCT.size)
+        destination_address = socket.inet_ntoa(packed_address)
+        offset = UDP_HEADER_STRUCT.size + UDP_IPV4_ADDRESS_STRUCT.size
+    else:
+        offset, destination_address = __decode_address(address_type, UDP_HEADER_STRUCT.size, data)
 
-    destination_port, = struct.unpack_from("!H", data, offset)
-    offset += 2
+        destination_port, = struct.unpack_from("!H", data, offset)
+        offset += 2
 
-    payload = data[offset:]
+    payload = memoryview(data)[offset:]
 
     return UdpRequest(rsv, frag, address_type, destination_address,
                       destination_port, payload)
 
 
+def encode_udp_header(rsv, frag, address_type, address, port):
+    """
+    Encodes the header of a SOCKS5 UDP packet
+    @param rsv: reserved bytes
+    @param frag: fragment
+    @param address_type: the address's type
+    @param address: address host
+    @param port: address port
+    @return: serialised byte string
+    @rtype: str
+    """
+    if address_type == ADDRESS_TYPE_IPV4:
+        return UDP_HEADER_STRUCT.pack(rsv, frag, address_type) + \
+            UDP_IPV4_ADDRESS_STRUCT.pack(socket.inet_aton(address), port)
+
+    return UDP_HEADER_STRUCT.pack(rsv, frag, address_type) + __encode_address(address_type, address) + \
+        struct.pack("!H", port)
+
+
 def encode_udp_packet(rsv, frag, address_type, address, port, payload):
     """
     Encodes a SOCKS5 UDP packet
@@ -242,14 +270,33 @@ def encode_udp_packet(rsv, frag, address_type, address, port, payload):
     @return: serialised byte string
     @rtype: str
     """
-    strings = [
-        struct.pack("!HBB", rsv, frag, address_type),
-        __encode_address(address_type, address),
-        struct.pack("!H", port),
-        payload
-    ]
-
-    return ''.join(strings)
+    return encode_udp_header(rsv, frag, address_type, address, port) + payload
+
+
+class UdpHeaderCache(object):
+    """
+    Cache of the encoded headers of unfragmented SOCKS5 UDP packets from IPv4 addresses, to avoid encoding the same
+    header for every packet from a peer. The cache is cleared when it grows beyond max_size.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.headers = {}
+
+    def get_header(self, address, port):
+        """
+        Return the encoded header for packets from the given address and port
+        @rtype: str
+        """
+        header = self.headers.get((address, port))
+        if header is None:
+            if len(self.headers) >= self.max_size:
+                self.headers.clear()
+            header = self.headers[(address, port)] = encode_udp_header(0, 0, ADDRESS_TYPE_IPV4, address, port)
+        return header
+
+    def encode_udp_packet(self, address, port, payload):
+        return self.get_header(address, port) + payload
 
 
 class IPV6AddrError(NotImplementedError):
@@ -11,11 +11,12 @@ class Socks5Server(object):
     This object represents a Socks5 server.
     """
 
-    def __init__(self, port, udp_output_stream):
+    def __init__(self, port, udp_output_stream, batched_udp=False):
         self._logger = logging.getLogger(self.__class__.__name__)
 
         self.port = port
         self.udp_output_stream = udp_output_stream
+        self.batched_udp = batched_udp
         self.twisted_port = None
         self.sessions = []
 
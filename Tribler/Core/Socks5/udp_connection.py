@@ -1,13 +1,14 @@
 import logging
 
 from Tribler.Core.Socks5 import conversion
+from Tribler.Core.Socks5.batched_udp import BatchedUDPPort, is_batched_udp_supported
 from twisted.internet import reactor
 from twisted.internet.protocol import DatagramProtocol
 
 
 class SocksUDPConnection(DatagramProtocol):
 
-    def __init__(self, socksconnection, remote_udp_address):
+    def __init__(self, socksconnection, remote_udp_address, batched=False):
         self._logger = logging.getLogger(self.__class__.__name__)
         self.socksconnection = socksconnection
 
@@ -16,14 +17,24 @@ class SocksUDPConnection(DatagramProtocol):
         else:
             self.remote_udp_address = None
 
-        self.listen_port = reactor.listenUDP(0, self)
+        self.batched = batched and is_batched_udp_supported()
+        if self.batched:
+            self.listen_port = BatchedUDPPort(0, self, reactor=reactor)
+            self.listen_port.startListening()
+        else:
+            if batched:
+                self._logger.info("Batched UDP I/O is not supported on this platform, falling back to regular I/O")
+            self.listen_port = reactor.listenUDP(0, self)
 
     def get_listen_port(self):
         return self.listen_port.getHost().port
 
     def sendDatagram(self, data):
         if self.remote_udp_address:
-            self.transport.write(data, self.remote_udp_address)
+            if self.batched:
+                self.transport.write_batched(data, self.remote_udp_address)
+            else:
+                self.transport.write(data, self.remote_udp_address)
             return True
         else:
             self._logger.error("cannot send data, no clue where to send it to")
@@ -0,0 +1,81 @@
+from base64 import b64encode
+from collections import OrderedDict
+from hashlib import sha1
+
+from .exception import BufferCacheFullException
+
+# default maximum number of bytes of the files that are being uploaded
+DEFAULT_MAX_BUFFER_SIZE = 64 * 1024 * 1024
+
+
+class BufferCacheEntry(object):
+    """
+    A file in the buffer cache.
+    """
+    __slots__ = ('view', 'checksum', 'references')
+
+    def __init__(self, data):
+        self.view = memoryview(data)
+        self.checksum = b64encode(sha1(data).digest())
+        self.references = 0
+
+
+class BufferCache(object):
+    """
+    A read-only cache of the files that are uploaded over TFTP. All sessions that upload the same file share a single
+    buffer, which they slice with a memoryview, so the blocks are not copied until they are put in a packet.
+
+    The files that are in use by a session may not take more than max_size bytes together. The files that are no
+    longer in use stay in the cache until their memory is needed for another file.
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_BUFFER_SIZE):
+        self.max_size = max_size
+        self.size = 0
+        self._entries = OrderedDict()  # Map: key -> BufferCacheEntry, the least recently used first
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def acquire(self, key, load_file):
+        """
+        Gets the buffer of a file for a session, the buffer should be released when the session is done.
+        :param key: The key of the file.
+        :param load_file: A function that returns the content of the file, called if the file is not cached.
+        :return: A (memoryview, checksum) tuple.
+        :raises BufferCacheFullException: if the file does not fit in the cache next to the files that are in use.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            data = load_file()
+            self._make_room(key, len(data))
+            entry = BufferCacheEntry(data)
+            self.size += len(data)
+
+        self._entries[key] = entry
+        entry.references += 1
+        return entry.view, entry.checksum
+
+    def release(self, key):
+        """
+        Releases the buffer of a file that has been acquired by a session.
+        :param key: The key of the file.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.references > 0:
+            entry.references -= 1
+
+    def _make_room(self, key, size):
+        """
+        Removes the least recently used files that are not in use, until a file of the given size fits in the cache.
+        """
+        for old_key, entry in self._entries.items():
+            if self.size + size <= self.max_size:
+                break
+            if not entry.references:
+                del self._entries[old_key]
+                self.size -= len(entry.view)
+
+        if self.size + size > self.max_size:
+            raise BufferCacheFullException(u"%s (%d bytes) does not fit in the buffer cache (%d of %d bytes in use)"
+                                           % (key, size, self.size, self.max_size))
@@ -16,3 +16,8 @@ class InvalidStringException(Exception):
 class FileNotFound(OSError):
     """Indicates that a file is not found."""
     pass
+
+
+class BufferCacheFullException(Exception):
+    """Indicates that a file does not fit in the buffer cache."""
+    pass
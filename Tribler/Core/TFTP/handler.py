@@ -15,10 +15,11 @@ from Tribler.dispersy.util import (call_on_reactor_thread, blocking_call_on_reac
                                    is_valid_address)
 from Tribler.pyipv8.ipv8.taskmanager import TaskManager
 
-from .exception import InvalidPacketException, FileNotFound
+from .buffer_cache import BufferCache, DEFAULT_MAX_BUFFER_SIZE
+from .exception import InvalidPacketException, FileNotFound, BufferCacheFullException
 from .packet import (encode_packet, decode_packet, OPCODE_RRQ, OPCODE_WRQ, OPCODE_ACK, OPCODE_DATA, OPCODE_OACK,
                      OPCODE_ERROR, ERROR_DICT)
-from .session import Session, DEFAULT_BLOCK_SIZE, DEFAULT_TIMEOUT
+from .session import Session, DEFAULT_BLOCK_SIZE, DEFAULT_TIMEOUT, DEFAULT_WINDOW_SIZE
 
 MAX_INT16 = 2 ** 16 - 1
 
@@ -32,10 +33,19 @@ class TftpHandler(TaskManager):
 
     """
     This is the TFTP handler that should be registered at the thread pool to handle TFTP packets.
+
+    The number of DATA packets that are sent before waiting for an ACK is negotiated with the windowsize option
+    (RFC 7440). The receiver acknowledges cumulatively, once per window, and keeps the blocks that arrive after a
+    missing block, so the sender only retransmits the first block that has not been acknowledged. A missing block is
+    reported right away with an ACK of the block before it. A peer that does not negotiate a window size gets one DATA
+    packet at a time.
+
+    The files that are uploaded are kept in a BufferCache that is shared by all sessions. A request for a file that
+    does not fit in the cache next to the files that are being uploaded is rejected.
     """
 
     def __init__(self, session, endpoint, prefix, block_size=DEFAULT_BLOCK_SIZE, timeout=DEFAULT_TIMEOUT,
-                 max_retries=DEFAULT_RETIES):
+                 max_retries=DEFAULT_RETIES, window_size=DEFAULT_WINDOW_SIZE, max_buffer_size=DEFAULT_MAX_BUFFER_SIZE):
         """ The constructor.
         :param session:     The tribler session.
         :param endpoint:    The endpoint to use.
@@ -43,6 +53,8 @@ class TftpHandler(TaskManager):
         :param block_size:  Transmission block size.
         :param timeout:     Transmission timeout.
         :param max_retries: Transmission maximum retries.
+        :param window_size: The maximum number of DATA packets in flight.
+        :param max_buffer_size: The maximum number of bytes of the files that are being uploaded.
         """
         super(TftpHandler, self).__init__()
         self._logger = logging.getLogger(self.__class__.__name__)
@@ -55,6 +67,9 @@ class TftpHandler(TaskManager):
         self._block_size = block_size
         self._timeout = timeout
         self._max_retries = max_retries
+        self._window_size = window_size
+
+        self._buffer_cache = BufferCache(max_buffer_size)
 
         self._timeout_check_interval = 0.5
 
@@ -129,7 +144,8 @@ class TftpHandler(TaskManager):
         self._logger.debug(u"start downloading %s from %s:%s, sid = %s", file_name, ip, port, session_id)
         session = Session(True, session_id, (ip, port), OPCODE_RRQ, file_name, '', None, None,
                           extra_info=extra_info, block_size=self._block_size, timeout=self._timeout,
-                          success_callback=success_callback, failure_callback=failure_callback)
+                          window_size=self._window_size, success_callback=success_callback,
+                          failure_callback=failure_callback)
 
         self._add_new_session(session)
         self._send_request_packet(session)
@@ -170,8 +186,20 @@ class TftpHandler(TaskManager):
         timeout = session.timeout * (2**session.retries)
         if session.last_contact_time + timeout < time():
             # we do NOT resend packets that are not data-related
-            if session.retries < self._max_retries and session.last_sent_packet['opcode'] in (OPCODE_ACK, OPCODE_DATA):
-                self._send_packet(session, session.last_sent_packet)
+            if session.retries < self._max_retries and session.last_sent_packet['opcode'] == OPCODE_DATA:
+                # only the first block that has not been acknowledged, the receiver keeps the blocks after it
+                self._send_block(session, session.acked_block_number + 1)
+                session.retries += 1
+            elif session.retries < self._max_retries and session.last_sent_packet['opcode'] == OPCODE_ACK:
+                # acknowledge all blocks that have been received, also when the window is not complete yet
+                self._send_ack_packet(session, session.block_number - 1)
+                session.retries += 1
+            elif session.retries < self._max_retries and session.last_sent_packet['opcode'] == OPCODE_RRQ \
+                    and session.window_size > 1:
+                # peers that do not know the windowsize option drop the request, so we ask again without it
+                self._logger.info(u"%s no OACK, retrying without window size", session)
+                session.window_size = 1
+                self._send_request_packet(session)
                 session.retries += 1
             else:
                 has_failed = True
@@ -204,7 +232,9 @@ class TftpHandler(TaskManager):
         self._session_id_dict[session_id] -= 1
         if self._session_id_dict[session_id] == 0:
             del self._session_id_dict[session_id]
-        del self._session_dict[key]
+        session = self._session_dict.pop(key)
+        if not session.is_client:
+            self._buffer_cache.release(session.file_name)
 
     @attach_runtime_statistics(u"{0.__class__.__name__}.{function_name}")
     @call_on_reactor_thread
@@ -287,6 +317,7 @@ class TftpHandler(TaskManager):
         file_name = packet['file_name'].decode('utf8')
         block_size = packet['options']['blksize']
         timeout = packet['options']['timeout']
+        window_size = max(1, min(packet['options'].get('windowsize', 1), self._window_size))
 
         # check session_id
         if (ip, port, packet['session_id']) in self._session_dict:
@@ -296,23 +327,29 @@ class TftpHandler(TaskManager):
             self._handle_error(dummy_session, 50)
             return
 
-        # read the file/directory into memory
+        # get the file/directory from the buffer cache, it is read into memory if it is not cached
         try:
             if file_name.startswith(METADATA_PREFIX):
                 if not self.session.config.get_metadata_enabled():
                     return
-                file_data, file_size = self._load_metadata(file_name[len(METADATA_PREFIX):])
+                load_file = lambda: self._load_metadata(file_name[len(METADATA_PREFIX):])
             else:
                 if not self.session.config.get_torrent_store_enabled():
                     return
-                file_data, file_size = self._load_torrent(file_name)
-            checksum = b64encode(sha1(file_data).digest())
+                load_file = lambda: self._load_torrent(file_name)
+            file_data, checksum = self._buffer_cache.acquire(file_name, load_file)
         except FileNotFound as e:
             self._logger.warn(u"[READ %s:%s] file not found: %s", ip, port, e)
             dummy_session = Session(False, packet['session_id'], (ip, port), packet['opcode'],
                                     file_name, None, None, None, block_size=block_size, timeout=timeout)
             self._handle_error(dummy_session, 1)
             return
+        except BufferCacheFullException as e:
+            self._logger.warn(u"[READ %s:%s] rejected: %s", ip, port, e)
+            dummy_session = Session(False, packet['session_id'], (ip, port), packet['opcode'],
+                                    file_name, None, None, None, block_size=block_size, timeout=timeout)
+            self._handle_error(dummy_session, 3)
+            return
         except Exception as e:
             self._logger.error(u"[READ %s:%s] failed to load file: %s", ip, port, e)
             dummy_session = Session(False, packet['session_id'], (ip, port), packet['opcode'],
@@ -322,7 +359,8 @@ class TftpHandler(TaskManager):
 
         # create a session object
         session = Session(False, packet['session_id'], (ip, port), packet['opcode'],
-                          file_name, file_data, file_size, checksum, block_size=block_size, timeout=timeout)
+                          file_name, file_data, len(file_data), checksum, block_size=block_size, timeout=timeout,
+                          window_size=window_size)
 
         # insert session_id and session
         self._add_new_session(session)
@@ -334,6 +372,7 @@ class TftpHandler(TaskManager):
     def _load_metadata(self, thumb_hash):
         """ Loads a thumbnail into memory.
         :param thumb_hash: The thumbnail hash.
+        :return: The content of the thumbnail.
         """
         file_data = self.session.lm.metadata_store.get(thumb_hash.encode('utf8'))
         # check if file exists
@@ -341,11 +380,12 @@ class TftpHandler(TaskManager):
             msg = u"Metadata not in store: %s" % thumb_hash
             raise FileNotFound(msg)
 
-        return file_data, len(file_data)
+        return file_data
 
     def _load_torrent(self, file_name):
         """ Loads a file into memory.
         :param file_name: The file name.
+        :return: The content of the file.
         """
         infohash = (file_name[:-8]).encode('utf8')  # len('.torrent') = 8
 
@@ -355,22 +395,32 @@ class TftpHandler(TaskManager):
             msg = u"Torrent not in store: %s" % infohash
             raise FileNotFound(msg)
 
-        return file_data, len(file_data)
+        return file_data
 
-    def _get_next_data(self, session):
-        """ Gets the next block of data to be uploaded. This method is only used for data uploading.
-        :return The data to transfer.
+    def _get_last_block_number(self, session):
+        """ Gets the number of the last block, which is smaller than the block size and may be empty.
+        This method is only used for data uploading.
         """
-        start_idx = session.block_number * session.block_size
-        end_idx = start_idx + session.block_size
-        data = session.file_data[start_idx:end_idx]
-        session.block_number += 1
+        return session.file_size // session.block_size + 1
 
-        # check if we are done
-        if len(data) < session.block_size:
-            session.is_waiting_for_last_ack = True
+    def _send_block(self, session, block_number):
+        """ Sends a block of data, a slice of the memoryview on the file buffer. This method is only used for data
+        uploading.
+        :param block_number: The number of the block, the first block of the file has number 1.
+        """
+        start_idx = (block_number - 1) * session.block_size
+        end_idx = start_idx + session.block_size
+        self._send_data_packet(session, block_number, session.file_data[start_idx:end_idx])
 
-        return data
+    def _send_window(self, session):
+        """ Sends the blocks that fit in the window after the last acknowledged block and have not been sent yet.
+        This method is only used for data uploading.
+        """
+        last_block_number = min(session.acked_block_number + session.window_size,
+                                self._get_last_block_number(session))
+        while session.block_number < last_block_number:
+            session.block_number += 1
+            self._send_block(session, session.block_number)
 
     def _process_packet(self, session, packet):
         """ processes an incoming packet.
@@ -412,6 +462,16 @@ class TftpHandler(TaskManager):
                     self._handle_error(session, 0, error_msg=msg)  # Error: timeout mismatch
                     return
 
+                # peers that do not negotiate a window size send one block at a time
+                window_size = packet['options'].get('windowsize', 1)
+                if not 1 <= window_size <= session.window_size:
+                    msg = "%s OACK windowsize mismatch: %s > %s (requested)" %\
+                          (session, window_size, session.window_size)
+                    self._logger.error(msg)
+                    self._handle_error(session, 0, error_msg=msg)  # Error: windowsize mismatch
+                    return
+
+                session.window_size = window_size
                 session.file_size = packet['options']['tsize']
                 session.checksum = packet['options']['checksum']
 
@@ -435,26 +495,48 @@ class TftpHandler(TaskManager):
         self._logger.debug(u"%s Got data, #block = %s size = %s", session, packet['block_number'], len(packet['data']))
 
         # check block_number
-        # ignore old ones, they may be retransmissions
+        # old ones are retransmissions, our last ACK may have been lost
         if packet['block_number'] < session.block_number:
-            self._logger.warn(u"%s ignore old block number DATA %s < %s",
+            self._logger.warn(u"%s got old block number DATA %s < %s",
                               session, packet['block_number'], session.block_number)
+            self._send_ack_packet(session, session.block_number - 1)
             return
 
-        if packet['block_number'] != session.block_number:
-            msg = "%s Got ACK with block# %s while expecting %s" %\
-                  (session, packet['block_number'], session.block_number)
+        if packet['block_number'] >= session.block_number + session.window_size:
+            msg = "%s Got DATA with block# %s outside of window %s-%s" %\
+                  (session, packet['block_number'], session.block_number,
+                   session.block_number + session.window_size - 1)
             self._logger.error(msg)
             self._handle_error(session, 0, error_msg=msg)  # Error: block_number mismatch
             return
 
-        # save data
-        session.file_data += packet['data']
-        self._send_ack_packet(session, session.block_number)
+        if packet['block_number'] > session.block_number:
+            # a block is missing, keep this one until the missing block has been retransmitted
+            if not session.received_blocks:
+                # an ACK of the block before the missing one tells the sender to retransmit it without waiting for a
+                # timeout, since the sender only expects an ACK of the last block of a window
+                self._send_ack_packet(session, session.block_number - 1)
+            session.received_blocks[packet['block_number']] = packet['data']
+            return
+
+        # save data, together with the blocks that have been received after it
+        data = packet['data']
+        session.file_data += data
         session.block_number += 1
+        while session.block_number in session.received_blocks:
+            data = session.received_blocks.pop(session.block_number)
+            session.file_data += data
+            session.block_number += 1
+        session.retries = 0
+
+        # acknowledge cumulatively, once per window, or right away if another block of the window is missing
+        is_last_block = len(data) < session.block_size
+        if is_last_block or session.received_blocks \
+                or session.block_number - 1 - session.acked_block_number >= session.window_size:
+            self._send_ack_packet(session, session.block_number - 1)
 
         # check if it is the end
-        if len(packet['data']) < session.block_size:
+        if is_last_block:
             self._logger.info(u"%s transfer finished. checking data integrity...", session)
             # check file size and checksum
             if session.file_size != len(session.file_data):
@@ -484,26 +566,38 @@ class TftpHandler(TaskManager):
             return
 
         # check block number
-        # ignore old ones, they may be retransmissions
-        if packet['block_number'] < session.block_number:
-            self._logger.warn(u"%s ignore old block number ACK %s < %s",
-                              session, packet['block_number'], session.block_number)
-            return
-
-        if packet['block_number'] != session.block_number:
+        if packet['block_number'] > session.block_number:
             msg = "%s got ACK with block# %s while expecting %s" %\
                   (session, packet['block_number'], session.block_number)
             self._logger.error(msg)
             self._handle_error(session, 0, error_msg=msg)  # Error: block_number mismatch
             return
 
-        if session.is_waiting_for_last_ack:
+        # ignore old ones, they may be retransmissions
+        if packet['block_number'] < session.acked_block_number:
+            self._logger.warn(u"%s ignore old block number ACK %s < %s",
+                              session, packet['block_number'], session.acked_block_number)
+            return
+
+        if packet['block_number'] == session.acked_block_number:
+            # a duplicate ACK, the receiver misses the block after it
+            if session.block_number > session.acked_block_number:
+                self._send_block(session, session.acked_block_number + 1)
+            return
+
+        session.acked_block_number = packet['block_number']
+        session.retries = 0
+        if session.acked_block_number == self._get_last_block_number(session):
             session.is_done = True
             return
 
-        data = self._get_next_data(session)
+        # the receiver acknowledges the last block of a window, an ACK of an earlier block that has been sent means
+        # that the block after it is missing
+        if session.acked_block_number < session.block_number:
+            self._send_block(session, session.acked_block_number + 1)
+
         # send DATA
-        self._send_data_packet(session, session.block_number, data)
+        self._send_window(session)
 
     def _handle_error(self, session, error_code, error_msg=""):
         """ Handles an error during packet processing.
@@ -535,6 +629,8 @@ class TftpHandler(TaskManager):
                   'options': {'blksize': session.block_size,
                               'timeout': session.timeout,
                               }}
+        if session.window_size > 1:
+            packet['options']['windowsize'] = session.window_size
         self._send_packet(session, packet)
 
     def _send_data_packet(self, session, block_number, data):
@@ -549,6 +645,7 @@ class TftpHandler(TaskManager):
                   'session_id': session.session_id,
                   'block_number': block_number}
         self._send_packet(session, packet)
+        session.acked_block_number = block_number
 
     def _send_error_packet(self, session, error_code, error_msg):
         packet = {'opcode': OPCODE_ERROR,
@@ -567,4 +664,7 @@ class TftpHandler(TaskManager):
                               'tsize': session.file_size,
                               'checksum': session.checksum,
                               }}
+        # only a window size that has been requested is acknowledged, other peers do not know the option
+        if session.window_size > 1:
+            packet['options']['windowsize'] = session.window_size
         self._send_packet(session, packet)
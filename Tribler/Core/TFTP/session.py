@@ -7,11 +7,14 @@ DEFAULT_BLOCK_SIZE = 512
 # default timeout and maximum retries
 DEFAULT_TIMEOUT = 2
 
+# default number of DATA packets that can be sent without waiting for an ACK
+DEFAULT_WINDOW_SIZE = 16
+
 
 class Session(object):
 
     def __init__(self, is_client, session_id, address, request, file_name, file_data, file_size, checksum,
-                 extra_info=None, block_size=DEFAULT_BLOCK_SIZE, timeout=DEFAULT_TIMEOUT,
+                 extra_info=None, block_size=DEFAULT_BLOCK_SIZE, timeout=DEFAULT_TIMEOUT, window_size=1,
                  success_callback=None, failure_callback=None):
         self.is_client = is_client
         self.session_id = session_id
@@ -27,13 +30,18 @@ class Session(object):
         self.block_number = 0
         self.block_size = block_size
         self.timeout = timeout
+        self.window_size = window_size
         self.success_callback = success_callback
         self.failure_callback = failure_callback
 
         self.last_contact_time = time()
         self.last_received_packet = None
         self.last_sent_packet = None
-        self.is_waiting_for_last_ack = False
+
+        # the last block that has been acknowledged, all blocks up to this one have been received
+        self.acked_block_number = -1
+        # the blocks that have been received after a missing block, by block number
+        self.received_blocks = {}
 
         self.retries = 0
 
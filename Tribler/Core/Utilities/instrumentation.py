@@ -195,3 +195,20 @@ class WatchDog(Thread):
                 self.stacks.pop(thread_id)
                 self.times.pop(thread_id)
                 self.print_all_stacks()
+
+
+def get_thread_stack(thread_id):
+    """
+    Return the current stack of a thread as a list of "filename:lineno function" strings, outermost frame first.
+    Returns None if there is no thread with the given identifier.
+    """
+    frame = sys._current_frames().get(thread_id)
+    if frame is None:
+        return None
+
+    stack = []
+    while frame:
+        stack.append("%s:%s %s" % (frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
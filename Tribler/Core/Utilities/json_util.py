@@ -1,8 +1,19 @@
 from collections import Iterable
 import json
+from time import time
 
 __all__ = ['dumps', 'loads']
 
+# The total time (in seconds) spent in dumps(), used to measure the serialisation time of HTTP API responses
+_dumps_time = 0.0
+
+
+def get_dumps_time():
+    """
+    Return the total time (in seconds) spent serializing objects with dumps().
+    """
+    return _dumps_time
+
 
 def _is_undumpable(obj):
     """
@@ -90,6 +101,8 @@ def dumps(obj, ensure_ascii=True):
     :param ensure_ascii: allow binary strings to be sent
     :return: the JSON str representation of the object.
     """
+    global _dumps_time
+    start_time = time()
     try:
         return json.dumps(obj, ensure_ascii=ensure_ascii)
     except UnicodeDecodeError as e:
@@ -98,6 +111,8 @@ def dumps(obj, ensure_ascii=True):
         error = UnicodeDecodeError(e.encoding, str(obj), e.start, e.end, "could not dump:\n\t%s" % traces)
         error.message = str(error)
         raise error
+    finally:
+        _dumps_time += time() - start_time
 
 
 def loads(s, *args, **kwargs):
@@ -5,8 +5,12 @@ Author(s): Arno Bakker, Bram Cohen
 """
 import logging
 import os
+from Queue import Queue, Empty
+from collections import deque
 from copy import copy
 from hashlib import sha1
+from multiprocessing import cpu_count
+from threading import Thread
 from time import time
 
 from libtorrent import bencode
@@ -19,6 +23,19 @@ from Tribler.Core.osutils import fix_filebasename
 
 logger = logging.getLogger(__name__)
 
+# The number of threads that hash the pieces of a torrent. Hashlib releases the GIL while it hashes, so the threads
+# hash in parallel with each other and with the reading of the files.
+try:
+    HASH_THREADS = min(cpu_count(), 8)
+except NotImplementedError:
+    HASH_THREADS = 2
+
+# The minimum number of bytes that is read at once, it is rounded up to a whole number of pieces
+READ_BUFFER_SIZE = 4 * 1024 * 1024
+
+# The maximum number of bytes that have been read but not hashed yet
+MAX_PENDING_SIZE = 64 * 1024 * 1024
+
 
 def make_torrent_file(input, userabortflag=None, userprogresscallback=lambda x: None):
     """ Create a torrent file from the supplied input.
@@ -84,12 +101,8 @@ def makeinfo(input, userabortflag, userprogresscallback):
     """ Calculate hashes and create torrent file's 'info' part """
     encoding = input['encoding']
 
-    pieces = []
-    sh = sha1()
-    done = 0
     fs = []
     totalsize = 0
-    totalhashed = 0
 
     # 1. Determine which files should go into the torrent (=expand any dirs
     # specified by user in input['files']
@@ -134,48 +147,15 @@ def makeinfo(input, userabortflag, userprogresscallback):
         piece_length = input['piece length']
 
     # 4. Read files and calc hashes
-    for p, f, size in subs:
-        pos = 0
-
-        h = open(f, 'rb')
-
-        while pos < size:
-            a = min(size - pos, piece_length - done)
-
-            # See if the user cancelled
-            if userabortflag is not None and userabortflag.isSet():
-                return None, None
-
-            readpiece = h.read(a)
-
-            # See if the user cancelled
-            if userabortflag is not None and userabortflag.isSet():
-                return None, None
-
-            sh.update(readpiece)
-
-            done += a
-            pos += a
-            totalhashed += a
-
-            if done == piece_length:
-                pieces.append(sh.digest())
-                done = 0
-                sh = sha1()
-
-            if userprogresscallback is not None:
-                userprogresscallback(float(totalhashed) / float(totalsize))
+    files = [(filename, filesize) for _, filename, filesize in subs]
+    pieces = hash_files(files, piece_length, userabortflag, userprogresscallback)
+    if pieces is None:
+        return None, None
 
-        newdict = {'length': size,
+    for p, f, size in subs:
+        fs.append({'length': size,
                    'path': uniconvertl(p, encoding),
-                   'path.utf-8': uniconvertl(p, 'utf-8')}
-
-        fs.append(newdict)
-
-        h.close()
-
-    if done > 0:
-        pieces.append(sh.digest())
+                   'path.utf-8': uniconvertl(p, 'utf-8')})
 
     # 5. Create info dict
     if len(subs) == 1:
@@ -198,11 +178,106 @@ def makeinfo(input, userabortflag, userprogresscallback):
                 'name': uniconvert(name, encoding),
                 'name.utf-8': uniconvert(name, 'utf-8')}
 
-    infodict.update({'pieces': ''.join(pieces)})
+    infodict.update({'pieces': pieces})
 
     return infodict, piece_length
 
 
+def read_blocks(files, block_size):
+    """ Read the concatenation of the (filename, size) files in blocks of
+    block_size bytes, the last block holds the remaining bytes. """
+    parts = []
+    parts_size = 0
+    for filename, size in files:
+        with open(filename, 'rb') as f:
+            remaining = size
+            while remaining > 0:
+                data = f.read(min(block_size - parts_size, remaining))
+                if not data:
+                    break
+                remaining -= len(data)
+                parts.append(data)
+                parts_size += len(data)
+                if parts_size == block_size:
+                    yield parts[0] if len(parts) == 1 else ''.join(parts)
+                    parts = []
+                    parts_size = 0
+    if parts:
+        yield ''.join(parts)
+
+
+def hash_block(block, piece_length):
+    """ Return the SHA1 digests of the pieces in a block. """
+    return [sha1(buffer(block, offset, piece_length)).digest() for offset in xrange(0, len(block), piece_length)]
+
+
+def hash_blocks(tasks, piece_length):
+    """ Hash the (block, result queue) tasks of a queue, until it yields
+    None. """
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        block, result = task
+        result.put(hash_block(block, piece_length))
+
+
+def hash_files(files, piece_length, userabortflag=None, userprogresscallback=None, num_threads=HASH_THREADS):
+    """ Calculate the piece hashes of the concatenation of the (filename,
+    size) files.
+
+    The files are read by the calling thread, in blocks of whole pieces,
+    which are hashed by num_threads threads. The digests are collected in
+    the order of the blocks, while at most MAX_PENDING_SIZE bytes wait to be
+    hashed. The userprogresscallback is called by the calling thread after
+    every block.
+
+    Returns the concatenated digests, or None on userabort. """
+    totalsize = sum(size for _, size in files)
+    block_size = max(READ_BUFFER_SIZE // piece_length, 1) * piece_length
+    max_pending = max(MAX_PENDING_SIZE // block_size, num_threads)
+
+    tasks = Queue()
+    for _ in xrange(num_threads):
+        worker = Thread(target=hash_blocks, args=(tasks, piece_length), name="hash_files")
+        worker.setDaemon(True)
+        worker.start()
+
+    pieces = []
+    pending = deque()  # The queues that receive the digests of the blocks that are being hashed, in order
+    try:
+        for block in read_blocks(files, block_size):
+            # See if the user cancelled
+            if userabortflag is not None and userabortflag.isSet():
+                return None
+
+            result = Queue(1)
+            tasks.put((block, result))
+            pending.append(result)
+
+            # Collect the hashed blocks, and wait for the oldest block if too many blocks are pending
+            while pending and (len(pending) >= max_pending or not pending[0].empty()):
+                pieces.extend(pending.popleft().get())
+                if userprogresscallback is not None:
+                    userprogresscallback(min(len(pieces) * piece_length, totalsize) / float(totalsize))
+
+        while pending:
+            pieces.extend(pending.popleft().get())
+            if userprogresscallback is not None:
+                userprogresscallback(min(len(pieces) * piece_length, totalsize) / float(totalsize))
+    finally:
+        # The blocks that have not been hashed yet are discarded, and the workers stop after their current block
+        try:
+            while True:
+                tasks.get_nowait()
+        except Empty:
+            pass
+        for _ in xrange(num_threads):
+            tasks.put(None)
+
+    return ''.join(pieces)
+
+
 def subfiles(d):
     """ Return list of (pathlist,local filename) tuples for all the files in
     directory 'd' """
@@ -0,0 +1,66 @@
+"""
+This module contains a hashed timer wheel, to keep track of the deadlines of many items at once.
+"""
+
+
+class TimerWheel(object):
+    """
+    A hashed timer wheel. The deadlines are rounded to ticks of a fixed resolution and the items are stored in the
+    slot of their tick, so scheduling, cancelling and expiring an item takes constant time, independent of the number
+    of scheduled items. Every key can be scheduled once, scheduling a key again replaces its deadline.
+    """
+
+    def __init__(self, resolution=1.0, num_slots=512, now=0):
+        self.resolution = float(resolution)
+        self.slots = [set() for _ in xrange(num_slots)]
+        self.deadlines = {}
+        self.current_tick = self.get_tick(now)
+
+    def __len__(self):
+        return len(self.deadlines)
+
+    def __contains__(self, key):
+        return key in self.deadlines
+
+    def get_tick(self, timestamp):
+        return int(timestamp // self.resolution)
+
+    def get_deadline(self, key):
+        """
+        Return the deadline of a key, or None if it is not scheduled.
+        """
+        deadline = self.deadlines.get(key)
+        return deadline[0] if deadline else None
+
+    def schedule(self, key, deadline):
+        self.cancel(key)
+        # Deadlines that have already passed expire during the next advance
+        slot = max(self.get_tick(deadline), self.current_tick) % len(self.slots)
+        self.slots[slot].add(key)
+        self.deadlines[key] = (deadline, slot)
+
+    def cancel(self, key):
+        deadline = self.deadlines.pop(key, None)
+        if deadline:
+            self.slots[deadline[1]].discard(key)
+
+    def advance(self, now):
+        """
+        Move the wheel to the given time and remove the keys of which the deadline has passed.
+        :return: a list with the expired keys, ordered by deadline
+        """
+        target_tick = self.get_tick(now)
+        num_ticks = min(target_tick - self.current_tick + 1, len(self.slots))
+
+        expired = []
+        for tick in xrange(self.current_tick, self.current_tick + num_ticks):
+            slot = self.slots[tick % len(self.slots)]
+            # The slot also contains the keys that expire during a later rotation of the wheel
+            expired_keys = [key for key in slot if self.deadlines[key][0] <= now]
+            for key in expired_keys:
+                slot.remove(key)
+                expired.append((self.deadlines.pop(key)[0], key))
+
+        self.current_tick = max(self.current_tick, target_tick)
+        expired.sort(key=lambda item: item[0])
+        return [key for _, key in expired]
@@ -0,0 +1,205 @@
+"""
+Deadline scheduling of the pieces of a Video-On-Demand download.
+"""
+import time
+
+from Tribler.Core.Utilities.torrent_utils import get_info_from_handle
+
+# The number of seconds between two schedules
+SCHEDULE_INTERVAL = 1
+
+# The bitrate (in bytes per second) of a stream that has not been measured yet, and the lowest bitrate that is used
+DEFAULT_BITRATE = 512 * 1024
+MIN_BITRATE = 64 * 1024
+
+# The weight of a new measurement in the moving average of the bitrate
+BITRATE_WEIGHT = 0.2
+
+# The number of seconds of video ahead of the play head that get a deadline, bounded by a minimum and maximum size
+READ_AHEAD_TIME = 30
+MIN_READ_AHEAD = 4 * 1024 * 1024
+MAX_READ_AHEAD = 64 * 1024 * 1024
+
+# Pieces that are due within this number of seconds get the highest priority
+URGENT_TIME = 5
+
+# A deadline is only passed to libtorrent again when it moved by more than this number of seconds
+DEADLINE_TOLERANCE = 2
+
+PRIORITY_URGENT = 7
+PRIORITY_READ_AHEAD = 5
+PRIORITY_NORMAL = 1
+
+
+class VODStream(object):
+    """
+    The play head of a stream of the VOD file. The bitrate of the stream is measured from the progress of the play
+    head between two schedules. The intervals in which the stream waited for a piece are left out, since the progress
+    then depends on the download speed instead of the video.
+    """
+
+    def __init__(self, scheduler, position):
+        self.scheduler = scheduler
+        self.position = position
+        self.bitrate = None
+        self.is_stalled = False
+
+        self.sample_time = time.time()
+        self.sample_position = position
+        self.sample_stalled = False  # Whether the stream stalled since the sample has been taken
+
+    def advance(self, nbytes):
+        self.position += nbytes
+
+    def stall(self):
+        """
+        Called when the stream has to wait for a piece.
+        """
+        if not self.is_stalled:
+            self.is_stalled = True
+            self.sample_stalled = True
+            self.scheduler.stalls += 1
+
+    def resume(self):
+        self.is_stalled = False
+
+    def close(self):
+        self.scheduler.remove_stream(self)
+
+    def get_bitrate(self):
+        return max(self.bitrate or DEFAULT_BITRATE, MIN_BITRATE)
+
+    def update_bitrate(self, now):
+        elapsed = now - self.sample_time
+        progress = self.position - self.sample_position
+        if not self.sample_stalled and elapsed > 0 and progress > 0:
+            bitrate = progress / elapsed
+            self.bitrate = bitrate if self.bitrate is None else \
+                (1 - BITRATE_WEIGHT) * self.bitrate + BITRATE_WEIGHT * bitrate
+
+        self.sample_time = now
+        self.sample_position = self.position
+        self.sample_stalled = self.is_stalled
+
+
+class VODScheduler(object):
+    """
+    Schedules the pieces of the VOD file of a download. The pieces in the read-ahead window of every stream get a
+    libtorrent deadline, which is the time at which the play head reaches the piece at the bitrate of the stream, so
+    libtorrent requests them from the fastest peers first. The pieces that are due soon get the highest priority.
+    Pieces that leave the window, because a stream closed or jumped, lose their deadline and priority again.
+
+    The schedule also yields the buffer health of the stream that is closest to stalling, which is shown in the state
+    of the download.
+    """
+
+    def __init__(self, fileindex):
+        self.fileindex = fileindex
+        self.streams = set()
+        self.deadlines = {}  # Map: piece -> the time at which the piece is due, as it has been passed to libtorrent
+        self.escalated = set()  # The pieces whose priority has been raised
+        self.stalls = 0
+        self.buffered_bytes = 0
+        self.buffered_time = 0.0
+        self.bitrate = 0
+
+    def add_stream(self, position):
+        stream = VODStream(self, position)
+        self.streams.add(stream)
+        return stream
+
+    def remove_stream(self, stream):
+        self.streams.discard(stream)
+
+    def get_buffer_health(self):
+        """
+        Returns the buffer health of the stream that is closest to stalling: its bitrate (in bytes per second), the
+        number of bytes and seconds of video ahead of its play head that have been downloaded, and the number of times
+        the streams of this download waited for a piece.
+        """
+        return {'vod_bitrate': self.bitrate,
+                'vod_buffered_bytes': self.buffered_bytes,
+                'vod_buffered_time': self.buffered_time,
+                'vod_stalls': self.stalls}
+
+    def schedule(self, handle, now=None):
+        """
+        Update the deadlines and priorities of the pieces ahead of the play heads.
+        :param handle: the libtorrent handle of the download.
+        :param now: the current time, the time of the system by default.
+        """
+        now = now or time.time()
+        torrent_info = get_info_from_handle(handle)
+        if torrent_info is None:
+            return
+
+        have = handle.status().pieces
+        file_entry = torrent_info.file_at(self.fileindex)
+        piece_length = torrent_info.piece_length()
+
+        deadlines = {}
+        health = None
+        for stream in self.streams:
+            stream.update_bitrate(now)
+            if stream.position >= file_entry.size:
+                continue
+
+            bitrate = stream.get_bitrate()
+            read_ahead = min(max(int(bitrate * READ_AHEAD_TIME), MIN_READ_AHEAD), MAX_READ_AHEAD)
+            window_end = min(stream.position + read_ahead, file_entry.size)
+            first_piece = torrent_info.map_file(self.fileindex, stream.position, 0).piece
+            last_piece = torrent_info.map_file(self.fileindex, window_end - 1, 0).piece
+
+            buffered_bytes = window_end - stream.position
+            for piece in xrange(first_piece, last_piece + 1):
+                if have[piece]:
+                    continue
+                # The number of bytes between the play head and the start of the piece
+                offset = max(piece * piece_length - file_entry.offset - stream.position, 0)
+                buffered_bytes = min(buffered_bytes, offset)
+                deadline = now + float(offset) / bitrate
+                deadlines[piece] = min(deadline, deadlines.get(piece, deadline))
+
+            buffered_time = float(buffered_bytes) / bitrate
+            if health is None or buffered_time < health[1]:
+                health = (buffered_bytes, buffered_time, bitrate)
+
+        self.buffered_bytes, self.buffered_time, self.bitrate = health or (0, 0.0, 0)
+        self.set_deadlines(handle, have, deadlines, now)
+        self.set_priorities(handle, have, deadlines, now)
+
+    def set_deadlines(self, handle, have, deadlines, now):
+        for piece in self.deadlines.keys():
+            if piece not in deadlines:
+                if not have[piece]:
+                    handle.reset_piece_deadline(piece)
+                del self.deadlines[piece]
+
+        for piece, deadline in deadlines.iteritems():
+            if piece not in self.deadlines or abs(deadline - self.deadlines[piece]) > DEADLINE_TOLERANCE:
+                handle.set_piece_deadline(piece, int((deadline - now) * 1000))
+                self.deadlines[piece] = deadline
+
+    def set_priorities(self, handle, have, deadlines, now):
+        # The priorities are read from libtorrent, since they are also changed when a stream starts
+        priorities = handle.piece_priorities()
+        new_priorities = list(priorities)
+        for piece, deadline in deadlines.iteritems():
+            new_priorities[piece] = PRIORITY_URGENT if deadline <= now + URGENT_TIME else PRIORITY_READ_AHEAD
+        for piece in self.escalated:
+            if piece not in deadlines and not have[piece]:
+                new_priorities[piece] = PRIORITY_NORMAL
+        self.escalated = set(deadlines)
+
+        if new_priorities != list(priorities):
+            handle.prioritize_pieces(new_priorities)
+
+    def stop(self, handle):
+        """
+        Remove the deadlines and raised priorities of the pieces.
+        """
+        self.streams = set()
+        if self.deadlines or self.escalated:
+            have = handle.status().pieces
+            self.set_deadlines(handle, have, {}, time.time())
+            self.set_priorities(handle, have, {}, time.time())
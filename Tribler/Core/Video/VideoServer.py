@@ -6,21 +6,26 @@ Author(s): Jan David Mol, Arno Bakker, Egbert Bouman
 import logging
 import mimetypes
 import os
-import socket
-import time
-from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
-from SocketServer import ThreadingMixIn
 from binascii import unhexlify
 from cherrypy.lib.httputil import get_ranges
-from collections import defaultdict
-from threading import Event, Thread, RLock
-from traceback import print_exc
+from twisted.internet import reactor
+from twisted.internet.defer import Deferred, CancelledError, maybeDeferred, succeed
+from twisted.internet.interfaces import IPushProducer
+from twisted.web import http, resource, server
+from zope.interface import implementer
 
-from Tribler.Core.Libtorrent.LibtorrentDownloadImpl import VODFile
+from Tribler.Core.Utilities.torrent_utils import get_info_from_handle
 from Tribler.Core.simpledefs import DLMODE_VOD, DLMODE_NORMAL
 
+# The maximum number of bytes that are read from a file and written to the transport at once
+CHUNK_SIZE = 64 * 1024
 
-class VideoServer(ThreadingMixIn, HTTPServer):
+
+class VideoServer(object):
+    """
+    The HTTP server that streams the files of downloads to video players. It runs on the reactor thread, every
+    response is written by its own VideoStreamProducer.
+    """
 
     def __init__(self, port, session):
         self._logger = logging.getLogger(self.__class__.__name__)
@@ -29,14 +34,9 @@ class VideoServer(ThreadingMixIn, HTTPServer):
         self.session = session
         self.vod_fileindex = None
         self.vod_download = None
-        self.vod_info = defaultdict(dict)  # A dictionary containing info about the requested VOD streams.
-
-        HTTPServer.__init__(self, ("127.0.0.1", self.port), VideoRequestHandler)
 
-        self.server_thread = None
-
-        self.daemon_threads = True
-        self.allow_reuse_address = True
+        self.producers = set()  # The producers of the responses that are being sent
+        self.listening_port = None
 
     def get_vod_download(self):
         """
@@ -46,28 +46,19 @@ class VideoServer(ThreadingMixIn, HTTPServer):
 
     def set_vod_download(self, new_download):
         """
-        Set a new Video-On-Demand download. Set the mode of old download to normal and close the file stream of
-        the old download.
+        Set a new Video-On-Demand download. Set the mode of old download to normal and close the responses that are
+        streaming the old download.
         """
+        ltmgr = self.session.lm.ltmgr
         if self.vod_download:
             self.vod_download.set_mode(DLMODE_NORMAL)
-            vi_dict = self.vod_info.pop(self.vod_download.get_def().get_infohash(), None)
-            if vi_dict and 'stream' in vi_dict:
-                vi_dict['stream'][0].close()
+            for producer in [producer for producer in self.producers if producer.download == self.vod_download]:
+                producer.close()
+            ltmgr.set_progress_alerts_enabled(self.vod_download.get_hops(), False)
 
         self.vod_download = new_download
-
-    def get_vod_stream(self, dl_hash, wait=False):
-        if 'stream' not in self.vod_info[dl_hash] and self.session.get_download(dl_hash):
-            download = self.session.get_download(dl_hash)
-            vod_filename = self.get_vod_destination(download)
-            while wait and not os.path.exists(vod_filename):
-                time.sleep(1)
-            self.vod_info[dl_hash]['stream'] = (VODFile(open(vod_filename, 'rb'), download), RLock())
-
-        if self.vod_info[dl_hash].has_key('stream'):
-            return self.vod_info[dl_hash]['stream']
-        return None, None
+        if new_download:
+            ltmgr.set_progress_alerts_enabled(new_download.get_hops(), True)
 
     @staticmethod
     def get_vod_destination(download):
@@ -80,150 +71,238 @@ class VideoServer(ThreadingMixIn, HTTPServer):
             return download.get_content_dest()
 
     def start(self):
-        self.server_thread = Thread(target=self.serve_forever, name="VideoHTTPServerThread-1")
-        self.server_thread.setDaemon(True)
-        self.server_thread.start()
-
-    def process_request_thread(self, request, client_address):
-        try:
-            self.finish_request(request, client_address)
-            self.close_request(request)
-        except socket.error:
-            pass
-        except Exception:
-            print_exc()
+        self.listening_port = reactor.listenTCP(self.port, server.Site(VideoStreamResource(self)),
+                                                interface="127.0.0.1")
 
     def shutdown_server(self):
         """
-        Shutdown the video HTTP server.
+        Shutdown the video HTTP server and return a deferred that fires when the server has shut down.
         """
-        self.shutdown()
-        self.server_close()
-        self.set_vod_download(None)
+        for producer in list(self.producers):
+            producer.close()
+        if self.vod_download:
+            self.set_vod_download(None)
+        if self.listening_port:
+            return maybeDeferred(self.listening_port.stopListening)
+        return succeed(None)
 
 
-class VideoRequestHandler(BaseHTTPRequestHandler):
+class VideoStreamResource(resource.Resource):
+    """
+    The resource that streams a file of a download, at /<infohash>/<file index>. A single byte range can be
+    requested with a Range header, every request is served independently of the others.
+    """
+    isLeaf = True
 
-    def __init__(self, request, client_address, video_server):
+    def __init__(self, video_server):
+        resource.Resource.__init__(self)
         self._logger = logging.getLogger(self.__class__.__name__)
-        self.event = None
         self.video_server = video_server
-        BaseHTTPRequestHandler.__init__(self, request, client_address, video_server)
-
-    def log_message(self, f, *args):
-        pass
 
-    def do_GET(self):
-        if self.request_version == 'HTTP/1.1':
-            self.protocol_version = 'HTTP/1.1'
+    def render_GET(self, request):
+        self._logger.debug("VOD request %s %s", request.getClientIP(), request.uri)
+        download = None
+        if len(request.postpath) == 2:
+            downloadhash, fileindex = request.postpath
+            try:
+                download = self.video_server.session.get_download(unhexlify(downloadhash))
+            except TypeError:
+                pass
 
-        self._logger.debug("VOD request %s %s", self.client_address, self.path)
-        downloadhash, fileindex = self.path.strip('/').split('/')
-        downloadhash = unhexlify(downloadhash)
-        download = self.server.session.get_download(downloadhash)
-
-        if not download or not fileindex.isdigit() or int(fileindex) > len(download.get_def().get_files()):
-            self.send_error(404, "Not Found")
-            return
+        if not download or not fileindex.isdigit() or int(fileindex) >= len(download.get_def().get_files()):
+            request.setResponseCode(http.NOT_FOUND)
+            return "Not Found"
 
         fileindex = int(fileindex)
         filename, length = download.get_def().get_files_with_length()[fileindex]
 
-        requested_range = get_ranges(self.headers.getheader('range'), length)
+        requested_range = get_ranges(request.getHeader('range'), length)
         if requested_range is not None and len(requested_range) != 1:
-            self.send_error(416, "Requested Range Not Satisfiable")
-            return
-
-        has_changed = self.video_server.vod_fileindex != fileindex or\
-            self.video_server.get_vod_download() != download
-        if has_changed:
-            self.video_server.vod_fileindex = fileindex
-            self.video_server.set_vod_download(download)
-
-            # Put download in sequential mode + trigger initial buffering.
-            self.wait_for_handle(download)
-            if download.get_def().is_multifile_torrent():
-                download.set_selected_files([filename])
-            download.set_mode(DLMODE_VOD)
-            download.restart()
-
-        piecelen = download.get_def().get_piece_length()
-        blocksize = piecelen
+            request.setResponseCode(http.REQUESTED_RANGE_NOT_SATISFIABLE)
+            return "Requested Range Not Satisfiable"
 
         if requested_range is not None:
             firstbyte, lastbyte = requested_range[0]
             nbytes2send = lastbyte - firstbyte
-            self.send_response(206)
-            self.send_header('Content-Range', 'bytes %d-%d/%d' % (firstbyte, lastbyte - 1, length))
+            request.setResponseCode(http.PARTIAL_CONTENT)
+            request.setHeader('Content-Range', 'bytes %d-%d/%d' % (firstbyte, lastbyte - 1, length))
         else:
             firstbyte = 0
             nbytes2send = length
-            self.send_response(200)
 
         self._logger.debug("requested range %d - %d", firstbyte, firstbyte + nbytes2send)
 
         mimetype = mimetypes.guess_type(filename)[0]
         if mimetype:
-            self.send_header('Content-Type', mimetype)
-        self.send_header('Accept-Ranges', 'bytes')
+            request.setHeader('Content-Type', mimetype)
+        request.setHeader('Accept-Ranges', 'bytes')
+        request.setHeader('Content-Length', str(nbytes2send))
 
-        if length is not None:
-            self.send_header('Content-Length', nbytes2send)
-        else:
-            self.send_header('Transfer-Encoding', 'chunked')
+        has_changed = self.video_server.vod_fileindex != fileindex or\
+            self.video_server.get_vod_download() != download
+        if has_changed:
+            self.video_server.vod_fileindex = fileindex
+            self.video_server.set_vod_download(download)
 
-        if self.request_version == 'HTTP/1.1' and self.headers.get('Connection', '').lower() != 'close':
-            self.send_header('Connection', 'Keep-Alive')
-            self.send_header('Keep-Alive', 'timeout=300, max=1')
+        producer = VideoStreamProducer(self.video_server, request, download, fileindex, firstbyte, nbytes2send)
+        self.video_server.producers.add(producer)
+        request.notifyFinish().addBoth(lambda _: producer.stopProducing())
 
-        self.end_headers()
+        def on_failure(failure):
+            self._logger.error("failed to stream %s: %s", filename, failure.getErrorMessage())
+            producer.close()
 
+        deferred = download.get_handle()
         if has_changed:
-            self.wait_for_buffer(download)
-
-        stream, lock = self.video_server.get_vod_stream(downloadhash, wait=True)
+            # Put download in sequential mode + trigger initial buffering.
+            deferred.addCallback(lambda _: self.start_vod(download, filename))
+        deferred.addCallback(lambda _: producer.start())
+        deferred.addErrback(on_failure)
+        return server.NOT_DONE_YET
 
-        with lock:
-            if stream.closed:
-                return
+    def start_vod(self, download, filename):
+        """
+        Put a download in VOD mode and return a deferred that fires when the prebuffering has finished.
+        """
+        if download.get_def().is_multifile_torrent():
+            download.set_selected_files([filename])
+        download.set_mode(DLMODE_VOD)
+        download.restart()
 
-            stream.seek(firstbyte)
-            nbyteswritten = 0
-            while True:
-                data = stream.read(blocksize)
-
-                if len(data) == 0:
-                    break
-                elif length is not None and nbyteswritten + len(data) > nbytes2send:
-                    endlen = nbytes2send - nbyteswritten
-                    if endlen != 0:
-                        self.wfile.write(data[:endlen])
-                        nbyteswritten += endlen
-                    break
-                else:
-                    self.wfile.write(data)
-                    nbyteswritten += len(data)
-
-            if nbyteswritten != nbytes2send:
-                self._logger.error("sent wrong amount, wanted %s got %s", nbytes2send, nbyteswritten)
-
-            if not requested_range:
-                stream.close()
-
-    def wait_for_handle(self, download):
-        # TODO(Martijn): Ugly time.sleep required, should be refactored when we Twistify the video server
-        while not (download.handle and download.handle.is_valid()):
-            time.sleep(1)
-
-    def wait_for_buffer(self, download):
-        self.event = Event()
+        deferred = Deferred()
 
         def wait_for_buffer(ds):
             if download.vod_seekpos is None or download != self.video_server.get_vod_download()\
                     or ds.get_vod_prebuffering_progress() == 1.0:
-                self.event.set()
+                # state callbacks are invoked on a thread of the thread pool
+                reactor.callFromThread(deferred.callback, None)
                 return 0
             return 1.0
         download.set_state_callback(wait_for_buffer)
-        self.event.wait()
-        self.event.clear()
+        return deferred
+
+
+@implementer(IPushProducer)
+class VideoStreamProducer(object):
+    """
+    Writes a byte range of a file of a download to an HTTP request. Chunks are written until the transport pauses
+    the producer, and when a chunk is in a piece that has not been downloaded yet, the producer waits for the
+    piece_finished_alert of this piece. The position of the producer is the play head of a stream in the VOD scheduler
+    of the download, which gives the pieces ahead of it a deadline.
+    """
+
+    def __init__(self, video_server, request, download, fileindex, firstbyte, nbytes):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.video_server = video_server
+        self.request = request
+        self.download = download
+        self.fileindex = fileindex
+        self.position = firstbyte
+        self.end = firstbyte + nbytes
+
+        self.file = None
+        self.torrent_info = None
+        self.stream = None  # The play head of this response in the VOD scheduler of the download
+        self.piece_deferred = None
+        self.is_paused = False
+        self.is_stopped = False
+
+    def start(self):
+        """
+        Start writing, from the first byte of the range. The pieces after this byte get priority.
+        """
+        if self.is_stopped:
+            return
+
+        self.torrent_info = get_info_from_handle(self.download.handle)
+        if self.download.vod_seekpos is None or abs(self.position - self.download.vod_seekpos) < 1024 * 1024:
+            self.download.vod_seekpos = self.position
+        self.download.set_byte_priority([(self.fileindex, 0, self.position)], 0)
+        self.download.set_byte_priority([(self.fileindex, self.position, -1)], 1)
+
+        scheduler = self.download.vod_scheduler
+        if scheduler and scheduler.fileindex == self.fileindex:
+            self.stream = scheduler.add_stream(self.position)
+            self.download.schedule_vod_pieces()
+
+        self.request.registerProducer(self, True)
+        self.write_chunks()
+
+    def write_chunks(self):
+        """
+        Write chunks until the range has been written, the transport pauses the producer, or a piece is missing.
+        """
+        while not self.is_paused and not self.is_stopped and self.position < self.end:
+            peer_request = self.torrent_info.map_file(self.fileindex, self.position, 1)
+            if not self.download.has_piece(peer_request.piece):
+                self._logger.debug("waiting for piece %d of %s", peer_request.piece, self.download.get_def().get_name())
+                if self.stream:
+                    self.stream.stall()
+                self.piece_deferred = self.download.wait_for_piece(peer_request.piece)
+                self.piece_deferred.addCallbacks(self.on_piece_finished, self.on_piece_cancelled)
+                return
+
+            if self.file is None:
+                self.file = open(self.video_server.get_vod_destination(self.download), 'rb')
+
+            # a chunk does not extend beyond the end of its piece, since the next piece might not be there yet
+            chunk_size = min(CHUNK_SIZE, self.end - self.position,
+                             self.torrent_info.piece_size(peer_request.piece) - peer_request.start)
+            self.file.seek(self.position)
+            data = self.file.read(chunk_size)
+            if not data:
+                self._logger.error("sent wrong amount, the file ends at %s instead of %s", self.position, self.end)
+                self.close()
+                return
+
+            if self.download.vod_seekpos == self.position:
+                self.download.vod_seekpos += len(data)
+            self.position += len(data)
+            if self.stream:
+                self.stream.advance(len(data))
+            self.request.write(data)
+
+        if self.position >= self.end and not self.is_stopped:
+            self.request.unregisterProducer()
+            self.request.finish()
+
+    def on_piece_finished(self, _):
+        self.piece_deferred = None
+        if self.stream:
+            self.stream.resume()
+        self.write_chunks()
+
+    def on_piece_cancelled(self, failure):
+        failure.trap(CancelledError)
+        # The download has been stopped while we were waiting for the piece
+        self.piece_deferred = None
+        self.close()
+
+    def close(self):
+        """
+        Stop writing and close the connection before the range has been written.
+        """
+        if not self.is_stopped:
+            self.stopProducing()
+            self.request.loseConnection()
+
+    def pauseProducing(self):
+        self.is_paused = True
+
+    def resumeProducing(self):
+        self.is_paused = False
+        if self.piece_deferred is None:
+            self.write_chunks()
+
+    def stopProducing(self):
+        self.is_stopped = True
+        self.video_server.producers.discard(self)
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if self.piece_deferred:
+            self.piece_deferred.cancel()
+            self.piece_deferred = None
+        if self.file:
+            self.file.close()
+            self.file = None
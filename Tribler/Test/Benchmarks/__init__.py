@@ -0,0 +1,9 @@
+"""
+This package contains offline micro-benchmarks of performance-sensitive code paths in Tribler.
+
+The benchmarks can be executed with:
+
+    python -m Tribler.Test.Benchmarks.run_benchmarks --output results.json
+
+All input data is generated with a fixed seed, so the results of different commits can be compared.
+"""
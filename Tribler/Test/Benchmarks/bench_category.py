@@ -0,0 +1,20 @@
+"""
+Benchmarks of the classification of torrents.
+"""
+from Tribler.Core.Category.Category import Category
+from Tribler.Test.Benchmarks.benchmark import Benchmark
+
+NUM_TORRENTS = 200
+
+
+class CalculateCategoryBenchmark(Benchmark):
+    name = "category.calculate_category"
+    operations = NUM_TORRENTS
+
+    def setUp(self):
+        self.category = Category()
+        self.metainfos = [self.generator.random_metainfo(max_files=25) for _ in xrange(NUM_TORRENTS)]
+
+    def run(self):
+        for metainfo in self.metainfos:
+            self.category.calculateCategory(metainfo, metainfo['info']['name'].decode('utf-8'))
@@ -0,0 +1,31 @@
+"""
+Benchmarks of the serialisation functions in Tribler.Core.Utilities.encoding.
+"""
+from Tribler.Core.Utilities.encoding import decode, encode
+from Tribler.Test.Benchmarks.benchmark import Benchmark
+
+NUM_OBJECTS = 200
+
+
+class EncodeBenchmark(Benchmark):
+    name = "encoding.encode"
+    operations = NUM_OBJECTS
+
+    def setUp(self):
+        self.objects = [self.generator.random_encodable() for _ in xrange(NUM_OBJECTS)]
+
+    def run(self):
+        for obj in self.objects:
+            encode(obj)
+
+
+class DecodeBenchmark(Benchmark):
+    name = "encoding.decode"
+    operations = NUM_OBJECTS
+
+    def setUp(self):
+        self.streams = [encode(self.generator.random_encodable()) for _ in xrange(NUM_OBJECTS)]
+
+    def run(self):
+        for stream in self.streams:
+            decode(stream)
@@ -0,0 +1,54 @@
+"""
+Benchmarks of the hashing of the pieces of generated files, as it is done when a torrent is created. The files are
+read from the page cache after the first measurement, so the benchmarks measure the hashing rather than the disk.
+"""
+import os
+import shutil
+
+from Tribler.Core.Utilities.maketorrent import hash_files, HASH_THREADS
+from Tribler.Test.Benchmarks.benchmark import Benchmark
+
+MB = 1024 * 1024
+
+NUM_FILES = 4
+FILE_SIZE = 16 * MB
+PIECE_LENGTH = 256 * 1024
+
+
+class HashFilesBenchmark(Benchmark):
+    """
+    Hash the pieces of a folder of files with a pool of threads. The time is reported per MB.
+    """
+    name = "maketorrent.hash_files"
+    repeat = 3
+    number = 2
+    operations = NUM_FILES * FILE_SIZE / MB
+    num_threads = HASH_THREADS
+
+    def setUp(self):
+        self.files_dir = os.path.join(self.state_dir, "hash_files")
+        os.makedirs(self.files_dir)
+
+        # A random block is repeated, since generating all bytes of the files would take too long
+        block = self.generator.random_bytes(64 * 1024)
+        self.files = []
+        for index in xrange(NUM_FILES):
+            file_path = os.path.join(self.files_dir, "file%d" % index)
+            with open(file_path, 'wb') as f:
+                for _ in xrange(FILE_SIZE / len(block)):
+                    f.write(block)
+            self.files.append((file_path, FILE_SIZE))
+
+    def tearDown(self):
+        shutil.rmtree(self.files_dir, ignore_errors=True)
+
+    def run(self):
+        hash_files(self.files, PIECE_LENGTH, num_threads=self.num_threads)
+
+
+class HashFilesSingleThreadBenchmark(HashFilesBenchmark):
+    """
+    Hash the pieces with a single thread, which only overlaps the reading of the files with the hashing.
+    """
+    name = "maketorrent.hash_files_single_thread"
+    num_threads = 1
@@ -0,0 +1,109 @@
+"""
+Benchmarks of the matching of orders in the market community.
+"""
+from Tribler.community.market.core.matching_engine import PriceTimeStrategy
+from Tribler.community.market.core.message import TraderId
+from Tribler.community.market.core.order import OrderId, OrderNumber
+from Tribler.community.market.core.orderbook import OrderBook
+from Tribler.community.market.core.price import Price
+from Tribler.community.market.core.quantity import Quantity
+from Tribler.community.market.core.tick import Ask, Bid
+from Tribler.community.market.core.timeout import Timeout
+from Tribler.community.market.core.timestamp import Timestamp
+from Tribler.Test.Benchmarks.benchmark import Benchmark
+
+NUM_TICKS = 10000
+NUM_TRADERS = 100
+NUM_MATCHES = 50
+MIN_PRICE = 100
+NUM_PRICE_LEVELS = 100
+
+
+class PriceTimeMatchBenchmark(Benchmark):
+    """
+    Match incoming bids and asks against an order book with many ticks, spread over many price levels.
+    """
+    name = "market.price_time_match"
+    operations = NUM_MATCHES * 2
+
+    def setUp(self):
+        rand = self.generator.random
+        trader_ids = [TraderId("%040x" % rand.getrandbits(160)) for _ in xrange(NUM_TRADERS)]
+
+        self.order_book = OrderBook()
+        for order_number in xrange(NUM_TICKS):
+            order_id = OrderId(rand.choice(trader_ids), OrderNumber(order_number))
+            quantity = Quantity(rand.randint(1, 10), 'MC')
+            if order_number % 2:
+                self.order_book.insert_ask(Ask(order_id, Price(rand.randint(MIN_PRICE + NUM_PRICE_LEVELS / 2,
+                                                                            MIN_PRICE + NUM_PRICE_LEVELS), 'BTC'),
+                                               quantity, Timeout(3600), Timestamp.now()))
+            else:
+                self.order_book.insert_bid(Bid(order_id, Price(rand.randint(MIN_PRICE,
+                                                                            MIN_PRICE + NUM_PRICE_LEVELS / 2 - 1),
+                                                               'BTC'),
+                                               quantity, Timeout(3600), Timestamp.now()))
+
+        self.matching_strategy = PriceTimeStrategy(self.order_book)
+
+        # Incoming orders that cross the spread, each of them matches ticks in several price levels
+        self.incoming_orders = []
+        for order_number in xrange(NUM_MATCHES):
+            order_id = OrderId(rand.choice(trader_ids), OrderNumber(NUM_TICKS + order_number))
+            quantity = Quantity(rand.randint(50, 500), 'MC')
+            self.incoming_orders.append((order_id, Price(MIN_PRICE + NUM_PRICE_LEVELS, 'BTC'), quantity, False))
+            self.incoming_orders.append((order_id, Price(MIN_PRICE, 'BTC'), quantity, True))
+
+    def tearDown(self):
+        self.order_book.shutdown_task_manager()
+
+    def run(self):
+        for order_id, price, quantity, is_ask in self.incoming_orders:
+            self.matching_strategy.match(order_id, price, quantity, is_ask)
+
+
+DEEP_BOOK_PRICE_LEVELS = 10000
+DEEP_BOOK_MATCHES = 100000
+
+
+class DeepBookMatchBenchmark(Benchmark):
+    """
+    Match many incoming bids against an order book with an ask in each of many price levels. Every bid matches the
+    cheapest asks, over several price levels. The last bid sweeps all price levels of the book.
+    """
+    name = "market.deep_book_match"
+    operations = DEEP_BOOK_MATCHES + 1
+    repeat = 3
+    number = 1
+
+    def setUp(self):
+        rand = self.generator.random
+        trader_ids = [TraderId("%040x" % rand.getrandbits(160)) for _ in xrange(NUM_TRADERS)]
+
+        self.order_book = OrderBook()
+        total_quantity = 0
+        for order_number in xrange(DEEP_BOOK_PRICE_LEVELS):
+            order_id = OrderId(rand.choice(trader_ids), OrderNumber(order_number))
+            quantity = rand.randint(1, 10)
+            total_quantity += quantity
+            self.order_book.insert_ask(Ask(order_id, Price(MIN_PRICE + order_number, 'BTC'), Quantity(quantity, 'MC'),
+                                           Timeout(3600), Timestamp.now()))
+
+        self.matching_strategy = PriceTimeStrategy(self.order_book)
+
+        self.incoming_orders = []
+        for order_number in xrange(DEEP_BOOK_MATCHES):
+            order_id = OrderId(rand.choice(trader_ids), OrderNumber(DEEP_BOOK_PRICE_LEVELS + order_number))
+            price = Price(MIN_PRICE + rand.randint(0, DEEP_BOOK_PRICE_LEVELS - 1), 'BTC')
+            self.incoming_orders.append((order_id, price, Quantity(rand.randint(1, 30), 'MC')))
+
+        order_id = OrderId(rand.choice(trader_ids), OrderNumber(DEEP_BOOK_PRICE_LEVELS + DEEP_BOOK_MATCHES))
+        self.incoming_orders.append((order_id, Price(MIN_PRICE + DEEP_BOOK_PRICE_LEVELS, 'BTC'),
+                                     Quantity(total_quantity + 1, 'MC')))
+
+    def tearDown(self):
+        self.order_book.shutdown_task_manager()
+
+    def run(self):
+        for order_id, price, quantity in self.incoming_orders:
+            self.matching_strategy.match(order_id, price, quantity, False)
@@ -0,0 +1,97 @@
+"""
+Benchmarks of the Temporal PageRank reputation of the market community, over a large synthetic TradeChain.
+"""
+from Tribler.community.market.reputation.incremental_pagerank_manager import IncrementalTemporalPagerankManager
+from Tribler.pyipv8.ipv8.attestation.trustchain.block import UNKNOWN_SEQ
+from Tribler.Test.Benchmarks.benchmark import Benchmark
+
+NUM_BLOCKS = 1000000
+NUM_PEERS = 1000
+NUM_NEW_BLOCKS = 1000
+NUM_NEW_BLOCK_BATCHES = 20
+
+
+class SyntheticBlock(object):
+    """
+    A block with the fields that are used by the reputation managers.
+    """
+    __slots__ = ('public_key', 'sequence_number', 'link_public_key', 'link_sequence_number', 'transaction')
+
+    def __init__(self, public_key, sequence_number, link_public_key, link_sequence_number, transaction):
+        self.public_key = public_key
+        self.sequence_number = sequence_number
+        self.link_public_key = link_public_key
+        self.link_sequence_number = link_sequence_number
+        self.transaction = transaction
+
+
+class SyntheticChain(object):
+    """
+    A TradeChain of completed transactions between random peers. Every transaction consists of a proposal block of the
+    requester and an agreement block of the responder.
+    """
+
+    def __init__(self, generator, num_peers):
+        self.rand = generator.random
+        self.public_keys = [generator.random_bytes(74) for _ in xrange(num_peers)]
+        self.sequence_numbers = dict.fromkeys(self.public_keys, 0)
+        # The blocks share a limited number of transactions, so the chain fits in memory
+        self.transactions = [{"type": "tx_done",
+                              "tx": {"quantity_type": "BTC", "quantity": self.rand.randint(1, 100),
+                                     "price_type": "MC", "price": self.rand.randint(1, 100)}}
+                             for _ in xrange(100)]
+
+    def create_blocks(self, num_blocks):
+        blocks = []
+        for _ in xrange(num_blocks / 2):
+            requester, responder = self.rand.sample(self.public_keys, 2)
+            transaction = self.rand.choice(self.transactions)
+            self.sequence_numbers[requester] += 1
+            self.sequence_numbers[responder] += 1
+            blocks.append(SyntheticBlock(requester, self.sequence_numbers[requester], responder, UNKNOWN_SEQ,
+                                         transaction))
+            blocks.append(SyntheticBlock(responder, self.sequence_numbers[responder], requester,
+                                         self.sequence_numbers[requester], transaction))
+        return blocks
+
+
+class IncrementalReputationBenchmark(Benchmark):
+    """
+    Add a batch of new blocks to the reputation of a chain with a million blocks, and compute the scores starting
+    from the previous scores. This is what the market community does every five minutes.
+    """
+    name = "market.reputation_incremental"
+    operations = NUM_NEW_BLOCKS
+    repeat = 3
+    number = 1
+
+    def setUp(self):
+        chain = SyntheticChain(self.generator, NUM_PEERS)
+        self.own_public_key = chain.public_keys[0]
+        self.reputation_manager = IncrementalTemporalPagerankManager(chain.create_blocks(NUM_BLOCKS))
+        self.reputation_manager.compute(self.own_public_key)
+
+        # If the benchmark runs more often than there are batches, the last runs only recompute the scores
+        self.new_block_batches = [chain.create_blocks(NUM_NEW_BLOCKS) for _ in xrange(NUM_NEW_BLOCK_BATCHES)]
+
+    def run(self):
+        self.reputation_manager.add_blocks(self.new_block_batches.pop() if self.new_block_batches else [])
+        self.reputation_manager.compute(self.own_public_key)
+
+
+class FullReputationBenchmark(Benchmark):
+    """
+    Compute the reputation of a chain with a million blocks from scratch, as the market community does when it starts.
+    """
+    name = "market.reputation_full"
+    operations = NUM_BLOCKS
+    repeat = 1
+    number = 1
+
+    def setUp(self):
+        chain = SyntheticChain(self.generator, NUM_PEERS)
+        self.own_public_key = chain.public_keys[0]
+        self.blocks = chain.create_blocks(NUM_BLOCKS)
+
+    def run(self):
+        IncrementalTemporalPagerankManager(self.blocks).compute(self.own_public_key)
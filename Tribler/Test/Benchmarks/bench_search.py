@@ -0,0 +1,53 @@
+"""
+Benchmarks of the full text search in the local torrent database.
+"""
+import os
+
+from Tribler.Core.CacheDB.SqliteCacheDBHandler import TorrentDBHandler
+from Tribler.Core.CacheDB.sqlitecachedb import SQLiteCacheDB
+from Tribler.Core.Category.Category import Category
+from Tribler.Test.Benchmarks.benchmark import Benchmark
+from Tribler.Test.Core.base_test import MockObject
+
+NUM_TORRENTS = 10000
+NUM_QUERIES = 20
+
+# The same columns as the ones requested by the search endpoint
+SEARCH_KEYS = ['T.torrent_id', 'infohash', 'T.name', 'length', 'category', 'num_seeders', 'num_leechers',
+               'last_tracker_check']
+
+
+class LocalTorrentSearchBenchmark(Benchmark):
+    """
+    Search a generated database with torrents. This measures the FTS query and the BM25 scoring of the results.
+    """
+    name = "search.local_torrents"
+    number = 2
+    operations = NUM_QUERIES
+
+    def setUp(self):
+        self.sqlite_db = SQLiteCacheDB(os.path.join(self.state_dir, "search_benchmark.db"))
+        self.sqlite_db.initialize()
+        self.sqlite_db.initial_begin()
+
+        session = MockObject()
+        session.sqlite_db = self.sqlite_db
+        session.notifier = None
+        self.torrent_db = TorrentDBHandler(session)
+        self.torrent_db.category = Category()
+
+        for _ in xrange(NUM_TORRENTS):
+            self.torrent_db.addExternalTorrentNoDef(self.generator.random_infohash(), self.generator.random_name(),
+                                                    self.generator.random_files(),
+                                                    [self.generator.random.choice(("udp://tracker.example.org:6969",
+                                                                                   "DHT"))],
+                                                    self.generator.random.randint(1262304000, 1514764800))
+
+        self.queries = [u" ".join(self.generator.random_words(1, 3)) for _ in xrange(NUM_QUERIES)]
+
+    def tearDown(self):
+        self.sqlite_db.close()
+
+    def run(self):
+        for query in self.queries:
+            self.torrent_db.search_in_local_torrents_db(query, keys=SEARCH_KEYS)
@@ -0,0 +1,38 @@
+"""
+Benchmarks of the encoding and decoding of SOCKS5 UDP packets.
+"""
+from Tribler.Core.Socks5 import conversion
+from Tribler.Test.Benchmarks.benchmark import Benchmark
+
+NUM_PACKETS = 1000
+PAYLOAD_SIZE = 1400
+
+
+class EncodeUdpPacketBenchmark(Benchmark):
+    name = "socks5.encode_udp_packet"
+    operations = NUM_PACKETS
+
+    def setUp(self):
+        payload = self.generator.random_bytes(PAYLOAD_SIZE)
+        self.packets = [(self.generator.random_ipv4_address(), self.generator.random_port(), payload)
+                        for _ in xrange(NUM_PACKETS)]
+
+    def run(self):
+        for address, port, payload in self.packets:
+            conversion.encode_udp_packet(0, 0, conversion.ADDRESS_TYPE_IPV4, address, port, payload)
+
+
+class DecodeUdpPacketBenchmark(Benchmark):
+    name = "socks5.decode_udp_packet"
+    operations = NUM_PACKETS
+
+    def setUp(self):
+        payload = self.generator.random_bytes(PAYLOAD_SIZE)
+        self.packets = [conversion.encode_udp_packet(0, 0, conversion.ADDRESS_TYPE_IPV4,
+                                                     self.generator.random_ipv4_address(),
+                                                     self.generator.random_port(), payload)
+                        for _ in xrange(NUM_PACKETS)]
+
+    def run(self):
+        for packet in self.packets:
+            conversion.decode_udp_packet(packet)
@@ -0,0 +1,152 @@
+"""
+Benchmarks of TFTP transfers between two handlers that are connected by an in-memory loopback network.
+"""
+import time
+from binascii import hexlify
+from collections import deque
+
+from Tribler.Core.TFTP.handler import TftpHandler
+from Tribler.Core.TFTP.session import DEFAULT_WINDOW_SIZE
+from Tribler.Test.Benchmarks.benchmark import Benchmark
+from Tribler.Test.Core.base_test import MockObject
+
+TFTP_PREFIX = "fffffffd".decode('hex')
+BLOCK_SIZE = 1024
+
+NUM_FILES = 10
+FILE_SIZE = 256 * 1024
+
+# The one-way delay of the network in the benchmarks that simulate a wide-area link
+LATENCY = 0.005
+
+SERVER_ADDRESS = ("127.0.0.1", 7001)
+CLIENT_ADDRESS = ("127.0.0.1", 7002)
+
+
+class LoopbackNetwork(object):
+    """
+    An in-memory network that queues the packets sent by the endpoints attached to it. Packets are only delivered
+    when deliver_packets is called, which prevents deep recursion between the two handlers.
+
+    With a latency, the packets are delivered in rounds: all packets that are in flight arrive after the latency, and
+    the packets they cause are delivered in the next round. This is a link with a round-trip time of twice the latency
+    and an unlimited bandwidth.
+    """
+
+    def __init__(self, latency=0):
+        self.latency = latency
+        self.endpoints = {}
+        self.packets = deque()
+
+    def create_endpoint(self, address):
+        endpoint = LoopbackEndpoint(self, address)
+        self.endpoints[address] = endpoint
+        return endpoint
+
+    def deliver_packets(self):
+        num_packets = 0
+        while self.packets:
+            packets = self.packets
+            if self.latency:
+                self.packets = deque()
+                time.sleep(self.latency)
+
+            while packets:
+                source, destination, prefix, packet = packets.popleft()
+                handler = self.endpoints[destination].listeners.get(prefix)
+                if handler:
+                    handler(source, packet)
+                num_packets += 1
+        return num_packets
+
+
+class LoopbackEndpoint(object):
+    """
+    An endpoint that only implements the methods used by the TFTP handler.
+    """
+
+    def __init__(self, network, address):
+        self.network = network
+        self.address = address
+        self.listeners = {}
+
+    def listen_to(self, prefix, handler):
+        self.listeners[prefix] = handler
+
+    def stop_listen_to(self, prefix):
+        self.listeners.pop(prefix, None)
+
+    def send_packet(self, candidate, packet, prefix=None):
+        self.network.packets.append((self.address, candidate.sock_addr, prefix, packet))
+
+
+class TftpLoopbackTransferBenchmark(Benchmark):
+    """
+    Download files from a TFTP handler that serves them from its torrent store.
+    """
+    name = "tftp.loopback_transfer"
+    number = 3
+    operations = NUM_FILES
+    latency = 0
+    window_size = DEFAULT_WINDOW_SIZE
+
+    def setUp(self):
+        self.network = LoopbackNetwork(self.latency)
+        self.torrent_store = {}
+        self.file_names = []
+        for _ in xrange(NUM_FILES):
+            infohash = hexlify(self.generator.random_infohash())
+            self.torrent_store[infohash] = self.generator.random_bytes(FILE_SIZE)
+            self.file_names.append(u"%s.torrent" % infohash)
+
+        server_session = MockObject()
+        server_session.config = MockObject()
+        server_session.config.get_torrent_store_enabled = lambda: True
+        server_session.lm = MockObject()
+        server_session.lm.torrent_store = self.torrent_store
+        self.server = TftpHandler(server_session, self.network.create_endpoint(SERVER_ADDRESS), TFTP_PREFIX,
+                                  block_size=BLOCK_SIZE, window_size=self.window_size)
+
+        client_session = MockObject()
+        client_session.lm = MockObject()
+        client_session.lm.dispersy = MockObject()
+        client_session.lm.dispersy.wan_address = CLIENT_ADDRESS
+        self.client = TftpHandler(client_session, self.network.create_endpoint(CLIENT_ADDRESS), TFTP_PREFIX,
+                                  block_size=BLOCK_SIZE, window_size=self.window_size)
+
+        self.server.initialize()
+        self.client.initialize()
+
+        self.num_downloaded = 0
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.client.shutdown()
+
+    def on_download_finished(self, *_):
+        self.num_downloaded += 1
+
+    def run(self):
+        for file_name in self.file_names:
+            self.client.download_file(file_name, SERVER_ADDRESS[0], SERVER_ADDRESS[1],
+                                      success_callback=self.on_download_finished)
+        self.network.deliver_packets()
+
+
+class TftpLatencyTransferBenchmark(TftpLoopbackTransferBenchmark):
+    """
+    Download files over a link with a round-trip time of 10 ms, with the default window size.
+    """
+    name = "tftp.latency_transfer"
+    repeat = 3
+    number = 1
+    latency = LATENCY
+
+
+class TftpLatencyStopAndWaitTransferBenchmark(TftpLatencyTransferBenchmark):
+    """
+    Download files over a link with a round-trip time of 10 ms from a peer that does not negotiate a window size, so
+    every block waits for the ACK of the previous block.
+    """
+    name = "tftp.latency_transfer_stop_and_wait"
+    window_size = 1
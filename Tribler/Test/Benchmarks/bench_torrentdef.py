@@ -0,0 +1,45 @@
+"""
+Benchmarks of the (de)serialisation of torrent files.
+"""
+from libtorrent import bdecode, bencode
+
+from Tribler.Core.TorrentDef import TorrentDef
+from Tribler.Test.Benchmarks.benchmark import Benchmark
+
+NUM_TORRENTS = 100
+
+
+class TorrentDefLoadFromMemoryBenchmark(Benchmark):
+    name = "torrentdef.load_from_memory"
+    operations = NUM_TORRENTS
+
+    def setUp(self):
+        self.torrent_files = [self.generator.random_torrent_file() for _ in xrange(NUM_TORRENTS)]
+
+    def run(self):
+        for torrent_file in self.torrent_files:
+            TorrentDef.load_from_memory(torrent_file)
+
+
+class BencodeBenchmark(Benchmark):
+    name = "torrentdef.bencode"
+    operations = NUM_TORRENTS
+
+    def setUp(self):
+        self.metainfos = [self.generator.random_metainfo() for _ in xrange(NUM_TORRENTS)]
+
+    def run(self):
+        for metainfo in self.metainfos:
+            bencode(metainfo)
+
+
+class BdecodeBenchmark(Benchmark):
+    name = "torrentdef.bdecode"
+    operations = NUM_TORRENTS
+
+    def setUp(self):
+        self.torrent_files = [self.generator.random_torrent_file() for _ in xrange(NUM_TORRENTS)]
+
+    def run(self):
+        for torrent_file in self.torrent_files:
+            bdecode(torrent_file)
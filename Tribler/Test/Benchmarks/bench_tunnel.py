@@ -0,0 +1,133 @@
+"""
+Benchmarks of the dispatching of traffic between the SOCKS5 servers and the tunnel community.
+"""
+from Tribler.Core.Socks5.conversion import UdpRequest, ADDRESS_TYPE_IPV4, decode_udp_packet, encode_udp_packet
+from Tribler.community.triblertunnel.dispatcher import TunnelDispatcher
+from Tribler.pyipv8.ipv8.messaging.anonymization.tunnel import CIRCUIT_STATE_READY, CIRCUIT_TYPE_DATA
+from Tribler.Test.Benchmarks.benchmark import Benchmark
+from Tribler.Test.Core.base_test import MockObject
+
+NUM_SOCKS_SERVERS = 3
+NUM_CIRCUITS = 50
+NUM_DESTINATIONS = 500
+NUM_PACKETS = 1000
+PAYLOAD_SIZE = 1400
+
+
+class TunnelDispatcherBenchmark(Benchmark):
+    """
+    Base class of the dispatcher benchmarks, which sets up a dispatcher with mocked SOCKS5 servers and circuits.
+    """
+
+    def setUp(self):
+        rand = self.generator.random
+
+        self.tunnel_community = MockObject()
+        self.tunnel_community.send_data = lambda *_: None
+        self.tunnel_community.selection_strategy = MockObject()
+        self.tunnel_community.selection_strategy.select = lambda destination, hops: rand.choice(self.circuits[hops])
+        self.dispatcher = TunnelDispatcher(self.tunnel_community)
+
+        self.socks_servers = []
+        for _ in xrange(NUM_SOCKS_SERVERS):
+            udp_socket = MockObject()
+            udp_socket.sendDatagram = lambda _: True
+            session = MockObject()
+            session._udp_socket = udp_socket
+            socks_server = MockObject()
+            socks_server.sessions = [session]
+            self.socks_servers.append(socks_server)
+        self.dispatcher.set_socks_servers(self.socks_servers)
+
+        self.circuits = {}
+        for hops in xrange(1, NUM_SOCKS_SERVERS + 1):
+            self.circuits[hops] = []
+            for _ in xrange(NUM_CIRCUITS):
+                circuit = MockObject()
+                circuit.circuit_id = rand.getrandbits(32)
+                circuit.ctype = CIRCUIT_TYPE_DATA
+                circuit.state = CIRCUIT_STATE_READY
+                circuit.goal_hops = hops
+                circuit.sock_addr = (self.generator.random_ipv4_address(), self.generator.random_port())
+                self.circuits[hops].append(circuit)
+
+        self.destinations = [(self.generator.random_ipv4_address(), self.generator.random_port())
+                             for _ in xrange(NUM_DESTINATIONS)]
+        self.payload = self.generator.random_bytes(PAYLOAD_SIZE)
+
+
+class DispatcherSocksToTunnelBenchmark(TunnelDispatcherBenchmark):
+    name = "tunnel.dispatcher.socks_to_tunnel"
+    operations = NUM_PACKETS
+
+    def setUp(self):
+        super(DispatcherSocksToTunnelBenchmark, self).setUp()
+        rand = self.generator.random
+
+        self.packets = []
+        for _ in xrange(NUM_PACKETS):
+            udp_connection = MockObject()
+            udp_connection.socksconnection = MockObject()
+            udp_connection.socksconnection.socksserver = rand.choice(self.socks_servers)
+            destination = rand.choice(self.destinations)
+            request = UdpRequest(0, 0, ADDRESS_TYPE_IPV4, destination[0], destination[1], memoryview(self.payload))
+            self.packets.append((udp_connection, request))
+
+    def run(self):
+        for udp_connection, request in self.packets:
+            self.dispatcher.on_socks5_udp_data(udp_connection, request)
+
+
+class DispatcherTunnelToSocksBenchmark(TunnelDispatcherBenchmark):
+    name = "tunnel.dispatcher.tunnel_to_socks"
+    operations = NUM_PACKETS
+
+    def setUp(self):
+        super(DispatcherTunnelToSocksBenchmark, self).setUp()
+        rand = self.generator.random
+
+        # Incoming traffic is only dispatched for destinations that we have sent data to before
+        for hops, circuits in self.circuits.iteritems():
+            for destination in self.destinations:
+                self.dispatcher.add_destination(hops, destination, rand.choice(circuits))
+
+        self.packets = []
+        for _ in xrange(NUM_PACKETS):
+            hops = rand.randint(1, NUM_SOCKS_SERVERS)
+            origin = rand.choice(self.destinations)
+            self.packets.append((self.dispatcher.destinations[hops][origin], origin))
+
+    def run(self):
+        for circuit, origin in self.packets:
+            self.dispatcher.on_incoming_from_tunnel(self.tunnel_community, circuit, origin, self.payload)
+
+
+class TunnelRelayBenchmark(TunnelDispatcherBenchmark):
+    """
+    Relay packets between libtorrent and the tunnels, including the decoding and encoding of the SOCKS5 UDP packets.
+    Every packet from libtorrent is answered with a packet from the tunnels, the result is the time per packet.
+    """
+    name = "tunnel.relay"
+    operations = 2 * NUM_PACKETS
+
+    def setUp(self):
+        super(TunnelRelayBenchmark, self).setUp()
+        rand = self.generator.random
+
+        self.packets = []
+        for _ in xrange(NUM_PACKETS):
+            udp_connection = MockObject()
+            udp_connection.socksconnection = MockObject()
+            hops = rand.randint(1, NUM_SOCKS_SERVERS)
+            udp_connection.socksconnection.socksserver = self.socks_servers[hops - 1]
+            destination = rand.choice(self.destinations)
+            datagram = encode_udp_packet(0, 0, ADDRESS_TYPE_IPV4, destination[0], destination[1], self.payload)
+            self.packets.append((udp_connection, hops, datagram))
+
+    def run(self):
+        destinations = self.dispatcher.destinations
+        for udp_connection, hops, datagram in self.packets:
+            request = decode_udp_packet(datagram)
+            self.dispatcher.on_socks5_udp_data(udp_connection, request)
+            self.dispatcher.on_incoming_from_tunnel(self.tunnel_community, destinations[hops][request.destination],
+                                                    request.destination, self.payload)
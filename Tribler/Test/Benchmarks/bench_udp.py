@@ -0,0 +1,80 @@
+"""
+Loopback benchmarks of the UDP ports that are used by the SOCKS5 UDP relay, with and without batched datagram I/O.
+"""
+import socket
+
+from twisted.internet import reactor, udp
+from twisted.internet.protocol import DatagramProtocol
+
+from Tribler.Core.Socks5.batched_udp import BatchedUDPPort, is_batched_udp_supported
+from Tribler.Test.Benchmarks.benchmark import Benchmark
+
+NUM_PACKETS = 1000
+BATCH_SIZE = 100
+PAYLOAD_SIZE = 1400
+
+
+class CountingProtocol(DatagramProtocol):
+
+    def __init__(self):
+        self.received = 0
+
+    def datagramReceived(self, data, addr):
+        self.received += 1
+
+
+class UDPLoopbackBenchmark(Benchmark):
+    """
+    Send packets from one UDP port to another over the loopback interface and receive them. The packets are sent in
+    batches that fit in the receive buffer of the socket, so no packets are dropped.
+    The ports are not driven by the reactor, the benchmark calls doRead directly.
+    """
+    name = "socks5.udp_loopback.regular"
+    operations = NUM_PACKETS
+
+    def create_port(self, protocol):
+        port = udp.Port(0, protocol, interface="127.0.0.1", reactor=reactor)
+        port.startListening()
+        port.stopReading()
+        return port
+
+    def setUp(self):
+        self.sender = self.create_port(DatagramProtocol())
+        self.protocol = CountingProtocol()
+        self.receiver = self.create_port(self.protocol)
+        self.receiver.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * BATCH_SIZE * PAYLOAD_SIZE)
+
+        address = ("127.0.0.1", self.receiver.getHost().port)
+        payload = self.generator.random_bytes(PAYLOAD_SIZE)
+        self.datagrams = [(payload, address) for _ in xrange(BATCH_SIZE)]
+
+    def tearDown(self):
+        self.sender.stopListening()
+        self.receiver.stopListening()
+
+    def send_batch(self):
+        for datagram, address in self.datagrams:
+            self.sender.write(datagram, address)
+
+    def run(self):
+        self.protocol.received = 0
+        for _ in xrange(NUM_PACKETS // BATCH_SIZE):
+            self.send_batch()
+            self.receiver.doRead()
+
+
+class BatchedUDPLoopbackBenchmark(UDPLoopbackBenchmark):
+    name = "socks5.udp_loopback.batched"
+
+    def create_port(self, protocol):
+        if not is_batched_udp_supported():
+            raise RuntimeError("Batched UDP I/O is not supported on this platform")
+
+        port = BatchedUDPPort(0, protocol, interface="127.0.0.1", reactor=reactor)
+        port.startListening()
+        port.stopReading()
+        return port
+
+    def send_batch(self):
+        self.sender.pending_datagrams.extend(self.datagrams)
+        self.sender.flush()
@@ -0,0 +1,135 @@
+"""
+This module contains the base class of the benchmarks and the runner that executes them.
+"""
+import gc
+import logging
+import os
+import platform
+import subprocess
+import time
+from timeit import default_timer
+
+from Tribler.Test.Benchmarks.generators import BenchmarkDataGenerator, DEFAULT_SEED
+
+RESULTS_FORMAT_VERSION = 1
+
+
+class Benchmark(object):
+    """
+    Base class of a benchmark. Subclasses should give the benchmark a unique name and implement run(). Each call of
+    run() should perform the measured operation the number of times given by operations, usually once for every item
+    of a batch of input data. The input data should be prepared in setUp(), using the seeded generator.
+
+    A single measurement executes run() number times and reports the time per operation. A benchmark is measured
+    repeat times, the fastest measurements are the most representative ones, since slower ones are usually disturbed
+    by other processes on the machine.
+    """
+    name = None
+    repeat = 5
+    number = 10
+    operations = 1
+
+    def __init__(self, generator, state_dir):
+        self.generator = generator
+        self.state_dir = state_dir
+
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def run(self):
+        raise NotImplementedError()
+
+
+def get_git_commit():
+    """
+    Return the hash of the commit that is checked out, or None if it cannot be determined.
+    """
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(__file__),
+                                       stderr=open(os.devnull, 'w')).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_median(values):
+    sorted_values = sorted(values)
+    middle = len(sorted_values) // 2
+    if len(sorted_values) % 2:
+        return sorted_values[middle]
+    return (sorted_values[middle - 1] + sorted_values[middle]) / 2.0
+
+
+class BenchmarkRunner(object):
+    """
+    This class executes benchmarks and collects the results in a dictionary that can be serialised as JSON.
+    The benchmarks should be executed on the reactor thread, since some of the measured code requires it.
+    """
+
+    def __init__(self, benchmark_classes, state_dir, seed=DEFAULT_SEED, repeat=None):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.benchmark_classes = benchmark_classes
+        self.state_dir = state_dir
+        self.seed = seed
+        self.repeat = repeat
+        self.results = {}
+
+    def run_benchmark(self, benchmark_class):
+        benchmark = benchmark_class(BenchmarkDataGenerator(self.seed), self.state_dir)
+        benchmark.setUp()
+        try:
+            # Execute the benchmark once before measuring, to warm up caches
+            benchmark.run()
+
+            timings = []
+            gc_was_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                for _ in xrange(self.repeat or benchmark.repeat):
+                    start_time = default_timer()
+                    for _ in xrange(benchmark.number):
+                        benchmark.run()
+                    timings.append((default_timer() - start_time) / (benchmark.number * benchmark.operations))
+            finally:
+                if gc_was_enabled:
+                    gc.enable()
+        finally:
+            benchmark.tearDown()
+
+        return {
+            "number": benchmark.number,
+            "operations": benchmark.operations,
+            "repeat": len(timings),
+            "min": min(timings),
+            "median": get_median(timings),
+            "max": max(timings),
+            "ops_per_second": 1.0 / min(timings) if min(timings) > 0 else None,
+            "timings": timings
+        }
+
+    def run(self):
+        for benchmark_class in self.benchmark_classes:
+            self._logger.info("Running benchmark %s", benchmark_class.name)
+            try:
+                self.results[benchmark_class.name] = self.run_benchmark(benchmark_class)
+            except Exception as exc:
+                self._logger.exception("Benchmark %s failed", benchmark_class.name)
+                self.results[benchmark_class.name] = {"error": str(exc)}
+            else:
+                self._logger.info("Benchmark %s: %.3f usec per operation", benchmark_class.name,
+                                  self.results[benchmark_class.name]["min"] * 1e6)
+        return self.get_results_dict()
+
+    def get_results_dict(self):
+        return {
+            "version": RESULTS_FORMAT_VERSION,
+            "commit": get_git_commit(),
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "seed": self.seed,
+            "benchmarks": self.results
+        }
@@ -0,0 +1,337 @@
+"""
+This script synthesises a large Tribler state directory, with a database that contains torrents, trackers, channels,
+playlists and votes, and a torrent store with the torrent files of the collected torrents.
+
+Example usage:
+
+    python -m Tribler.Test.Benchmarks.database_generator --state-dir /tmp/large_state --torrents 2000000
+"""
+import logging
+import os
+import sys
+import time
+from binascii import hexlify
+from hashlib import sha1
+
+from configobj import ConfigObj
+from libtorrent import bencode
+from twisted.internet import reactor
+from twisted.python import usage
+
+from Tribler.Core.CacheDB.db_versions import LATEST_DB_VERSION
+from Tribler.Core.CacheDB.sqlitecachedb import SQLiteCacheDB, DB_FILE_RELATIVE_PATH, bin2str
+from Tribler.Core.Category.Category import Category
+from Tribler.Core.Config.tribler_config import TriblerConfig, CONFIG_SPEC_PATH
+from Tribler.Core.Utilities.search_utils import split_into_keywords
+from Tribler.Core.leveldbstore import LevelDbStore
+from Tribler.Test.Benchmarks.generators import BenchmarkDataGenerator, DEFAULT_SEED
+
+BATCH_SIZE = 10000
+
+# The no-DHT and DHT trackers are inserted by the database script
+DHT_TRACKER_ID = 2
+
+# The votes as stored by the ChannelCastDBHandler
+VOTE_FAVORITE = 2
+VOTE_SPAM = -1
+
+MIN_TIMESTAMP = 1262304000
+MAX_TIMESTAMP = 1514764800
+
+
+class DatabaseGenerator(object):
+    """
+    This class generates a state directory with a database in the latest schema, using bulk inserts. The generated
+    rows follow the format of the rows that are inserted by the database handlers, so the database can be used by a
+    Session without having to be upgraded or reindexed.
+    """
+
+    def __init__(self, state_dir, seed=DEFAULT_SEED, num_torrents=1000000, num_trackers=500, num_peers=20000,
+                 num_channels=5000, torrents_per_channel=200, playlists_per_channel=2, votes_per_channel=20,
+                 collected_ratio=0.05):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.generator = BenchmarkDataGenerator(seed)
+
+        self.config = TriblerConfig(ConfigObj(configspec=CONFIG_SPEC_PATH))
+        self.config.set_state_dir(state_dir)
+
+        self.num_torrents = num_torrents
+        self.num_trackers = num_trackers
+        self.num_peers = num_peers
+        self.num_channels = num_channels
+        self.torrents_per_channel = torrents_per_channel
+        self.playlists_per_channel = playlists_per_channel
+        self.votes_per_channel = votes_per_channel
+        self.collected_ratio = collected_ratio
+
+        self.category = Category()
+        self.db = None
+        self.torrent_store = None
+        self.tracker_urls = {}
+        self.next_dispersy_id = 1
+        self.statistics = {}
+
+    def generate(self):
+        """
+        Generate the database and the torrent store. Should be called on the reactor thread.
+        Returns a dictionary with the number of generated items per table.
+        """
+        db_path = os.path.join(self.config.get_state_dir(), DB_FILE_RELATIVE_PATH)
+        if os.path.exists(db_path):
+            raise RuntimeError("Database %s already exists" % db_path)
+        if not os.path.exists(os.path.dirname(db_path)):
+            os.makedirs(os.path.dirname(db_path))
+        if not os.path.exists(self.config.get_torrent_store_dir()):
+            os.makedirs(self.config.get_torrent_store_dir())
+
+        self.db = SQLiteCacheDB(db_path)
+        self.db.initialize()
+        self.torrent_store = LevelDbStore(self.config.get_torrent_store_dir())
+
+        try:
+            self.db.execute(u"BEGIN;")
+            self.generate_trackers()
+            self.generate_peers()
+            self.generate_torrents()
+            self.generate_channels()
+            # The full text index is already in the format of the latest version, no upgrade is needed
+            self.db.execute(u"UPDATE MyInfo SET value = ? WHERE entry == 'version'", (LATEST_DB_VERSION,))
+            self.db.execute(u"COMMIT;")
+        finally:
+            self.torrent_store.close()
+            self.db.close()
+
+        return self.statistics
+
+    def commit_batch(self):
+        self.db.execute(u"COMMIT;")
+        self.db.execute(u"BEGIN;")
+
+    def get_dispersy_ids(self, count):
+        first_id = self.next_dispersy_id
+        self.next_dispersy_id += count
+        return xrange(first_id, first_id + count)
+
+    def random_timestamp(self):
+        return self.generator.random.randint(MIN_TIMESTAMP, MAX_TIMESTAMP)
+
+    def generate_trackers(self):
+        trackers = []
+        for ind in xrange(self.num_trackers):
+            if ind % 3:
+                trackers.append((u"udp://tracker%d.example.org:%d" % (ind, self.generator.random_port()),))
+            else:
+                trackers.append((u"http://tracker%d.example.com/announce" % ind,))
+        self.db.executemany(u"INSERT INTO TrackerInfo (tracker) VALUES (?)", trackers)
+        self.tracker_urls = dict(self.db.fetchall(u"SELECT tracker_id, tracker FROM TrackerInfo WHERE tracker_id > ?",
+                                                  (DHT_TRACKER_ID,)))
+        self.statistics["trackers"] = len(self.tracker_urls)
+
+    def generate_peers(self):
+        peers = [(bin2str(self.generator.random_bytes(74)), self.generator.random_name())
+                 for _ in xrange(self.num_peers)]
+        self.db.executemany(u"INSERT INTO Peer (permid, name) VALUES (?, ?)", peers)
+        self.statistics["peers"] = self.num_peers
+
+    def get_fulltext_index_row(self, torrent_id, name, files):
+        """
+        Return the row in the full text index of a torrent, like TorrentDBHandler._indexTorrent creates it.
+        """
+        file_keywords = set()
+        file_extensions = set()
+        for file_name, _ in files:
+            file_name, extension = os.path.splitext(file_name)
+            file_keywords.update(split_into_keywords(file_name, to_filter_stopwords=True))
+            file_extensions.add(extension[1:])
+        return (torrent_id, u" ".join(split_into_keywords(name)), u" ".join(file_keywords),
+                u" ".join(file_extensions))
+
+    def generate_torrents(self):
+        """
+        Generate the torrents in batches. A fraction of the torrents is collected, the torrent files of these
+        torrents are added to the torrent store.
+        """
+        rand = self.generator.random
+        tracker_ids = sorted(self.tracker_urls)
+        num_collected = 0
+
+        for batch_start in xrange(0, self.num_torrents, BATCH_SIZE):
+            torrents, files_rows, index_rows, tracker_rows = [], [], [], []
+
+            for torrent_id in xrange(batch_start + 1, min(batch_start + BATCH_SIZE, self.num_torrents) + 1):
+                name = self.generator.random_name()
+                files = self.generator.random_files()
+                trackers = rand.sample(tracker_ids, rand.randint(0, min(3, len(tracker_ids))))
+                creation_date = self.random_timestamp()
+                comment = u" ".join(self.generator.random_words(0, 6))
+
+                is_collected = rand.random() < self.collected_ratio
+                if is_collected:
+                    tracker_urls = [self.tracker_urls[tracker_id].encode('utf-8') for tracker_id in trackers]
+                    metainfo = self.generator.build_metainfo(name, files, tracker_urls, creation_date,
+                                                             comment.encode('utf-8'))
+                    infohash = sha1(bencode(metainfo["info"])).digest()
+                    self.torrent_store[hexlify(infohash)] = bencode(metainfo)
+                    num_collected += 1
+                else:
+                    infohash = self.generator.random_infohash()
+
+                length = sum(file_length for _, file_length in files)
+                category = self.category.calculateCategoryNonDict(
+                    [(file_name, file_length / 1048576.0) for file_name, file_length in files], name,
+                    self.tracker_urls[trackers[0]] if trackers else u"", comment)
+                last_tracker_check = self.random_timestamp() if rand.random() < 0.5 else 0
+                torrents.append((torrent_id, bin2str(infohash), name, length, creation_date, len(files),
+                                 self.random_timestamp(), category, rand.randint(0, 5000) if last_tracker_check else 0,
+                                 rand.randint(0, 5000) if last_tracker_check else 0, comment, int(is_collected),
+                                 last_tracker_check))
+
+                files_rows.extend((torrent_id, file_name, file_length) for file_name, file_length in files)
+                index_rows.append(self.get_fulltext_index_row(torrent_id, name, files))
+                tracker_rows.append((torrent_id, DHT_TRACKER_ID))
+                tracker_rows.extend((torrent_id, tracker_id) for tracker_id in trackers)
+
+            self.db.executemany(u"INSERT INTO Torrent (torrent_id, infohash, name, length, creation_date, num_files, "
+                                u"insert_time, secret, relevance, category, status, num_seeders, num_leechers, "
+                                u"comment, is_collected, last_tracker_check) "
+                                u"VALUES (?, ?, ?, ?, ?, ?, ?, 0, 0.0, ?, 'unknown', ?, ?, ?, ?, ?)", torrents)
+            self.db.executemany(u"INSERT OR IGNORE INTO TorrentFiles (torrent_id, path, length) VALUES (?, ?, ?)",
+                                files_rows)
+            self.db.executemany(u"INSERT INTO FullTextIndex (rowid, swarmname, filenames, fileextensions) "
+                                u"VALUES (?, ?, ?, ?)", index_rows)
+            self.db.executemany(u"INSERT OR IGNORE INTO TorrentTrackerMapping (torrent_id, tracker_id) VALUES (?, ?)",
+                                tracker_rows)
+            self.commit_batch()
+            self.torrent_store.flush()
+
+            self._logger.info("Generated %d/%d torrents", batch_start + len(torrents), self.num_torrents)
+
+        self.statistics["torrents"] = self.num_torrents
+        self.statistics["collected_torrents"] = num_collected
+
+    def generate_channels(self):
+        """
+        Generate the channels, together with their torrents, playlists and votes. The number of torrents in a channel
+        follows a power law: most channels are small while a few are very large.
+        """
+        rand = self.generator.random
+        num_channel_torrents = num_playlists = num_votes = 0
+
+        for channel_id in xrange(1, self.num_channels + 1):
+            peer_id = rand.randint(1, self.num_peers)
+            modified = self.random_timestamp()
+
+            torrent_ids = rand.sample(xrange(1, self.num_torrents + 1),
+                                      min(int(rand.paretovariate(1.5) * self.torrents_per_channel / 3),
+                                          self.num_torrents))
+            channel_torrents = [(dispersy_id, torrent_id, channel_id, peer_id, None, self.random_timestamp(),
+                                 modified, modified)
+                                for dispersy_id, torrent_id in zip(self.get_dispersy_ids(len(torrent_ids)),
+                                                                   torrent_ids)]
+            self.db.executemany(u"INSERT INTO _ChannelTorrents (dispersy_id, torrent_id, channel_id, peer_id, name, "
+                                u"time_stamp, modified, inserted) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", channel_torrents)
+
+            voters = rand.sample(xrange(1, self.num_peers + 1),
+                                 min(rand.randint(0, 2 * self.votes_per_channel), self.num_peers))
+            votes = [(channel_id, voter_id, dispersy_id, VOTE_FAVORITE if rand.random() < 0.9 else VOTE_SPAM,
+                      self.random_timestamp())
+                     for voter_id, dispersy_id in zip(voters, self.get_dispersy_ids(len(voters)))]
+            self.db.executemany(u"INSERT INTO _ChannelVotes (channel_id, voter_id, dispersy_id, vote, time_stamp) "
+                                u"VALUES (?, ?, ?, ?, ?)", votes)
+
+            nr_favorite = sum(1 for vote in votes if vote[3] == VOTE_FAVORITE)
+            self.db.execute(u"INSERT INTO _Channels (id, dispersy_cid, peer_id, name, description, modified, "
+                            u"inserted, nr_torrents, nr_spam, nr_favorite) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            (channel_id, buffer(self.generator.random_bytes(20)), peer_id,
+                             self.generator.random_name(), u" ".join(self.generator.random_words(0, 20)), modified,
+                             modified, len(channel_torrents), len(votes) - nr_favorite, nr_favorite))
+
+            num_playlists += self.generate_playlists(channel_id, peer_id, channel_torrents)
+            num_channel_torrents += len(channel_torrents)
+            num_votes += len(votes)
+
+            if channel_id % 100 == 0:
+                self.commit_batch()
+                self._logger.info("Generated %d/%d channels", channel_id, self.num_channels)
+
+        self.statistics["channels"] = self.num_channels
+        self.statistics["channel_torrents"] = num_channel_torrents
+        self.statistics["playlists"] = num_playlists
+        self.statistics["votes"] = num_votes
+
+    def generate_playlists(self, channel_id, peer_id, channel_torrents):
+        rand = self.generator.random
+        num_playlists = rand.randint(0, 2 * self.playlists_per_channel) if channel_torrents else 0
+
+        for _ in xrange(num_playlists):
+            playlist_id = self.db.fetchone(u"INSERT INTO _Playlists (channel_id, dispersy_id, peer_id, name, "
+                                           u"description) VALUES (?, ?, ?, ?, ?); SELECT last_insert_rowid();",
+                                           (channel_id, self.get_dispersy_ids(1)[0], peer_id,
+                                            self.generator.random_name(),
+                                            u" ".join(self.generator.random_words(0, 10))))
+
+            # The ids of the rows in _ChannelTorrents are not known, they are looked up by their dispersy id
+            playlist_torrents = rand.sample(channel_torrents, rand.randint(1, min(len(channel_torrents), 25)))
+            self.db.executemany(u"INSERT INTO _PlaylistTorrents (dispersy_id, peer_id, playlist_id, "
+                                u"channeltorrent_id) SELECT ?, ?, ?, id FROM _ChannelTorrents WHERE dispersy_id = ?",
+                                [(dispersy_id, peer_id, playlist_id, channel_torrent[0]) for dispersy_id,
+                                 channel_torrent in zip(self.get_dispersy_ids(len(playlist_torrents)),
+                                                        playlist_torrents)])
+        return num_playlists
+
+
+class Options(usage.Options):
+    optParameters = [
+        ["state-dir", "d", None, "The state directory to generate"],
+        ["seed", "s", DEFAULT_SEED, "The seed of the data generator", int],
+        ["torrents", "t", 1000000, "The number of torrents", int],
+        ["trackers", None, 500, "The number of trackers", int],
+        ["peers", "p", 20000, "The number of peers", int],
+        ["channels", "c", 5000, "The number of channels", int],
+        ["channel-torrents", None, 200, "The average number of torrents per channel", int],
+        ["playlists", None, 2, "The average number of playlists per channel", int],
+        ["votes", None, 20, "The average number of votes per channel", int],
+        ["collected", None, 0.05, "The fraction of the torrents that is collected", float]
+    ]
+
+    def postOptions(self):
+        if not self["state-dir"]:
+            raise usage.UsageError("A state directory should be given")
+        if self["torrents"] < 1 or self["peers"] < 1:
+            raise usage.UsageError("At least one torrent and one peer should be generated")
+
+
+def main(argv):
+    options = Options()
+    try:
+        options.parseOptions(argv)
+    except usage.UsageError as error:
+        print "%s: %s" % (sys.argv[0], error)
+        print options
+        return 1
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    generator = DatabaseGenerator(options["state-dir"], seed=options["seed"], num_torrents=options["torrents"],
+                                  num_trackers=options["trackers"], num_peers=options["peers"],
+                                  num_channels=options["channels"], torrents_per_channel=options["channel-torrents"],
+                                  playlists_per_channel=options["playlists"], votes_per_channel=options["votes"],
+                                  collected_ratio=options["collected"])
+
+    def generate():
+        try:
+            start_time = time.time()
+            statistics = generator.generate()
+            for table, count in sorted(statistics.iteritems()):
+                print "%s: %d" % (table, count)
+            print "Generated in %.1f seconds" % (time.time() - start_time)
+        finally:
+            reactor.stop()
+
+    # The database can only be accessed from the reactor thread
+    reactor.callWhenRunning(generate)
+    reactor.run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
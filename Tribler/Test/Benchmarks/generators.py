@@ -0,0 +1,113 @@
+"""
+This module contains generators of (reproducible) input data for the benchmarks.
+"""
+import random
+from hashlib import sha1
+
+from libtorrent import bencode
+
+DEFAULT_SEED = 42
+
+WORDS = ["ubuntu", "debian", "linux", "server", "desktop", "amd64", "i386", "iso", "live", "install", "big",
+         "buck", "bunny", "sintel", "tears", "steel", "elephants", "dream", "creative", "commons", "music", "album",
+         "live", "concert", "lecture", "course", "python", "twisted", "ebook", "collection", "documentary", "nature",
+         "ocean", "space", "history", "science", "podcast", "episode", "season", "remastered", "flac", "mp3",
+         "1080p", "720p", "hdtv", "x264", "open", "source", "software", "archive"]
+
+EXTENSIONS = ["mkv", "avi", "mp4", "mp3", "flac", "iso", "pdf", "epub", "txt", "nfo", "jpg", "zip"]
+
+TRACKERS = ["udp://tracker.example.org:6969/announce", "udp://tracker.example.com:1337/announce",
+            "http://tracker.example.net/announce"]
+
+
+class BenchmarkDataGenerator(object):
+    """
+    This class generates random (but reproducible) input data, like torrents, packets and payloads.
+    Every generator is seeded separately, so a benchmark always gets the same data, regardless of the other
+    benchmarks that have been executed before it.
+    """
+
+    def __init__(self, seed=DEFAULT_SEED):
+        self.seed = seed
+        self.random = random.Random(seed)
+
+    def random_bytes(self, length):
+        return ''.join(chr(self.random.getrandbits(8)) for _ in xrange(length))
+
+    def random_infohash(self):
+        return sha1(self.random_bytes(20)).digest()
+
+    def random_words(self, min_words=2, max_words=6):
+        return [self.random.choice(WORDS) for _ in xrange(self.random.randint(min_words, max_words))]
+
+    def random_name(self):
+        return u" ".join(self.random_words())
+
+    def random_ipv4_address(self):
+        return "%d.%d.%d.%d" % (self.random.randint(1, 223), self.random.randint(0, 255),
+                                self.random.randint(0, 255), self.random.randint(1, 254))
+
+    def random_port(self):
+        return self.random.randint(1024, 65535)
+
+    def random_files(self, max_files=10):
+        """
+        Return a list of (file name, file length) tuples.
+        """
+        files = []
+        for _ in xrange(self.random.randint(1, max_files)):
+            file_name = u"%s.%s" % (u"_".join(self.random_words(1, 4)), self.random.choice(EXTENSIONS))
+            files.append((file_name, self.random.randint(1024, 4 * 1024 ** 3)))
+        return files
+
+    def build_metainfo(self, name, files, trackers, creation_date, comment="", max_pieces=256):
+        """
+        Return the metainfo dictionary of a torrent with random piece hashes. The piece length is increased for large
+        torrents to keep the number of pieces (and thereby the size of the torrent file) small.
+        """
+        total_length = sum(length for _, length in files)
+        piece_length = 2 ** 18
+        while piece_length * max_pieces < total_length:
+            piece_length *= 2
+        num_pieces = (total_length + piece_length - 1) // piece_length
+
+        info = {"name": name.encode('utf-8'),
+                "piece length": piece_length,
+                "pieces": self.random_bytes(20 * num_pieces)}
+        if len(files) == 1:
+            info["length"] = files[0][1]
+        else:
+            info["files"] = [{"path": [file_name.encode('utf-8')], "length": length} for file_name, length in files]
+
+        metainfo = {"info": info, "creation date": creation_date, "comment": comment}
+        if trackers:
+            metainfo["announce"] = trackers[0]
+            metainfo["announce-list"] = [trackers]
+        return metainfo
+
+    def random_metainfo(self, max_files=10):
+        trackers = self.random.sample(TRACKERS, self.random.randint(1, len(TRACKERS)))
+        return self.build_metainfo(self.random_name(), self.random_files(max_files), trackers,
+                                   self.random.randint(1262304000, 1514764800), " ".join(self.random_words(0, 8)))
+
+    def random_torrent_file(self, max_files=10):
+        return bencode(self.random_metainfo(max_files=max_files))
+
+    def random_encodable(self, depth=3):
+        """
+        Return a nested data structure that can be serialised by Tribler.Core.Utilities.encoding.
+        """
+        kind = self.random.randint(0, 6 if depth > 0 else 3)
+        if kind == 0:
+            return self.random.randint(-2 ** 31, 2 ** 31)
+        elif kind == 1:
+            return self.random.random()
+        elif kind == 2:
+            return self.random_name()
+        elif kind == 3:
+            return self.random_bytes(self.random.randint(0, 64))
+        elif kind == 4:
+            return [self.random_encodable(depth - 1) for _ in xrange(self.random.randint(0, 8))]
+        elif kind == 5:
+            return tuple(self.random_encodable(depth - 1) for _ in xrange(self.random.randint(0, 8)))
+        return {self.random.choice(WORDS): self.random_encodable(depth - 1) for _ in xrange(self.random.randint(0, 8))}
@@ -0,0 +1,354 @@
+"""
+This script starts a Tribler session on an existing (e.g. generated) state directory and drives its HTTP API with
+scripted workloads. The throughput and latency percentiles of every workload are reported as JSON.
+
+Example usage:
+
+    python -m Tribler.Test.Benchmarks.database_generator --state-dir /tmp/large_state
+    python -m Tribler.Test.Benchmarks.load_test --state-dir /tmp/large_state --workloads search,channels
+"""
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import urllib
+from binascii import hexlify
+
+from configobj import ConfigObj
+from twisted.internet import reactor
+from twisted.internet.defer import inlineCallbacks, DeferredList, succeed, returnValue
+from twisted.python import usage
+from twisted.web.client import Agent, HTTPConnectionPool, readBody
+from twisted.web.http_headers import Headers
+from twisted.web.iweb import IBodyProducer
+from zope.interface import implements
+
+from Tribler.Core.CacheDB.sqlitecachedb import str2bin
+from Tribler.Core.Config.tribler_config import TriblerConfig, CONFIG_SPEC_PATH
+from Tribler.Core.Session import Session
+from Tribler.Test.Benchmarks.benchmark import get_git_commit
+from Tribler.Test.Benchmarks.generators import BenchmarkDataGenerator, DEFAULT_SEED
+
+DEFAULT_HTTP_API_PORT = 8086
+
+
+class StringBodyProducer(object):
+    """
+    This class produces the body of the PUT, POST and DELETE requests.
+    """
+    implements(IBodyProducer)
+
+    def __init__(self, body):
+        self.body = body
+        self.length = len(body)
+
+    def startProducing(self, consumer):
+        consumer.write(self.body)
+        return succeed(None)
+
+    def stopProducing(self):
+        pass
+
+
+class Workload(object):
+    """
+    Base class of a workload. A workload yields the requests that are made by a single client. Every client works
+    through its own sequence of requests, so a workload can rely on the order of the requests of a client.
+    """
+    name = None
+
+    def __init__(self, session, generator):
+        self.session = session
+        self.generator = generator
+
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def get_requests(self, client_index, num_clients):
+        """
+        Return an (infinite) iterator of (method, path, body) tuples.
+        """
+        raise NotImplementedError()
+
+
+class SearchWorkload(Workload):
+    """
+    A user that searches for torrents and channels, while the search completions are requested as the user types.
+    """
+    name = "search"
+
+    def get_requests(self, client_index, num_clients):
+        rand = self.generator.random
+        while True:
+            keywords = self.generator.random_words(1, 3)
+            yield "GET", "search/completions?q=%s" % keywords[0][:rand.randint(1, len(keywords[0]))], None
+            yield "GET", "search?%s" % urllib.urlencode({"q": " ".join(keywords)}), None
+
+
+class ChannelBrowseWorkload(Workload):
+    """
+    A user that browses through the popular channels, the torrents and playlists in these channels and the details
+    of the torrents.
+    """
+    name = "channels"
+
+    def setUp(self):
+        db = self.session.sqlite_db
+        self.channel_cids = [hexlify(str(cid)) for cid, in db.fetchall(
+            u"SELECT dispersy_cid FROM Channels ORDER BY nr_favorite DESC LIMIT 1000")]
+        self.infohashes = [hexlify(str2bin(infohash)) for infohash, in db.fetchall(
+            u"SELECT infohash FROM Torrent WHERE is_collected = 1 LIMIT 10000")]
+        if not self.channel_cids or not self.infohashes:
+            raise RuntimeError("The database should contain channels and collected torrents")
+
+    def get_requests(self, client_index, num_clients):
+        rand = self.generator.random
+        while True:
+            if rand.random() < 0.02:
+                yield "GET", "channels/discovered", None
+            yield "GET", "channels/popular?limit=20", None
+
+            # Popular channels are visited more often
+            cid = self.channel_cids[min(int(rand.expovariate(0.02)), len(self.channel_cids) - 1)]
+            yield "GET", "channels/discovered/%s" % cid, None
+            yield "GET", "channels/discovered/%s/torrents" % cid, None
+            yield "GET", "channels/discovered/%s/playlists" % cid, None
+            for _ in xrange(rand.randint(1, 3)):
+                yield "GET", "torrents/%s" % rand.choice(self.infohashes), None
+
+
+class DownloadWorkload(Workload):
+    """
+    A user that starts downloads of collected torrents, monitors the downloads and removes them again.
+    Since the session has no network access, the downloads do not make any progress.
+    """
+    name = "downloads"
+
+    def setUp(self):
+        self.torrent_dir = tempfile.mkdtemp(prefix="tribler_load_test_")
+        self.torrent_files = []
+        for infohash, torrent_data in self.session.lm.torrent_store.iteritems():
+            torrent_path = os.path.join(self.torrent_dir, "%s.torrent" % infohash)
+            with open(torrent_path, 'wb') as torrent_file:
+                torrent_file.write(torrent_data)
+            self.torrent_files.append((infohash, torrent_path))
+            if len(self.torrent_files) >= 1000:
+                break
+        if not self.torrent_files:
+            raise RuntimeError("The torrent store should contain torrents")
+
+    def tearDown(self):
+        shutil.rmtree(self.torrent_dir, ignore_errors=True)
+
+    def get_requests(self, client_index, num_clients):
+        torrent_files = self.torrent_files[client_index::num_clients] or self.torrent_files
+        while True:
+            for infohash, torrent_path in torrent_files:
+                yield "PUT", "downloads", urllib.urlencode({"uri": "file:%s" % torrent_path, "anon_hops": 0})
+                yield "GET", "downloads?get_peers=0&get_pieces=0", None
+                yield "DELETE", "downloads/%s" % infohash, urllib.urlencode({"remove_data": 1})
+
+
+WORKLOADS = {workload_class.name: workload_class
+             for workload_class in (SearchWorkload, ChannelBrowseWorkload, DownloadWorkload)}
+
+
+def get_percentile(sorted_values, percentile):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(percentile / 100.0 * len(sorted_values)), len(sorted_values) - 1)]
+
+
+class LoadTester(object):
+    """
+    This class runs workloads against the HTTP API of a session. Every workload is executed by a number of
+    concurrent clients, until the configured number of requests has been made.
+    """
+
+    def __init__(self, session, workload_classes, num_requests, concurrency, seed=DEFAULT_SEED):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.session = session
+        self.workload_classes = workload_classes
+        self.num_requests = num_requests
+        self.concurrency = concurrency
+        self.seed = seed
+        self.connection_pool = HTTPConnectionPool(reactor, True)
+        self.connection_pool.maxPersistentPerHost = concurrency
+
+    def do_request(self, method, path, body):
+        agent = Agent(reactor, pool=self.connection_pool)
+        headers = Headers({'Content-Type': ['application/x-www-form-urlencoded']})
+        return agent.request(method, 'http://localhost:%d/%s' % (self.session.config.get_http_api_port(), path),
+                             headers, StringBodyProducer(body) if body is not None else None)
+
+    @inlineCallbacks
+    def run_client(self, requests, samples):
+        while len(samples) < self.num_requests:
+            method, path, body = next(requests)
+            start_time = time.time()
+            try:
+                response = yield self.do_request(method, path, body)
+                yield readBody(response)
+                code = response.code
+            except Exception as exc:
+                self._logger.error("%s %s failed: %s", method, path, exc)
+                code = None
+            samples.append((method, path.split('?')[0], code, time.time() - start_time))
+
+    @inlineCallbacks
+    def run_workload(self, workload_class):
+        workload = workload_class(self.session, BenchmarkDataGenerator(self.seed))
+        workload.setUp()
+        samples = []
+        try:
+            start_time = time.time()
+            yield DeferredList([self.run_client(workload.get_requests(ind, self.concurrency), samples)
+                                for ind in xrange(self.concurrency)])
+            duration = time.time() - start_time
+        finally:
+            workload.tearDown()
+
+        latencies = sorted(sample[3] for sample in samples)
+        errors = sum(1 for sample in samples if sample[2] is None or sample[2] >= 400)
+        returnValue({
+            "requests": len(samples),
+            "errors": errors,
+            "duration": duration,
+            "throughput": len(samples) / duration if duration > 0 else 0.0,
+            "latency": {
+                "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+                "p50": get_percentile(latencies, 50),
+                "p90": get_percentile(latencies, 90),
+                "p99": get_percentile(latencies, 99),
+                "max": latencies[-1] if latencies else 0.0
+            }
+        })
+
+    @inlineCallbacks
+    def run(self):
+        results = {}
+        for workload_class in self.workload_classes:
+            self._logger.info("Running workload %s", workload_class.name)
+            results[workload_class.name] = yield self.run_workload(workload_class)
+            self._logger.info("Workload %s: %.1f requests/s, p99 latency %.3fs", workload_class.name,
+                              results[workload_class.name]["throughput"],
+                              results[workload_class.name]["latency"]["p99"])
+
+        # Include the server-side measurements of the endpoints, which split the latency in handler, database and
+        # serialisation time.
+        response = yield self.do_request("GET", "debug/rest", None)
+        rest_statistics = json.loads((yield readBody(response)))
+        yield self.connection_pool.closeCachedConnections()
+
+        returnValue({
+            "commit": get_git_commit(),
+            "timestamp": time.time(),
+            "concurrency": self.concurrency,
+            "workloads": results,
+            "endpoints": rest_statistics["endpoints"]
+        })
+
+
+class Options(usage.Options):
+    optParameters = [
+        ["state-dir", "d", None, "The state directory of the session (e.g. created by the database generator)"],
+        ["workloads", "w", ",".join(sorted(WORKLOADS)), "A comma-separated list of the workloads to run"],
+        ["requests", "n", 1000, "The number of requests per workload", int],
+        ["concurrency", "c", 4, "The number of concurrent clients", int],
+        ["port", "p", DEFAULT_HTTP_API_PORT, "The port of the HTTP API", int],
+        ["seed", "s", DEFAULT_SEED, "The seed of the workload generators", int],
+        ["output", "o", None, "The file to write the JSON results to (default: stdout)"]
+    ]
+    optFlags = [
+        ["response-cache", None, "Keep the response cache of the HTTP API enabled"]
+    ]
+
+    def postOptions(self):
+        if not self["state-dir"]:
+            raise usage.UsageError("A state directory should be given")
+        unknown_workloads = set(self["workloads"].split(",")) - set(WORKLOADS)
+        if unknown_workloads:
+            raise usage.UsageError("Unknown workloads: %s" % ", ".join(sorted(unknown_workloads)))
+        if self["requests"] < 1 or self["concurrency"] < 1:
+            raise usage.UsageError("The number of requests and the concurrency should be positive")
+
+
+def create_config(options, destination_dir):
+    """
+    Create the configuration of an offline session, with only the components that are needed by the workloads.
+    """
+    workloads = options["workloads"].split(",")
+
+    config = TriblerConfig(ConfigObj(configspec=CONFIG_SPEC_PATH, encoding='latin_1'))
+    config.set_state_dir(options["state-dir"])
+    config.set_default_destination_dir(destination_dir)
+    config.set_megacache_enabled(True)
+    config.set_torrent_store_enabled(True)
+    config.set_http_api_enabled(True)
+    config.set_http_api_port(options["port"])
+    if not options["response-cache"]:
+        config.set_http_api_response_cache_ttl(0)
+    config.set_libtorrent_enabled(DownloadWorkload.name in workloads)
+
+    config.set_torrent_checking_enabled(False)
+    config.set_dispersy_enabled(False)
+    config.set_ipv8_enabled(False)
+    config.set_mainline_dht_enabled(False)
+    config.set_torrent_search_enabled(False)
+    config.set_channel_search_enabled(False)
+    config.set_torrent_collecting_enabled(False)
+    config.set_video_server_enabled(False)
+    config.set_metadata_enabled(False)
+    config.set_tunnel_community_enabled(False)
+    config.set_credit_mining_enabled(False)
+    config.set_market_community_enabled(False)
+    config.set_resource_monitor_enabled(False)
+    return config
+
+
+def main(argv):
+    options = Options()
+    try:
+        options.parseOptions(argv)
+    except usage.UsageError as error:
+        print "%s: %s" % (sys.argv[0], error)
+        print options
+        return 1
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    destination_dir = tempfile.mkdtemp(prefix="tribler_load_test_downloads_")
+    session = Session(create_config(options, destination_dir))
+    workload_classes = [WORKLOADS[name] for name in options["workloads"].split(",")]
+
+    @inlineCallbacks
+    def run_load_test():
+        try:
+            yield session.start()
+            results = yield LoadTester(session, workload_classes, options["requests"], options["concurrency"],
+                                       seed=options["seed"]).run()
+            results_json = json.dumps(results, indent=2, sort_keys=True)
+            if options["output"]:
+                with open(options["output"], 'w') as output_file:
+                    output_file.write(results_json)
+            else:
+                print results_json
+        except Exception:
+            logging.exception("The load test failed")
+        finally:
+            yield session.shutdown()
+            reactor.stop()
+
+    reactor.callWhenRunning(run_load_test)
+    reactor.run()
+    shutil.rmtree(destination_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
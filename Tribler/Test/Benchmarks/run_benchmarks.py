@@ -0,0 +1,103 @@
+"""
+This script executes the benchmarks and writes the results to a JSON file (or to stdout).
+
+Example usage:
+
+    python -m Tribler.Test.Benchmarks.run_benchmarks --output results.json --filter market
+"""
+import importlib
+import inspect
+import json
+import logging
+import shutil
+import sys
+import tempfile
+
+from twisted.internet import reactor
+from twisted.python import usage
+
+from Tribler.Test.Benchmarks.benchmark import Benchmark, BenchmarkRunner
+from Tribler.Test.Benchmarks.generators import DEFAULT_SEED
+
+BENCHMARK_MODULES = ["Tribler.Test.Benchmarks.bench_torrentdef",
+                     "Tribler.Test.Benchmarks.bench_encoding",
+                     "Tribler.Test.Benchmarks.bench_search",
+                     "Tribler.Test.Benchmarks.bench_category",
+                     "Tribler.Test.Benchmarks.bench_market",
+                     "Tribler.Test.Benchmarks.bench_reputation",
+                     "Tribler.Test.Benchmarks.bench_socks5",
+                     "Tribler.Test.Benchmarks.bench_udp",
+                     "Tribler.Test.Benchmarks.bench_tunnel",
+                     "Tribler.Test.Benchmarks.bench_tftp",
+                     "Tribler.Test.Benchmarks.bench_maketorrent"]
+
+
+class Options(usage.Options):
+    optParameters = [
+        ["output", "o", None, "The file to write the JSON results to (default: stdout)"],
+        ["filter", "f", None, "Only run the benchmarks with a name that contains this string"],
+        ["seed", "s", DEFAULT_SEED, "The seed of the data generators", int],
+        ["repeat", "r", None, "Override the number of measurements of each benchmark", int]
+    ]
+    optFlags = [
+        ["list", "l", "List the available benchmarks"]
+    ]
+
+
+def get_benchmark_classes(name_filter=None):
+    """
+    Return the benchmark classes in the benchmark modules, ordered by the name of the benchmark.
+    """
+    benchmark_classes = []
+    for module_name in BENCHMARK_MODULES:
+        module = importlib.import_module(module_name)
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if issubclass(cls, Benchmark) and cls.name and cls.__module__ == module_name \
+                    and (not name_filter or name_filter in cls.name):
+                benchmark_classes.append(cls)
+    return sorted(benchmark_classes, key=lambda cls: cls.name)
+
+
+def write_results(results, output):
+    results_json = json.dumps(results, indent=2, sort_keys=True)
+    if output:
+        with open(output, 'w') as output_file:
+            output_file.write(results_json)
+    else:
+        print results_json
+
+
+def main(argv):
+    options = Options()
+    try:
+        options.parseOptions(argv)
+    except usage.UsageError as error:
+        print "%s: %s" % (sys.argv[0], error)
+        print options
+        return 1
+
+    benchmark_classes = get_benchmark_classes(options["filter"])
+    if options["list"]:
+        for benchmark_class in benchmark_classes:
+            print benchmark_class.name
+        return 0
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    state_dir = tempfile.mkdtemp(prefix="tribler_benchmarks_")
+    runner = BenchmarkRunner(benchmark_classes, state_dir, seed=options["seed"], repeat=options["repeat"])
+
+    def run_benchmarks():
+        try:
+            write_results(runner.run(), options["output"])
+        finally:
+            reactor.stop()
+
+    # Some of the benchmarked code has to be executed on the reactor thread
+    reactor.callWhenRunning(run_benchmarks)
+    reactor.run()
+    shutil.rmtree(state_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
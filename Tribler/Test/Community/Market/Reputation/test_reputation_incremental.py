@@ -0,0 +1,59 @@
+from Tribler.Test.Community.Market.Reputation.test_reputation_base import TestReputationBase
+from Tribler.community.market.core.price import Price
+from Tribler.community.market.core.quantity import Quantity
+from Tribler.community.market.reputation.incremental_pagerank_manager import IncrementalTemporalPagerankManager
+
+
+class TestReputationIncremental(TestReputationBase):
+    """
+    Contains tests to test the incremental Temporal Pagerank computation
+    """
+
+    def insert_transactions(self):
+        self.insert_transaction('a', 'b', Quantity(1, 'BTC'), Price(1, 'MC'))
+        self.insert_transaction('b', 'c', Quantity(100, 'BTC'), Price(100, 'MC'))
+        self.insert_transaction('b', 'd', Quantity(100, 'BTC'), Price(100, 'MC'))
+        self.insert_transaction('a', 'e', Quantity(3, 'MC'), Price(5, 'BTC'))
+
+    def assert_reputations_equal(self, rep_dict1, rep_dict2):
+        self.assertEqual(sorted(rep_dict1.keys()), sorted(rep_dict2.keys()))
+        for public_key, rep in rep_dict1.iteritems():
+            self.assertAlmostEqual(rep, rep_dict2[public_key], places=4)
+
+    def test_compute(self):
+        """
+        Test whether the incremental computation gives the same reputations as the full computation
+        """
+        self.insert_transactions()
+        rep_manager = IncrementalTemporalPagerankManager(self.market_db.get_all_blocks())
+        self.assert_reputations_equal(rep_manager.compute('a'), self.compute_reputations())
+
+    def test_compute_unknown(self):
+        """
+        Test the incremental computation for a public key without transactions
+        """
+        rep_manager = IncrementalTemporalPagerankManager()
+        self.assertDictEqual(rep_manager.compute('a'), {})
+
+    def test_add_blocks(self):
+        """
+        Test whether only the new blocks are added and whether the next computation starts from the previous scores
+        """
+        self.insert_transaction('a', 'b', Quantity(1, 'BTC'), Price(1, 'MC'))
+        last_rowid = self.market_db.get_last_block_rowid()
+        rep_manager = IncrementalTemporalPagerankManager(self.market_db.get_blocks_in_rowid_range(0, last_rowid))
+        rep_manager.compute('a')
+
+        self.insert_transaction('b', 'c', Quantity(100, 'BTC'), Price(100, 'MC'))
+        self.insert_transaction('b', 'd', Quantity(100, 'BTC'), Price(100, 'MC'))
+        self.insert_transaction('a', 'e', Quantity(3, 'MC'), Price(5, 'BTC'))
+        new_blocks = self.market_db.get_blocks_in_rowid_range(last_rowid, self.market_db.get_last_block_rowid())
+        self.assertEqual(len(new_blocks), 6)
+        self.assertEqual(rep_manager.add_blocks(new_blocks), 3)
+        self.assertEqual(rep_manager.add_blocks(self.market_db.get_all_blocks()), 0)
+
+        self.assert_reputations_equal(rep_manager.compute('a'), self.compute_reputations())
+
+        # The graph did not change, so the computation starts from converged scores
+        rep_manager.compute('a')
+        self.assertEqual(rep_manager.iterations, 1)
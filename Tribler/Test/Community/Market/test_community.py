@@ -1,8 +1,13 @@
+import time
+
 from Tribler.pyipv8.ipv8.test.base import TestBase
 from Tribler.pyipv8.ipv8.test.mocking.ipv8 import MockIPv8
 from Tribler.pyipv8.ipv8.test.util import twisted_wrapper
 from Tribler.community.market.wallet.dummy_wallet import DummyWallet1, DummyWallet2
-from Tribler.community.market.community import MarketCommunity, PingRequestCache
+from Tribler.community.market.community import MarketCommunity, PingRequestCache, MAX_SYNC_PEERS, \
+    ORDERBOOK_SYNC_INTERVAL, SYNC_BATCH_INTERVAL, SYNC_BATCH_SIZE
+from Tribler.community.market.core.quantity import Quantity
+from Tribler.Test.Core.base_test import MockObject
 from twisted.internet.defer import fail
 
 
@@ -95,7 +100,7 @@ class TestMarketCommunity(TestMarketCommunityBase):
         yield self.introduce_nodes()
 
         order = yield self.nodes[0].overlay.create_ask(1, 'DUM1', 1, 'DUM2', 3600)
-        order._traded_quantity._quantity = 1  # So it looks like this order has already been fulfilled
+        order._traded_quantity = Quantity(1, 'DUM2')  # So it looks like this order has already been fulfilled
 
         yield self.deliver_messages()
 
@@ -116,7 +121,7 @@ class TestMarketCommunity(TestMarketCommunityBase):
         yield self.introduce_nodes()
 
         order = yield self.nodes[0].overlay.create_ask(2, 'DUM1', 2, 'DUM2', 3600)
-        order._traded_quantity._quantity = 1  # Partially fulfill this order
+        order._traded_quantity = Quantity(1, 'DUM2')  # Partially fulfill this order
 
         yield self.deliver_messages(timeout=.4)
 
@@ -141,7 +146,8 @@ class TestMarketCommunity(TestMarketCommunityBase):
         yield self.deliver_messages(timeout=.5)
 
         # Compute reputation
-        self.nodes[0].overlay.compute_reputation()
+        yield self.nodes[0].overlay.compute_reputation()
+        self.assertTrue(self.nodes[0].overlay.reputation_dict)
 
         # Verify that the trade has been made
         self.assertTrue(self.nodes[0].overlay.transaction_manager.find_all())
@@ -246,6 +252,82 @@ class TestMarketCommunity(TestMarketCommunityBase):
         self.assertTrue(self.nodes[4].overlay.order_book.get_tick(ask_order.order_id))
         self.assertTrue(self.nodes[4].overlay.order_book.get_tick(bid_order.order_id))
 
+    @twisted_wrapper(4)
+    def test_orderbook_sync_interval(self):
+        """
+        Test whether a second orderbook sync message within the sync interval is ignored
+        """
+        yield self.introduce_nodes()
+        yield self.nodes[0].overlay.create_ask(100, 'DUM1', 2, 'DUM2', 3600)
+        yield self.deliver_messages(timeout=.5)
+
+        sent_block_pairs = []
+        self.nodes[2].overlay.send_block_pair = lambda *args: sent_block_pairs.append(args)
+
+        self.add_node_to_experiment(self.create_node())
+        for _ in xrange(2):
+            self.nodes[3].overlay.send_orderbook_sync(self.nodes[2].overlay.my_peer)
+            yield self.deliver_messages(timeout=.5)
+
+        self.assertEqual(len(sent_block_pairs), 1)
+        self.assertEqual(len(self.nodes[2].overlay.sync_times), 1)
+
+    @twisted_wrapper(4)
+    def test_orderbook_sync_batches(self):
+        """
+        Test whether the block pairs that a peer misses are sent in batches, and whether the cached block pairs of
+        ticks that left the orderbook are dropped
+        """
+        matchmaker = self.nodes[2].overlay
+        entries = []
+        for index in xrange(SYNC_BATCH_SIZE + 5):
+            entry = MockObject()
+            entry.order_id = "order%d" % index
+            entry.tick = MockObject()
+            entry.tick.block_hash = "hash%d" % index
+            entries.append(entry)
+        matchmaker.order_book.asks.get_tick_entries = lambda: entries
+        matchmaker.get_tick_block_pair = lambda tick: (tick.block_hash, tick.block_hash)
+        matchmaker.tick_block_pairs = {"removed_hash": ("removed_hash", "removed_hash")}
+
+        sent_block_pairs = []
+        matchmaker.send_block_pair = lambda *args: sent_block_pairs.append(args)
+
+        self.add_node_to_experiment(self.create_node())
+        self.nodes[3].overlay.send_orderbook_sync(matchmaker.my_peer)
+        yield self.deliver_messages(timeout=.5)
+
+        # The first batch is sent right away, the remaining block pairs after the batch interval
+        self.assertEqual(len(sent_block_pairs), SYNC_BATCH_SIZE)
+        self.assertEqual(len(matchmaker.sync_queues), 1)
+        self.assertNotIn("removed_hash", matchmaker.tick_block_pairs)
+        self.assertEqual(len(matchmaker.tick_block_pairs), len(entries))
+
+        # A peer that is still receiving block pairs is not answered again
+        matchmaker.sync_times = {}
+        self.nodes[3].overlay.send_orderbook_sync(matchmaker.my_peer)
+        yield self.deliver_messages(timeout=.5)
+        self.assertEqual(len(sent_block_pairs), SYNC_BATCH_SIZE)
+
+        yield self.sleep(SYNC_BATCH_INTERVAL + 0.2)
+        self.assertEqual(len(sent_block_pairs), len(entries))
+        self.assertFalse(matchmaker.sync_queues)
+
+    @twisted_wrapper(4)
+    def test_orderbook_sync_prune_peers(self):
+        """
+        Test whether the sync times of peers that synced before the sync interval are pruned
+        """
+        matchmaker = self.nodes[2].overlay
+        matchmaker.sync_times = {("1.2.3.4", port): 0 for port in xrange(MAX_SYNC_PEERS)}
+
+        self.add_node_to_experiment(self.create_node())
+        self.nodes[3].overlay.send_orderbook_sync(matchmaker.my_peer)
+        yield self.deliver_messages(timeout=.5)
+
+        self.assertEqual(len(matchmaker.sync_times), 1)
+        self.assertGreater(matchmaker.sync_times.values()[0], time.time() - ORDERBOOK_SYNC_INTERVAL)
+
 
 class TestMarketCommunityTwoNodes(TestMarketCommunityBase):
     __testing__ = True
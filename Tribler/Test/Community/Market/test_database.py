@@ -161,6 +161,60 @@ class TestDatabase(AbstractServer):
         self.database.delete_all_ticks()
         self.assertEqual(len(self.database.get_ticks()), 0)
 
+    @blocking_call_on_reactor_thread
+    def test_apply_tick_changes(self):
+        """
+        Test whether changed ticks are stored and removed ticks are deleted in one go
+        """
+        ask = Tick.from_order(self.order1)
+        bid = Tick.from_order(self.order2)
+        self.database.add_tick(ask)
+
+        ask.quantity = Quantity(3, 'BTC')
+        self.database.apply_tick_changes([ask, bid], [])
+        self.assertEqual(sorted(float(tick.quantity) for tick in self.database.get_ticks()), [3, 6])
+
+        self.database.apply_tick_changes([], [ask.order_id])
+        self.assertEqual(len(self.database.get_ticks()), 1)
+
+    @blocking_call_on_reactor_thread
+    def test_apply_order_changes(self):
+        """
+        Test whether new orders are inserted, changed columns are updated and deleted orders are removed in one go
+        """
+        self.database.add_order(self.order2)
+        reserved_key = (u'3', u'4')
+        self.database.apply_order_changes([self.order1.to_database()], [(self.order_id2, {u"cancelled": True})],
+                                          [(u'3', u'4', u'4', u'5', 2.0, u'BTC')], [(u'4', u'5') + reserved_key], [])
+
+        self.assertEqual(len(self.database.get_all_orders()), 2)
+        self.assertTrue(self.database.get_order(self.order_id2).cancelled)
+        self.assertEqual(self.database.get_reserved_ticks(self.order_id1),
+                         [(self.order_id2, Quantity(2, 'BTC'))])
+        self.assertEqual(self.database.get_reserved_ticks(self.order_id2), [])
+
+        self.database.apply_order_changes([], [], [], [], [self.order_id1])
+        self.assertIsNone(self.database.get_order(self.order_id1))
+        self.assertEqual(self.database.get_reserved_ticks(self.order_id1), [])
+
+    @blocking_call_on_reactor_thread
+    def test_apply_transaction_changes(self):
+        """
+        Test whether the changes to transactions are stored in one go and whether payments are only inserted
+        """
+        self.database.apply_transaction_changes([self.transaction1.to_database()], [],
+                                                [self.payment1.to_database()], [])
+        self.database.apply_transaction_changes([], [(self.transaction_id1, {u"match_id": u"abc"})],
+                                                [self.payment1.to_database()], [])
+
+        transaction = self.database.get_transaction(self.transaction_id1)
+        self.assertEqual(transaction.match_id, "abc")
+        self.assertEqual(len(transaction.payments), 1)
+
+        self.database.apply_transaction_changes([], [], [], [self.transaction_id1])
+        self.assertIsNone(self.database.get_transaction(self.transaction_id1))
+        self.assertEqual(self.database.get_payments(self.transaction_id1), [])
+
     @blocking_call_on_reactor_thread
     def test_add_get_trader_identity(self):
         """
@@ -0,0 +1,44 @@
+import unittest
+
+from Tribler.community.market.core.identity_map import IdentityMap, get_changed_columns
+
+
+class IdentityMapTestSuite(unittest.TestCase):
+    """Identity map test cases."""
+
+    def setUp(self):
+        # Object creation
+        self.identity_map = IdentityMap(tuple)
+
+    def test_load(self):
+        # Test whether a row that has already been loaded is represented by the object that was loaded first
+        obj = [1, 2]
+        self.assertIs(self.identity_map.load('a', obj), obj)
+        self.assertIs(self.identity_map.load('a', [1, 2]), obj)
+        self.assertFalse(self.identity_map.has_changes())
+
+    def test_changes(self):
+        # Test whether new, changed and deleted objects are tracked
+        stored, changed = [1, 2], [3, 4]
+        self.identity_map.load('a', stored)
+        self.identity_map.load('b', changed)
+        changed[1] = 5
+        self.identity_map.add('b', changed)
+        self.identity_map.add('c', [6])
+        self.identity_map.remove('a')
+        # A deleted row is not loaded again before the deletion has been written to the database
+        self.assertIsNone(self.identity_map.load('a', [1, 2]))
+
+        self.assertEqual(self.identity_map.get_changes(), ([('c', (6,))], [('b', (3, 4), (3, 5))], ['a']))
+        self.assertFalse(self.identity_map.has_changes())
+        self.assertNotIn('a', self.identity_map)
+
+    def test_unchanged(self):
+        # Test whether an object that is updated without changes is not written again
+        self.identity_map.load('a', [1, 2])
+        self.identity_map.add('a', self.identity_map.get('a'))
+        self.assertEqual(self.identity_map.get_changes(), ([], [], []))
+
+    def test_get_changed_columns(self):
+        # Test whether only the changed columns are returned
+        self.assertEqual(get_changed_columns(('a', 'b', 'c'), (1, 2, 3), (1, 4, 3)), {'b': 4})
@@ -181,55 +181,68 @@ class PriceTimeStrategyTestSuite(AbstractServer):
         self.assertEquals(Price(200, 'BTC'), self.bid2.price)
         self.assertEquals(Quantity(30, 'MC'), matching_ticks[0][2])
 
-    def test_search_for_quantity_in_order_book_partial_ask_low(self):
+    def test_get_next_price_level_ask(self):
         """
-        Test for protected search for quantity in order book partial ask when price is too low
+        Test selecting the next bid price level when matching an ask
         """
         self.order_book.insert_bid(self.bid)
         self.order_book.insert_bid(self.bid2)
         self.order_book.insert_bid(self.bid3)
         self.order_book.insert_bid(self.bid4)
-        matching_ticks = self.price_time_strategy._search_for_quantity_in_order_book_partial_ask(
-            self.ask_order2.order_id, Price(100, 'BTC'), Quantity(30, 'MC'), [], self.ask_order2.price, True)
-        self.assertEquals(1, len(matching_ticks))
-        self.assertEquals(Quantity(30, 'MC'), matching_ticks[0][2])
+        next_price, next_price_level = self.price_time_strategy._get_next_price_level(
+            Price(100, 'BTC'), 'MC', self.ask_order2.price, True)
+        self.assertEquals(Price(50, 'BTC'), next_price)
+        self.assertEquals(Quantity(200, 'MC'), next_price_level.depth)
 
-    def test_search_for_quantity_in_order_book_partial_ask(self):
+    def test_get_next_price_level_ask_low(self):
         """
-        Test for protected search for quantity in order book partial ask
+        Test selecting the next bid price level when matching an ask when the price is too low
         """
         self.order_book.insert_bid(self.bid)
         self.order_book.insert_bid(self.bid2)
         self.order_book.insert_bid(self.bid3)
         self.order_book.insert_bid(self.bid4)
-        matching_ticks = self.price_time_strategy._search_for_quantity_in_order_book_partial_ask(
-            self.ask_order.order_id, Price(100, 'BTC'), Quantity(30, 'MC'), [], self.ask_order.price, True)
-        self.assertEquals(0, len(matching_ticks))
+        self.assertIsNone(self.price_time_strategy._get_next_price_level(
+            Price(100, 'BTC'), 'MC', self.ask_order.price, True))
+        self.assertIsNone(self.price_time_strategy._get_next_price_level(
+            Price(50, 'BTC'), 'MC', self.ask_order2.price, True))
 
-    def test_search_for_quantity_in_order_book_partial_bid_high(self):
+    def test_get_next_price_level_bid(self):
         """
-        Test for protected search for quantity in order book partial bid when price is too high
+        Test selecting the next ask price level when matching a bid
         """
         self.order_book.insert_ask(self.ask)
         self.order_book.insert_ask(self.ask2)
         self.order_book.insert_ask(self.ask3)
         self.order_book.insert_ask(self.ask4)
-        matching_ticks = self.price_time_strategy._search_for_quantity_in_order_book_partial_bid(
-            self.bid_order.order_id, Price(100, 'BTC'), Quantity(30, 'MC'), [], self.bid_order.price, False)
-        self.assertEquals(0, len(matching_ticks))
+        next_price, next_price_level = self.price_time_strategy._get_next_price_level(
+            Price(50, 'BTC'), 'MC', self.bid_order.price, False)
+        self.assertEquals(Price(100, 'BTC'), next_price)
+        self.assertEquals(Quantity(60, 'MC'), next_price_level.depth)
 
-    def test_search_for_quantity_in_order_book_partial_bid(self):
+    def test_get_next_price_level_bid_high(self):
         """
-        Test for protected search for quantity in order book partial bid
+        Test selecting the next ask price level when matching a bid when the price is too high
         """
         self.order_book.insert_ask(self.ask)
         self.order_book.insert_ask(self.ask2)
         self.order_book.insert_ask(self.ask3)
         self.order_book.insert_ask(self.ask4)
-        matching_ticks = self.price_time_strategy._search_for_quantity_in_order_book_partial_bid(
-            self.bid_order.order_id, Price(50, 'BTC'), Quantity(30, 'MC'), [], self.bid_order.price, False)
-        self.assertEquals(1, len(matching_ticks))
-        self.assertEquals(Quantity(30, 'MC'), matching_ticks[0][2])
+        self.assertIsNone(self.price_time_strategy._get_next_price_level(
+            Price(100, 'BTC'), 'MC', self.bid_order.price, False))
+
+    def test_search_for_quantity_deep_order_book(self):
+        """
+        Test matching against an order book with more price levels than the recursion limit
+        """
+        for order_number in xrange(2000):
+            self.order_book.insert_ask(Ask(OrderId(TraderId('1'), OrderNumber(order_number)),
+                                           Price(order_number + 1, 'BTC'), Quantity(1, 'MC'),
+                                           Timeout(100), Timestamp.now()))
+        matching_ticks = self.price_time_strategy.match(self.bid_order.order_id, Price(2000, 'BTC'),
+                                                        Quantity(1500, 'MC'), False)
+        self.assertEquals(1500, len(matching_ticks))
+        self.assertEquals(Price(1500, 'BTC'), matching_ticks[-1][1].price)
 
     def test_search_for_quantity_in_price_level(self):
         """
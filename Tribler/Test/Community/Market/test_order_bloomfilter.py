@@ -0,0 +1,53 @@
+import unittest
+
+from Tribler.community.market.core.message import TraderId
+from Tribler.community.market.core.order import OrderId, OrderNumber
+from Tribler.community.market.core.order_bloomfilter import OrderBloomFilter, MIN_CAPACITY
+
+
+class OrderBloomFilterTestSuite(unittest.TestCase):
+    """Order Bloom filter test cases."""
+
+    def setUp(self):
+        # Object creation
+        self.order_ids = [OrderId(TraderId('0'), OrderNumber(order_number)) for order_number in xrange(10)]
+        self.order_bloomfilter = OrderBloomFilter()
+
+    def get_bloomfilter(self):
+        return self.order_bloomfilter.get_bloomfilter(lambda: self.order_ids)
+
+    def test_build(self):
+        # Test whether the Bloom filter is built from the order ids of the order book
+        bloomfilter = self.get_bloomfilter()
+        for order_id in self.order_ids:
+            self.assertIn(str(order_id), bloomfilter)
+        self.assertEqual(self.order_bloomfilter.size, 10)
+        self.assertEqual(self.order_bloomfilter.capacity, MIN_CAPACITY)
+
+    def test_add(self):
+        # Test whether new order ids are added to the Bloom filter, without rebuilding it
+        bloomfilter = self.get_bloomfilter()
+        order_id = OrderId(TraderId('1'), OrderNumber(1))
+        self.order_bloomfilter.add(order_id)
+        self.assertIn(str(order_id), bloomfilter)
+        self.assertIs(self.get_bloomfilter(), bloomfilter)
+
+    def test_add_full(self):
+        # Test whether the Bloom filter is rebuilt when it is full
+        bloomfilter = self.get_bloomfilter()
+        for order_number in xrange(MIN_CAPACITY):
+            self.order_ids.append(OrderId(TraderId('1'), OrderNumber(order_number)))
+            self.order_bloomfilter.add(self.order_ids[-1])
+        self.assertIsNot(self.get_bloomfilter(), bloomfilter)
+        self.assertEqual(self.order_bloomfilter.capacity, 2 * len(self.order_ids))
+
+    def test_remove(self):
+        # Test whether the Bloom filter is rebuilt when too many of its order ids have been removed
+        bloomfilter = self.get_bloomfilter()
+        self.order_bloomfilter.remove(self.order_ids[0])
+        self.assertIs(self.get_bloomfilter(), bloomfilter)
+
+        for _ in xrange(MIN_CAPACITY / 4):
+            self.order_bloomfilter.remove(self.order_ids[0])
+        self.assertIsNot(self.get_bloomfilter(), bloomfilter)
+        self.assertEqual(self.order_bloomfilter.removed, 0)
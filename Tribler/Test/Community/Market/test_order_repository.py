@@ -79,11 +79,66 @@ class DatabaseOrderRepositoryTestSuite(AbstractServer):
         if not os.path.exists(path):
             os.makedirs(path)
 
-        database = MarketDB(self.getStateDir(), 'market')
-        self.database_order_repo = DatabaseOrderRepository('a' * 10, database)
+        self.database = MarketDB(self.getStateDir(), 'market')
+        self.database_order_repo = DatabaseOrderRepository('a' * 10, self.database)
+        self.order_id = OrderId(TraderId("a" * 10), OrderNumber(1))
+        self.order = Order(self.order_id, Price(100, 'BTC'), Quantity(30, 'MC'), Timeout(0.0), Timestamp(10.0), False)
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def tearDown(self, annotate=True):
+        self.database_order_repo.shutdown_task_manager()
+        yield super(DatabaseOrderRepositoryTestSuite, self).tearDown(annotate=annotate)
 
     def test_init(self):
         """
         Test the initialization of the database order repository
         """
         self.assertRaises(ValueError, DatabaseOrderRepository, 'g' * 10, None)
+
+    @blocking_call_on_reactor_thread
+    def test_identity_map(self):
+        """
+        Test whether an order is only read from the database once
+        """
+        self.database.add_order(self.order)
+        order = self.database_order_repo.find_by_id(self.order_id)
+        self.assertIs(self.database_order_repo.find_by_id(self.order_id), order)
+        self.assertEqual(self.database_order_repo.find_all(), [order])
+
+    @blocking_call_on_reactor_thread
+    def test_flush(self):
+        """
+        Test whether the changes to the orders are written to the database when the repository is flushed
+        """
+        self.database_order_repo.add(self.order)
+        self.assertIsNone(self.database.get_order(self.order_id))
+        self.database_order_repo.flush()
+        self.assertIsNotNone(self.database.get_order(self.order_id))
+
+        reserved_order_id = OrderId(TraderId("b" * 10), OrderNumber(1))
+        self.order.reserve_quantity_for_tick(reserved_order_id, Quantity(10, 'MC'))
+        self.database_order_repo.update(self.order)
+        self.database_order_repo.flush()
+        self.assertEqual(self.database.get_reserved_ticks(self.order_id), [(reserved_order_id, Quantity(10, 'MC'))])
+
+        self.order.release_quantity_for_tick(reserved_order_id, Quantity(10, 'MC'))
+        self.order.cancel()
+        self.database_order_repo.update(self.order)
+        self.database_order_repo.flush()
+        self.assertTrue(self.database.get_order(self.order_id).cancelled)
+        self.assertEqual(self.database.get_reserved_ticks(self.order_id), [])
+
+        self.database_order_repo.delete_by_id(self.order_id)
+        self.assertIsNone(self.database_order_repo.find_by_id(self.order_id))
+        self.database_order_repo.flush()
+        self.assertIsNone(self.database.get_order(self.order_id))
+
+    @blocking_call_on_reactor_thread
+    def test_next_identity(self):
+        """
+        Test whether orders that have not been written to the database yet get different order numbers
+        """
+        self.database.add_order(self.order)
+        self.assertEqual(self.database_order_repo.next_identity(), OrderId(TraderId("a" * 10), OrderNumber(2)))
+        self.assertEqual(self.database_order_repo.next_identity(), OrderId(TraderId("a" * 10), OrderNumber(3)))
@@ -7,7 +7,7 @@ from Tribler.Test.twisted_thread import deferred
 from Tribler.community.market.core.message import TraderId, MessageNumber, MessageId
 from Tribler.community.market.core.message_repository import MemoryMessageRepository
 from Tribler.community.market.core.order import OrderId, OrderNumber
-from Tribler.community.market.core.orderbook import OrderBook, DatabaseOrderBook
+from Tribler.community.market.core.orderbook import OrderBook, DatabaseOrderBook, CompletedOrders
 from Tribler.community.market.core.price import Price
 from Tribler.community.market.core.quantity import Quantity
 from Tribler.community.market.core.tick import Ask, Bid
@@ -66,6 +66,57 @@ class TestOrderBook(AbstractTestOrderBook):
 
         self.order_book.on_invalid_tick_insert(None)
 
+    def test_expire_ticks(self):
+        """
+        Test whether timed out ticks are removed from the order book in one batch
+        """
+        timed_out_ticks = []
+        self.order_book.insert_ask(self.ask).addCallback(timed_out_ticks.append)
+        self.order_book.insert_bid(self.bid).addCallback(timed_out_ticks.append)
+        self.order_book.insert_bid(self.bid2)
+        self.assertEqual(len(self.order_book.expiry_wheel), 3)
+
+        self.order_book.expiry_wheel.schedule(self.bid.order_id, 1)
+        self.order_book.expiry_wheel.schedule(self.ask.order_id, 2)
+        self.order_book.expire_ticks()
+        self.assertEqual(timed_out_ticks, [self.bid, self.ask])
+        self.assertFalse(self.order_book.tick_exists(self.ask.order_id))
+        self.assertTrue(self.order_book.tick_exists(self.bid2.order_id))
+
+        self.order_book.remove_tick(self.bid2.order_id)
+        self.assertFalse(self.order_book.expiry_wheel)
+        self.assertFalse(self.order_book.timeout_deferreds)
+
+    def test_get_bloomfilter(self):
+        """
+        Test whether the orders that are inserted are added to the Bloom filter of the order book
+        """
+        bloomfilter = self.order_book.get_bloomfilter()
+        self.order_book.insert_ask(self.ask)
+        self.assertIn(str(self.ask.order_id), self.order_book.get_bloomfilter())
+        self.assertIs(self.order_book.get_bloomfilter(), bloomfilter)
+
+    def test_completed_orders(self):
+        """
+        Test whether the completed orders are forgotten when they are too old or when there are too many of them
+        """
+        completed_orders = CompletedOrders(max_size=2, max_age=10)
+        completed_orders.add(self.ask.order_id, now=0)
+        completed_orders.add(self.bid.order_id, now=5)
+        self.assertIn(self.ask.order_id, completed_orders)
+
+        completed_orders.add(self.ask2.order_id, now=6)
+        self.assertNotIn(self.ask.order_id, completed_orders)
+        self.assertEqual(len(completed_orders), 2)
+
+        completed_orders.age_out(now=15)
+        self.assertEqual(len(completed_orders), 1)
+        self.assertIn(self.ask2.order_id, completed_orders)
+
+        self.order_book.completed_orders.add(self.ask.order_id)
+        self.order_book.insert_ask(self.ask)
+        self.assertFalse(self.order_book.tick_exists(self.ask.order_id))
+
     def test_ask_insertion(self):
         # Test for ask insertion
         self.order_book.insert_ask(self.ask2)
@@ -257,3 +308,29 @@ class TestDatabaseOrderBook(AbstractTestOrderBook):
 
         self.assertEqual(len(self.order_book.asks), 1)
         self.assertEqual(len(self.order_book.bids), 1)
+
+    @blocking_call_on_reactor_thread
+    def test_save_changes_to_db(self):
+        """
+        Test whether only the changes since the last save are written to the database
+        """
+        self.order_book.insert_ask(self.ask)
+        self.order_book.insert_bid(self.bid)
+        self.order_book.save_to_database()
+        self.assertFalse(self.order_book.pending_ticks)
+
+        self.order_book.remove_tick(self.ask.order_id)
+        self.assertEqual(self.order_book.pending_ticks, {self.ask.order_id: None})
+        self.order_book.save_to_database()
+        self.assertEqual(len(self.database.get_ticks()), 1)
+
+    @blocking_call_on_reactor_thread
+    def test_restore_invalid_from_db(self):
+        """
+        Test whether ticks that timed out are removed from the database when restoring the order book
+        """
+        self.database.add_tick(self.invalid_ask)
+        self.order_book.restore_from_database()
+
+        self.assertEqual(len(self.order_book.asks), 0)
+        self.assertFalse(self.database.get_ticks())
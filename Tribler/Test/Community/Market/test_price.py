@@ -75,3 +75,11 @@ class PriceTestSuite(unittest.TestCase):
         Test the string representation of a Price object
         """
         self.assertEqual(str(self.price1), "2.300000 BTC")
+
+    def test_fixed_point(self):
+        """
+        Test whether prices are stored as fixed-point integers, without accumulating rounding errors
+        """
+        self.assertEqual(Price(0.1, 'BTC') + Price(0.2, 'BTC'), Price(0.3, 'BTC'))
+        self.assertEqual(Price.from_fixed_point(self.price1.fixed_point, 'BTC'), self.price1)
+        self.assertRaises(ValueError, Price.from_fixed_point, -1, 'BTC')
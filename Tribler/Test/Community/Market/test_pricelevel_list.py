@@ -3,6 +3,7 @@ import unittest
 from Tribler.community.market.core.price import Price
 from Tribler.community.market.core.pricelevel import PriceLevel
 from Tribler.community.market.core.pricelevel_list import PriceLevelList
+from Tribler.community.market.core.quantity import Quantity
 
 
 class PriceLevelListTestSuite(unittest.TestCase):
@@ -102,3 +103,10 @@ class PriceLevelListTestSuite(unittest.TestCase):
     def test_items_reverse_empty(self):
         # Test for items when empty with reverse attribute
         self.assertEquals([], self.price_level_list2.items(reverse=True))
+
+    def test_get_depth_profile(self):
+        # Test for the depth profile
+        self.price_level2.depth = Quantity(5, 'MC')
+        self.assertEquals([(self.price, Quantity(0, 'MC')), (self.price2, Quantity(5, 'MC')),
+                           (self.price3, Quantity(0, 'MC')), (self.price4, Quantity(0, 'MC'))],
+                          self.price_level_list.get_depth_profile())
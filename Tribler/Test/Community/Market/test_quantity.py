@@ -67,3 +67,10 @@ class QuantityTestSuite(unittest.TestCase):
         # Test for hashes
         self.assertEqual(self.quantity1.__hash__(), Quantity(30, 'MC').__hash__())
         self.assertNotEqual(self.quantity1.__hash__(), self.quantity2.__hash__())
+
+    def test_fixed_point(self):
+        """
+        Test whether quantities are stored as fixed-point integers, without accumulating rounding errors
+        """
+        self.assertEqual(Quantity(0.1, 'MC') + Quantity(0.2, 'MC'), Quantity(0.3, 'MC'))
+        self.assertEqual(Quantity.from_fixed_point(self.quantity1.fixed_point, 'MC'), self.quantity1)
@@ -1,12 +1,22 @@
+import os
 import unittest
 
+from twisted.internet.defer import inlineCallbacks
+
+from Tribler.Test.test_as_server import AbstractServer
 from Tribler.community.market.core.order import OrderId, OrderNumber
-from Tribler.community.market.core.transaction_repository import MemoryTransactionRepository
+from Tribler.community.market.core.payment import Payment
+from Tribler.community.market.core.payment_id import PaymentId
+from Tribler.community.market.core.transaction_repository import MemoryTransactionRepository, \
+    DatabaseTransactionRepository
 from Tribler.community.market.core.transaction import TransactionNumber, TransactionId, Transaction
-from Tribler.community.market.core.message import TraderId
+from Tribler.community.market.core.message import TraderId, MessageId, MessageNumber
 from Tribler.community.market.core.quantity import Quantity
 from Tribler.community.market.core.price import Price
 from Tribler.community.market.core.timestamp import Timestamp
+from Tribler.community.market.core.wallet_address import WalletAddress
+from Tribler.community.market.database import MarketDB
+from Tribler.dispersy.util import blocking_call_on_reactor_thread
 
 
 class MemoryTransactionRepositoryTestSuite(unittest.TestCase):
@@ -51,3 +61,68 @@ class MemoryTransactionRepositoryTestSuite(unittest.TestCase):
         self.memory_transaction_repository.add(self.transaction)
         self.memory_transaction_repository.update(self.transaction)
         self.assertEquals(self.transaction, self.memory_transaction_repository.find_by_id(self.transaction_id))
+
+
+class DatabaseTransactionRepositoryTestSuite(AbstractServer):
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def setUp(self, annotate=True):
+        yield super(DatabaseTransactionRepositoryTestSuite, self).setUp(annotate=annotate)
+
+        path = os.path.join(self.getStateDir(), 'sqlite')
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        self.database = MarketDB(self.getStateDir(), 'market')
+        self.database_transaction_repo = DatabaseTransactionRepository("0", self.database)
+        self.transaction_id = TransactionId(TraderId("0"), TransactionNumber(1))
+        self.transaction = Transaction(self.transaction_id, Price(100, 'BTC'), Quantity(30, 'MC'),
+                                       OrderId(TraderId("0"), OrderNumber(1)), OrderId(TraderId("2"), OrderNumber(2)),
+                                       Timestamp(0.0))
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def tearDown(self, annotate=True):
+        self.database_transaction_repo.shutdown_task_manager()
+        yield super(DatabaseTransactionRepositoryTestSuite, self).tearDown(annotate=annotate)
+
+    def create_payment(self, message_number):
+        return Payment(MessageId(TraderId("0"), MessageNumber(message_number)), self.transaction_id,
+                       Quantity(5, 'MC'), Price(6, 'BTC'), WalletAddress('abc'), WalletAddress('def'),
+                       PaymentId("abc"), Timestamp(float(message_number)), True)
+
+    @blocking_call_on_reactor_thread
+    def test_flush(self):
+        """
+        Test whether the changes to a transaction and its new payments are written when the repository is flushed
+        """
+        self.transaction.add_payment(self.create_payment(1))
+        self.database_transaction_repo.add(self.transaction)
+        self.assertIsNone(self.database.get_transaction(self.transaction_id))
+        self.database_transaction_repo.flush()
+        self.assertEqual(len(self.database.get_payments(self.transaction_id)), 1)
+
+        self.transaction.add_payment(self.create_payment(2))
+        self.database_transaction_repo.update(self.transaction)
+        self.database_transaction_repo.flush()
+        transaction = self.database.get_transaction(self.transaction_id)
+        self.assertEqual(float(transaction.transferred_quantity), 10)
+        self.assertEqual(len(transaction.payments), 2)
+
+        self.database_transaction_repo.delete_by_id(self.transaction_id)
+        self.database_transaction_repo.flush()
+        self.assertIsNone(self.database.get_transaction(self.transaction_id))
+        self.assertEqual(self.database.get_payments(self.transaction_id), [])
+
+    @blocking_call_on_reactor_thread
+    def test_identity_map(self):
+        """
+        Test whether a transaction is only read from the database once
+        """
+        self.database.add_transaction(self.transaction)
+        transaction = self.database_transaction_repo.find_by_id(self.transaction_id)
+        self.assertIs(self.database_transaction_repo.find_by_id(self.transaction_id), transaction)
+        self.assertEqual(self.database_transaction_repo.find_all(), [transaction])
+        self.assertEqual(self.database_transaction_repo.next_identity(),
+                         TransactionId(TraderId("0"), TransactionNumber(2)))
@@ -1,3 +1,7 @@
+import time
+
+from Tribler.pyipv8.ipv8.keyvault.crypto import ECCrypto
+from Tribler.pyipv8.ipv8.peer import Peer
 from Tribler.pyipv8.ipv8.test.base import TestBase
 from Tribler.pyipv8.ipv8.test.mocking.ipv8 import MockIPv8
 from Tribler.pyipv8.ipv8.test.util import twisted_wrapper
@@ -33,3 +37,39 @@ class TestTriblerChainCrawlerCommunity(TestBase):
         for node_nr in [0, 1]:
             self.assertIsNotNone(self.nodes[node_nr].overlay.persistence.get(
                 self.nodes[0].overlay.my_peer.public_key.key_to_bin(), 1))
+
+    @twisted_wrapper
+    def test_crawl_budget(self):
+        """
+        Test whether identities are queued when the maximum number of crawl requests is in flight
+        """
+        self.nodes[1].overlay.max_crawls_in_flight = 0
+
+        yield self.introduce_nodes()
+
+        his_pk = self.nodes[0].overlay.my_peer.public_key.key_to_bin()
+        self.assertIn(his_pk, self.nodes[1].overlay.crawl_queue)
+        self.assertEqual(self.nodes[1].overlay.get_crawl_statistics()["crawls_queued"], 1)
+
+        # The identity is crawled as soon as there is room for another crawl request
+        self.nodes[1].overlay.max_crawls_in_flight = 1
+        self.nodes[1].overlay.send_crawl_requests()
+        self.assertNotIn(his_pk, self.nodes[1].overlay.crawl_queue)
+        self.assertIn(his_pk, self.nodes[1].overlay.crawl_times)
+
+    def test_crawl_answered_by_identity(self):
+        """
+        Test whether a crawl request is only answered by a block that the crawled identity sends itself
+        """
+        my_pk = self.nodes[0].overlay.my_peer.public_key.key_to_bin()
+        block = TriblerChainBlock.create({'up': 20, 'down': 40},
+                                         self.nodes[0].overlay.persistence, my_pk,
+                                         link=None, link_pk=ECCrypto().generate_key(u"curve25519").pub().key_to_bin())
+        block.sign(self.nodes[0].overlay.my_peer.key)
+        self.nodes[1].overlay.crawls_in_flight[my_pk] = time.time()
+
+        self.nodes[1].overlay.process_half_block(block, Peer(ECCrypto().generate_key(u"curve25519")))
+        self.assertIn(my_pk, self.nodes[1].overlay.crawls_in_flight)
+
+        self.nodes[1].overlay.process_half_block(block, self.nodes[0].overlay.my_peer)
+        self.assertNotIn(my_pk, self.nodes[1].overlay.crawls_in_flight)
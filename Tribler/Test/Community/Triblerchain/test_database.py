@@ -1,8 +1,9 @@
 import os
+import unittest
 
 from twisted.internet.defer import inlineCallbacks
 
-from Tribler.community.triblerchain.database import TriblerChainDB
+from Tribler.community.triblerchain.database import TriblerChainDB, TriblerChainCrawlerDB, SequenceRanges
 from Tribler.dispersy.util import blocking_call_on_reactor_thread
 from Tribler.pyipv8.ipv8.attestation.trustchain.block import TrustChainBlock
 from Tribler.pyipv8.ipv8.attestation.trustchain.database import DATABASE_DIRECTORY
@@ -37,3 +38,100 @@ class TestDatabase(AbstractServer):
         self.db.add_block(self.block1)
         self.db.add_block(self.block2)
         self.assertEqual((1, 1), self.db.get_num_unique_interactors(self.block1.public_key))
+
+    @blocking_call_on_reactor_thread
+    def test_get_num_interactors_incremental(self):
+        """
+        Test whether the interactors are updated as blocks are added, and counted once per counterparty
+        """
+        self.assertEqual((0, 0), self.db.get_num_unique_interactors(self.block1.public_key))
+        for sequence_number, link_public_key, up, down in [(1, 'b', 42, 0), (2, 'b', 0, 42), (3, 'c', 42, 0),
+                                                           (4, 'c', 21, 0), (5, 'd', 0, 0)]:
+            block = TrustChainBlock()
+            block.transaction = {'up': up, 'down': down}
+            block.public_key = self.block1.public_key
+            block.sequence_number = sequence_number
+            block.link_public_key = link_public_key
+            self.db.add_block(block)
+        self.assertEqual((2, 1), self.db.get_num_unique_interactors(self.block1.public_key))
+
+
+class TestCrawlerDatabase(AbstractServer):
+    """
+    Tests the Database for the TriblerChain crawler.
+    """
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def setUp(self, annotate=True):
+        yield super(TestCrawlerDatabase, self).setUp(annotate=annotate)
+        path = os.path.join(self.getStateDir(), DATABASE_DIRECTORY)
+        if not os.path.exists(path):
+            os.makedirs(path)
+        self.db = TriblerChainCrawlerDB(self.getStateDir(), u'triblerchain')
+
+    def create_block(self, sequence_number):
+        block = TrustChainBlock()
+        block.transaction = {'up': 42, 'down': 0}
+        block.public_key = 'a'
+        block.sequence_number = sequence_number
+        block.link_public_key = 'b'
+        return block
+
+    @blocking_call_on_reactor_thread
+    def test_batch(self):
+        """
+        Test whether crawled blocks are written to the database when the batch is flushed
+        """
+        self.db.add_block(self.create_block(1))
+        self.assertIsNotNone(self.db.get('a', 1))
+        self.assertEqual(self.db.execute(u"SELECT COUNT(*) FROM blocks").next()[0], 0)
+
+        self.db.flush()
+        self.assertEqual(self.db.execute(u"SELECT COUNT(*) FROM blocks").next()[0], 1)
+        self.assertEqual(self.db.num_crawled_blocks, 1)
+        self.assertEqual((1, 0), self.db.get_num_unique_interactors('a'))
+
+    @blocking_call_on_reactor_thread
+    def test_duplicate(self):
+        """
+        Test whether blocks that are already held are not added again
+        """
+        for sequence_number in [1, 2, 1, 2]:
+            self.db.add_block(self.create_block(sequence_number))
+        self.assertTrue(self.db.contains(self.create_block(2)))
+        self.assertFalse(self.db.contains(self.create_block(3)))
+        self.db.flush()
+        self.assertEqual(self.db.num_crawled_blocks, 2)
+        self.assertEqual(self.db.get_num_identities(), 1)
+
+
+class TestSequenceRanges(unittest.TestCase):
+    """
+    Tests the sequence number ranges of the blocks of an identity.
+    """
+
+    def test_add(self):
+        """
+        Test whether adjacent sequence numbers are merged into a single range
+        """
+        ranges = SequenceRanges()
+        for sequence_number in [5, 1, 3, 2, 7]:
+            self.assertTrue(ranges.add(sequence_number))
+        self.assertFalse(ranges.add(2))
+        self.assertEqual(ranges.ranges, [[1, 3], [5, 5], [7, 7]])
+
+        ranges.add(6)
+        ranges.add(4)
+        self.assertEqual(ranges.ranges, [[1, 7]])
+
+    def test_contains(self):
+        """
+        Test whether the ranges contain the added sequence numbers only
+        """
+        ranges = SequenceRanges()
+        ranges.add(2)
+        ranges.add(3)
+        self.assertIn(3, ranges)
+        self.assertNotIn(1, ranges)
+        self.assertNotIn(4, ranges)
@@ -1,10 +1,13 @@
+import struct
+
 from Tribler.Test.Core.base_test import MockObject
 from Tribler.pyipv8.ipv8.test.base import TestBase
 from Tribler.pyipv8.ipv8.test.mocking.exit_socket import MockTunnelExitSocket
 from Tribler.pyipv8.ipv8.test.mocking.ipv8 import MockIPv8
 from Tribler.pyipv8.ipv8.test.util import twisted_wrapper
 from Tribler.community.triblerchain.community import TriblerChainCommunity
-from Tribler.community.triblertunnel.community import TriblerTunnelCommunity
+from Tribler.community.triblertunnel.community import TriblerTunnelCommunity, TIMER_DHT_LOOKUP
+from Tribler.Core.simpledefs import DLSTATUS_DOWNLOADING
 from Tribler.pyipv8.ipv8.messaging.anonymization.tunnel import CIRCUIT_TYPE_RENDEZVOUS
 from Tribler.pyipv8.ipv8.peer import Peer
 from Tribler.pyipv8.ipv8.util import blocking_call_on_reactor_thread
@@ -116,6 +119,32 @@ class TestTriblerTunnelCommunity(TestBase):
 
         self.assertNotIn(mock_torrent, self.nodes[0].overlay.bittorrent_peers)
 
+    def test_generate_circuit_id_shard(self):
+        """
+        Test whether only circuit ids of our own shard are generated when the circuits are sharded
+        """
+        self.nodes[0].overlay.circuit_shard = (2, 3)
+        for _ in xrange(100):
+            circuit_id = self.nodes[0].overlay._generate_circuit_id()
+            self.assertEqual(circuit_id % 3, 2)
+            self.assertLess(circuit_id, 2 ** 32)
+
+    def test_send_packet_scheduler(self):
+        """
+        Test whether relayed packets pass through the traffic scheduler, and whether other packets do not
+        """
+        overlay = self.nodes[0].overlay
+        sent_packets = []
+        overlay.traffic_scheduler.send_callback = lambda _, __, packet: sent_packets.append(packet)
+        overlay.relay_from_to[42] = MockObject()
+
+        relay_packet = overlay._prefix + '\x01' + struct.pack("!I", 42) + 'data'
+        overlay.send_packet([("1.2.3.4", 1234)], u"data", relay_packet)
+        overlay.send_packet([("1.2.3.4", 1234)], u"data", overlay._prefix + '\x01' + struct.pack("!I", 43) + 'data')
+
+        self.assertEqual(sent_packets, [relay_packet])
+        self.assertEqual(overlay.traffic_scheduler.circuit_counters[42].bytes_sent, len(relay_packet))
+
     @blocking_call_on_reactor_thread
     def test_remove_circuit(self):
         """
@@ -203,6 +232,36 @@ class TestTriblerTunnelCommunity(TestBase):
         self.nodes[0].overlay.monitor_downloads([])
         self.assertTrue(mocked_remove_circuit.called)
 
+    @blocking_call_on_reactor_thread
+    def test_monitor_downloads_dht_lookup(self):
+        """
+        Test whether DHT lookups are only done when the state of a download changes or when its lookup timer expires
+        """
+        lookups = []
+        self.nodes[0].overlay.do_raw_dht_lookup = lambda info_hash: lookups.append(info_hash)
+
+        mock_state = MockObject()
+        mock_download = MockObject()
+        mock_tdef = MockObject()
+        mock_tdef.get_infohash = lambda: 'a'
+        mock_download.get_hops = lambda: 1
+        mock_download.get_def = lambda: mock_tdef
+        mock_download.add_peer = lambda x: None
+        mock_state.get_status = lambda: DLSTATUS_DOWNLOADING
+        mock_state.get_download = lambda: mock_download
+
+        lookup_ih = self.nodes[0].overlay.get_lookup_info_hash('a')
+        self.nodes[0].overlay.monitor_downloads([mock_state])
+        self.nodes[0].overlay.monitor_downloads([mock_state])
+        self.assertEqual(lookups, [lookup_ih])
+
+        self.nodes[0].overlay.download_timers.schedule((TIMER_DHT_LOOKUP, lookup_ih), 0)
+        self.nodes[0].overlay.monitor_downloads([mock_state])
+        self.assertEqual(lookups, [lookup_ih, lookup_ih])
+
+        self.nodes[0].overlay.monitor_downloads([])
+        self.assertNotIn((TIMER_DHT_LOOKUP, lookup_ih), self.nodes[0].overlay.download_timers)
+
     @blocking_call_on_reactor_thread
     def test_update_torrent(self):
         """
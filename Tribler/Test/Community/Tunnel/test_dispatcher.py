@@ -36,6 +36,7 @@ class TestTunnelDispatcher(AbstractServer):
         Test whether no data is sent to the SOCKS5 server when we receive data from the tunnels
         """
         mock_circuit = MockObject()
+        mock_circuit.circuit_id = 4
         mock_circuit.goal_hops = 300
         mock_circuit.ctype = CIRCUIT_TYPE_DATA
         origin = ("0.0.0.0", 1024)
@@ -47,12 +48,13 @@ class TestTunnelDispatcher(AbstractServer):
         mock_session._udp_socket = None
         mock_sock_server.sessions = [mock_session]
         self.dispatcher.set_socks_servers([mock_sock_server])
-        self.dispatcher.destinations[1] = {'a': mock_circuit}
+        self.dispatcher.add_destination(1, 'a', mock_circuit)
         self.assertFalse(self.dispatcher.on_incoming_from_tunnel(self.mock_tunnel_community, mock_circuit, origin, 'a'))
 
         mock_session._udp_socket = MockObject()
         mock_session._udp_socket.sendDatagram = lambda _: True
         self.assertTrue(self.dispatcher.on_incoming_from_tunnel(self.mock_tunnel_community, mock_circuit, origin, 'a'))
+        self.assertIn(origin, self.dispatcher.circuit_destinations[1][mock_circuit])
 
     def test_on_socks_in(self):
         """
@@ -67,7 +69,7 @@ class TestTunnelDispatcher(AbstractServer):
 
         mock_request = MockObject()
         mock_request.destination = ("0.0.0.0", 1024)
-        mock_request.payload = 'a'
+        mock_request.payload = memoryview('a')
 
         # No circuit is selected
         self.assertFalse(self.dispatcher.on_socks5_udp_data(mock_udp_connection, mock_request))
@@ -81,13 +83,79 @@ class TestTunnelDispatcher(AbstractServer):
 
         # Circuit ready, should be able to tunnel data
         self.assertTrue(self.dispatcher.on_socks5_udp_data(mock_udp_connection, mock_request))
+        self.assertEqual(self.dispatcher.circuit_destinations[1][self.mock_circuit], {mock_request.destination})
+
+    def test_add_destination(self):
+        """
+        Test whether both the forward and the reverse index are updated when a destination moves to another circuit
+        """
+        other_circuit = MockObject()
+        self.dispatcher.set_socks_servers([MockObject()])
+        self.dispatcher.add_destination(1, 'a', self.mock_circuit)
+        self.dispatcher.add_destination(1, 'b', self.mock_circuit)
+        self.dispatcher.add_destination(1, 'a', other_circuit)
+
+        self.assertEqual(self.dispatcher.destinations[1], {'a': other_circuit, 'b': self.mock_circuit})
+        self.assertEqual(self.dispatcher.circuit_destinations[1], {self.mock_circuit: {'b'}, other_circuit: {'a'}})
+
+    def test_remove_destination(self):
+        """
+        Test whether a circuit is removed from the reverse index when its last destination is removed
+        """
+        self.dispatcher.set_socks_servers([MockObject()])
+        self.dispatcher.add_destination(1, 'a', self.mock_circuit)
+        self.dispatcher.remove_destination(1, 'a')
+        self.dispatcher.remove_destination(1, 'b')
+
+        self.assertFalse(self.dispatcher.destinations[1])
+        self.assertFalse(self.dispatcher.circuit_destinations[1])
+
+    def test_circuit_counters(self):
+        """
+        Test whether the packets and bytes routed over a circuit are counted in both directions
+        """
+        mock_socks_server = MockObject()
+        mock_session = MockObject()
+        mock_session._udp_socket = MockObject()
+        mock_session._udp_socket.sendDatagram = lambda _: True
+        mock_socks_server.sessions = [mock_session]
+        self.dispatcher.set_socks_servers([mock_socks_server])
+        self.selection_strategy.select = lambda *_: self.mock_circuit
+        self.mock_circuit.state = CIRCUIT_STATE_READY
+        self.mock_circuit.goal_hops = 1
+        self.mock_circuit.ctype = CIRCUIT_TYPE_DATA
+
+        mock_udp_connection = MockObject()
+        mock_udp_connection.socksconnection = MockObject()
+        mock_udp_connection.socksconnection.socksserver = mock_socks_server
+        mock_request = MockObject()
+        mock_request.destination = ("1.2.3.4", 1024)
+        mock_request.payload = memoryview('abc')
+
+        self.dispatcher.on_socks5_udp_data(mock_udp_connection, mock_request)
+        self.dispatcher.on_socks5_udp_data(mock_udp_connection, mock_request)
+        self.dispatcher.on_incoming_from_tunnel(self.mock_tunnel_community, self.mock_circuit,
+                                                mock_request.destination, 'abcde')
+
+        counters = self.dispatcher.get_circuit_counters(self.mock_circuit.circuit_id)
+        self.assertDictEqual(counters.to_dict(), {"packets_up": 2, "bytes_up": 6, "packets_down": 1, "bytes_down": 5})
 
     def test_circuit_dead(self):
         """
         Test whether the correct peers are removed when a circuit breaks
         """
-        self.dispatcher.destinations = {1: {'a': self.mock_circuit, 'b': self.mock_circuit},
-                                        2: {'c': self.mock_circuit, 'a': self.mock_circuit}}
+        other_circuit = MockObject()
+        self.dispatcher.set_socks_servers([MockObject(), MockObject()])
+        self.dispatcher.add_destination(1, 'a', self.mock_circuit)
+        self.dispatcher.add_destination(1, 'b', self.mock_circuit)
+        self.dispatcher.add_destination(2, 'c', self.mock_circuit)
+        self.dispatcher.add_destination(2, 'a', self.mock_circuit)
+        self.dispatcher.add_destination(2, 'd', other_circuit)
+        self.dispatcher.get_circuit_counters(self.mock_circuit.circuit_id)
+
         res = self.dispatcher.circuit_dead(self.mock_circuit)
         self.assertTrue(res)
         self.assertEqual(len(res), 3)
+        self.assertEqual(self.dispatcher.destinations, {1: {}, 2: {'d': other_circuit}})
+        self.assertEqual(self.dispatcher.circuit_destinations, {1: {}, 2: {other_circuit: {'d'}}})
+        self.assertNotIn(self.mock_circuit.circuit_id, self.dispatcher.circuit_counters)
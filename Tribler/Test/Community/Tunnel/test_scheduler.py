@@ -0,0 +1,115 @@
+from twisted.internet.defer import inlineCallbacks
+
+from Tribler.community.triblertunnel.scheduler import TrafficScheduler, TokenBucket, TRAFFIC_CLASS_RELAY, \
+    TRAFFIC_CLASS_EXIT
+from Tribler.Test.test_as_server import AbstractServer
+from Tribler.pyipv8.ipv8.util import blocking_call_on_reactor_thread
+
+
+class TestTrafficScheduler(AbstractServer):
+    """
+    Test the rate limiting and fair queueing of relayed and exited traffic.
+    """
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def setUp(self, annotate=True):
+        yield super(TestTrafficScheduler, self).setUp(annotate=annotate)
+        self.sent = []
+        self.scheduler = TrafficScheduler(self.send)
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def tearDown(self, annotate=True):
+        self.scheduler.shutdown()
+        yield super(TestTrafficScheduler, self).tearDown(annotate=annotate)
+
+    def send(self, candidates, message_type, packet):
+        self.sent.append(packet)
+        return len(packet)
+
+    def test_token_bucket(self):
+        """
+        Test whether a token bucket is refilled at its rate, up to its capacity
+        """
+        bucket = TokenBucket(1000, now=0)
+        bucket.tokens = -100
+        bucket.refill(0.05)
+        self.assertAlmostEqual(bucket.tokens, -50)
+        bucket.refill(10)
+        self.assertEqual(bucket.tokens, bucket.capacity)
+
+    def test_send_unlimited(self):
+        """
+        Test whether packets are sent right away and counted when there are no rate limits
+        """
+        self.assertEqual(self.scheduler.send(1, TRAFFIC_CLASS_RELAY, [], u"data", "a" * 10), 10)
+        self.assertEqual(self.scheduler.send(2, TRAFFIC_CLASS_EXIT, [], u"data", "b" * 20), 20)
+        self.assertEqual(self.sent, ["a" * 10, "b" * 20])
+
+        statistics = self.scheduler.get_statistics()
+        self.assertEqual(statistics["classes"][TRAFFIC_CLASS_RELAY]["bytes_sent"], 10)
+        self.assertEqual(statistics["classes"][TRAFFIC_CLASS_EXIT]["packets_sent"], 1)
+        self.assertEqual(len(statistics["circuits"]), 2)
+
+    def test_circuit_rate_limit(self):
+        """
+        Test whether the packets of a circuit that exceeds its rate limit are queued, and sent in order later
+        """
+        self.scheduler.set_rate_limits(1000, 0, 0)
+        self.scheduler.send(1, TRAFFIC_CLASS_RELAY, [], u"data", "a" * 500)
+        self.scheduler.send(1, TRAFFIC_CLASS_RELAY, [], u"data", "b" * 500)
+        self.scheduler.send(2, TRAFFIC_CLASS_RELAY, [], u"data", "c" * 500)
+        self.assertEqual(self.sent, ["a" * 500, "c" * 500])
+        self.assertEqual(len(self.scheduler.queues[1]), 1)
+        self.assertEqual(self.scheduler.circuit_counters[1].packets_delayed, 1)
+
+        self.scheduler.circuit_buckets[1].tokens = 100
+        self.scheduler.drain()
+        self.assertEqual(self.sent[-1], "b" * 500)
+        self.assertFalse(self.scheduler.queues)
+        self.assertFalse(self.scheduler.drain_call)
+
+    def test_fair_queueing(self):
+        """
+        Test whether the available bandwidth of a traffic class is shared fairly between its circuits
+        """
+        self.scheduler.set_rate_limits(0, 1000, 0)
+        self.scheduler.class_buckets[TRAFFIC_CLASS_RELAY].tokens = -1000
+        for _ in xrange(5):
+            self.scheduler.send(1, TRAFFIC_CLASS_RELAY, [], u"data", "a" * 1000)
+            self.scheduler.send(2, TRAFFIC_CLASS_RELAY, [], u"data", "b" * 100)
+        self.scheduler.send(3, TRAFFIC_CLASS_EXIT, [], u"data", "c" * 100)
+        self.assertEqual(self.sent, ["c" * 100])
+
+        # Both circuits get the same share of the bandwidth, so circuit 2 can send its small packet
+        bucket = self.scheduler.class_buckets[TRAFFIC_CLASS_RELAY]
+        bucket.capacity = bucket.tokens = 2050
+        self.scheduler.drain()
+        self.assertEqual(self.sent[1:], ["a" * 1000, "a" * 1000, "b" * 100])
+
+    def test_queue_full(self):
+        """
+        Test whether packets are dropped when the queue of a circuit is full
+        """
+        self.scheduler.max_queue_size = 2
+        self.scheduler.set_rate_limits(0, 0, 1000)
+        self.scheduler.class_buckets[TRAFFIC_CLASS_EXIT].tokens = -1000
+        for _ in xrange(3):
+            self.scheduler.send(1, TRAFFIC_CLASS_EXIT, [], u"data", "a" * 100)
+        self.assertEqual(self.scheduler.send(1, TRAFFIC_CLASS_EXIT, [], u"data", "a" * 100), 0)
+        self.assertEqual(self.scheduler.circuit_counters[1].packets_dropped, 2)
+        self.assertEqual(self.scheduler.class_counters[TRAFFIC_CLASS_EXIT].bytes_dropped, 200)
+
+    def test_remove_circuit(self):
+        """
+        Test whether the state of a removed circuit is cleaned up
+        """
+        self.scheduler.set_rate_limits(1000, 0, 0)
+        self.scheduler.send(1, TRAFFIC_CLASS_RELAY, [], u"data", "a" * 500)
+        self.scheduler.send(1, TRAFFIC_CLASS_RELAY, [], u"data", "a" * 500)
+        self.scheduler.remove_circuit(1)
+        self.assertFalse(self.scheduler.queues)
+        self.assertFalse(self.scheduler.active_circuits)
+        self.assertFalse(self.scheduler.circuit_counters)
+        self.assertFalse(self.scheduler.circuit_buckets)
@@ -0,0 +1,132 @@
+import struct
+
+from Tribler.community.triblertunnel.sharding import ShardFront, ShardWorker, encode_packet, decode_packet, \
+    encode_register, encode_statistics, get_packet_circuit_id, get_address_shard, MSG_PACKET
+from Tribler.Test.Core.base_test import MockObject
+from Tribler.Test.test_as_server import AbstractServer
+
+PREFIX = '\x00\x01' + 'a' * 20
+
+
+class MockPort(MockObject):
+
+    def __init__(self, host_port=1234):
+        self.written = []
+        self.host = MockObject()
+        self.host.port = host_port
+
+    def write(self, data, address):
+        self.written.append((data, address))
+
+    def getHost(self):
+        return self.host
+
+
+class TestSharding(AbstractServer):
+    """
+    Test the steering of packets to the workers of a sharded tunnel helper.
+    """
+
+    def setUp(self, annotate=True):
+        super(TestSharding, self).setUp(annotate=annotate)
+        self.front = ShardFront(3)
+        self.front.public_port = MockPort()
+        self.front.internal_port = MockPort()
+        for worker_index in xrange(3):
+            self.front.on_internal_datagram(encode_register(worker_index, PREFIX), ("127.0.0.1", 2000 + worker_index))
+
+    def tearDown(self, annotate=True):
+        self.front.shutdown_task_manager()
+        super(TestSharding, self).tearDown(annotate=annotate)
+
+    def test_encode_decode_packet(self):
+        """
+        Test the encoding and decoding of a packet envelope
+        """
+        self.assertEqual(decode_packet(encode_packet(("1.2.3.4", 5678), "packet")), (("1.2.3.4", 5678), "packet"))
+
+    def test_get_packet_circuit_id(self):
+        """
+        Test whether the circuit id is only extracted from circuit packets of the tunnel community
+        """
+        self.assertEqual(get_packet_circuit_id(PREFIX + '\x01' + struct.pack("!I", 42) + "data", PREFIX), 42)
+        self.assertIsNone(get_packet_circuit_id(PREFIX + '\xf6' + struct.pack("!I", 42) + "data", PREFIX))
+        self.assertIsNone(get_packet_circuit_id('\x00\x01' + 'b' * 20 + '\x01' + struct.pack("!I", 42), PREFIX))
+        self.assertIsNone(get_packet_circuit_id(PREFIX + '\x01', PREFIX))
+
+    def test_register_worker(self):
+        """
+        Test whether the workers and the prefix of the tunnel community are registered
+        """
+        self.assertEqual(self.front.worker_addresses, [("127.0.0.1", 2000), ("127.0.0.1", 2001), ("127.0.0.1", 2002)])
+        self.assertEqual(self.front.circuit_prefix, PREFIX)
+
+    def test_steer_circuit_packet(self):
+        """
+        Test whether a circuit packet is steered to a worker by circuit id
+        """
+        packet = PREFIX + '\x01' + struct.pack("!I", 7) + "data"
+        self.front.on_public_datagram(packet, ("1.2.3.4", 5678))
+        self.assertEqual(self.front.internal_port.written,
+                         [(encode_packet(("1.2.3.4", 5678), packet), ("127.0.0.1", 2001))])
+
+    def test_steer_response(self):
+        """
+        Test whether a packet that does not belong to a circuit is steered to the worker that sent a packet to its
+        sender, and whether the packets of the workers are sent from the public port
+        """
+        self.front.on_internal_datagram(encode_packet(("1.2.3.4", 5678), "request"), ("127.0.0.1", 2002))
+        self.assertEqual(self.front.public_port.written, [("request", ("1.2.3.4", 5678))])
+
+        self.front.on_public_datagram("response", ("1.2.3.4", 5678))
+        self.assertEqual(self.front.internal_port.written[-1][1], ("127.0.0.1", 2002))
+
+        self.front.on_public_datagram("request", ("1.2.3.5", 5678))
+        self.assertEqual(self.front.internal_port.written[-1][1],
+                         ("127.0.0.1", 2000 + get_address_shard(("1.2.3.5", 5678), 3)))
+
+    def test_unknown_worker(self):
+        """
+        Test whether packets from unregistered workers are ignored and packets for them are dropped
+        """
+        self.front.on_internal_datagram(encode_packet(("1.2.3.4", 5678), "request"), ("127.0.0.1", 3000))
+        self.assertFalse(self.front.public_port.written)
+
+        front = ShardFront(2)
+        front.internal_port = MockPort()
+        front.on_public_datagram("request", ("1.2.3.4", 5678))
+        self.assertEqual(front.dropped_packets, 1)
+
+    def test_statistics(self):
+        """
+        Test whether the statistics of the workers are summed up
+        """
+        self.front.on_internal_datagram(encode_statistics(0, {"circuits": 2}), ("127.0.0.1", 2000))
+        self.front.on_internal_datagram(encode_statistics(1, {"circuits": 3}), ("127.0.0.1", 2001))
+        self.front.on_internal_datagram(encode_statistics(2, {"circuits": 4}), ("127.0.0.1", 3000))
+
+        statistics = self.front.get_statistics()
+        self.assertEqual(statistics["circuits"], 5)
+        self.assertEqual(statistics["workers"], 3)
+
+    def test_worker(self):
+        """
+        Test whether a worker unwraps the packets from the front process and wraps the packets it sends
+        """
+        port = MockPort()
+        endpoint = MockObject()
+        endpoint.transport = port
+        endpoint.received = []
+        endpoint.datagramReceived = lambda data, addr: endpoint.received.append((data, addr))
+
+        worker = ShardWorker(1, ("127.0.0.1", 1000), None)
+        worker.endpoint = endpoint
+        worker.port = port
+
+        worker.datagramReceived(encode_packet(("1.2.3.4", 5678), "packet"), ("127.0.0.1", 1000))
+        worker.datagramReceived(encode_packet(("1.2.3.4", 5678), "packet"), ("127.0.0.1", 1001))
+        self.assertEqual(endpoint.received, [("packet", ("1.2.3.4", 5678))])
+
+        worker.write("packet", ("1.2.3.4", 5678))
+        self.assertEqual(port.written, [(encode_packet(("1.2.3.4", 5678), "packet"), ("127.0.0.1", 1000))])
+        self.assertEqual(ord(port.written[0][0][0]), MSG_PACKET)
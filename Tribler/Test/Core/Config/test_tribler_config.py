@@ -141,6 +141,10 @@ class TestTriblerConfig(TriblerCoreTest):
         self.assertEqual(self.tribler_config.get_http_api_enabled(), True)
         self.tribler_config.set_http_api_port(True)
         self.assertEqual(self.tribler_config.get_http_api_port(), True)
+        self.tribler_config.set_http_api_response_cache_ttl(5.0)
+        self.assertEqual(self.tribler_config.get_http_api_response_cache_ttl(), 5.0)
+        self.tribler_config.set_http_api_slow_request_threshold(0.5)
+        self.assertEqual(self.tribler_config.get_http_api_slow_request_threshold(), 0.5)
 
     def test_get_set_methods_dispersy(self):
         """
@@ -217,6 +221,18 @@ class TestTriblerConfig(TriblerCoreTest):
         self.assertEqual(self.tribler_config.get_tunnel_community_socks5_listen_ports(), [5])
         self.tribler_config.set_tunnel_community_exitnode_enabled(True)
         self.assertEqual(self.tribler_config.get_tunnel_community_exitnode_enabled(), True)
+        self.tribler_config.set_tunnel_community_socks5_batched_udp(True)
+        self.assertEqual(self.tribler_config.get_tunnel_community_socks5_batched_udp(), True)
+        self.tribler_config.set_tunnel_community_shard_index(2)
+        self.assertEqual(self.tribler_config.get_tunnel_community_shard_index(), 2)
+        self.tribler_config.set_tunnel_community_shards(4)
+        self.assertEqual(self.tribler_config.get_tunnel_community_shards(), 4)
+        self.tribler_config.set_tunnel_community_max_circuit_rate(100)
+        self.assertEqual(self.tribler_config.get_tunnel_community_max_circuit_rate(), 100)
+        self.tribler_config.set_tunnel_community_max_relay_rate(200)
+        self.assertEqual(self.tribler_config.get_tunnel_community_max_relay_rate(), 200)
+        self.tribler_config.set_tunnel_community_max_exit_rate(300)
+        self.assertEqual(self.tribler_config.get_tunnel_community_max_exit_rate(), 300)
         self.tribler_config.set_default_number_hops(True)
         self.assertEqual(self.tribler_config.get_default_number_hops(), True)
         self.tribler_config.set_default_anonymity_enabled(True)
@@ -321,6 +337,8 @@ class TestTriblerConfig(TriblerCoreTest):
         self.assertEqual(self.tribler_config.get_resource_monitor_poll_interval(), 21)
         self.tribler_config.set_resource_monitor_history_size(1234)
         self.assertEqual(self.tribler_config.get_resource_monitor_history_size(), 1234)
+        self.tribler_config.set_resource_monitor_reactor_stall_threshold(0.5)
+        self.assertEqual(self.tribler_config.get_resource_monitor_reactor_stall_threshold(), 0.5)
 
         self.assertEqual(self.tribler_config.get_cpu_priority_order(), 1)
         self.tribler_config.set_cpu_priority_order(3)
@@ -255,6 +255,60 @@ class TestLibtorrentDownloadImplNoSession(TriblerCoreTest):
         self.libtorrent_download_impl.shutdown_task_manager()
         super(TestLibtorrentDownloadImplNoSession, self).tearDown(annotate=annotate)
 
+    def test_wait_for_piece(self):
+        """
+        Testing whether a deferred that waits for a piece fires when its piece_finished_alert is received
+        """
+        self.libtorrent_download_impl.handle.have_piece = lambda piece: piece == 1
+        self.assertTrue(self.libtorrent_download_impl.wait_for_piece(1).called)
+
+        deferred = self.libtorrent_download_impl.wait_for_piece(2)
+        self.assertFalse(deferred.called)
+        alert = MockObject()
+        alert.piece_index = 2
+        self.libtorrent_download_impl.on_piece_finished_alert(alert)
+        self.assertTrue(deferred.called)
+
+    def test_wait_for_piece_cancel(self):
+        """
+        Testing whether a cancelled deferred no longer waits for its piece
+        """
+        self.libtorrent_download_impl.handle.have_piece = lambda _: False
+        deferred = self.libtorrent_download_impl.wait_for_piece(2)
+        deferred.addErrback(lambda _: None)
+        deferred.cancel()
+        self.assertFalse(self.libtorrent_download_impl.deferreds_piece[2])
+
+    def test_check_pieces(self):
+        """
+        Testing whether a deferred that waits for a piece fires when its piece_finished_alert has been dropped
+        """
+        have_pieces = set()
+        self.libtorrent_download_impl.handle.have_piece = lambda piece: piece in have_pieces
+        deferred = self.libtorrent_download_impl.wait_for_piece(2)
+        self.assertTrue(self.libtorrent_download_impl.is_pending_task_active("check_pieces"))
+
+        self.libtorrent_download_impl.check_pieces()
+        self.assertFalse(deferred.called)
+
+        have_pieces.add(2)
+        self.libtorrent_download_impl.check_pieces()
+        self.assertTrue(deferred.called)
+        self.assertFalse(self.libtorrent_download_impl.is_pending_task_active("check_pieces"))
+
+    def test_cancel_piece_deferreds(self):
+        """
+        Testing whether the deferreds that wait for pieces are cancelled when the download is stopped
+        """
+        self.libtorrent_download_impl.handle.have_piece = lambda _: False
+        failures = []
+        self.libtorrent_download_impl.wait_for_piece(2).addErrback(failures.append)
+        self.libtorrent_download_impl.wait_for_piece(2).addErrback(failures.append)
+
+        self.libtorrent_download_impl.cancel_piece_deferreds()
+        self.assertEqual(len(failures), 2)
+        self.assertFalse(self.libtorrent_download_impl.deferreds_piece)
+
     def test_selected_files(self):
         """
         Test whether the selected files are set correctly
@@ -610,6 +664,29 @@ class TestLibtorrentDownloadImplNoSession(TriblerCoreTest):
                 has_priorities_task = True
         self.assertTrue(has_priorities_task)
 
+    def test_vod_scheduler(self):
+        """
+        Testing whether the VOD scheduler runs while the download is in VOD mode and its buffer health is in the state
+        """
+        def map_file(_dummy1, start_byte, _dummy2):
+            res = MockObject()
+            res.piece = int(start_byte / 250)
+            return res
+
+        self.libtorrent_download_impl.handle.get_torrent_info().num_pieces = lambda: 4
+        self.libtorrent_download_impl.handle.get_torrent_info().map_file = map_file
+        self.libtorrent_download_impl.handle.piece_priorities = lambda: [0, 0, 0, 0]
+
+        self.libtorrent_download_impl.set_vod_mode(True)
+        self.libtorrent_download_impl.set_mode(DLMODE_VOD)
+        self.assertTrue(self.libtorrent_download_impl.is_pending_task_active("vod_scheduler"))
+        self.libtorrent_download_impl.vod_scheduler.stalls = 3
+        self.assertEqual(self.libtorrent_download_impl.get_state().get_vod_stalls(), 3)
+
+        self.libtorrent_download_impl.set_vod_mode(False)
+        self.assertFalse(self.libtorrent_download_impl.is_pending_task_active("vod_scheduler"))
+        self.assertIsNone(self.libtorrent_download_impl.vod_scheduler)
+
     def test_get_pieces_bitmask(self):
         """
         Testing whether a correct pieces bitmask is returned when requested
@@ -3,13 +3,14 @@ import os
 import shutil
 import tempfile
 
+import libtorrent as lt
 from libtorrent import bencode
 from twisted.internet.defer import inlineCallbacks, Deferred
 from twisted.internet import reactor
 
 from Tribler.Core.CacheDB.Notifier import Notifier
 from Tribler.Core.Libtorrent.LibtorrentDownloadImpl import LibtorrentDownloadImpl
-from Tribler.Core.Libtorrent.LibtorrentMgr import LibtorrentMgr
+from Tribler.Core.Libtorrent.LibtorrentMgr import LibtorrentMgr, DEFAULT_ALERT_QUEUE_SIZE, PROGRESS_ALERT_QUEUE_SIZE
 from Tribler.Core.exceptions import DuplicateDownloadException, TorrentFileException
 from Tribler.Test.Core.base_test import MockObject
 from Tribler.Test.test_as_server import AbstractServer
@@ -430,3 +431,21 @@ class TestLibtorrentMgr(AbstractServer):
         self.ltmgr.initialize()
         self.ltmgr._task_process_alerts()
         self.assertTrue(mutable_container[0])
+
+    def test_set_progress_alerts_enabled(self):
+        """
+        Test whether the progress alerts are added to and removed from the alert mask of a session
+        """
+        mock_ltsession = MockObject()
+        mock_ltsession.set_alert_mask = lambda mask: setattr(mock_ltsession, 'alert_mask', mask)
+        mock_ltsession.settings = {}
+        mock_ltsession.get_settings = lambda: mock_ltsession.settings
+        mock_ltsession.set_settings = lambda settings: setattr(mock_ltsession, 'settings', settings)
+        self.ltmgr.get_session = lambda *_: mock_ltsession
+
+        self.ltmgr.set_progress_alerts_enabled(0, True)
+        self.assertTrue(mock_ltsession.alert_mask & lt.alert.category_t.progress_notification)
+        self.assertEqual(mock_ltsession.settings['alert_queue_size'], PROGRESS_ALERT_QUEUE_SIZE)
+        self.ltmgr.set_progress_alerts_enabled(0, False)
+        self.assertEqual(mock_ltsession.alert_mask, self.ltmgr.default_alert_mask)
+        self.assertEqual(mock_ltsession.settings['alert_queue_size'], DEFAULT_ALERT_QUEUE_SIZE)
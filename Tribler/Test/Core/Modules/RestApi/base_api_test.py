@@ -65,6 +65,7 @@ class AbstractBaseApiTest(TestAsServer):
         self.config.set_http_api_enabled(True)
         self.config.set_megacache_enabled(True)
         self.config.set_tunnel_community_enabled(False)
+        self.config.set_http_api_response_cache_ttl(0)
 
         # Make sure we select a random port for the HTTP API
         min_base_port = 1000 if not os.environ.get("TEST_BUCKET", None) \
@@ -1,6 +1,7 @@
 import os
 
 import Tribler.Core.Utilities.json_util as json
+from Tribler.community.triblertunnel.scheduler import TRAFFIC_CLASS_RELAY
 from Tribler.Test.Core.Modules.RestApi.base_api_test import AbstractApiTest
 from Tribler.Test.Core.base_test import MockObject
 from Tribler.Test.twisted_thread import deferred
@@ -46,6 +47,9 @@ class TestCircuitDebugEndpoint(AbstractApiTest):
         mock_circuit.destroy = lambda: None
 
         self.session.lm.tunnel_community.circuits = {1234: mock_circuit}
+        self.session.lm.tunnel_community.dispatcher.get_circuit_counters(1234).bytes_up = 10
+        self.session.lm.tunnel_community.traffic_scheduler.send_callback = lambda *_: 5
+        self.session.lm.tunnel_community.traffic_scheduler.send(5678, TRAFFIC_CLASS_RELAY, [], u"data", "12345")
 
         def verify_response(response):
             response_json = json.loads(response)
@@ -55,6 +59,8 @@ class TestCircuitDebugEndpoint(AbstractApiTest):
             self.assertEqual(response_json['circuits'][0]['bytes_down'], 400)
             self.assertEqual(len(response_json['circuits'][0]['hops']), 1)
             self.assertEqual(response_json['circuits'][0]['hops'][0]['host'], 'somewhere:4242')
+            self.assertEqual(response_json['circuits'][0]['socks5_traffic']['bytes_up'], 10)
+            self.assertEqual(response_json['scheduler']['circuits'][0]['bytes_sent'], 5)
 
         self.should_check_equality = False
         return self.do_request('debug/circuits', expected_code=200).addCallback(verify_response)
@@ -244,3 +250,56 @@ class TestCircuitDebugEndpoint(AbstractApiTest):
 
         self.should_check_equality = False
         return self.do_request('debug/profiler', expected_code=200, request_type='PUT').addCallback(on_started_profiler)
+
+    @deferred(timeout=10)
+    def test_get_rest_statistics(self):
+        """
+        Test whether the API returns the statistics of earlier requests
+        """
+        def verify_response(response):
+            json_response = json.loads(response)
+            self.assertIn('GET DebugThreadsEndpoint', json_response['endpoints'])
+            threads_statistics = json_response['endpoints']['GET DebugThreadsEndpoint']
+            self.assertEqual(threads_statistics['requests'], 1)
+            self.assertEqual(threads_statistics['latency']['count'], 1)
+            self.assertGreater(threads_statistics['bytes_written'], 0)
+
+        self.should_check_equality = False
+        return self.do_request('debug/threads', expected_code=200)\
+            .addCallback(lambda _: self.do_request('debug/rest', expected_code=200))\
+            .addCallback(verify_response)
+
+    @deferred(timeout=10)
+    def test_get_reactor_statistics(self):
+        """
+        Test whether the API returns the reactor lag statistics
+        """
+        def verify_response(response):
+            json_response = json.loads(response)
+            self.assertIn('p99', json_response['lag'])
+            self.assertEqual(json_response['stalls'], 0)
+
+        self.should_check_equality = False
+        return self.do_request('debug/reactor', expected_code=200).addCallback(verify_response)
+
+    @deferred(timeout=10)
+    def test_get_reactor_stacks(self):
+        """
+        Test whether the API returns the sampled reactor stacks in the collapsed stack format
+        """
+        self.session.lm.resource_monitor.reactor_monitor.add_stack_sample(["a.py:1 main", "b.py:2 run"])
+
+        def verify_response(response):
+            self.assertEqual(response, "a.py:1 main;b.py:2 run 1\n")
+
+        self.should_check_equality = False
+        return self.do_request('debug/reactor/stacks', expected_code=200).addCallback(verify_response)
+
+    @deferred(timeout=10)
+    def test_get_reactor_no_monitor(self):
+        """
+        Test whether the API returns error 404 if the reactor is not monitored
+        """
+        self.session.lm.resource_monitor.reactor_monitor.stop()
+        self.session.lm.resource_monitor.reactor_monitor = None
+        return self.do_request('debug/reactor', expected_code=404)
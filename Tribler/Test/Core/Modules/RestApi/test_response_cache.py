@@ -0,0 +1,105 @@
+import zlib
+
+from Tribler.Core.Modules.restapi.response_cache import ResponseCache, accepts_gzip, etag_matches, get_cache_key, \
+    gzip_compress, is_cacheable_path
+from Tribler.Test.Core.base_test import TriblerCoreTest
+
+
+class TestResponseCache(TriblerCoreTest):
+    """
+    This class contains tests for the response cache of the HTTP API.
+    """
+
+    def setUp(self, annotate=True):
+        super(TestResponseCache, self).setUp(annotate=annotate)
+        self.cache = ResponseCache(10)
+
+    def test_cacheable_path(self):
+        """
+        Test whether we correctly determine which endpoints can be cached
+        """
+        self.assertTrue(is_cacheable_path('/settings'))
+        self.assertTrue(is_cacheable_path('/statistics/tribler'))
+        self.assertTrue(is_cacheable_path('/channels/discovered'))
+        self.assertFalse(is_cacheable_path('/channels/subscribed'))
+        self.assertFalse(is_cacheable_path('/settingsabc'))
+        self.assertFalse(is_cacheable_path('/events'))
+
+    def test_cache_key_arguments(self):
+        """
+        Test whether the order of the arguments does not influence the cache key
+        """
+        self.assertEqual(get_cache_key('/torrentinfo', {'a': ['1'], 'b': ['2']}),
+                         get_cache_key('/torrentinfo', {'b': ['2'], 'a': ['1']}))
+        self.assertNotEqual(get_cache_key('/torrentinfo', {'a': ['1']}),
+                            get_cache_key('/torrentinfo', {'a': ['2']}))
+
+    def test_get_put(self):
+        """
+        Test storing and retrieving a response from the cache
+        """
+        key = get_cache_key('/settings', {})
+        self.assertIsNone(self.cache.get(key))
+        cached_response = self.cache.put(key, 'abc', 'text/json', 'SettingsEndpoint')
+        self.assertEqual(self.cache.get(key), cached_response)
+        self.assertEqual(self.cache.get(key).body, 'abc')
+        self.assertEqual(self.cache.get(key).endpoint, 'SettingsEndpoint')
+
+    def test_expired(self):
+        """
+        Test whether an expired response is not returned by the cache
+        """
+        key = get_cache_key('/settings', {})
+        self.cache.put(key, 'abc', 'text/json').timestamp -= 20
+        self.assertIsNone(self.cache.get(key))
+        self.assertFalse(self.cache.entries)
+
+    def test_disabled(self):
+        """
+        Test whether nothing is stored when the cache has been disabled, while we still get a response with an ETag
+        """
+        self.cache.ttl = 0
+        key = get_cache_key('/settings', {})
+        self.assertTrue(self.cache.put(key, 'abc', 'text/json').etag)
+        self.assertIsNone(self.cache.get(key))
+
+    def test_max_entries(self):
+        """
+        Test whether the oldest response is dropped when the cache is full
+        """
+        self.cache.max_entries = 2
+        for ind in xrange(3):
+            self.cache.put(get_cache_key('/settings', {'a': [str(ind)]}), 'abc', 'text/json').timestamp += ind
+        self.assertEqual(len(self.cache.entries), 2)
+        self.assertIsNone(self.cache.get(get_cache_key('/settings', {'a': ['0']})))
+
+    def test_invalidate(self):
+        """
+        Test whether responses of the same top-level endpoint are dropped when invalidating the cache
+        """
+        self.cache.put(get_cache_key('/channels/discovered', {}), 'abc', 'text/json')
+        self.cache.put(get_cache_key('/settings', {}), 'abc', 'text/json')
+        self.cache.invalidate('/channels/subscribed/abcd')
+        self.assertEqual(self.cache.entries.keys(), [get_cache_key('/settings', {})])
+
+    def test_etag(self):
+        """
+        Test the generation and matching of ETags
+        """
+        etag = self.cache.put(get_cache_key('/settings', {}), 'abc', 'text/json').etag
+        self.assertNotEqual(etag, self.cache.put(get_cache_key('/settings', {}), 'abcd', 'text/json').etag)
+        self.assertTrue(etag_matches(etag, etag))
+        self.assertTrue(etag_matches(etag, '"a", %s' % etag))
+        self.assertTrue(etag_matches(etag, '*'))
+        self.assertFalse(etag_matches(etag, None))
+        self.assertFalse(etag_matches(etag, '"a"'))
+
+    def test_gzip(self):
+        """
+        Test whether we correctly parse the Accept-Encoding header and compress data
+        """
+        self.assertTrue(accepts_gzip('gzip, deflate'))
+        self.assertTrue(accepts_gzip('deflate,gzip;q=1.0'))
+        self.assertFalse(accepts_gzip('x-gzip2'))
+        self.assertFalse(accepts_gzip(None))
+        self.assertEqual(zlib.decompress(gzip_compress('a' * 2000), 16 + zlib.MAX_WBITS), 'a' * 2000)
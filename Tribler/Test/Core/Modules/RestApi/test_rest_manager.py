@@ -1,6 +1,13 @@
+import zlib
+
+from twisted.internet.defer import inlineCallbacks, returnValue
+from twisted.web.client import Agent, readBody
+from twisted.web.http_headers import Headers
+
 from Tribler.Core.exceptions import TriblerException
 import Tribler.Core.Utilities.json_util as json
-from Tribler.Test.twisted_thread import deferred
+from Tribler.Test.twisted_thread import deferred, reactor
+from Tribler.dispersy.util import blocking_call_on_reactor_thread
 from base_api_test import AbstractApiTest
 
 
@@ -35,3 +42,66 @@ class RestRequestTest(AbstractApiTest):
         self.should_check_equality = False
         return self.do_request('channels/discovered', expected_code=500, expected_json=None, request_type='PUT',
                                post_data=post_data).addCallback(verify_error_message)
+
+
+class RestResponseCacheTest(AbstractApiTest):
+
+    def setUpPreSession(self):
+        super(RestResponseCacheTest, self).setUpPreSession()
+        self.config.set_http_api_response_cache_ttl(10)
+
+    @inlineCallbacks
+    def do_get_request(self, endpoint, headers=None):
+        agent = Agent(reactor, pool=self.connection_pool)
+        response = yield agent.request('GET', 'http://localhost:%s/%s' % (self.session.config.get_http_api_port(),
+                                                                          endpoint), Headers(headers or {}))
+        body = yield readBody(response)
+        returnValue((response, body))
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_etag(self):
+        """
+        Testing whether a cacheable response has an ETag and whether we get a 304 response when it is not modified
+        """
+        response, body = yield self.do_get_request('settings')
+        self.assertEqual(response.code, 200)
+        etag = response.headers.getRawHeaders('etag')[0]
+        self.assertTrue(json.loads(body)['settings'])
+
+        response, body = yield self.do_get_request('settings', {'If-None-Match': [etag]})
+        self.assertEqual(response.code, 304)
+        self.assertEqual(body, '')
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_cached_response(self):
+        """
+        Testing whether a cached response is returned and whether it is dropped when the endpoint is modified
+        """
+        response, body = yield self.do_get_request('settings')
+        self.session.config.config['general']['family_filter'] = not self.session.config.get_family_filter_enabled()
+        _, cached_body = yield self.do_get_request('settings')
+        self.assertEqual(body, cached_body)
+        endpoint_statistics = self.session.lm.api_manager.statistics.endpoints['GET SettingsEndpoint']
+        self.assertEqual(endpoint_statistics.num_requests, 2)
+        self.assertEqual(endpoint_statistics.num_cache_hits, 1)
+
+        yield self.do_request('settings', expected_code=200, request_type='POST', post_data=json.dumps({}),
+                              raw_data=True)
+        _, new_body = yield self.do_get_request('settings')
+        self.assertNotEqual(body, new_body)
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_gzip_response(self):
+        """
+        Testing whether large responses are compressed when the client accepts gzip-encoded content
+        """
+        response, body = yield self.do_get_request('settings', {'Accept-Encoding': ['gzip']})
+        self.assertEqual(response.headers.getRawHeaders('content-encoding'), ['gzip'])
+        self.assertTrue(json.loads(zlib.decompress(body, 16 + zlib.MAX_WBITS))['settings'])
+
+        response, body = yield self.do_get_request('settings')
+        self.assertFalse(response.headers.hasHeader('content-encoding'))
+        self.assertTrue(json.loads(body)['settings'])
@@ -0,0 +1,96 @@
+import time
+
+from Tribler.Core.Modules.restapi.rest_statistics import LatencyHistogram, RESTStatistics, RequestRecord
+from Tribler.Test.Core.base_test import TriblerCoreTest, MockObject
+
+
+class TestRESTStatistics(TriblerCoreTest):
+    """
+    This class contains tests for the statistics of the HTTP API.
+    """
+
+    def setUp(self, annotate=True):
+        super(TestRESTStatistics, self).setUp(annotate=annotate)
+        session = MockObject()
+        session.sqlite_db = MockObject()
+        session.sqlite_db.query_time = 0.0
+        self.session = session
+        self.statistics = RESTStatistics(session, 0.5)
+
+    def test_latency_histogram(self):
+        """
+        Test adding latencies to the histogram and estimating percentiles
+        """
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.get_percentile(50), 0.0)
+        for _ in xrange(9):
+            histogram.add(0.003)
+        histogram.add(20)
+        self.assertEqual(histogram.get_percentile(50), 0.005)
+        self.assertEqual(histogram.get_percentile(99), 20)
+        self.assertEqual(histogram.to_dict()['buckets'][-1], ["+Inf", 1])
+        self.assertEqual(histogram.to_dict()['count'], 10)
+
+    def test_request_finished_after_rendering(self):
+        """
+        Test whether a request is added to the statistics when it is finished after rendering
+        """
+        record = RequestRecord('GET', '/settings')
+        record.endpoint = 'SettingsEndpoint'
+        self.statistics.render_started(record, 1)
+        self.session.sqlite_db.query_time += 0.2
+        self.statistics.render_finished(record)
+        self.assertFalse(self.statistics.endpoints)
+
+        self.statistics.request_finished(record, 200)
+        endpoint_statistics = self.statistics.endpoints['GET SettingsEndpoint']
+        self.assertEqual(endpoint_statistics.num_requests, 1)
+        self.assertAlmostEqual(endpoint_statistics.db_time, 0.2)
+
+    def test_request_finished_while_rendering(self):
+        """
+        Test whether a request that is finished during the rendering is added after rendering
+        """
+        record = RequestRecord('GET', '/settings')
+        record.endpoint = 'SettingsEndpoint'
+        self.statistics.render_started(record, 1)
+        self.statistics.request_finished(record, 500)
+        self.assertFalse(self.statistics.endpoints)
+        self.statistics.render_finished(record)
+        self.assertEqual(self.statistics.endpoints['GET SettingsEndpoint'].num_errors, 1)
+
+    def test_cache_hit(self):
+        """
+        Test whether a response from the cache is counted for the endpoint that rendered it
+        """
+        record = RequestRecord('GET', '/settings')
+        record.endpoint = 'SettingsEndpoint'
+        record.cache_hit = True
+        self.statistics.request_finished(record, 200)
+        self.assertEqual(self.statistics.endpoints['GET SettingsEndpoint'].num_cache_hits, 1)
+        self.assertEqual(self.statistics.get_statistics_dict()['endpoints']['GET SettingsEndpoint']['cache_hits'], 1)
+
+    def test_slow_request(self):
+        """
+        Test whether slow requests are recorded
+        """
+        record = RequestRecord('GET', '/settings')
+        record.endpoint = 'SettingsEndpoint'
+        record.start_time = time.time() - 1
+        self.statistics.request_finished(record, 200)
+        self.assertEqual(self.statistics.endpoints['GET SettingsEndpoint'].num_slow_requests, 1)
+        self.assertEqual(self.statistics.get_statistics_dict()['slow_requests'][0]['path'], '/settings')
+
+    def test_sample_stack(self):
+        """
+        Test whether the stack of the thread that renders a slow request is sampled
+        """
+        self.statistics.slow_request_threshold = 0.1
+        self.statistics.start()
+        record = RequestRecord('GET', '/settings')
+        self.statistics.render_started(record, self.statistics.sampler.ident)
+        record.render_start_time -= 1
+        time.sleep(0.3)
+        self.statistics.render_finished(record)
+        self.statistics.stop()
+        self.assertTrue(record.stack)
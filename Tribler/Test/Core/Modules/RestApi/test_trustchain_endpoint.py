@@ -256,3 +256,11 @@ class TestTrustchainStatsEndpoint(AbstractApiTest):
         """
         self.should_check_equality = False
         return self.do_request('trustchain/bootstrap?amount=aaa', expected_code=400)
+
+    @deferred(timeout=10)
+    def test_get_crawler_no_crawler(self):
+        """
+        Testing whether the API returns error 404 if the loaded community is not a crawler
+        """
+        self.should_check_equality = False
+        return self.do_request('trustchain/crawler', expected_code=404)
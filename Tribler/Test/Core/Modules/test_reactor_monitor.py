@@ -0,0 +1,67 @@
+import time
+
+from Tribler.Core.Modules.reactor_monitor import ReactorMonitor, ReactorStallSampler, HEARTBEAT_INTERVAL
+from Tribler.Test.Core.base_test import TriblerCoreTest
+
+
+class TestReactorMonitor(TriblerCoreTest):
+
+    def setUp(self, annotate=True):
+        super(TestReactorMonitor, self).setUp(annotate=annotate)
+        self.reactor_monitor = ReactorMonitor(0.25, self.session_base_dir)
+
+    def test_heartbeat(self):
+        """
+        Test whether the lag of the reactor is measured
+        """
+        self.reactor_monitor.last_heartbeat = time.time() - HEARTBEAT_INTERVAL - 1
+        self.reactor_monitor.heartbeat()
+        self.reactor_monitor.heartbeat()
+        self.assertEqual(self.reactor_monitor.num_stalls, 1)
+        self.assertGreaterEqual(self.reactor_monitor.max_lag, 1)
+
+        statistics = self.reactor_monitor.get_statistics_dict()
+        self.assertEqual(statistics['lag']['samples'], 2)
+        self.assertEqual(statistics['lag']['p50'], self.reactor_monitor.max_lag)
+        self.assertEqual(statistics['lag']['p90'], self.reactor_monitor.max_lag)
+        self.assertEqual(len(statistics['recent_stalls']), 1)
+
+    def test_get_lag(self):
+        """
+        Test whether the reactor only lags once the next heartbeat is due, which the stall sampler relies on too
+        """
+        now = time.time()
+        self.reactor_monitor.last_heartbeat = now - HEARTBEAT_INTERVAL / 2
+        self.assertEqual(self.reactor_monitor.get_lag(now), 0.0)
+        self.reactor_monitor.last_heartbeat = now - HEARTBEAT_INTERVAL - 0.2
+        self.assertAlmostEqual(self.reactor_monitor.get_lag(now), 0.2)
+
+    def test_collapsed_stacks(self):
+        """
+        Test whether stack samples are aggregated in the collapsed stack format
+        """
+        self.reactor_monitor.add_stack_sample(["a.py:1 main", "b.py:2 run"])
+        self.reactor_monitor.add_stack_sample(["a.py:1 main", "b.py:2 run"])
+        self.reactor_monitor.add_stack_sample(["a.py:1 main", "c.py:3 block;ing"])
+        self.assertEqual(self.reactor_monitor.get_collapsed_stacks(),
+                         "a.py:1 main;b.py:2 run 2\na.py:1 main;c.py:3 block:ing 1\n")
+        self.assertEqual(self.reactor_monitor.get_statistics_dict()['stack_samples'], 3)
+
+        with open(self.reactor_monitor.write_collapsed_stacks()) as stacks_file:
+            self.assertEqual(stacks_file.read(), self.reactor_monitor.get_collapsed_stacks())
+
+        self.reactor_monitor.clear_stack_samples()
+        self.assertEqual(self.reactor_monitor.get_collapsed_stacks(), "")
+
+    def test_sample_stalled_reactor(self):
+        """
+        Test whether the stack of the reactor thread is sampled when the reactor does not process heartbeats
+        """
+        self.reactor_monitor.heartbeat()
+        self.reactor_monitor.last_heartbeat = time.time() - 1
+        sampler = ReactorStallSampler(self.reactor_monitor, 0.25)
+        sampler.start()
+        time.sleep(0.2)
+        sampler.stop()
+        self.assertGreater(self.reactor_monitor.num_stack_samples, 0)
+        self.assertIn("test_sample_stalled_reactor", self.reactor_monitor.get_collapsed_stacks())
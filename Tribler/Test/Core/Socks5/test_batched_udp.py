@@ -0,0 +1,73 @@
+import errno
+import socket
+from unittest import skipUnless
+
+from twisted.internet import reactor
+from twisted.internet.defer import inlineCallbacks
+from twisted.internet.task import deferLater
+
+from Tribler.Core.Socks5.batched_udp import MMsgBuffers, is_batched_udp_supported
+from Tribler.Core.Socks5.udp_connection import SocksUDPConnection
+from Tribler.Test.test_as_server import AbstractServer
+from Tribler.pyipv8.ipv8.util import blocking_call_on_reactor_thread
+
+
+@skipUnless(is_batched_udp_supported(), "Batched UDP I/O is not supported on this platform")
+class TestBatchedUDP(AbstractServer):
+    """
+    Test the batched sending and receiving of datagrams.
+    """
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def setUp(self, annotate=True):
+        yield super(TestBatchedUDP, self).setUp(annotate=annotate)
+
+        self.receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.receiver.bind(("127.0.0.1", 0))
+        self.receiver.setblocking(False)
+        self.sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sender.bind(("127.0.0.1", 0))
+        self.sender.setblocking(False)
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def tearDown(self, annotate=True):
+        self.receiver.close()
+        self.sender.close()
+        yield super(TestBatchedUDP, self).tearDown(annotate=annotate)
+
+    def test_send_receive(self):
+        """
+        Test whether a batch of datagrams is sent and received correctly
+        """
+        datagrams = [("datagram %d" % index, self.receiver.getsockname()) for index in xrange(5)]
+        self.assertEqual(MMsgBuffers(4).send(self.sender.fileno(), datagrams), 4)
+
+        received = MMsgBuffers(8, 2048).receive(self.receiver.fileno())
+        self.assertEqual(received, [(data, self.sender.getsockname()) for data, _ in datagrams[:4]])
+
+    def test_receive_nothing(self):
+        """
+        Test whether an error is raised when there are no datagrams to receive
+        """
+        with self.assertRaises(socket.error) as context:
+            MMsgBuffers(8, 2048).receive(self.receiver.fileno())
+        self.assertIn(context.exception.args[0], (errno.EAGAIN, errno.EWOULDBLOCK))
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_batched_udp_connection(self):
+        """
+        Test whether a batched SOCKS5 UDP connection sends the queued datagrams during the next reactor iteration
+        """
+        connection = SocksUDPConnection(None, self.receiver.getsockname(), batched=True)
+        self.assertTrue(connection.sendDatagram('a'))
+        self.assertTrue(connection.sendDatagram('b'))
+        self.assertEqual(len(connection.listen_port.pending_datagrams), 2)
+
+        yield deferLater(reactor, 0.1, lambda: None)
+        self.assertFalse(connection.listen_port.pending_datagrams)
+        self.assertEqual(self.receiver.recv(16), 'a')
+        self.assertEqual(self.receiver.recv(16), 'b')
+        yield connection.close()
@@ -36,7 +36,9 @@ class TestSocks5Connection(AbstractServer):
     def setUp(self, annotate=True):
         yield super(TestSocks5Connection, self).setUp(annotate=annotate)
 
-        self.connection = Socks5Connection(None)
+        mock_socks_server = MockObject()
+        mock_socks_server.batched_udp = False
+        self.connection = Socks5Connection(mock_socks_server)
         self.connection.transport = MockTransport()
 
     @blocking_call_on_reactor_thread
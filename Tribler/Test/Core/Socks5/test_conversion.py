@@ -1,6 +1,7 @@
 import struct
 
-from Tribler.Core.Socks5.conversion import decode_request, IPV6AddrError
+from Tribler.Core.Socks5.conversion import decode_request, IPV6AddrError, decode_udp_packet, encode_udp_packet, \
+    ADDRESS_TYPE_IPV4, ADDRESS_TYPE_DOMAIN_NAME, UdpHeaderCache
 from Tribler.Test.test_as_server import AbstractServer
 
 
@@ -12,3 +13,38 @@ class TestSocks5Conversion(AbstractServer):
         """
         self.assertIsNone(decode_request(0, struct.pack("!BBBB", 5, 0, 0, 5))[1])  # Invalid address type
         self.assertRaises(IPV6AddrError, decode_request, 0, struct.pack("!BBBB", 5, 0, 0, 4))  # IPv6
+
+    def test_encode_decode_udp_packet(self):
+        """
+        Test the encoding and decoding of a SOCKS5 UDP packet
+        """
+        data = encode_udp_packet(0, 0, ADDRESS_TYPE_IPV4, "1.2.3.4", 1234, "payload")
+        self.assertEqual(data, struct.pack("!HBB4BH", 0, 0, ADDRESS_TYPE_IPV4, 1, 2, 3, 4, 1234) + "payload")
+
+        request = decode_udp_packet(data)
+        self.assertEqual(request.destination, ("1.2.3.4", 1234))
+        self.assertEqual(request.frag, 0)
+        self.assertIsInstance(request.payload, memoryview)
+        self.assertEqual(request.payload.tobytes(), "payload")
+
+    def test_encode_decode_udp_packet_domain(self):
+        """
+        Test the encoding and decoding of a SOCKS5 UDP packet destined for a domain name
+        """
+        data = encode_udp_packet(0, 0, ADDRESS_TYPE_DOMAIN_NAME, "tribler.org", 80, "payload")
+        request = decode_udp_packet(data)
+        self.assertEqual(request.destination, ("tribler.org", 80))
+        self.assertEqual(request.payload.tobytes(), "payload")
+
+    def test_udp_header_cache(self):
+        """
+        Test whether the UDP header cache encodes the same packets and does not grow beyond its maximum size
+        """
+        cache = UdpHeaderCache(max_size=2)
+        self.assertEqual(cache.encode_udp_packet("1.2.3.4", 1234, "payload"),
+                         encode_udp_packet(0, 0, ADDRESS_TYPE_IPV4, "1.2.3.4", 1234, "payload"))
+        self.assertIs(cache.get_header("1.2.3.4", 1234), cache.get_header("1.2.3.4", 1234))
+
+        cache.get_header("1.2.3.5", 1234)
+        cache.get_header("1.2.3.6", 1234)
+        self.assertLessEqual(len(cache.headers), 2)
@@ -0,0 +1,58 @@
+from nose.tools import raises
+
+from Tribler.Core.TFTP.buffer_cache import BufferCache
+from Tribler.Core.TFTP.exception import BufferCacheFullException
+from Tribler.Test.Core.base_test import TriblerCoreTest
+
+
+class TestTFTPBufferCache(TriblerCoreTest):
+    """
+    This class contains tests for the TFTP buffer cache.
+    """
+
+    def setUp(self, annotate=True):
+        super(TestTFTPBufferCache, self).setUp(annotate=annotate)
+        self.buffer_cache = BufferCache(max_size=10)
+        self.num_loads = 0
+
+    def load_file(self, size):
+        def load():
+            self.num_loads += 1
+            return "a" * size
+        return load
+
+    def test_acquire_shared(self):
+        """
+        Testing whether the sessions that upload the same file share a single buffer
+        """
+        view1, checksum1 = self.buffer_cache.acquire("a", self.load_file(4))
+        view2, checksum2 = self.buffer_cache.acquire("a", self.load_file(4))
+        self.assertIs(view1, view2)
+        self.assertEqual(checksum1, checksum2)
+        self.assertEqual(view1[1:3], "aa")
+        self.assertEqual(self.num_loads, 1)
+        self.assertEqual(self.buffer_cache.size, 4)
+
+    def test_release_evict(self):
+        """
+        Testing whether released files stay in the cache until their memory is needed, the least recently used first
+        """
+        self.buffer_cache.acquire("a", self.load_file(4))
+        self.buffer_cache.acquire("b", self.load_file(4))
+        self.buffer_cache.release("a")
+        self.buffer_cache.release("b")
+        self.buffer_cache.acquire("a", self.load_file(4))
+        self.assertEqual(self.num_loads, 2)
+
+        self.buffer_cache.acquire("c", self.load_file(4))
+        self.assertIn("a", self.buffer_cache)
+        self.assertNotIn("b", self.buffer_cache)
+        self.assertEqual(self.buffer_cache.size, 8)
+
+    @raises(BufferCacheFullException)
+    def test_acquire_full(self):
+        """
+        Testing whether a file that does not fit next to the files that are in use is rejected
+        """
+        self.buffer_cache.acquire("a", self.load_file(6))
+        self.buffer_cache.acquire("b", self.load_file(6))
@@ -1,9 +1,13 @@
+from base64 import b64encode
+from hashlib import sha1
+
 from nose.tools import raises
 from twisted.internet.defer import inlineCallbacks
 
 from Tribler.Core.TFTP.exception import FileNotFound
 from Tribler.Core.TFTP.handler import TftpHandler, METADATA_PREFIX
-from Tribler.Core.TFTP.packet import OPCODE_OACK, OPCODE_ERROR, OPCODE_RRQ
+from Tribler.Core.TFTP.packet import OPCODE_OACK, OPCODE_ERROR, OPCODE_RRQ, OPCODE_ACK, OPCODE_DATA
+from Tribler.Core.TFTP.session import Session
 from Tribler.Test.Core.base_test import TriblerCoreTest, MockObject
 from Tribler.dispersy.util import blocking_call_on_reactor_thread
 
@@ -18,6 +22,19 @@ class TestTFTPHandler(TriblerCoreTest):
     def setUp(self, annotate=True):
         yield TriblerCoreTest.setUp(self, annotate=annotate)
         self.handler = TftpHandler(None, None, None)
+        self.sent_packets = []
+
+    def create_session(self, is_client, file_data, window_size):
+        """
+        Create a session with a block size of 2 bytes, of which the sent packets are kept in sent_packets
+        """
+        def mocked_send_packet(session, packet):
+            session.last_sent_packet = packet
+            self.sent_packets.append(packet)
+
+        self.handler._send_packet = mocked_send_packet
+        return Session(is_client, 1, ("127.0.0.1", 1234), OPCODE_RRQ, u"test", file_data, len(file_data), None,
+                       block_size=2, window_size=window_size)
 
     @blocking_call_on_reactor_thread
     @inlineCallbacks
@@ -47,6 +64,31 @@ class TestTFTPHandler(TriblerCoreTest):
         self.handler._max_retries = 1
         self.assertTrue(self.handler._check_session_timeout(mock_session))
 
+    def test_check_session_timeout_retransmit(self):
+        """
+        Testing whether only the first block that has not been acknowledged is retransmitted on a timeout
+        """
+        session = self.create_session(False, "abcdefgh", window_size=3)
+        self.handler._handle_packet_as_sender(session, {'opcode': OPCODE_ACK, 'block_number': 0})
+        self.handler._handle_packet_as_sender(session, {'opcode': OPCODE_ACK, 'block_number': 1})
+        self.sent_packets = []
+        session.last_contact_time = 0
+        self.assertFalse(self.handler._check_session_timeout(session))
+        self.assertEqual([(packet['block_number'], packet['data']) for packet in self.sent_packets], [(2, "cd")])
+        self.assertEqual(session.retries, 1)
+
+    def test_check_session_timeout_request_without_window(self):
+        """
+        Testing whether a request is retried without a window size if the peer does not answer it
+        """
+        session = self.create_session(True, "", window_size=16)
+        self.handler._send_request_packet(session)
+        self.assertEqual(self.sent_packets[-1]['options']['windowsize'], 16)
+        session.last_contact_time = 0
+        self.assertFalse(self.handler._check_session_timeout(session))
+        self.assertEqual(self.sent_packets[-1]['opcode'], OPCODE_RRQ)
+        self.assertNotIn('windowsize', self.sent_packets[-1]['options'])
+
     def test_schedule_callback_processing(self):
         """
         Testing whether scheduling a TFTP callback works correctly
@@ -60,11 +102,44 @@ class TestTFTPHandler(TriblerCoreTest):
         """
         Testing whether a tftp session is correctly cleaned up
         """
+        mock_session = MockObject()
+        mock_session.is_client = True
         self.handler._session_id_dict["c"] = 1
-        self.handler._session_dict = {"abc": "test"}
+        self.handler._session_dict = {"abc": mock_session}
         self.handler._cleanup_session("abc")
         self.assertFalse('c' in self.handler._session_id_dict)
 
+    def test_cleanup_session_release_buffer(self):
+        """
+        Testing whether the file buffer of an upload session is released when the session is cleaned up
+        """
+        self.handler._buffer_cache.acquire(u"test", lambda: "abc")
+        session = self.create_session(False, "abc", window_size=1)
+        self.handler._add_new_session(session)
+        self.handler._cleanup_session(("127.0.0.1", 1234, 1))
+        self.assertEqual(self.handler._buffer_cache._entries[u"test"].references, 0)
+
+    def test_handle_new_request_buffer_cache_full(self):
+        """
+        Testing whether a request for a file that does not fit in the buffer cache is rejected with an error
+        """
+        self.handler = TftpHandler(None, None, None, max_buffer_size=2)
+        self.handler.session = MockObject()
+        self.handler.session.config = MockObject()
+        self.handler.session.config.get_torrent_store_enabled = lambda: True
+        self.handler._load_torrent = lambda _: "abc"
+        self.create_session(False, "", window_size=1)
+
+        fake_packet = {"opcode": OPCODE_RRQ,
+                       "file_name": "abc.torrent",
+                       "options": {"blksize": 1,
+                                   "timeout": 1},
+                       "session_id": 1}
+        self.handler._handle_new_request("123", "456", fake_packet)
+        self.assertEqual(self.sent_packets[-1]['opcode'], OPCODE_ERROR)
+        self.assertEqual(self.sent_packets[-1]['error_code'], 3)
+        self.assertFalse(self.handler._session_dict)
+
     def test_data_came_in(self):
         """
         Testing whether we do nothing when data comes in and the handler is not running
@@ -229,3 +304,111 @@ class TestTFTPHandler(TriblerCoreTest):
         mock_session = MockObject()
         mock_session.session_id = 42
         self.handler._send_error_packet(mock_session, 43, "test")
+
+    def test_handle_packet_as_sender_window(self):
+        """
+        Testing whether the sender sends a window of blocks for every ACK and retransmits on a duplicate ACK
+        """
+        session = self.create_session(False, "abcdefgh", window_size=3)
+        self.handler._handle_packet_as_sender(session, {'opcode': OPCODE_ACK, 'block_number': 0})
+        self.assertEqual([packet['block_number'] for packet in self.sent_packets], [1, 2, 3])
+
+        # an ACK of a block before the last one that has been sent asks for the block after it
+        self.sent_packets = []
+        self.handler._handle_packet_as_sender(session, {'opcode': OPCODE_ACK, 'block_number': 1})
+        self.assertEqual([packet['block_number'] for packet in self.sent_packets], [2, 4])
+
+        self.sent_packets = []
+        self.handler._handle_packet_as_sender(session, {'opcode': OPCODE_ACK, 'block_number': 1})
+        self.assertEqual([packet['block_number'] for packet in self.sent_packets], [2])
+
+        # the last block of a file with a size that is a multiple of the block size is empty
+        self.sent_packets = []
+        self.handler._handle_packet_as_sender(session, {'opcode': OPCODE_ACK, 'block_number': 4})
+        self.assertEqual([(packet['block_number'], packet['data']) for packet in self.sent_packets], [(5, "")])
+        self.assertFalse(session.is_done)
+        self.handler._handle_packet_as_sender(session, {'opcode': OPCODE_ACK, 'block_number': 5})
+        self.assertTrue(session.is_done)
+
+    def test_handle_packet_as_receiver_window(self):
+        """
+        Testing whether the receiver keeps the blocks after a missing block and acknowledges cumulatively
+        """
+        session = self.create_session(True, "", window_size=3)
+        self.handler._handle_packet_as_receiver(session, {'opcode': OPCODE_OACK, 'options': {
+            'blksize': 2, 'timeout': session.timeout, 'tsize': 5, 'checksum': "A95sVwv+JL/DKMzXyka3bq2vQzQ=",
+            'windowsize': 2}})
+        self.assertEqual(session.window_size, 2)
+        self.assertEqual(self.sent_packets[-1]['block_number'], 0)
+
+        # the first block is lost, a duplicate ACK asks for it
+        self.sent_packets = []
+        self.handler._handle_packet_as_receiver(session, {'opcode': OPCODE_DATA, 'block_number': 2, 'data': "cd"})
+        self.assertEqual([packet['block_number'] for packet in self.sent_packets], [0])
+
+        self.sent_packets = []
+        self.handler._handle_packet_as_receiver(session, {'opcode': OPCODE_DATA, 'block_number': 1, 'data': "ab"})
+        self.assertEqual([packet['block_number'] for packet in self.sent_packets], [2])
+
+        self.sent_packets = []
+        self.handler._handle_packet_as_receiver(session, {'opcode': OPCODE_DATA, 'block_number': 3, 'data': "e"})
+        self.assertEqual([packet['block_number'] for packet in self.sent_packets], [3])
+        self.assertEqual(session.file_data, "abcde")
+        self.assertTrue(session.is_done)
+
+    def transfer(self, file_data, window_size, lost_blocks):
+        """
+        Transfer a file from a sender to a receiver session, losing the given blocks the first time they are sent.
+        Timeouts are never checked, so the transfer only completes if every lost block is retransmitted right away.
+        :return: the receiver session and the block numbers of the DATA packets that have been sent
+        """
+        sender = self.create_session(False, file_data, window_size=window_size)
+        receiver = self.create_session(True, "", window_size=window_size)
+        self.handler._handle_packet_as_receiver(receiver, {'opcode': OPCODE_OACK, 'options': {
+            'blksize': 2, 'timeout': receiver.timeout, 'tsize': len(file_data),
+            'checksum': b64encode(sha1(file_data).digest()), 'windowsize': window_size}})
+
+        sent_blocks = []
+        while self.sent_packets:
+            packet = self.sent_packets.pop(0)
+            if packet['opcode'] == OPCODE_DATA:
+                sent_blocks.append(packet['block_number'])
+                if packet['block_number'] in lost_blocks:
+                    lost_blocks.remove(packet['block_number'])
+                else:
+                    self.handler._handle_packet_as_receiver(receiver, packet)
+            else:
+                self.handler._handle_packet_as_sender(sender, packet)
+
+        self.assertTrue(sender.is_done)
+        return receiver, sent_blocks
+
+    def test_transfer_lost_block_in_window(self):
+        """
+        Testing whether a block that is lost in the middle of a window is retransmitted without waiting for a timeout
+        """
+        receiver, sent_blocks = self.transfer("abcdefghijklmnopqrstuvwxyz", 4, {6})
+        self.assertTrue(receiver.is_done)
+        self.assertEqual(receiver.file_data, "abcdefghijklmnopqrstuvwxyz")
+        self.assertEqual(sent_blocks, [1, 2, 3, 4, 5, 6, 7, 8, 6, 9, 10, 11, 12, 13, 14])
+
+    def test_transfer_lost_blocks_in_window(self):
+        """
+        Testing whether several blocks that are lost in a window are retransmitted without waiting for a timeout
+        """
+        receiver, sent_blocks = self.transfer("abcdefghijklmnopqrstuvwxyz", 4, {6, 7})
+        self.assertTrue(receiver.is_done)
+        self.assertEqual(receiver.file_data, "abcdefghijklmnopqrstuvwxyz")
+        self.assertEqual(sent_blocks, [1, 2, 3, 4, 5, 6, 7, 8, 6, 9, 7, 10, 11, 12, 13, 14])
+
+    def test_handle_packet_as_receiver_no_window(self):
+        """
+        Testing whether a peer that does not negotiate a window size gets an ACK for every block
+        """
+        session = self.create_session(True, "", window_size=16)
+        self.handler._handle_packet_as_receiver(session, {'opcode': OPCODE_OACK, 'options': {
+            'blksize': 2, 'timeout': session.timeout, 'tsize': 5, 'checksum': "A95sVwv+JL/DKMzXyka3bq2vQzQ="}})
+        self.assertEqual(session.window_size, 1)
+
+        self.handler._handle_packet_as_receiver(session, {'opcode': OPCODE_DATA, 'block_number': 1, 'data': "ab"})
+        self.assertEqual(self.sent_packets[-1]['block_number'], 1)
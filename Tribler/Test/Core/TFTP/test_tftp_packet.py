@@ -2,7 +2,7 @@ from nose.tools import raises
 
 from Tribler.Core.TFTP.exception import InvalidStringException, InvalidPacketException
 from Tribler.Core.TFTP.packet import _get_string, _decode_options, _decode_data, _decode_ack, _decode_error, \
-    decode_packet, OPCODE_ERROR, encode_packet
+    decode_packet, OPCODE_ERROR, OPCODE_OACK, encode_packet
 from Tribler.Test.Core.base_test import TriblerCoreTest
 
 
@@ -102,3 +102,11 @@ class TestTFTPPacket(TriblerCoreTest):
         encoded = encode_packet({'opcode': OPCODE_ERROR, 'session_id': 123, 'error_code': 1, 'error_msg': 'hi'})
         self.assertEqual(encoded[-3], 'h')
         self.assertEqual(encoded[-2], 'i')
+
+    def test_encode_decode_window_size(self):
+        """
+        Testing whether the windowsize option survives encoding and decoding
+        """
+        packet = {'opcode': OPCODE_OACK, 'session_id': 123,
+                  'options': {'blksize': 1024, 'timeout': 2, 'tsize': 42, 'checksum': 'abc', 'windowsize': 16}}
+        self.assertEqual(decode_packet(encode_packet(packet)), packet)
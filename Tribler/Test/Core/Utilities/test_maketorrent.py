@@ -1,6 +1,9 @@
 import os
+from hashlib import sha1
+from threading import Event
 
-from Tribler.Core.Utilities.maketorrent import pathlist2filename
+from Tribler.Core.Utilities.maketorrent import pathlist2filename, read_blocks, hash_files
+from Tribler.Test.Core.base_test import TriblerCoreTest
 from Tribler.Test.test_as_server import BaseTestCase
 
 
@@ -16,3 +19,45 @@ class TestMakeTorrent(BaseTestCase):
         path_list = ["test", part]
         path = pathlist2filename(path_list)
         self.assertEqual(path, os.path.join(u"test", u"\xb0\xe7"))
+
+
+class TestHashFiles(TriblerCoreTest):
+
+    def setUp(self, annotate=True):
+        TriblerCoreTest.setUp(self, annotate=annotate)
+        self.files = []
+        self.content = ""
+        for index, size in enumerate([5000, 12345, 7]):
+            data = "".join(chr((index + i) % 256) for i in xrange(size))
+            file_path = os.path.join(self.session_base_dir, "file%d" % index)
+            with open(file_path, 'wb') as f:
+                f.write(data)
+            self.files.append((file_path, size))
+            self.content += data
+
+    def test_read_blocks(self):
+        """
+        Testing whether the files are read as a single stream of blocks
+        """
+        blocks = list(read_blocks(self.files, 4096))
+        self.assertEqual([len(block) for block in blocks], [4096] * 4 + [len(self.content) - 4 * 4096])
+        self.assertEqual("".join(blocks), self.content)
+
+    def test_hash_files(self):
+        """
+        Testing whether the pieces are hashed in order, across the boundaries of the files
+        """
+        progress = []
+        pieces = hash_files(self.files, 1024, userprogresscallback=progress.append, num_threads=3)
+        expected = "".join(sha1(self.content[offset:offset + 1024]).digest()
+                           for offset in xrange(0, len(self.content), 1024))
+        self.assertEqual(pieces, expected)
+        self.assertEqual(progress[-1], 1.0)
+
+    def test_hash_files_abort(self):
+        """
+        Testing whether hashing stops when the user aborts
+        """
+        abort_flag = Event()
+        abort_flag.set()
+        self.assertIsNone(hash_files(self.files, 1024, userabortflag=abort_flag))
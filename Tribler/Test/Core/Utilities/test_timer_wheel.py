@@ -0,0 +1,56 @@
+from Tribler.Core.Utilities.timer_wheel import TimerWheel
+from Tribler.Test.test_as_server import BaseTestCase
+
+
+class TestTimerWheel(BaseTestCase):
+
+    def setUp(self):
+        super(TestTimerWheel, self).setUp()
+        self.wheel = TimerWheel(resolution=1, num_slots=8, now=100)
+
+    def test_advance(self):
+        """
+        Test whether keys expire in the order of their deadlines, and not before their deadlines
+        """
+        self.wheel.schedule('b', 103.5)
+        self.wheel.schedule('a', 102)
+        self.wheel.schedule('c', 104)
+        self.assertEqual(len(self.wheel), 3)
+
+        self.assertEqual(self.wheel.advance(101), [])
+        self.assertEqual(self.wheel.advance(103), ['a'])
+        self.assertEqual(self.wheel.advance(103.6), ['b'])
+        self.assertEqual(self.wheel.advance(110), ['c'])
+        self.assertFalse(self.wheel)
+
+    def test_later_rotation(self):
+        """
+        Test whether keys that expire during a later rotation of the wheel are kept
+        """
+        self.wheel.schedule('a', 120)
+        self.wheel.schedule('b', 105)
+        self.assertEqual(self.wheel.advance(112), ['b'])
+        self.assertIn('a', self.wheel)
+        self.assertEqual(self.wheel.advance(125), ['a'])
+
+    def test_schedule_past(self):
+        """
+        Test whether a key with a deadline in the past expires during the next advance
+        """
+        self.wheel.advance(105)
+        self.wheel.schedule('a', 90)
+        self.assertEqual(self.wheel.advance(105), ['a'])
+
+    def test_reschedule_cancel(self):
+        """
+        Test whether a key can be rescheduled and cancelled
+        """
+        self.wheel.schedule('a', 102)
+        self.wheel.schedule('a', 106)
+        self.assertEqual(self.wheel.get_deadline('a'), 106)
+        self.assertEqual(self.wheel.advance(104), [])
+
+        self.wheel.cancel('a')
+        self.wheel.cancel('b')
+        self.assertIsNone(self.wheel.get_deadline('a'))
+        self.assertEqual(self.wheel.advance(110), [])
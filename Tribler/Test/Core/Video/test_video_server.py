@@ -9,11 +9,13 @@ from twisted.internet import reactor
 from twisted.internet.defer import inlineCallbacks, Deferred
 from twisted.internet.endpoints import TCP4ClientEndpoint, connectProtocol
 from twisted.internet.protocol import Protocol, connectionDone
+from twisted.web.test.requesthelper import DummyRequest
 
 from Tribler.Core.DownloadConfig import DownloadStartupConfig
 from Tribler.Core.TorrentDef import TorrentDef
 from Tribler.Core.Utilities.network_utils import get_random_port
-from Tribler.Core.Video.VideoServer import VideoServer
+from Tribler.Core.Video.VODScheduler import VODScheduler
+from Tribler.Core.Video.VideoServer import VideoServer, VideoStreamResource, VideoStreamProducer
 from Tribler.Test.Core.base_test import MockObject, TriblerCoreTest
 from Tribler.Test.common import TESTS_DATA_DIR
 from Tribler.Test.test_as_server import TestAsServer
@@ -96,12 +98,131 @@ class TestVideoServer(TriblerCoreTest):
 
         self.assertEqual(self.video_server.get_vod_destination(mock_download), os.path.join("abc", "def"))
 
-    def test_get_vod_stream(self):
+    def test_render_unknown_download(self):
         """
-        Testing whether the right VOD stream is returned
+        Testing whether a request for an unknown download is answered with a 404
         """
         self.mock_session.get_download = lambda _: None
-        self.assertEqual(self.video_server.get_vod_stream("abcd"), (None, None))
+        request = DummyRequest(["abcd", "0"])
+        VideoStreamResource(self.video_server).render_GET(request)
+        self.assertEqual(request.responseCode, 404)
+
+
+class TestVideoStreamProducer(TriblerCoreTest):
+    """
+    Tests for the producer that writes a byte range of a file to a request.
+    """
+
+    def setUp(self, annotate=True):
+        TriblerCoreTest.setUp(self, annotate=annotate)
+        self.content = "".join(chr(i % 256) for i in xrange(1000))
+        file_path = os.path.join(self.session_base_dir, "video.avi")
+        with open(file_path, 'wb') as video_file:
+            video_file.write(self.content)
+
+        # Scenario: we have a file with 4 pieces, 250 bytes in each piece, of which we have the first two.
+        self.have_pieces = set([0, 1])
+        self.piece_deferreds = {}
+        torrent_info = MockObject()
+        torrent_info.piece_size = lambda _: 250
+
+        def map_file(_, offset, _dummy):
+            peer_request = MockObject()
+            peer_request.piece, peer_request.start = divmod(offset, 250)
+            return peer_request
+        torrent_info.map_file = map_file
+
+        self.download = MockObject()
+        self.download.handle = MockObject()
+        self.download.handle.get_torrent_info = lambda: torrent_info
+        self.download.vod_seekpos = 0
+        self.download.set_byte_priority = lambda _dummy1, _dummy2: None
+        self.download.has_piece = lambda piece: piece in self.have_pieces
+        self.download.wait_for_piece = lambda piece: self.piece_deferreds.setdefault(piece, Deferred())
+        self.download.vod_scheduler = None
+        mock_def = MockObject()
+        mock_def.get_name = lambda: "video.avi"
+        self.download.get_def = lambda: mock_def
+
+        self.video_server = VideoServer(get_random_port(), MockObject())
+        self.video_server.get_vod_destination = lambda _: file_path
+
+        self.request = MockObject()
+        self.request.written = []
+        self.request.finished = False
+        self.request.write = self.request.written.append
+        self.request.registerProducer = lambda _dummy1, _dummy2: None
+        self.request.unregisterProducer = lambda: None
+
+        def finish():
+            self.request.finished = True
+        self.request.finish = finish
+
+    def test_write_range(self):
+        """
+        Testing whether a range is written in chunks that do not extend beyond a piece
+        """
+        producer = VideoStreamProducer(self.video_server, self.request, self.download, 0, 100, 300)
+        producer.start()
+        self.assertEqual(self.request.written, [self.content[100:250], self.content[250:400]])
+        self.assertTrue(self.request.finished)
+        self.assertEqual(self.download.vod_seekpos, 400)
+
+    def test_wait_for_piece(self):
+        """
+        Testing whether the producer resumes writing when a missing piece has been downloaded
+        """
+        producer = VideoStreamProducer(self.video_server, self.request, self.download, 0, 400, 200)
+        producer.start()
+        self.assertEqual("".join(self.request.written), self.content[400:500])
+        self.assertIn(2, self.piece_deferreds)
+
+        self.have_pieces.add(2)
+        self.piece_deferreds[2].callback(2)
+        self.assertEqual("".join(self.request.written), self.content[400:600])
+        self.assertTrue(self.request.finished)
+
+    def test_piece_cancelled(self):
+        """
+        Testing whether the connection is closed when the download stops while the producer waits for a piece
+        """
+        self.request.loseConnection = lambda: setattr(self.request, 'lost', True)
+        producer = VideoStreamProducer(self.video_server, self.request, self.download, 0, 400, 200)
+        producer.start()
+        self.piece_deferreds[2].cancel()
+        self.assertTrue(producer.is_stopped)
+        self.assertTrue(self.request.lost)
+
+    def test_pause_producing(self):
+        """
+        Testing whether the producer stops writing when it is paused and continues when it is resumed
+        """
+        producer = VideoStreamProducer(self.video_server, self.request, self.download, 0, 0, 500)
+        self.request.write = lambda data: (self.request.written.append(data), producer.pauseProducing())
+        producer.start()
+        self.assertEqual(self.request.written, [self.content[0:250]])
+
+        producer.resumeProducing()
+        self.assertEqual(self.request.written, [self.content[0:250], self.content[250:500]])
+        self.assertTrue(self.request.finished)
+
+    def test_vod_stream(self):
+        """
+        Testing whether the producer moves its play head in the VOD scheduler and reports the pieces it waited for
+        """
+        self.download.vod_scheduler = VODScheduler(0)
+        self.download.schedule_vod_pieces = lambda: None
+        producer = VideoStreamProducer(self.video_server, self.request, self.download, 0, 400, 200)
+        producer.start()
+        self.assertEqual(producer.stream.position, 500)
+        self.assertEqual(self.download.vod_scheduler.stalls, 1)
+
+        self.have_pieces.add(2)
+        self.piece_deferreds[2].callback(2)
+        self.assertEqual(producer.stream.position, 600)
+
+        producer.stopProducing()
+        self.assertEqual(self.download.vod_scheduler.streams, set())
 
 
 class TestVideoServerSession(TestAsServer):
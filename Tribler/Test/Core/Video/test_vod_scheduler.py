@@ -0,0 +1,104 @@
+from Tribler.Core.Video.VODScheduler import VODScheduler, PRIORITY_URGENT, PRIORITY_READ_AHEAD, PRIORITY_NORMAL
+from Tribler.Test.Core.base_test import MockObject, TriblerCoreTest
+
+MB = 1024 * 1024
+
+
+class TestVODScheduler(TriblerCoreTest):
+    """
+    Tests for the scheduler that gives the pieces ahead of the play heads of VOD streams a deadline.
+    """
+
+    def setUp(self, annotate=True):
+        TriblerCoreTest.setUp(self, annotate=annotate)
+        # Scenario: we stream a file of 8 pieces, 1 MB in each piece, of which we have the first piece.
+        self.have = [True] + [False] * 7
+        self.priorities = [1] * 8
+        self.deadlines = {}
+
+        file_entry = MockObject()
+        file_entry.size = 8 * MB
+        file_entry.offset = 0
+        torrent_info = MockObject()
+        torrent_info.file_at = lambda _: file_entry
+        torrent_info.piece_length = lambda: MB
+
+        def map_file(_, offset, _dummy):
+            peer_request = MockObject()
+            peer_request.piece = offset / MB
+            return peer_request
+        torrent_info.map_file = map_file
+
+        status = MockObject()
+        status.pieces = self.have
+        self.handle = MockObject()
+        self.handle.get_torrent_info = lambda: torrent_info
+        self.handle.status = lambda: status
+        self.handle.piece_priorities = lambda: self.priorities
+        self.handle.set_piece_deadline = self.deadlines.__setitem__
+        self.handle.reset_piece_deadline = self.deadlines.pop
+
+        def prioritize_pieces(priorities):
+            self.priorities = priorities
+        self.handle.prioritize_pieces = prioritize_pieces
+
+        self.scheduler = VODScheduler(0)
+
+    def test_schedule(self):
+        """
+        Testing whether the missing pieces ahead of a play head get a deadline and a raised priority
+        """
+        self.scheduler.add_stream(0)
+        self.scheduler.schedule(self.handle, now=1000)
+
+        # At the default bitrate of 512 KB/s, every piece takes 2 seconds of video
+        self.assertEqual(self.deadlines, {1: 2000, 2: 4000, 3: 6000, 4: 8000, 5: 10000, 6: 12000, 7: 14000})
+        self.assertEqual(self.priorities, [1, PRIORITY_URGENT, PRIORITY_URGENT] + [PRIORITY_READ_AHEAD] * 5)
+
+        health = self.scheduler.get_buffer_health()
+        self.assertEqual(health['vod_buffered_bytes'], MB)
+        self.assertEqual(health['vod_buffered_time'], 2.0)
+        self.assertEqual(health['vod_bitrate'], 512 * 1024)
+
+    def test_schedule_stream_closed(self):
+        """
+        Testing whether the pieces lose their deadline and priority when the stream is closed
+        """
+        stream = self.scheduler.add_stream(0)
+        self.scheduler.schedule(self.handle, now=1000)
+        self.have[1] = True
+
+        stream.close()
+        self.scheduler.schedule(self.handle, now=1001)
+        self.assertEqual(self.deadlines, {1: 2000})
+        self.assertEqual(self.priorities, [1, PRIORITY_URGENT] + [PRIORITY_NORMAL] * 6)
+        self.assertEqual(self.scheduler.get_buffer_health()['vod_buffered_time'], 0.0)
+
+    def test_bitrate(self):
+        """
+        Testing whether the bitrate of a stream is measured, leaving out the intervals in which the stream stalled
+        """
+        stream = self.scheduler.add_stream(0)
+        stream.sample_time = 1000
+        stream.advance(MB)
+        stream.update_bitrate(1001)
+        self.assertEqual(stream.get_bitrate(), MB)
+
+        stream.stall()
+        stream.advance(MB)
+        stream.resume()
+        stream.update_bitrate(1002)
+        self.assertEqual(stream.get_bitrate(), MB)
+        self.assertEqual(self.scheduler.stalls, 1)
+
+    def test_stop(self):
+        """
+        Testing whether stopping the scheduler removes the deadlines and raised priorities
+        """
+        self.scheduler.add_stream(4 * MB)
+        self.scheduler.schedule(self.handle, now=1000)
+        self.assertEqual(len(self.deadlines), 4)
+
+        self.scheduler.stop(self.handle)
+        self.assertEqual(self.deadlines, {})
+        self.assertEqual(self.priorities, [1] * 8)
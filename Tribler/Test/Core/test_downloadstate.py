@@ -41,6 +41,8 @@ class TestDownloadState(TriblerCoreTest):
         self.assertEqual(download_state.get_num_seeds_peers(), (0, 0))
         self.assertEqual(download_state.get_vod_prebuffering_progress_consec(), 0)
         self.assertEqual(download_state.get_vod_prebuffering_progress(), 0)
+        self.assertEqual(download_state.get_vod_buffered_time(), 0.0)
+        self.assertEqual(download_state.get_vod_stalls(), 0)
         self.assertFalse(download_state.is_vod())
         self.assertEqual(download_state.get_peerlist(), [])
 
@@ -71,7 +73,11 @@ class TestDownloadState(TriblerCoreTest):
         lt_status.finished_time = 10
 
         download_state = DownloadState(self.mock_download, lt_status, None, {'vod_prebuf_frac_consec': 43,
-                                                                             'vod_prebuf_frac': 44})
+                                                                             'vod_prebuf_frac': 44,
+                                                                             'vod_bitrate': 1000,
+                                                                             'vod_buffered_bytes': 5000,
+                                                                             'vod_buffered_time': 5.0,
+                                                                             'vod_stalls': 2})
 
         self.assertEqual(download_state.get_status(), DLSTATUS_DOWNLOADING)
         self.assertEqual(download_state.get_current_speed(UPLOAD), 123)
@@ -80,6 +86,10 @@ class TestDownloadState(TriblerCoreTest):
         self.assertEqual(download_state.get_total_transferred(DOWNLOAD), 200)
         self.assertEqual(download_state.get_vod_prebuffering_progress_consec(), 43)
         self.assertEqual(download_state.get_vod_prebuffering_progress(), 44)
+        self.assertEqual(download_state.get_vod_bitrate(), 1000)
+        self.assertEqual(download_state.get_vod_buffered_bytes(), 5000)
+        self.assertEqual(download_state.get_vod_buffered_time(), 5.0)
+        self.assertEqual(download_state.get_vod_stalls(), 2)
         self.assertTrue(download_state.is_vod())
         self.assertEqual(download_state.get_seeding_ratio(), 0.5)
         self.assertEqual(download_state.get_eta(), 0.25)
@@ -1,6 +1,6 @@
-from threading import Event, Thread
+from threading import Event, Thread, current_thread
 
-from Tribler.Core.Utilities.instrumentation import synchronized, WatchDog
+from Tribler.Core.Utilities.instrumentation import synchronized, WatchDog, get_thread_stack
 from Tribler.Test.Core.base_test import TriblerCoreTest
 
 
@@ -127,3 +127,14 @@ class TriblerCoreTestWatchDog(TriblerCoreTest):
         Test thread names outputted by watchdog
         """
         self.assertEquals("Unknown", self.watchdog.get_thread_name(-1))
+
+
+class TriblerCoreTestThreadStack(TriblerCoreTest):
+
+    def test_get_thread_stack(self):
+        """
+        Test whether we can get the stack of a running thread
+        """
+        stack = get_thread_stack(current_thread().ident)
+        self.assertIn("test_get_thread_stack", stack[-1])
+        self.assertIsNone(get_thread_stack(-1))
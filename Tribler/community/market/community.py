@@ -1,10 +1,13 @@
 import random
+import time
 from base64 import b64decode
+from collections import deque
+from itertools import chain
 
-from Tribler.pyipv8.ipv8.deprecated.bloomfilter import BloomFilter
 from twisted.internet import reactor
 from twisted.internet.defer import inlineCallbacks, succeed, Deferred, returnValue
 from twisted.internet.task import LoopingCall
+from twisted.internet.threads import deferToThread
 
 from Tribler.Core.simpledefs import NTFY_MARKET_ON_ASK, NTFY_MARKET_ON_BID, NTFY_MARKET_ON_TRANSACTION_COMPLETE, \
     NTFY_MARKET_ON_ASK_TIMEOUT, NTFY_MARKET_ON_BID_TIMEOUT, NTFY_MARKET_ON_PAYMENT_RECEIVED, NTFY_MARKET_ON_PAYMENT_SENT
@@ -35,7 +38,7 @@ from Tribler.community.market.database import MarketDB
 from Tribler.community.market.payload import InfoPayload, MatchPayload, TradePayload, StartTransactionPayload, \
     AcceptMatchPayload, OrderStatusRequestPayload, OrderStatusResponsePayload, WalletInfoPayload, PaymentPayload, \
     DeclineMatchPayload, DeclineTradePayload, OrderbookSyncPayload, PingPongPayload
-from Tribler.community.market.reputation.temporal_pagerank_manager import TemporalPagerankReputationManager
+from Tribler.community.market.reputation.incremental_pagerank_manager import IncrementalTemporalPagerankManager
 from Tribler.community.market.tradechain.block import TradeChainBlock
 from Tribler.community.market.wallet.tc_wallet import TrustchainWallet
 from Tribler.pyipv8.ipv8.attestation.trustchain.block import TrustChainBlock
@@ -48,6 +51,15 @@ from Tribler.pyipv8.ipv8.deprecated.payload_headers import GlobalTimeDistributio
 from Tribler.pyipv8.ipv8.peer import Peer
 from Tribler.pyipv8.ipv8.requestcache import NumberCache, RandomNumberCache, RequestCache
 
+# A peer gets at most one response to its order book sync messages every interval (in seconds)
+ORDERBOOK_SYNC_INTERVAL = 20.0
+
+# The block pairs of the ticks that a peer misses are sent in batches
+SYNC_BATCH_SIZE = 20
+SYNC_BATCH_INTERVAL = 1.0
+
+MAX_SYNC_PEERS = 1000
+
 
 class ProposedTradeRequestCache(NumberCache):
     """
@@ -136,6 +148,9 @@ class MarketCommunity(TrustChainCommunity):
         self.incoming_match_messages = {}  # Map of TraderId -> Message (we save all incoming matches)
         self.transaction_manager = None
         self.reputation_dict = {}
+        self.reputation_manager = IncrementalTemporalPagerankManager()
+        self.reputation_block_rowid = 0
+        self.reputation_computation = None
         self.use_local_address = False
         self.matching_enabled = True
         self.message_repository = MemoryMessageRepository(self.mid)
@@ -144,6 +159,9 @@ class MarketCommunity(TrustChainCommunity):
         self.pending_matchmaker_deferreds = []
         self.request_cache = RequestCache()
         self.cancelled_orders = set()  # Keep track of cancelled orders so we don't add them again to the orderbook.
+        self.tick_block_pairs = {}  # Map: block hash of a tick -> (tick block, linked block)
+        self.sync_times = {}
+        self.sync_queues = {}
         self.broadcast_block = False
 
         if use_database:
@@ -263,11 +281,7 @@ class MarketCommunity(TrustChainCommunity):
         self.endpoint.send(peer.address, packet)
 
     def get_orders_bloomfilter(self):
-        order_ids = [str(order_id) for order_id in self.order_book.get_order_ids()]
-        orders_bloom_filter = BloomFilter(0.005, max(len(order_ids), 1), prefix=' ')
-        if order_ids:
-            orders_bloom_filter.add_keys(order_ids)
-        return orders_bloom_filter
+        return self.order_book.get_bloomfilter()
 
     @inlineCallbacks
     def unload(self):
@@ -277,6 +291,10 @@ class MarketCommunity(TrustChainCommunity):
         for trader_id, sock_addr in self.mid_register.iteritems():
             self.market_database.add_trader_identity(trader_id, sock_addr[0], sock_addr[1])
 
+        # Write the pending changes to the orders and transactions to the database
+        self.order_manager.order_repository.flush()
+        self.transaction_manager.transaction_repository.flush()
+
         # Save the ticks to the database
         if self.is_matchmaker:
             self.order_book.save_to_database()
@@ -464,17 +482,59 @@ class MarketCommunity(TrustChainCommunity):
         if not self.is_matchmaker:
             return
 
-        for order_id in self.order_book.get_order_ids():
-            if str(order_id) not in payload.bloomfilter:
-                is_ask = self.order_book.ask_exists(order_id)
-                entry = self.order_book.get_ask(order_id) if is_ask else self.order_book.get_bid(order_id)
-
-                # Send the block pair associated with this tick
-                tick_block = self.persistence.get_block_with_hash(entry.tick.block_hash)
-                if tick_block:
-                    other_tick_block = self.persistence.get_linked(tick_block)
-                    if other_tick_block:
-                        self.send_block_pair(tick_block, other_tick_block, source_address)
+        # We do not respond to a peer that is still receiving the response to its previous sync message
+        now = time.time()
+        if source_address in self.sync_queues or self.sync_times.get(source_address, 0) > now - ORDERBOOK_SYNC_INTERVAL:
+            return
+        if len(self.sync_times) >= MAX_SYNC_PEERS:
+            self.sync_times = {address: sync_time for address, sync_time in self.sync_times.iteritems()
+                               if sync_time > now - ORDERBOOK_SYNC_INTERVAL}
+        self.sync_times[source_address] = now
+
+        # The cached block pairs of the ticks that are no longer in the order book are dropped
+        tick_block_pairs = {}
+        missing_block_pairs = deque()
+        for entry in chain(self.order_book.asks.get_tick_entries(), self.order_book.bids.get_tick_entries()):
+            block_pair = self.tick_block_pairs.get(entry.tick.block_hash)
+            if block_pair:
+                tick_block_pairs[entry.tick.block_hash] = block_pair
+
+            if str(entry.order_id) not in payload.bloomfilter:
+                block_pair = block_pair or self.get_tick_block_pair(entry.tick)
+                if block_pair:
+                    tick_block_pairs[entry.tick.block_hash] = block_pair
+                    missing_block_pairs.append(block_pair)
+        self.tick_block_pairs = tick_block_pairs
+
+        if missing_block_pairs:
+            self.sync_queues[source_address] = missing_block_pairs
+            self.send_sync_block_pairs(source_address)
+
+    def get_tick_block_pair(self, tick):
+        """
+        Return the block pair associated with a tick, or None if we do not have both blocks.
+        """
+        tick_block = self.persistence.get_block_with_hash(tick.block_hash)
+        if tick_block:
+            other_tick_block = self.persistence.get_linked(tick_block)
+            if other_tick_block:
+                return tick_block, other_tick_block
+        return None
+
+    def send_sync_block_pairs(self, address):
+        """
+        Send the next batch of block pairs that a peer misses in its order book.
+        """
+        queue = self.sync_queues[address]
+        for _ in xrange(min(SYNC_BATCH_SIZE, len(queue))):
+            tick_block, other_tick_block = queue.popleft()
+            self.send_block_pair(tick_block, other_tick_block, address)
+
+        if queue:
+            self.register_task("sync_block_pairs_%s:%d" % address,
+                               reactor.callLater(SYNC_BATCH_INTERVAL, self.send_sync_block_pairs, address))
+        else:
+            del self.sync_queues[address]
 
     def ping_peer(self, peer):
         """
@@ -1072,11 +1132,11 @@ class MarketCommunity(TrustChainCommunity):
 
         if matched_tick_entry and payload.decline_reason == DeclineMatchReason.OTHER_ORDER_COMPLETED:
             self.order_book.remove_tick(matched_tick_entry.order_id)
-            self.order_book.completed_orders.append(matched_tick_entry.order_id)
+            self.order_book.completed_orders.add(matched_tick_entry.order_id)
 
         if payload.decline_reason == DeclineMatchReason.ORDER_COMPLETED and tick_entry:
             self.order_book.remove_tick(tick_entry.order_id)
-            self.order_book.completed_orders.append(tick_entry.order_id)
+            self.order_book.completed_orders.add(tick_entry.order_id)
         elif tick_entry:
             # Search for a new match
             self.match(tick_entry.tick)
@@ -1698,7 +1758,27 @@ class MarketCommunity(TrustChainCommunity):
 
     def compute_reputation(self):
         """
-        Compute the reputation of peers in the community
+        Compute the reputation of peers in the community. Only the blocks that have been added since the previous
+        computation are read from the database, the scores are computed on a worker thread.
         """
-        rep_manager = TemporalPagerankReputationManager(self.persistence.get_all_blocks())
-        self.reputation_dict = rep_manager.compute(self.my_peer.public_key.key_to_bin())
+        if self.reputation_computation:
+            # The blocks may not be added to the reputation manager while it is computing the scores
+            return self.reputation_computation
+
+        last_block_rowid = self.persistence.get_last_block_rowid()
+        self.reputation_manager.add_blocks(self.persistence.get_blocks_in_rowid_range(self.reputation_block_rowid,
+                                                                                      last_block_rowid))
+        self.reputation_block_rowid = last_block_rowid
+
+        def on_reputation_computed(reputation_dict):
+            self.reputation_computation = None
+            self.reputation_dict = reputation_dict
+
+        def on_reputation_failure(failure):
+            self.reputation_computation = None
+            self.logger.error("Failed to compute the reputation of peers: %s", failure.getErrorMessage())
+
+        self.reputation_computation = deferToThread(self.reputation_manager.compute,
+                                                    self.my_peer.public_key.key_to_bin())
+        self.reputation_computation.addCallbacks(on_reputation_computed, on_reputation_failure)
+        return self.reputation_computation
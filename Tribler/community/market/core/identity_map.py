@@ -0,0 +1,91 @@
+class IdentityMap(object):
+    """
+    An identity map in front of a database table. It keeps the objects that have been loaded from or added to the
+    database, so every row is represented by a single object, and it tracks which of these objects changed since they
+    were last written to the database.
+
+    The state of an object is captured by a snapshot, a representation of the object as it is stored in the database.
+    The changes of an object are found by comparing its snapshot with the snapshot that was taken when the object was
+    last written to the database.
+    """
+
+    def __init__(self, get_snapshot):
+        """
+        :param get_snapshot: a function that returns the snapshot of an object
+        """
+        self.get_snapshot = get_snapshot
+        self.objects = {}
+        self.stored_snapshots = {}  # The snapshots of the objects, as they are stored in the database
+        self.dirty_keys = set()
+        self.deleted_keys = set()
+        self.complete = False  # Whether all rows of the table have been loaded
+
+    def __contains__(self, key):
+        return key in self.objects
+
+    def __len__(self):
+        return len(self.objects)
+
+    def get(self, key):
+        return self.objects.get(key)
+
+    def is_deleted(self, key):
+        return key in self.deleted_keys
+
+    def has_changes(self):
+        return bool(self.dirty_keys or self.deleted_keys)
+
+    def load(self, key, obj):
+        """
+        Register an object that has been read from the database. If the row has already been loaded, the object that
+        was loaded before is returned, since it might contain changes that have not been written to the database yet.
+        """
+        if key in self.objects or key in self.deleted_keys:
+            return self.objects.get(key)
+        self.objects[key] = obj
+        self.stored_snapshots[key] = self.get_snapshot(obj)
+        return obj
+
+    def add(self, key, obj):
+        """
+        Register a new or changed object.
+        """
+        self.objects[key] = obj
+        self.dirty_keys.add(key)
+
+    def remove(self, key):
+        self.objects.pop(key, None)
+        self.stored_snapshots.pop(key, None)
+        self.dirty_keys.discard(key)
+        self.deleted_keys.add(key)
+
+    def get_changes(self):
+        """
+        Return the changes since the previous call, and consider them written to the database.
+        :return: a tuple with a list of (key, snapshot) of the new objects, a list of (key, stored snapshot, snapshot)
+        of the changed objects and a list with the keys of the deleted objects
+        """
+        new, changed = [], []
+        for key in self.dirty_keys:
+            snapshot = self.get_snapshot(self.objects[key])
+            stored_snapshot = self.stored_snapshots.get(key)
+            if stored_snapshot is None:
+                new.append((key, snapshot))
+            elif snapshot != stored_snapshot:
+                changed.append((key, stored_snapshot, snapshot))
+            self.stored_snapshots[key] = snapshot
+
+        # An object that is deleted and then added again is written after its old row has been deleted
+        deleted = list(self.deleted_keys)
+        self.dirty_keys = set()
+        self.deleted_keys = set()
+        return new, changed, deleted
+
+
+def get_changed_columns(column_names, stored_row, row):
+    """
+    Compare two database representations of an object.
+    :return: a dictionary with the names and new values of the columns that changed
+    """
+    return dict((name, value) for name, stored_value, value in zip(column_names, stored_row, row)
+                if value != stored_value)
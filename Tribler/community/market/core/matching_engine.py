@@ -114,10 +114,11 @@ class PriceTimeStrategy(MatchingStrategy):
 
     def _search_for_quantity_in_order_book(self, order_id, price, price_level, quantity_to_trade, tick_price, is_ask):
         """
-        Search through the price levels in the order book
+        Search through the price levels in the order book, starting at the best price level. The price levels are
+        walked iteratively, so the depth of the order book is not limited by the recursion limit.
         :param order_id: The order id of the tick to match
-        :param price: The price of the price level
-        :param price_level: The price level to search in
+        :param price: The price of the first price level
+        :param price_level: The first price level to search in
         :param quantity_to_trade: The quantity still to be matched
         :param tick_price: The price of the tick being matched
         :param is_ask: Whether our tick being matched is an ask
@@ -130,82 +131,61 @@ class PriceTimeStrategy(MatchingStrategy):
         :return: A list of tuples containing the ticks and the matched quantity
         :rtype: [(str, TickEntry, Quantity)]
         """
-        if price_level is None:  # Last price level
-            return []
-
-        assert isinstance(order_id, OrderId), type(order_id)
-        assert isinstance(price, Price), type(price)
-        assert isinstance(price_level, PriceLevel), type(price_level)
-        assert isinstance(quantity_to_trade, Quantity), type(quantity_to_trade)
-        assert isinstance(tick_price, Price), type(tick_price)
-        assert isinstance(is_ask, bool), type(is_ask)
-
-        self._logger.debug("Searching in price level: %f (depth: %f, reserved: %f)",
-                           float(price), float(price_level.depth), float(price_level.reserved))
-
-        if quantity_to_trade <= price_level.depth - price_level.reserved:
-            # All the quantity can be matched in this price level
-            return self._search_for_quantity_in_price_level(order_id, price_level.first_tick,
-                                                            quantity_to_trade,
-                                                            tick_price, is_ask)
-        else:
-            # Not all the quantity can be matched in this price level
-            return self._search_for_quantity_in_order_book_partial(order_id, price, price_level, quantity_to_trade,
-                                                                   tick_price, is_ask)
-
-    def _search_for_quantity_in_order_book_partial(self, order_id, price, price_level, quantity_to_trade,
-                                                   tick_price, is_ask):
-        # Not all the quantity can be matched in this price level
-        matching_ticks = self._search_for_quantity_in_price_level(order_id, price_level.first_tick, quantity_to_trade,
-                                                                  tick_price, is_ask)
-
-        matched_quantity = Quantity(0, quantity_to_trade.wallet_id)
-        for _, _, quantity in matching_ticks:
-            matched_quantity += quantity
-        quantity_to_trade -= matched_quantity
-
-        if is_ask:
-            return self._search_for_quantity_in_order_book_partial_ask(order_id, price, quantity_to_trade,
-                                                                       matching_ticks, tick_price, is_ask)
-        else:
-            return self._search_for_quantity_in_order_book_partial_bid(order_id, price, quantity_to_trade,
-                                                                       matching_ticks, tick_price, is_ask)
-
-    def _search_for_quantity_in_order_book_partial_ask(self, order_id, price, quantity_to_trade, matching_ticks,
-                                                       tick_price, is_ask):
-        # Select the next price level
-        try:
-            # Search the next price level
-            next_price, next_price_level = self.order_book.bids.\
-                get_price_level_list(price.wallet_id, quantity_to_trade.wallet_id).prev_item(price)
-        except IndexError:
-            return matching_ticks
+        matching_ticks = []
+
+        while price_level is not None:  # None means that we passed the last price level
+            assert isinstance(order_id, OrderId), type(order_id)
+            assert isinstance(price, Price), type(price)
+            assert isinstance(price_level, PriceLevel), type(price_level)
+            assert isinstance(quantity_to_trade, Quantity), type(quantity_to_trade)
+            assert isinstance(tick_price, Price), type(tick_price)
+            assert isinstance(is_ask, bool), type(is_ask)
 
-        if tick_price > next_price:  # Price is too low
-            return matching_ticks
+            self._logger.debug("Searching in price level: %f (depth: %f, reserved: %f)",
+                               float(price), float(price_level.depth), float(price_level.reserved))
 
-        matching_ticks += self._search_for_quantity_in_order_book(order_id, next_price, next_price_level,
-                                                                  quantity_to_trade, tick_price, is_ask)
+            if quantity_to_trade <= price_level.depth - price_level.reserved:
+                # All the quantity can be matched in this price level
+                matching_ticks += self._search_for_quantity_in_price_level(order_id, price_level.first_tick,
+                                                                           quantity_to_trade, tick_price, is_ask)
+                break
+
+            # Not all the quantity can be matched in this price level
+            level_matching_ticks = self._search_for_quantity_in_price_level(order_id, price_level.first_tick,
+                                                                            quantity_to_trade, tick_price, is_ask)
+            for _, _, quantity in level_matching_ticks:
+                quantity_to_trade -= quantity
+            matching_ticks += level_matching_ticks
+
+            next_price_level = self._get_next_price_level(price, quantity_to_trade.wallet_id, tick_price, is_ask)
+            if next_price_level is None:
+                break
+            price, price_level = next_price_level
 
         return matching_ticks
 
-    def _search_for_quantity_in_order_book_partial_bid(self, order_id, price, quantity_to_trade, matching_ticks,
-                                                       tick_price, is_ask):
-        # Select the next price level
+    def _get_next_price_level(self, price, quantity_wallet_id, tick_price, is_ask):
+        """
+        Select the price level after the given price: the next lower bid when we match an ask, the next higher ask
+        when we match a bid.
+        :return: A tuple with the price and the price level, or None if there is no next price level within the price
+                 of the tick being matched
+        :rtype: (Price, PriceLevel)
+        """
         try:
-            # Search the next price level
-            next_price, next_price_level = self.order_book.asks.\
-                get_price_level_list(price.wallet_id, quantity_to_trade.wallet_id).succ_item(price)
+            if is_ask:
+                next_price, next_price_level = self.order_book.bids.\
+                    get_price_level_list(price.wallet_id, quantity_wallet_id).prev_item(price)
+            else:
+                next_price, next_price_level = self.order_book.asks.\
+                    get_price_level_list(price.wallet_id, quantity_wallet_id).succ_item(price)
         except IndexError:
-            return matching_ticks
-
-        if tick_price < next_price:  # Price is too high
-            return matching_ticks
+            return None
 
-        matching_ticks += self._search_for_quantity_in_order_book(order_id, next_price, next_price_level,
-                                                                  quantity_to_trade, tick_price, is_ask)
+        if (is_ask and tick_price > next_price) or (not is_ask and tick_price < next_price):  # Price is out of range
+            return None
 
-        return matching_ticks
+        return next_price, next_price_level
 
     def _search_for_quantity_in_price_level(self, order_id, tick_entry, quantity_to_trade, tick_price, is_ask):
         """
@@ -223,48 +203,37 @@ class PriceTimeStrategy(MatchingStrategy):
         :return: A list of tuples containing the ticks and the matched quantity
         :rtype: [(str, TickEntry, Quantity)]
         """
-        if tick_entry is None:  # Last tick
-            return []
-
-        assert isinstance(order_id, OrderId), type(order_id)
-        assert isinstance(tick_entry, TickEntry), type(tick_entry)
-        assert isinstance(quantity_to_trade, Quantity), type(quantity_to_trade)
-        assert isinstance(tick_price, Price), type(tick_price)
-        assert isinstance(is_ask, bool), type(is_ask)
-
-        if quantity_to_trade <= tick_entry.quantity - tick_entry.reserved_for_matching \
-                and not tick_entry.is_blocked_for_matching(order_id):
-            # All the quantity can be matched in this tick
-            return self._search_for_quantity_in_price_level_total(tick_entry, quantity_to_trade)
-        else:
-            # Not all the quantity can be matched in this tick
-            return self._search_for_quantity_in_price_level_partial(order_id, tick_entry, quantity_to_trade,
-                                                                    tick_price, is_ask)
+        matching_ticks = []
 
-    def _search_for_quantity_in_price_level_total(self, tick_entry, quantity_to_trade):
-        trading_quantity = quantity_to_trade
+        while tick_entry is not None:  # None means that we passed the last tick
+            assert isinstance(order_id, OrderId), type(order_id)
+            assert isinstance(tick_entry, TickEntry), type(tick_entry)
+            assert isinstance(quantity_to_trade, Quantity), type(quantity_to_trade)
+            assert isinstance(tick_price, Price), type(tick_price)
+            assert isinstance(is_ask, bool), type(is_ask)
 
-        self._logger.debug("Match with the id (%s) was found: price %f, quantity %f",
-                           str(tick_entry.order_id), float(tick_entry.price), float(trading_quantity))
+            available_quantity = tick_entry.quantity - tick_entry.reserved_for_matching
+            is_blocked = tick_entry.is_blocked_for_matching(order_id)
 
-        return [(self.get_unique_match_id(), tick_entry, trading_quantity)]
+            if quantity_to_trade <= available_quantity and not is_blocked:
+                # All the quantity can be matched in this tick
+                self._logger.debug("Match with the id (%s) was found: price %f, quantity %f",
+                                   str(tick_entry.order_id), float(tick_entry.price), float(quantity_to_trade))
+                matching_ticks.append((self.get_unique_match_id(), tick_entry, quantity_to_trade))
+                break
 
-    def _search_for_quantity_in_price_level_partial(self, order_id, tick_entry, quantity_to_trade, tick_price, is_ask):
-        matched_quantity = tick_entry.quantity - tick_entry.reserved_for_matching
-        matching_ticks = []
+            # Not all the quantity can be matched in this tick
+            if available_quantity.fixed_point > 0 and not is_blocked:
+                quantity_to_trade -= available_quantity
 
-        if matched_quantity > Quantity(0, matched_quantity.wallet_id) and not \
-                tick_entry.is_blocked_for_matching(order_id):
-            quantity_to_trade -= matched_quantity
+                self._logger.debug("Match with the id (%s) was found: price %f, quantity %f",
+                                   str(tick_entry.order_id), float(tick_entry.price), float(available_quantity))
 
-            self._logger.debug("Match with the id (%s) was found: price %f, quantity %f",
-                               str(tick_entry.order_id), float(tick_entry.price), float(matched_quantity))
+                matching_ticks.append((self.get_unique_match_id(), tick_entry, available_quantity))
 
-            matching_ticks = [(self.get_unique_match_id(), tick_entry, matched_quantity)]
+            # Search the next tick
+            tick_entry = tick_entry.next_tick
 
-        # Search the next tick
-        matching_ticks += self._search_for_quantity_in_price_level(order_id, tick_entry.next_tick, quantity_to_trade,
-                                                                   tick_price, is_ask)
         return matching_ticks
 
 
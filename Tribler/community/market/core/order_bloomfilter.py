@@ -0,0 +1,55 @@
+from Tribler.pyipv8.ipv8.deprecated.bloomfilter import BloomFilter
+
+ERROR_RATE = 0.005
+MIN_CAPACITY = 64
+
+
+class OrderBloomFilter(object):
+    """
+    A Bloom filter with the ids of the orders in an order book, that is sent to other matchmakers to synchronise the
+    order books. The ids of new orders are added to the filter as they are inserted in the order book. Removed ids
+    cannot be taken out of a Bloom filter, so the filter is rebuilt when it is full, or when too many of its ids
+    have been removed.
+    """
+
+    def __init__(self, error_rate=ERROR_RATE):
+        self.error_rate = error_rate
+        self.bloomfilter = None
+        self.capacity = 0
+        self.size = 0
+        self.removed = 0
+
+    def invalidate(self):
+        self.bloomfilter = None
+
+    def add(self, order_id):
+        if self.bloomfilter is None:
+            return
+        if self.size >= self.capacity:
+            self.invalidate()
+            return
+
+        self.bloomfilter.add(str(order_id))
+        self.size += 1
+
+    def remove(self, _):
+        self.removed += 1
+        if self.removed > self.capacity / 4:
+            self.invalidate()
+
+    def get_bloomfilter(self, get_order_ids):
+        """
+        Return the Bloom filter, it is rebuilt if it is out of date.
+        :param get_order_ids: a function that returns the ids of all orders in the order book
+        :rtype: BloomFilter
+        """
+        if self.bloomfilter is None:
+            order_ids = [str(order_id) for order_id in get_order_ids()]
+            # We leave room for new orders, so the filter does not have to be rebuilt every time an order is added
+            self.capacity = max(2 * len(order_ids), MIN_CAPACITY)
+            self.bloomfilter = BloomFilter(self.error_rate, self.capacity, prefix=' ')
+            if order_ids:
+                self.bloomfilter.add_keys(order_ids)
+            self.size = len(order_ids)
+            self.removed = 0
+        return self.bloomfilter
@@ -1,8 +1,16 @@
 import logging
 from abc import ABCMeta, abstractmethod
 
+from twisted.internet import reactor
+
+from Tribler.community.market.core.identity_map import IdentityMap, get_changed_columns
 from Tribler.community.market.core.message import TraderId
 from Tribler.community.market.core.order import OrderNumber, OrderId, Order
+from Tribler.community.market.database import ORDER_COLUMNS
+from Tribler.pyipv8.ipv8.taskmanager import TaskManager
+
+# The interval (in seconds) at which the changes of the orders are written to the database
+FLUSH_INTERVAL = 1.0
 
 
 class OrderRepository(object):
@@ -42,6 +50,13 @@ class OrderRepository(object):
     def next_identity(self):
         return
 
+    def flush(self):
+        """
+        Write the pending changes to the storage backend. Repositories that store every change immediately do not
+        have to override this method.
+        """
+        pass
+
 
 class MemoryOrderRepository(OrderRepository):
     """A repository for orders in the order manager stored in memory"""
@@ -122,8 +137,12 @@ class MemoryOrderRepository(OrderRepository):
         return OrderId(TraderId(self._mid), OrderNumber(self._next_id))
 
 
-class DatabaseOrderRepository(OrderRepository):
-    """A repository that stores orders in the database"""
+class DatabaseOrderRepository(OrderRepository, TaskManager):
+    """
+    A repository that stores orders in the database. The orders that have been loaded or added are kept in an
+    identity map, so they are only read from the database once. Changes are written to the database in batches, in a
+    single transaction every FLUSH_INTERVAL seconds, and only the columns that changed are updated.
+    """
 
     def __init__(self, mid, persistence):
         """
@@ -132,7 +151,7 @@ class DatabaseOrderRepository(OrderRepository):
         """
         super(DatabaseOrderRepository, self).__init__()
 
-        self._logger.info("Memory order repository used")
+        self._logger.info("Database order repository used")
 
         try:
             int(mid, 16)
@@ -141,12 +160,28 @@ class DatabaseOrderRepository(OrderRepository):
 
         self._mid = mid
         self.persistence = persistence
+        self._orders = IdentityMap(self.get_snapshot)
+        self._next_order_number = None
+
+    @staticmethod
+    def get_snapshot(order):
+        """
+        Return the database representation of an order and its reserved ticks.
+        """
+        reserved_ticks = dict(((unicode(order_id.trader_id), unicode(order_id.order_number)),
+                               (float(quantity), unicode(quantity.wallet_id)))
+                              for order_id, quantity in order.reserved_ticks.iteritems())
+        return order.to_database(), reserved_ticks
 
     def find_all(self):
         """
         :rtype: [Order]
         """
-        return self.persistence.get_all_orders()
+        if not self._orders.complete:
+            for order in self.persistence.get_all_orders():
+                self._orders.load(order.order_id, order)
+            self._orders.complete = True
+        return self._orders.objects.values()
 
     def find_by_id(self, order_id):
         """
@@ -159,31 +194,78 @@ class DatabaseOrderRepository(OrderRepository):
 
         self._logger.debug("Order with the id: " + str(order_id) + " was searched for in the order repository")
 
-        return self.persistence.get_order(order_id)
+        order = self._orders.get(order_id)
+        if order or self._orders.complete or self._orders.is_deleted(order_id):
+            return order
+
+        order = self.persistence.get_order(order_id)
+        return self._orders.load(order_id, order) if order else None
 
     def add(self, order):
         """
         :param order: The order to add to the database
         :type order: Order
         """
-        self.persistence.add_order(order)
+        self._orders.add(order.order_id, order)
+        self.schedule_flush()
 
     def update(self, order):
         """
         :param order: The order to update
         :type order: Order
         """
-        self.delete_by_id(order.order_id)
-        self.add(order)
+        self._orders.add(order.order_id, order)
+        self.schedule_flush()
 
     def delete_by_id(self, order_id):
         """
         :param order_id: The id of the order to remove
         """
-        self.persistence.delete_order(order_id)
+        self._orders.remove(order_id)
+        self.schedule_flush()
 
     def next_identity(self):
         """
         :rtype OrderId
         """
-        return OrderId(TraderId(self._mid), OrderNumber(self.persistence.get_next_order_number()))
+        # The orders that have not been written to the database yet also have an order number
+        if self._next_order_number is None:
+            self._next_order_number = self.persistence.get_next_order_number()
+        order_number = self._next_order_number
+        self._next_order_number += 1
+        return OrderId(TraderId(self._mid), OrderNumber(order_number))
+
+    def schedule_flush(self):
+        if not self.is_pending_task_active("flush_orders"):
+            self.register_task("flush_orders", reactor.callLater(FLUSH_INTERVAL, self.flush))
+
+    def flush(self):
+        """
+        Write the changes to the orders since the last flush to the database
+        """
+        self.cancel_pending_task("flush_orders")
+        if not self._orders.has_changes():
+            return
+
+        new_orders, changed_orders, deleted_order_ids = self._orders.get_changes()
+        updated_columns, reserved_ticks, removed_reserved_ticks = [], [], []
+        for order_id, (stored_row, stored_reserved_ticks), (row, snapshot_reserved_ticks) in changed_orders:
+            columns = get_changed_columns(ORDER_COLUMNS, stored_row, row)
+            if columns:
+                updated_columns.append((order_id, columns))
+
+            order_key = row[:2]
+            reserved_ticks += [order_key + reserved_key + values
+                               for reserved_key, values in snapshot_reserved_ticks.iteritems()
+                               if stored_reserved_ticks.get(reserved_key) != values]
+            removed_reserved_ticks += [order_key + reserved_key for reserved_key in stored_reserved_ticks
+                                       if reserved_key not in snapshot_reserved_ticks]
+
+        for order_id, (row, snapshot_reserved_ticks) in new_orders:
+            reserved_ticks += [row[:2] + reserved_key + values
+                               for reserved_key, values in snapshot_reserved_ticks.iteritems()]
+
+        # A new order might replace an order that was stored before it was loaded, so we remove the old rows first
+        self.persistence.apply_order_changes([row for _, (row, _) in new_orders], updated_columns, reserved_ticks,
+                                             removed_reserved_ticks,
+                                             deleted_order_ids + [order_id for order_id, _ in new_orders])
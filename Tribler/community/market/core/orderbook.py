@@ -1,13 +1,16 @@
 import logging
 import time
+from collections import OrderedDict
 
 from twisted.internet import reactor
-from twisted.internet.defer import fail
-from twisted.internet.task import deferLater
+from twisted.internet.defer import Deferred, fail
+from twisted.internet.task import LoopingCall
 from twisted.python.failure import Failure
 
+from Tribler.Core.Utilities.timer_wheel import TimerWheel
 from Tribler.community.market.core.message import TraderId
 from Tribler.community.market.core.order import OrderId, OrderNumber
+from Tribler.community.market.core.order_bloomfilter import OrderBloomFilter
 from Tribler.community.market.core.price import Price
 from Tribler.community.market.core.quantity import Quantity
 from Tribler.community.market.core.side import Side
@@ -17,6 +20,50 @@ from Tribler.community.market.core.timestamp import Timestamp
 from Tribler.community.market.database import MarketDB
 from Tribler.pyipv8.ipv8.taskmanager import TaskManager
 
+# The interval (in seconds) at which the timed out ticks are removed from the order book
+EXPIRY_INTERVAL = 1.0
+
+# The interval (in seconds) at which the changes of the ticks are written to the database
+FLUSH_INTERVAL = 1.0
+
+MAX_COMPLETED_ORDERS = 100000
+COMPLETED_ORDER_MAX_AGE = 3600
+
+
+class CompletedOrders(object):
+    """
+    The ids of the orders that have been completed, so we do not insert their ticks again. The set is bounded: an
+    order id is forgotten after max_age seconds, or earlier when more than max_size orders have been completed.
+    """
+
+    def __init__(self, max_size=MAX_COMPLETED_ORDERS, max_age=COMPLETED_ORDER_MAX_AGE):
+        self.max_size = max_size
+        self.max_age = max_age
+        self._completed = OrderedDict()
+
+    def __contains__(self, order_id):
+        return order_id in self._completed
+
+    def __len__(self):
+        return len(self._completed)
+
+    def add(self, order_id, now=None):
+        now = time.time() if now is None else now
+        self._completed.pop(order_id, None)
+        self._completed[order_id] = now
+        self.age_out(now)
+
+    def age_out(self, now=None):
+        """
+        Forget the oldest order ids, until the set is within its bounds.
+        """
+        now = time.time() if now is None else now
+        while self._completed:
+            order_id, completed_at = next(self._completed.iteritems())
+            if len(self._completed) <= self.max_size and completed_at + self.max_age > now:
+                break
+            del self._completed[order_id]
+
 
 class OrderBook(TaskManager):
     """
@@ -30,7 +77,12 @@ class OrderBook(TaskManager):
         self._logger = logging.getLogger(self.__class__.__name__)
         self._bids = Side()
         self._asks = Side()
-        self.completed_orders = []
+        self.completed_orders = CompletedOrders()
+        self.order_bloomfilter = OrderBloomFilter()
+
+        # Instead of a delayed call for every tick, the deadlines of the ticks are kept in a timer wheel
+        self.expiry_wheel = TimerWheel(EXPIRY_INTERVAL, now=time.time())
+        self.timeout_deferreds = {}
 
     def timeout_ask(self, order_id):
         ask = self.get_ask(order_id).tick
@@ -45,6 +97,36 @@ class OrderBook(TaskManager):
     def on_timeout_error(self, _):
         pass
 
+    def schedule_timeout(self, tick):
+        """
+        Schedule the removal of a tick when it times out.
+        :return: a Deferred that fires with the tick when it has timed out
+        """
+        deferred = Deferred()
+        self.timeout_deferreds[tick.order_id] = deferred
+        self.expiry_wheel.schedule(tick.order_id, float(tick.timestamp) + float(tick.timeout))
+        if not self.is_pending_task_active("expire_ticks"):
+            self.register_task("expire_ticks", LoopingCall(self.expire_ticks)).start(EXPIRY_INTERVAL, now=False)
+        return deferred.addErrback(self.on_timeout_error)
+
+    def cancel_timeout(self, order_id):
+        self.expiry_wheel.cancel(order_id)
+        deferred = self.timeout_deferreds.pop(order_id, None)
+        if deferred:
+            deferred.cancel()
+
+    def expire_ticks(self):
+        """
+        Remove all ticks that have timed out since the last call, in the order of their deadlines.
+        """
+        for order_id in self.expiry_wheel.advance(time.time()):
+            deferred = self.timeout_deferreds.pop(order_id)
+            tick = self.timeout_ask(order_id) if self._asks.tick_exists(order_id) else self.timeout_bid(order_id)
+            deferred.callback(tick)
+
+        if not self.expiry_wheel:
+            self.cancel_pending_task("expire_ticks")
+
     def on_invalid_tick_insert(self, _):
         self._logger.warning("Invalid tick inserted in order book.")
 
@@ -56,10 +138,8 @@ class OrderBook(TaskManager):
 
         if not self._asks.tick_exists(ask.order_id) and ask.order_id not in self.completed_orders and ask.is_valid():
             self._asks.insert_tick(ask)
-            timeout_delay = float(ask.timestamp) + float(ask.timeout) - time.time()
-            task = deferLater(reactor, timeout_delay, self.timeout_ask, ask.order_id)
-            self.register_task("ask_%s_timeout" % ask.order_id, task)
-            return task.addErrback(self.on_timeout_error)
+            self.order_bloomfilter.add(ask.order_id)
+            return self.schedule_timeout(ask)
         return fail(Failure(RuntimeError("ask invalid"))).addErrback(self.on_invalid_tick_insert)
 
     def remove_ask(self, order_id):
@@ -69,8 +149,9 @@ class OrderBook(TaskManager):
         assert isinstance(order_id, OrderId), type(order_id)
 
         if self._asks.tick_exists(order_id):
-            self.cancel_pending_task("ask_%s_timeout" % order_id)
+            self.cancel_timeout(order_id)
             self._asks.remove_tick(order_id)
+            self.order_bloomfilter.remove(order_id)
 
     def insert_bid(self, bid):
         """
@@ -80,10 +161,8 @@ class OrderBook(TaskManager):
 
         if not self._bids.tick_exists(bid.order_id) and bid.order_id not in self.completed_orders and bid.is_valid():
             self._bids.insert_tick(bid)
-            timeout_delay = float(bid.timestamp) + float(bid.timeout) - time.time()
-            task = deferLater(reactor, timeout_delay, self.timeout_bid, bid.order_id)
-            self.register_task("bid_%s_timeout" % bid.order_id, task)
-            return task.addErrback(self.on_timeout_error)
+            self.order_bloomfilter.add(bid.order_id)
+            return self.schedule_timeout(bid)
         return fail(Failure(RuntimeError("bid invalid"))).addErrback(self.on_invalid_tick_insert)
 
     def remove_bid(self, order_id):
@@ -93,8 +172,9 @@ class OrderBook(TaskManager):
         assert isinstance(order_id, OrderId), type(order_id)
 
         if self._bids.tick_exists(order_id):
-            self.cancel_pending_task("bid_%s_timeout" % order_id)
+            self.cancel_timeout(order_id)
             self._bids.remove_tick(order_id)
+            self.order_bloomfilter.remove(order_id)
 
     def update_ticks(self, ask_order_dict, bid_order_dict, traded_quantity, unreserve=True):
         """
@@ -126,7 +206,7 @@ class OrderBook(TaskManager):
                 tick.release_for_matching(traded_quantity)
             if tick.quantity <= Quantity(0, ask_order_dict["quantity_type"]):
                 self.remove_tick(tick.order_id)
-                self.completed_orders.append(tick.order_id)
+                self.completed_orders.add(tick.order_id)
         elif not self.tick_exists(ask_order_id) and new_ask_quantity > Quantity(0, ask_order_dict["quantity_type"]):
             ask = Ask(ask_order_id, Price(ask_order_dict["price"], ask_order_dict["price_type"]),
                       new_ask_quantity, Timeout(ask_order_dict["timeout"]), Timestamp(ask_order_dict["timestamp"]))
@@ -142,7 +222,7 @@ class OrderBook(TaskManager):
                 tick.release_for_matching(traded_quantity)
             if tick.quantity <= Quantity(0, bid_order_dict["quantity_type"]):
                 self.remove_tick(tick.order_id)
-                self.completed_orders.append(tick.order_id)
+                self.completed_orders.add(tick.order_id)
         elif not self.tick_exists(bid_order_id) and new_bid_quantity > Quantity(0, bid_order_dict["quantity_type"]):
             bid = Bid(bid_order_id, Price(bid_order_dict["price"], bid_order_dict["price_type"]),
                       new_bid_quantity, Timeout(bid_order_dict["timeout"]), Timestamp(bid_order_dict["timestamp"]))
@@ -304,10 +384,7 @@ class OrderBook(TaskManager):
         :return: The depth profile
         :rtype: list
         """
-        profile = []
-        for key, value in self._bids.get_price_level_list(price_wallet_id, quantity_wallet_id).items():
-            profile.append((key, value.depth))
-        return profile
+        return self._bids.get_price_level_list(price_wallet_id, quantity_wallet_id).get_depth_profile()
 
     def get_ask_side_depth_profile(self, price_wallet_id, quantity_wallet_id):
         """
@@ -316,10 +393,7 @@ class OrderBook(TaskManager):
         :return: The depth profile
         :rtype: list
         """
-        profile = []
-        for key, value in self._asks.get_price_level_list(price_wallet_id, quantity_wallet_id).items():
-            profile.append((key, value.depth))
-        return profile
+        return self._asks.get_price_level_list(price_wallet_id, quantity_wallet_id).get_depth_profile()
 
     def bid_relative_price(self, price):
         """
@@ -369,6 +443,13 @@ class OrderBook(TaskManager):
         """
         return self._asks.get_min_price_list(price_wallet_id, quantity_wallet_id)
 
+    def get_bloomfilter(self):
+        """
+        Return a Bloom filter with the ids of all orders in the order book.
+        :rtype: BloomFilter
+        """
+        return self.order_bloomfilter.get_bloomfilter(self.get_order_ids)
+
     def get_order_ids(self):
         """
         Return all IDs of the orders in the orderbook, both asks and bids. The returned list is sorted.
@@ -412,6 +493,8 @@ class OrderBook(TaskManager):
 
     def cancel_all_pending_tasks(self):
         super(OrderBook, self).cancel_all_pending_tasks()
+        for order_id in self.timeout_deferreds.keys():
+            self.cancel_timeout(order_id)
         for order_id in self.get_order_ids():
             self.get_tick(order_id).cancel_all_pending_tasks()
 
@@ -419,7 +502,8 @@ class OrderBook(TaskManager):
 class DatabaseOrderBook(OrderBook):
     """
     This class adds support for a persistency backend to store ticks.
-    For now, it only provides methods to save all ticks to the database or to restore all ticks from the database.
+    Every insertion, removal and quantity change of a tick is recorded as it happens. The recorded changes are written
+    to the database in batches, in a single transaction every FLUSH_INTERVAL seconds.
     """
     def __init__(self, database):
         super(DatabaseOrderBook, self).__init__()
@@ -427,21 +511,78 @@ class DatabaseOrderBook(OrderBook):
         assert isinstance(database, MarketDB)
 
         self.database = database
+        # The ticks that changed since the last flush, by order id. A removed tick is recorded as None.
+        self.pending_ticks = {}
+
+    def record_tick(self, order_id, tick):
+        self.pending_ticks[order_id] = tick
+        if not self.is_pending_task_active("flush_ticks"):
+            self.register_task("flush_ticks", reactor.callLater(FLUSH_INTERVAL, self.save_to_database))
+
+    def insert_ask(self, ask):
+        exists = self.tick_exists(ask.order_id)
+        deferred = super(DatabaseOrderBook, self).insert_ask(ask)
+        if not exists and self.tick_exists(ask.order_id):
+            self.record_tick(ask.order_id, ask)
+        return deferred
+
+    def insert_bid(self, bid):
+        exists = self.tick_exists(bid.order_id)
+        deferred = super(DatabaseOrderBook, self).insert_bid(bid)
+        if not exists and self.tick_exists(bid.order_id):
+            self.record_tick(bid.order_id, bid)
+        return deferred
+
+    def remove_ask(self, order_id):
+        if self.ask_exists(order_id):
+            self.record_tick(order_id, None)
+        super(DatabaseOrderBook, self).remove_ask(order_id)
+
+    def remove_bid(self, order_id):
+        if self.bid_exists(order_id):
+            self.record_tick(order_id, None)
+        super(DatabaseOrderBook, self).remove_bid(order_id)
+
+    def update_ticks(self, ask_order_dict, bid_order_dict, traded_quantity, unreserve=True):
+        super(DatabaseOrderBook, self).update_ticks(ask_order_dict, bid_order_dict, traded_quantity, unreserve)
+
+        # The quantities of the ticks that are still in the order book might have changed
+        for order_dict in (ask_order_dict, bid_order_dict):
+            order_id = OrderId(TraderId(order_dict["trader_id"]), OrderNumber(order_dict["order_number"]))
+            tick_entry = self.get_tick(order_id)
+            if tick_entry:
+                self.record_tick(order_id, tick_entry.tick)
 
     def save_to_database(self):
         """
-        Write all ticks to the database
+        Write the ticks that changed since the last call to the database
         """
-        self.database.delete_all_ticks()
-        for order_id in self.get_order_ids():
-            tick = self.get_tick(order_id)
-            if tick.is_valid():
-                self.database.add_tick(tick.tick)
+        self.cancel_pending_task("flush_ticks")
+        if not self.pending_ticks:
+            return
+
+        pending_ticks, self.pending_ticks = self.pending_ticks, {}
+        self.database.apply_tick_changes([tick for tick in pending_ticks.itervalues() if tick],
+                                         [order_id for order_id, tick in pending_ticks.iteritems() if not tick])
 
     def restore_from_database(self):
         """
-        Restore ticks from the database
+        Restore ticks from the database. The ticks are added to the sides directly, ordered by price and time, so the
+        price levels are built by appending to them and the time priority within a price level is preserved.
         """
-        for tick in self.database.get_ticks():
-            if not self.tick_exists(tick.order_id) and tick.is_valid():
-                self.insert_ask(tick) if tick.is_ask() else self.insert_bid(tick)
+        ticks = sorted(self.database.get_ticks(), key=lambda tick: (float(tick.price), float(tick.timestamp)))
+        for tick in ticks:
+            if self.tick_exists(tick.order_id):
+                continue
+            if not tick.is_valid():
+                self.pending_ticks[tick.order_id] = None
+                continue
+
+            (self._asks if tick.is_ask() else self._bids).insert_tick(tick)
+            self.schedule_timeout(tick)
+
+        # The restored ticks bypass the insert methods, so their order ids are not in the Bloom filter yet
+        self.order_bloomfilter.invalidate()
+
+        # Remove the ticks that timed out while we were offline
+        self.save_to_database()
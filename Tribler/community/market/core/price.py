@@ -1,5 +1,14 @@
+# The number of decimals of a price. Prices are stored as an integer number of these units, to prevent float drift.
+PRICE_DECIMALS = 8
+PRICE_SCALE = 10 ** PRICE_DECIMALS
+
+
 class Price(object):
-    """Price is used for having a consistent comparable and usable class that deals with floats."""
+    """
+    Price is used for having a consistent comparable and usable class that deals with floats.
+    Internally, the price is a fixed-point integer, so arithmetic and comparisons do not involve floats.
+    """
+    __slots__ = ('_value', '_wallet_id')
 
     def __init__(self, price, wallet_id):
         """
@@ -20,9 +29,23 @@ class Price(object):
         if price < 0:
             raise ValueError("Price must be positive or zero")
 
-        self._price = price
+        self._value = int(round(price * PRICE_SCALE))
         self._wallet_id = wallet_id
 
+    @classmethod
+    def from_fixed_point(cls, value, wallet_id):
+        """
+        Create a price from its fixed-point integer value, without converting it from a float.
+        :raises ValueError: Thrown when the value is negative
+        """
+        if value < 0:
+            raise ValueError("Price must be positive or zero")
+
+        price = cls.__new__(cls)
+        price._value = value
+        price._wallet_id = wallet_id
+        return price
+
     @property
     def wallet_id(self):
         """
@@ -30,61 +53,67 @@ class Price(object):
         """
         return self._wallet_id
 
+    @property
+    def fixed_point(self):
+        """
+        The price as an integer number of 10^-PRICE_DECIMALS units.
+        :rtype: int
+        """
+        return self._value
+
     def __int__(self):
-        return int(self._price)
+        return int(float(self))
 
     def __float__(self):
-        return float(self._price)
+        return self._value / float(PRICE_SCALE)
 
     def __str__(self):
-        return "%f %s" % (self._price, self.wallet_id)
+        return "%f %s" % (float(self), self.wallet_id)
 
     def __add__(self, other):
-        if isinstance(other, Price) and self.wallet_id == other.wallet_id:
-            return Price(self._price + float(other), self._wallet_id)
+        if isinstance(other, Price) and self._wallet_id == other._wallet_id:
+            return Price.from_fixed_point(self._value + other._value, self._wallet_id)
         else:
             return NotImplemented
 
     def __sub__(self, other):
-        if isinstance(other, Price) and self.wallet_id == other.wallet_id:
-            return Price(self._price - float(other), self._wallet_id)
+        if isinstance(other, Price) and self._wallet_id == other._wallet_id:
+            return Price.from_fixed_point(self._value - other._value, self._wallet_id)
         else:
             return NotImplemented
 
     def __lt__(self, other):
-        if isinstance(other, Price) and self.wallet_id == other.wallet_id:
-            return self._price < float(other)
+        if isinstance(other, Price) and self._wallet_id == other._wallet_id:
+            return self._value < other._value
         else:
             return NotImplemented
 
     def __le__(self, other):
-        if isinstance(other, Price) and self.wallet_id == other.wallet_id:
-            return self._price <= float(other)
+        if isinstance(other, Price) and self._wallet_id == other._wallet_id:
+            return self._value <= other._value
         else:
             return NotImplemented
 
     def __eq__(self, other):
-        if not isinstance(other, Price) or self.wallet_id != other.wallet_id:
+        if not isinstance(other, Price) or self._wallet_id != other._wallet_id:
             return NotImplemented
-        elif self is other:
-            return True
         else:
-            return self._price == float(other)
+            return self._value == other._value
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
     def __gt__(self, other):
-        if isinstance(other, Price) and self.wallet_id == other.wallet_id:
-            return self._price > float(other)
+        if isinstance(other, Price) and self._wallet_id == other._wallet_id:
+            return self._value > other._value
         else:
             return NotImplemented
 
     def __ge__(self, other):
-        if isinstance(other, Price) and self.wallet_id == other.wallet_id:
-            return self._price >= float(other)
+        if isinstance(other, Price) and self._wallet_id == other._wallet_id:
+            return self._value >= other._value
         else:
             return NotImplemented
 
     def __hash__(self):
-        return hash(self._price)
+        return hash(self._value)
@@ -1,16 +1,35 @@
+from bisect import bisect_left, bisect_right
+
 from Tribler.community.market.core.price import Price
 from Tribler.community.market.core.pricelevel import PriceLevel
 
 
 class PriceLevelList(object):
     """
-    Sorted doubly linked dictionary implementation.
+    Sorted dictionary of price levels. The prices are kept in a sorted list, so a price is looked up with a binary
+    search. Next to the prices, we keep their fixed-point values, which can be compared without calling into Python
+    code, and the price levels in the same order, so the levels can be walked without hashing the prices.
     """
 
     def __init__(self):
         super(PriceLevelList, self).__init__()
         self._price_list = []
-        self._price_level_dictionary = {}
+        self._price_keys = []
+        self._price_levels = []
+
+    def _index(self, price):
+        """
+        Return the index of a price in the price list.
+
+        :type price: Price
+        :rtype: int
+        :raises ValueError: Thrown when the price is not in the price level list
+        """
+        key = price.fixed_point
+        index = bisect_left(self._price_keys, key)
+        if index == len(self._price_keys) or self._price_keys[index] != key:
+            raise ValueError("Price %s is not in the price level list" % price)
+        return index
 
     def insert(self, price, price_level):
         """
@@ -20,9 +39,11 @@ class PriceLevelList(object):
         assert isinstance(price, Price), type(price)
         assert isinstance(price_level, PriceLevel), type(price_level)
 
-        self._price_list.append(price)
-        self._price_list.sort()
-        self._price_level_dictionary[price] = price_level
+        key = price.fixed_point
+        index = bisect_right(self._price_keys, key)
+        self._price_keys.insert(index, key)
+        self._price_list.insert(index, price)
+        self._price_levels.insert(index, price_level)
 
     def remove(self, price):
         """
@@ -30,8 +51,10 @@ class PriceLevelList(object):
         """
         assert isinstance(price, Price), type(price)
 
-        self._price_list.remove(price)
-        del self._price_level_dictionary[price]
+        index = self._index(price)
+        del self._price_keys[index]
+        del self._price_list[index]
+        del self._price_levels[index]
 
     def succ_item(self, price):
         """
@@ -42,11 +65,10 @@ class PriceLevelList(object):
         """
         assert isinstance(price, Price), type(price)
 
-        index = self._price_list.index(price) + 1
+        index = self._index(price) + 1
         if index >= len(self._price_list):
             raise IndexError
-        succ_price = self._price_list[index]
-        return succ_price, self._price_level_dictionary[succ_price]
+        return self._price_list[index], self._price_levels[index]
 
     def prev_item(self, price):
         """
@@ -57,11 +79,10 @@ class PriceLevelList(object):
         """
         assert isinstance(price, Price), type(price)
 
-        index = self._price_list.index(price) - 1
+        index = self._index(price) - 1
         if index < 0:
             raise IndexError
-        prev_price = self._price_list[index]
-        return prev_price, self._price_level_dictionary[prev_price]
+        return self._price_list[index], self._price_levels[index]
 
     def min_key(self):
         """
@@ -87,14 +108,19 @@ class PriceLevelList(object):
         :type reverse: bool
         :rtype: List[(Price, PriceLevel)]
         """
-        items = []
-        for price in self._price_list:
-            if reverse:
-                items.insert(0, (price, self._price_level_dictionary[price]))
-            else:
-                items.append((price, self._price_level_dictionary[price]))
+        items = zip(self._price_list, self._price_levels)
+        if reverse:
+            items.reverse()
         return items
 
+    def get_depth_profile(self):
+        """
+        Returns a sorted list of price, depth tuples, built in one pass over the price levels
+
+        :rtype: List[(Price, Quantity)]
+        """
+        return zip(self._price_list, [price_level.depth for price_level in self._price_levels])
+
     def get_ticks_list(self):
         """
         Returns a list describing all ticks.
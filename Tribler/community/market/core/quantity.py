@@ -1,5 +1,15 @@
+# The number of decimals of a quantity. Quantities are stored as an integer number of these units, to prevent float
+# drift when depths and reservations are updated.
+QUANTITY_DECIMALS = 8
+QUANTITY_SCALE = 10 ** QUANTITY_DECIMALS
+
+
 class Quantity(object):
-    """Quantity is used for having a consistent comparable and usable class."""
+    """
+    Quantity is used for having a consistent comparable and usable class.
+    Internally, the quantity is a fixed-point integer, so arithmetic and comparisons do not involve floats.
+    """
+    __slots__ = ('_value', '_wallet_id')
 
     def __init__(self, quantity, wallet_id):
         """
@@ -17,9 +27,19 @@ class Quantity(object):
         if not isinstance(wallet_id, str):
             raise ValueError("Wallet id must be a string")
 
-        self._quantity = quantity
+        self._value = int(round(quantity * QUANTITY_SCALE))
         self._wallet_id = wallet_id
 
+    @classmethod
+    def from_fixed_point(cls, value, wallet_id):
+        """
+        Create a quantity from its fixed-point integer value, without converting it from a float.
+        """
+        quantity = cls.__new__(cls)
+        quantity._value = value
+        quantity._wallet_id = wallet_id
+        return quantity
+
     @property
     def wallet_id(self):
         """
@@ -27,61 +47,67 @@ class Quantity(object):
         """
         return self._wallet_id
 
+    @property
+    def fixed_point(self):
+        """
+        The quantity as an integer number of 10^-QUANTITY_DECIMALS units.
+        :rtype: int
+        """
+        return self._value
+
     def __int__(self):
-        return int(self._quantity)
+        return int(float(self))
 
     def __float__(self):
-        return float(self._quantity)
+        return self._value / float(QUANTITY_SCALE)
 
     def __str__(self):
-        return "%f %s" % (self._quantity, self.wallet_id)
+        return "%f %s" % (float(self), self.wallet_id)
 
     def __add__(self, other):
-        if isinstance(other, Quantity) and self.wallet_id == other.wallet_id:
-            return Quantity(self._quantity + float(other), self._wallet_id)
+        if isinstance(other, Quantity) and self._wallet_id == other._wallet_id:
+            return Quantity.from_fixed_point(self._value + other._value, self._wallet_id)
         else:
             return NotImplemented
 
     def __sub__(self, other):
-        if isinstance(other, Quantity) and self.wallet_id == other.wallet_id:
-            return Quantity(self._quantity - float(other), self._wallet_id)
+        if isinstance(other, Quantity) and self._wallet_id == other._wallet_id:
+            return Quantity.from_fixed_point(self._value - other._value, self._wallet_id)
         else:
             return NotImplemented
 
     def __lt__(self, other):
-        if isinstance(other, Quantity) and self.wallet_id == other.wallet_id:
-            return self._quantity < float(other)
+        if isinstance(other, Quantity) and self._wallet_id == other._wallet_id:
+            return self._value < other._value
         else:
             return NotImplemented
 
     def __le__(self, other):
-        if isinstance(other, Quantity) and self.wallet_id == other.wallet_id:
-            return self._quantity <= float(other)
+        if isinstance(other, Quantity) and self._wallet_id == other._wallet_id:
+            return self._value <= other._value
         else:
             return NotImplemented
 
     def __eq__(self, other):
-        if not isinstance(other, Quantity) or self.wallet_id != other.wallet_id:
+        if not isinstance(other, Quantity) or self._wallet_id != other._wallet_id:
             return NotImplemented
-        elif self is other:
-            return True
         else:
-            return self._quantity == float(other)
+            return self._value == other._value
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
     def __gt__(self, other):
-        if isinstance(other, Quantity) and self.wallet_id == other.wallet_id:
-            return self._quantity > float(other)
+        if isinstance(other, Quantity) and self._wallet_id == other._wallet_id:
+            return self._value > other._value
         else:
             return NotImplemented
 
     def __ge__(self, other):
-        if isinstance(other, Quantity) and self.wallet_id == other.wallet_id:
-            return self._quantity >= float(other)
+        if isinstance(other, Quantity) and self._wallet_id == other._wallet_id:
+            return self._value >= other._value
         else:
             return NotImplemented
 
     def __hash__(self):
-        return hash(self._quantity)
+        return hash(self._value)
@@ -124,6 +124,13 @@ class Side(object):
                 self._remove_price_level(tick.price, tick.quantity.wallet_id)
             del self._tick_map[order_id]
 
+    def get_tick_entries(self):
+        """
+        :return: the entries of all ticks in this side, in no particular order
+        :rtype: [TickEntry]
+        """
+        return self._tick_map.values()
+
     def get_price_level_list(self, price_wallet_id, quantity_wallet_id):
         """
         :return: PriceLevelList
@@ -1,8 +1,16 @@
 import logging
 from abc import ABCMeta, abstractmethod
 
+from twisted.internet import reactor
+
+from Tribler.community.market.core.identity_map import IdentityMap, get_changed_columns
 from Tribler.community.market.core.message import TraderId
 from Tribler.community.market.core.transaction import TransactionNumber, TransactionId, Transaction
+from Tribler.community.market.database import TRANSACTION_COLUMNS
+from Tribler.pyipv8.ipv8.taskmanager import TaskManager
+
+# The interval (in seconds) at which the changes of the transactions are written to the database
+FLUSH_INTERVAL = 1.0
 
 
 class TransactionRepository(object):
@@ -42,6 +50,13 @@ class TransactionRepository(object):
     def next_identity(self):
         return
 
+    def flush(self):
+        """
+        Write the pending changes to the storage backend. Repositories that store every change immediately do not
+        have to override this method.
+        """
+        pass
+
 
 class MemoryTransactionRepository(TransactionRepository):
     """A repository for transactions in the transaction manager stored in memory"""
@@ -121,8 +136,13 @@ class MemoryTransactionRepository(TransactionRepository):
         return TransactionId(TraderId(self._mid), TransactionNumber(self._next_id))
 
 
-class DatabaseTransactionRepository(TransactionRepository):
-    """A repository for transactions in the transaction manager stored in a database"""
+class DatabaseTransactionRepository(TransactionRepository, TaskManager):
+    """
+    A repository for transactions in the transaction manager stored in a database. The transactions that have been
+    loaded or added are kept in an identity map, so they are only read from the database once. Changes are written to
+    the database in batches, in a single transaction every FLUSH_INTERVAL seconds. Only the columns that changed are
+    updated and only the new payments of a transaction are inserted.
+    """
 
     def __init__(self, mid, persistence):
         """
@@ -135,12 +155,26 @@ class DatabaseTransactionRepository(TransactionRepository):
 
         self._mid = mid
         self.persistence = persistence
+        self._transactions = IdentityMap(self.get_snapshot)
+        self._next_transaction_number = None
+
+    @staticmethod
+    def get_snapshot(transaction):
+        """
+        Return the database representation of a transaction and its number of payments. Payments are only added to a
+        transaction, so the new payments are the ones after the stored number of payments.
+        """
+        return transaction.to_database(), len(transaction.payments)
 
     def find_all(self):
         """
         :rtype: [Transaction]
         """
-        return self.persistence.get_all_transactions()
+        if not self._transactions.complete:
+            for transaction in self.persistence.get_all_transactions():
+                self._transactions.load(transaction.transaction_id, transaction)
+            self._transactions.complete = True
+        return self._transactions.objects.values()
 
     def find_by_id(self, transaction_id):
         """
@@ -154,31 +188,74 @@ class DatabaseTransactionRepository(TransactionRepository):
         self._logger.debug("Transaction with the id: %s was searched for in the transaction repository",
                            str(transaction_id))
 
-        return self.persistence.get_transaction(transaction_id)
+        transaction = self._transactions.get(transaction_id)
+        if transaction or self._transactions.complete or self._transactions.is_deleted(transaction_id):
+            return transaction
+
+        transaction = self.persistence.get_transaction(transaction_id)
+        return self._transactions.load(transaction_id, transaction) if transaction else None
 
     def add(self, transaction):
         """
         :param transaction: The transaction to add to the database
         :type transaction: Transaction
         """
-        self.persistence.add_transaction(transaction)
+        self._transactions.add(transaction.transaction_id, transaction)
+        self.schedule_flush()
 
     def update(self, transaction):
         """
         :param transaction: The transaction to update
         :type transaction: Transaction
         """
-        self.delete_by_id(transaction.transaction_id)
-        self.add(transaction)
+        self._transactions.add(transaction.transaction_id, transaction)
+        self.schedule_flush()
 
     def delete_by_id(self, transaction_id):
         """
         :param transaction_id: The id of the transaction to remove
         """
-        self.persistence.delete_transaction(transaction_id)
+        self._transactions.remove(transaction_id)
+        self.schedule_flush()
 
     def next_identity(self):
         """
         :rtype: TransactionId
         """
-        return TransactionId(TraderId(self._mid), TransactionNumber(self.persistence.get_next_transaction_number()))
+        # The transactions that have not been written to the database yet also have a transaction number
+        if self._next_transaction_number is None:
+            self._next_transaction_number = self.persistence.get_next_transaction_number()
+        transaction_number = self._next_transaction_number
+        self._next_transaction_number += 1
+        return TransactionId(TraderId(self._mid), TransactionNumber(transaction_number))
+
+    def schedule_flush(self):
+        if not self.is_pending_task_active("flush_transactions"):
+            self.register_task("flush_transactions", reactor.callLater(FLUSH_INTERVAL, self.flush))
+
+    def flush(self):
+        """
+        Write the changes to the transactions since the last flush to the database
+        """
+        self.cancel_pending_task("flush_transactions")
+        if not self._transactions.has_changes():
+            return
+
+        new_transactions, changed_transactions, deleted_transaction_ids = self._transactions.get_changes()
+        updated_columns, new_payments = [], []
+        for transaction_id, (stored_row, stored_num_payments), (row, num_payments) in changed_transactions:
+            columns = get_changed_columns(TRANSACTION_COLUMNS, stored_row, row)
+            if columns:
+                updated_columns.append((transaction_id, columns))
+            payments = self._transactions.get(transaction_id).payments[stored_num_payments:num_payments]
+            new_payments += [payment.to_database() for payment in payments]
+
+        for transaction_id, _ in new_transactions:
+            new_payments += [payment.to_database() for payment in self._transactions.get(transaction_id).payments]
+
+        # A new transaction might replace a transaction that was stored before it was loaded, so we remove the old
+        # rows first
+        self.persistence.apply_transaction_changes([row for _, (row, _) in new_transactions], updated_columns,
+                                                   new_payments,
+                                                   deleted_transaction_ids
+                                                   + [transaction_id for transaction_id, _ in new_transactions])
@@ -17,6 +17,15 @@ DATABASE_DIRECTORY = path.join(u"sqlite")
 DATABASE_PATH = path.join(DATABASE_DIRECTORY, u"market.db")
 # Version to keep track if the db schema needs to be updated.
 LATEST_DB_VERSION = 2
+# The columns of the orders and transactions tables, in the order of their database representations
+ORDER_COLUMNS = (u"trader_id", u"order_number", u"price", u"price_type", u"quantity", u"quantity_type",
+                 u"traded_quantity", u"timeout", u"order_timestamp", u"completed_timestamp", u"is_ask", u"cancelled",
+                 u"verified")
+TRANSACTION_COLUMNS = (u"trader_id", u"transaction_number", u"order_trader_id", u"order_number", u"partner_trader_id",
+                       u"partner_order_number", u"price", u"price_type", u"transferred_price", u"quantity",
+                       u"quantity_type", u"transferred_quantity", u"transaction_timestamp", u"sent_wallet_info",
+                       u"received_wallet_info", u"incoming_address", u"outgoing_address",
+                       u"partner_incoming_address", u"partner_outgoing_address", u"match_id")
 # Schema for the Market DB.
 schema = u"""
 CREATE TABLE IF NOT EXISTS blocks(
@@ -159,6 +168,19 @@ class MarketDB(TrustChainDB):
         """
         return self._get(u"WHERE block_hash = ?", (buffer(hash),))
 
+    def get_last_block_rowid(self):
+        """
+        Return the row id of the block that has been added last, or 0 if there are no blocks.
+        """
+        return self.execute(u"SELECT MAX(rowid) FROM blocks").next()[0] or 0
+
+    def get_blocks_in_rowid_range(self, first_rowid, last_rowid):
+        """
+        Return the blocks that have been added after the block with row id first_rowid, up to and including the
+        block with row id last_rowid.
+        """
+        return self._getall(u"WHERE rowid > ? AND rowid <= ?", (first_rowid, last_rowid))
+
     def get_all_orders(self):
         """
         Return all orders in the database.
@@ -201,6 +223,52 @@ class MarketDB(TrustChainDB):
                      (unicode(order_id.trader_id), unicode(order_id.order_number)))
         self.delete_reserved_ticks(order_id)
 
+    def apply_order_changes(self, new_orders, updated_columns, reserved_ticks, removed_reserved_ticks,
+                            deleted_order_ids):
+        """
+        Write the changes to the orders to the database, in a single transaction.
+        :param new_orders: the database representations of the new orders
+        :param updated_columns: a list of (order id, {column: value}) with the changed columns of stored orders
+        :param reserved_ticks: the database representations of the new and changed reserved ticks
+        :param removed_reserved_ticks: the keys (trader id, order number, reserved trader id, reserved order number)
+        of the reserved ticks that have been removed
+        :param deleted_order_ids: the ids of the deleted orders
+        """
+        deleted_keys = [(unicode(order_id.trader_id), unicode(order_id.order_number)) for order_id in deleted_order_ids]
+        self.executemany(u"DELETE FROM orders WHERE trader_id = ? AND order_number = ?", deleted_keys)
+        self.executemany(u"DELETE FROM orders_reserved_ticks WHERE trader_id = ? AND order_number = ?", deleted_keys)
+
+        self.executemany(u"INSERT OR REPLACE INTO orders (%s) VALUES(%s)"
+                         % (u",".join(ORDER_COLUMNS), u",".join(u"?" * len(ORDER_COLUMNS))), new_orders)
+        self.update_columns(u"orders", (u"trader_id", u"order_number"),
+                            [((unicode(order_id.trader_id), unicode(order_id.order_number)), columns)
+                             for order_id, columns in updated_columns])
+
+        self.executemany(u"DELETE FROM orders_reserved_ticks WHERE trader_id = ? AND order_number = ? "
+                         u"AND reserved_trader_id = ? AND reserved_order_number = ?", removed_reserved_ticks)
+        self.executemany(
+            u"INSERT OR REPLACE INTO orders_reserved_ticks (trader_id, order_number, reserved_trader_id,"
+            u"reserved_order_number, quantity, quantity_type) VALUES(?,?,?,?,?,?)", reserved_ticks)
+        self.commit()
+
+    def update_columns(self, table, key_columns, updated_columns):
+        """
+        Update some of the columns of existing rows. The rows in which the same columns changed are updated together.
+        :param table: the name of the table
+        :param key_columns: the names of the primary key columns
+        :param updated_columns: a list of (primary key, {column: value})
+        """
+        updates = {}
+        for key, columns in updated_columns:
+            column_names = tuple(sorted(columns))
+            updates.setdefault(column_names, []).append(tuple(columns[name] for name in column_names) + tuple(key))
+
+        for column_names, values in updates.iteritems():
+            self.executemany(u"UPDATE %s SET %s WHERE %s" % (table,
+                                                            u", ".join(u"%s = ?" % name for name in column_names),
+                                                            u" AND ".join(u"%s = ?" % name for name in key_columns)),
+                             values)
+
     def get_next_order_number(self):
         """
         Return the next order number from the database
@@ -284,6 +352,35 @@ class MarketDB(TrustChainDB):
                      (unicode(transaction_id.trader_id), unicode(transaction_id.transaction_number)))
         self.delete_payments(transaction_id)
 
+    def apply_transaction_changes(self, new_transactions, updated_columns, new_payments, deleted_transaction_ids):
+        """
+        Write the changes to the transactions to the database, in a single transaction. Payments are never changed
+        after they have been added to a transaction, so only the new payments are inserted.
+        :param new_transactions: the database representations of the new transactions
+        :param updated_columns: a list of (transaction id, {column: value}) with the changed columns of stored
+        transactions
+        :param new_payments: the database representations of the new payments
+        :param deleted_transaction_ids: the ids of the deleted transactions
+        """
+        deleted_keys = [(unicode(transaction_id.trader_id), int(transaction_id.transaction_number))
+                        for transaction_id in deleted_transaction_ids]
+        self.executemany(u"DELETE FROM transactions WHERE trader_id = ? AND transaction_number = ?", deleted_keys)
+        self.executemany(u"DELETE FROM payments WHERE transaction_trader_id = ? AND transaction_number = ?",
+                         deleted_keys)
+
+        self.executemany(u"INSERT OR REPLACE INTO transactions (%s) VALUES(%s)"
+                         % (u",".join(TRANSACTION_COLUMNS), u",".join(u"?" * len(TRANSACTION_COLUMNS))),
+                         new_transactions)
+        self.update_columns(u"transactions", (u"trader_id", u"transaction_number"),
+                            [((unicode(transaction_id.trader_id), int(transaction_id.transaction_number)), columns)
+                             for transaction_id, columns in updated_columns])
+
+        self.executemany(
+            u"INSERT OR IGNORE INTO payments (trader_id, message_number, transaction_trader_id, transaction_number,"
+            u"payment_id, transferee_quantity, quantity_type, transferee_price, price_type, address_from, address_to,"
+            u"timestamp, success) VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?)", new_payments)
+        self.commit()
+
     def get_next_transaction_number(self):
         """
         Return the next transaction number from the database
@@ -330,6 +427,19 @@ class MarketDB(TrustChainDB):
             u"VALUES(?,?,?,?,?,?,?,?,?,?)", tick.to_database())
         self.commit()
 
+    def apply_tick_changes(self, changed_ticks, removed_order_ids):
+        """
+        Store the new and updated ticks and delete the removed ticks, in a single transaction.
+        """
+        self.executemany(
+            u"INSERT OR REPLACE INTO ticks (trader_id, order_number, price, price_type, quantity,"
+            u"quantity_type, timeout, timestamp, is_ask, block_hash) "
+            u"VALUES(?,?,?,?,?,?,?,?,?,?)", [tick.to_database() for tick in changed_ticks])
+        self.executemany(u"DELETE FROM ticks WHERE trader_id = ? AND order_number = ?",
+                         [(unicode(order_id.trader_id), int(order_id.order_number))
+                          for order_id in removed_order_ids])
+        self.commit()
+
     def delete_all_ticks(self):
         """
         Remove all ticks from the database.
@@ -0,0 +1,136 @@
+from array import array
+
+import numpy as np
+import scipy.sparse
+
+from Tribler.community.market.reputation.reputation_manager import ReputationManager
+from Tribler.pyipv8.ipv8.attestation.trustchain.block import UNKNOWN_SEQ
+
+
+class IncrementalTemporalPagerankManager(ReputationManager):
+    """
+    This reputation manager computes the same Temporal PageRank scores as the TemporalPagerankReputationManager, but
+    it keeps the interaction graph between computations. New blocks are added to the graph with add_blocks, and the
+    power iteration starts from the scores of the previous computation, so it usually converges in a few iterations.
+
+    The graph is stored as a sparse matrix in coordinate format, in flat arrays, so it takes little memory and the
+    matrix can be built without iterating over Python objects. A computation does not modify the graph, so it can run
+    on a worker thread, as long as no blocks are added while it runs.
+    """
+
+    def __init__(self, blocks=(), alpha=0.85, max_iterations=100, tolerance=1.0e-6):
+        super(IncrementalTemporalPagerankManager, self).__init__([])
+        self.alpha = alpha
+        self.max_iterations = max_iterations
+        self.tolerance = tolerance
+
+        # The nodes of the graph are interactions, identified by (public key, sequence number)
+        self.node_indices = {}
+        self.node_public_keys = array('l')
+        self.public_key_indices = {}
+        self.public_keys = []
+
+        self.sources = array('l')
+        self.targets = array('l')
+        self.contributions = array('d')
+
+        # The indices of the nodes of the blocks that have been added, so a block is never added twice
+        self.added_blocks = set()
+
+        self.scores = np.zeros(0)
+        self.iterations = 0
+
+        self.add_blocks(blocks)
+
+    def get_node_index(self, public_key, sequence_number):
+        node = (public_key, sequence_number)
+        index = self.node_indices.get(node)
+        if index is None:
+            index = self.node_indices[node] = len(self.node_indices)
+            key_index = self.public_key_indices.get(public_key)
+            if key_index is None:
+                key_index = self.public_key_indices[public_key] = len(self.public_keys)
+                self.public_keys.append(public_key)
+            self.node_public_keys.append(key_index)
+        return index
+
+    def add_edge(self, source, target, contribution):
+        self.sources.append(source)
+        self.targets.append(target)
+        self.contributions.append(contribution)
+
+    def add_blocks(self, blocks):
+        """
+        Add the completed transactions in the given blocks to the interaction graph.
+        :return: the number of blocks that have been added
+        """
+        added = 0
+        for block in blocks:
+            if block.link_sequence_number == UNKNOWN_SEQ or block.transaction['type'] != 'tx_done' \
+                    or 'tx' not in block.transaction:
+                continue  # Don't consider half interactions
+
+            responder = self.get_node_index(block.public_key, block.sequence_number)
+            if responder in self.added_blocks:
+                continue
+            self.added_blocks.add(responder)
+            added += 1
+
+            requester = self.get_node_index(block.link_public_key, block.link_sequence_number)
+            next_requester = self.get_node_index(block.link_public_key, block.link_sequence_number + 1)
+            next_responder = self.get_node_index(block.public_key, block.sequence_number + 1)
+
+            is_price_btc = block.transaction["tx"]["quantity_type"] == "BTC"
+            value_exchange = block.transaction["tx"]["quantity"] if is_price_btc else block.transaction["tx"]["price"]
+
+            self.add_edge(requester, next_requester, value_exchange)
+            self.add_edge(requester, next_responder, value_exchange)
+            self.add_edge(responder, next_responder, value_exchange)
+            self.add_edge(responder, next_requester, value_exchange)
+        return added
+
+    def compute(self, own_public_key):
+        """
+        Compute the Temporal PageRank scores of all public keys, personalised for the given public key.
+        """
+        key_index = self.public_key_indices.get(own_public_key)
+        if key_index is None:
+            return {}
+
+        num_nodes = len(self.node_indices)
+        node_public_keys = np.frombuffer(self.node_public_keys, dtype=np.int_).copy()
+        personalisation = (node_public_keys == key_index).astype(np.float64)
+        personalisation /= personalisation.sum()
+
+        matrix = scipy.sparse.csr_matrix((np.frombuffer(self.contributions, dtype=np.float64).copy(),
+                                          (np.frombuffer(self.sources, dtype=np.int_).copy(),
+                                           np.frombuffer(self.targets, dtype=np.int_).copy())),
+                                         shape=(num_nodes, num_nodes))
+
+        # Normalise the contributions of the outgoing edges of every node. Nodes without outgoing edges (the latest
+        # interaction of every public key) distribute their score according to the personalisation.
+        out_contributions = np.asarray(matrix.sum(axis=1)).ravel()
+        dangling = out_contributions == 0
+        out_contributions[dangling] = 1
+        transition = (scipy.sparse.diags(1.0 / out_contributions) * matrix).T.tocsr()
+
+        # Start from the previous scores, the nodes that have been added since then start without a score
+        scores = np.zeros(num_nodes)
+        scores[:len(self.scores)] = self.scores
+        total_score = scores.sum()
+        scores = scores / total_score if total_score > 0 else np.full(num_nodes, 1.0 / num_nodes)
+
+        for iteration in xrange(1, self.max_iterations + 1):
+            previous_scores = scores
+            propagated = transition.dot(previous_scores) + previous_scores[dangling].sum() * personalisation
+            scores = self.alpha * propagated + (1 - self.alpha) * personalisation
+            if np.abs(scores - previous_scores).sum() < self.tolerance:
+                break
+        else:
+            self._logger.warning("Temporal PageRank did not converge in %d iterations", self.max_iterations)
+
+        self.scores = scores
+        self.iterations = iteration
+
+        sums = np.bincount(node_public_keys, weights=scores, minlength=len(self.public_keys))
+        return dict(zip(self.public_keys, sums.tolist()))
@@ -1,7 +1,12 @@
+import time
+from collections import OrderedDict, deque
+
+from twisted.internet.task import LoopingCall
+
 from Tribler.pyipv8.ipv8.deprecated.payload import IntroductionResponsePayload
 
 from Tribler.community.triblerchain.block import TriblerChainBlock
-from Tribler.community.triblerchain.database import TriblerChainDB
+from Tribler.community.triblerchain.database import TriblerChainDB, TriblerChainCrawlerDB
 from Tribler.pyipv8.ipv8.attestation.trustchain.community import TrustChainCommunity
 from Tribler.pyipv8.ipv8.keyvault.crypto import ECCrypto
 from Tribler.pyipv8.ipv8.peer import Peer
@@ -9,6 +14,17 @@ from Tribler.pyipv8.ipv8.util import blocking_call_on_reactor_thread
 
 MIN_TRANSACTION_SIZE = 1024 * 1024
 
+# The maximum number of crawl requests that are waiting for a response
+MAX_CRAWLS_IN_FLIGHT = 50
+# The time (in seconds) after which a crawl request without response no longer counts as in flight
+CRAWL_REQUEST_TIMEOUT = 10.0
+# The minimum time (in seconds) between two crawls of the same identity
+RECRAWL_INTERVAL = 60.0
+# The interval (in seconds) at which the crawled blocks are written to the database and the crawl rate is sampled
+CRAWLER_FLUSH_INTERVAL = 1.0
+# The number of samples over which the crawl rate is measured
+CRAWL_RATE_WINDOW = 60
+
 
 class TriblerChainCommunity(TrustChainCommunity):
     """
@@ -120,12 +136,94 @@ class TriblerChainCommunity(TrustChainCommunity):
 class TriblerChainCrawlerCommunity(TriblerChainCommunity):
     """
     Subclass of TriblerChainCommunity. Specifically, it requests a crawl when it receives an introduction response.
+
+    The identities that are discovered by the walkers are queued, and they are crawled as long as fewer than
+    max_crawls_in_flight crawl requests are waiting for a response, so the crawl rate is not limited by the latency of
+    a single peer. An identity is crawled at most once every RECRAWL_INTERVAL seconds. The crawled blocks are written
+    to the database in batches.
     """
+    DB_CLASS = TriblerChainCrawlerDB
+
+    def __init__(self, *args, **kwargs):
+        self.max_crawls_in_flight = kwargs.pop('max_crawls_in_flight', MAX_CRAWLS_IN_FLIGHT)
+        super(TriblerChainCrawlerCommunity, self).__init__(*args, **kwargs)
+        self.crawl_queue = OrderedDict()  # Map: public key -> peer
+        self.crawls_in_flight = {}  # Map: public key -> time at which the crawl request was sent
+        self.crawl_times = {}  # Map: public key -> time of the last crawl
+        self.crawl_samples = deque(maxlen=CRAWL_RATE_WINDOW + 1)  # (time, number of blocks, number of identities)
+
+        self.register_task("flush_crawled_blocks",
+                           LoopingCall(self.flush_crawled_blocks)).start(CRAWLER_FLUSH_INTERVAL, now=False)
+
+    def should_sign(self, block):
+        """
+        The crawler does not take part in transactions. Its blocks are written to the database in batches, so it
+        could create two blocks with the same sequence number.
+        """
+        return False
 
     def on_introduction_response(self, source_address, data):
         super(TriblerChainCrawlerCommunity, self).on_introduction_response(source_address, data)
 
         auth, _, _ = self._ez_unpack_auth(IntroductionResponsePayload, data)
-        peer = Peer(auth.public_key_bin, source_address)
+        self.queue_crawl(Peer(auth.public_key_bin, source_address))
+
+    def queue_crawl(self, peer):
+        public_key = peer.public_key.key_to_bin()
+        if public_key in self.crawl_queue or public_key in self.crawls_in_flight or \
+                time.time() - self.crawl_times.get(public_key, 0) < RECRAWL_INTERVAL:
+            return
 
-        self.send_crawl_request(peer, peer.public_key.key_to_bin())
+        self.crawl_queue[public_key] = peer
+        self.send_crawl_requests()
+
+    def send_crawl_requests(self):
+        """
+        Crawl the queued identities, up to the maximum number of crawl requests in flight.
+        """
+        now = time.time()
+        for public_key, request_time in self.crawls_in_flight.items():
+            if now - request_time >= CRAWL_REQUEST_TIMEOUT:
+                del self.crawls_in_flight[public_key]
+
+        while self.crawl_queue and len(self.crawls_in_flight) < self.max_crawls_in_flight:
+            public_key, peer = self.crawl_queue.popitem(last=False)
+            self.crawls_in_flight[public_key] = now
+            self.crawl_times[public_key] = now
+            self.send_crawl_request(peer, public_key)
+
+    def process_half_block(self, blk, peer):
+        # A block of a crawled identity that is sent by the identity itself means that its crawl request has been
+        # answered. Blocks of the identity that other peers pass on do not count, although a block that the identity
+        # broadcasts while it is being crawled is still taken for the answer.
+        if blk.public_key == peer.public_key.key_to_bin() and self.crawls_in_flight.pop(blk.public_key, None):
+            self.send_crawl_requests()
+        return super(TriblerChainCrawlerCommunity, self).process_half_block(blk, peer)
+
+    def flush_crawled_blocks(self):
+        self.persistence.flush()
+        self.crawl_samples.append((time.time(), self.persistence.num_crawled_blocks,
+                                   self.persistence.get_num_identities()))
+        self.send_crawl_requests()
+
+    def get_crawl_statistics(self):
+        """
+        Returns a dictionary with the progress and the rate of the crawler, the rates are measured over the last
+        CRAWL_RATE_WINDOW samples
+        """
+        blocks_per_second = identities_per_second = 0
+        if len(self.crawl_samples) > 1:
+            first_sample, last_sample = self.crawl_samples[0], self.crawl_samples[-1]
+            duration = last_sample[0] - first_sample[0]
+            if duration > 0:
+                blocks_per_second = (last_sample[1] - first_sample[1]) / duration
+                identities_per_second = (last_sample[2] - first_sample[2]) / duration
+
+        return {
+            "blocks": self.persistence.num_crawled_blocks,
+            "identities": self.persistence.get_num_identities(),
+            "blocks_per_second": blocks_per_second,
+            "identities_per_second": identities_per_second,
+            "crawls_in_flight": len(self.crawls_in_flight),
+            "crawls_queued": len(self.crawl_queue)
+        }
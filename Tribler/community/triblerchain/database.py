@@ -1,11 +1,62 @@
+import sys
+from bisect import bisect_right
+from collections import OrderedDict
+
 from Tribler.pyipv8.ipv8.attestation.trustchain.database import TrustChainDB
 
+# The number of crawled blocks that are written to the database in a single transaction
+CRAWLER_BATCH_SIZE = 500
+
+# The peers that an identity interacted with, with whether it helped them and whether they helped it. The table is
+# updated as blocks are added, so the statistics of an identity do not require reading all of its blocks.
+interactors_schema = u"""
+CREATE TABLE IF NOT EXISTS triblerchain_interactors(
+ public_key           TEXT NOT NULL,
+ link_public_key      TEXT NOT NULL,
+ helped               INTEGER NOT NULL,
+ helped_by            INTEGER NOT NULL,
+
+ PRIMARY KEY (public_key, link_public_key)
+ );
+"""
+
 
 class TriblerChainDB(TrustChainDB):
     """
     Persistence layer for the TriblerChain Community.
     """
-    LATEST_DB_VERSION = 4
+    LATEST_DB_VERSION = 5
+
+    def get_schema(self):
+        """
+        Return the schema for the database.
+        """
+        return super(TriblerChainDB, self).get_schema() + interactors_schema
+
+    def add_block(self, block):
+        """
+        Persist a block and update the interactors of its creator. The interactors are updated first, so they are
+        committed together with the block.
+        :param block: The data that will be saved.
+        """
+        self.add_interaction(block)
+        super(TriblerChainDB, self).add_block(block)
+
+    def add_interaction(self, block):
+        """
+        Record whether the creator of a block helped or has been helped by its counterparty. The changes are not
+        committed.
+        """
+        helped = int(block.transaction.get("up", 0)) > 0
+        helped_by = int(block.transaction.get("down", 0)) > 0
+        if not helped and not helped_by:
+            return
+
+        keys = (buffer(block.public_key), buffer(block.link_public_key))
+        self.execute(u"INSERT OR IGNORE INTO triblerchain_interactors (public_key, link_public_key, helped, helped_by) "
+                     u"VALUES(?,?,0,0)", keys)
+        self.execute(u"UPDATE triblerchain_interactors SET helped = MAX(helped, ?), helped_by = MAX(helped_by, ?) "
+                     u"WHERE public_key = ? AND link_public_key = ?", (int(helped), int(helped_by)) + keys)
 
     def get_num_unique_interactors(self, public_key):
         """
@@ -13,14 +64,10 @@ class TriblerChainDB(TrustChainDB):
         :param public_key: The public key of the member of which we want the information
         :return: A tuple of unique number of interactors that helped you and that you have helped respectively
         """
-        peers_you_helped = set()
-        peers_helped_you = set()
-        for block in self.get_latest_blocks(public_key, limit=-1):
-            if int(block.transaction["up"]) > 0:
-                peers_you_helped.add(block.link_public_key)
-            if int(block.transaction["down"]) > 0:
-                peers_helped_you.add(block.link_public_key)
-        return len(peers_you_helped), len(peers_helped_you)
+        peers_you_helped, peers_helped_you = self.execute(
+            u"SELECT COALESCE(SUM(helped), 0), COALESCE(SUM(helped_by), 0) FROM triblerchain_interactors "
+            u"WHERE public_key = ?", (buffer(public_key),)).next()
+        return peers_you_helped, peers_helped_you
 
     def get_upgrade_script(self, current_version):
         """
@@ -32,3 +79,137 @@ class TriblerChainDB(TrustChainDB):
             DROP TABLE IF EXISTS blocks;
             DROP TABLE IF EXISTS option;
             """
+        if current_version == 4:
+            return interactors_schema + u"UPDATE option SET value = '5' WHERE key = 'database_version';"
+
+    def check_database(self, database_version):
+        """
+        Ensure the proper schema is used by the database.
+        :param database_version: Current version of the database.
+        """
+        version = super(TriblerChainDB, self).check_database(database_version)
+
+        if database_version == u"4":
+            # The interactors of the blocks that have been stored before the table existed
+            for block in self._getall(u"", ()):
+                self.add_interaction(block)
+            self.commit()
+
+        return version
+
+
+class SequenceRanges(object):
+    """
+    The sequence numbers of the blocks of an identity that are held, as sorted, disjoint ranges. A crawled chain is
+    usually contiguous, so an identity takes a single range, independent of the length of its chain.
+    """
+    __slots__ = ('ranges',)
+
+    def __init__(self):
+        self.ranges = []  # A sorted list of [first sequence number, last sequence number]
+
+    def __contains__(self, sequence_number):
+        index = bisect_right(self.ranges, [sequence_number, sys.maxint]) - 1
+        return index >= 0 and self.ranges[index][1] >= sequence_number
+
+    def add(self, sequence_number):
+        """
+        Add a sequence number to the ranges.
+        :return: False if the sequence number was already in the ranges, True otherwise
+        """
+        index = bisect_right(self.ranges, [sequence_number, sys.maxint])
+        previous_range = self.ranges[index - 1] if index > 0 else None
+        next_range = self.ranges[index] if index < len(self.ranges) else None
+        if previous_range and previous_range[1] >= sequence_number:
+            return False
+
+        joins_previous = previous_range is not None and previous_range[1] == sequence_number - 1
+        joins_next = next_range is not None and next_range[0] == sequence_number + 1
+        if joins_previous and joins_next:
+            previous_range[1] = next_range[1]
+            del self.ranges[index]
+        elif joins_previous:
+            previous_range[1] = sequence_number
+        elif joins_next:
+            next_range[0] = sequence_number
+        else:
+            self.ranges.insert(index, [sequence_number, sequence_number])
+        return True
+
+
+class TriblerChainCrawlerDB(TriblerChainDB):
+    """
+    Persistence layer for the TriblerChain crawler.
+
+    Crawled blocks are written in batches of CRAWLER_BATCH_SIZE blocks, in a single transaction, or earlier when flush
+    is called. Blocks that are already held are recognised by the sequence number ranges of every identity, which are
+    kept in memory, so they are never inserted twice. A block that is waiting to be written can be retrieved with
+    get, and queries for multiple blocks, like the answers to crawl requests, write the current batch first. The
+    other queries for a single block do not see the current batch, so these blocks are not used to validate each
+    other.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.held_ranges = {}  # Map: public key -> SequenceRanges
+        self.pending_blocks = OrderedDict()  # Map: (public key, sequence number) -> block
+        self.num_crawled_blocks = 0
+        super(TriblerChainCrawlerDB, self).__init__(*args, **kwargs)
+
+        for public_key, sequence_number in self.execute(u"SELECT public_key, sequence_number FROM blocks"):
+            self.get_held_ranges(str(public_key)).add(sequence_number)
+
+    def get_held_ranges(self, public_key):
+        ranges = self.held_ranges.get(public_key)
+        if ranges is None:
+            ranges = self.held_ranges[public_key] = SequenceRanges()
+        return ranges
+
+    def get_num_identities(self):
+        return len(self.held_ranges)
+
+    def contains(self, block):
+        ranges = self.held_ranges.get(block.public_key)
+        return ranges is not None and block.sequence_number in ranges
+
+    def get(self, public_key, sequence_number):
+        block = self.pending_blocks.get((public_key, sequence_number))
+        if block:
+            return block
+        return super(TriblerChainCrawlerDB, self).get(public_key, sequence_number)
+
+    def _getall(self, query, params):
+        self.flush()
+        return super(TriblerChainCrawlerDB, self)._getall(query, params)
+
+    def add_block(self, block):
+        """
+        Add a block to the current batch, unless it is already held.
+        :param block: The data that will be saved.
+        """
+        if not self.get_held_ranges(block.public_key).add(block.sequence_number):
+            return
+
+        self.pending_blocks[(block.public_key, block.sequence_number)] = block
+        if len(self.pending_blocks) >= CRAWLER_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the current batch of blocks to the database.
+        """
+        if not self.pending_blocks:
+            return
+
+        blocks = self.pending_blocks.values()
+        self.pending_blocks = OrderedDict()
+        self.executemany(u"INSERT OR IGNORE INTO blocks (tx, public_key, sequence_number, link_public_key,"
+                         u"link_sequence_number, previous_hash, signature, block_hash) VALUES(?,?,?,?,?,?,?,?)",
+                         [block.pack_db_insert() for block in blocks])
+        for block in blocks:
+            self.add_interaction(block)
+        self.commit()
+        self.num_crawled_blocks += len(blocks)
+
+    def close(self, commit=True):
+        self.flush()
+        return super(TriblerChainCrawlerDB, self).close(commit)
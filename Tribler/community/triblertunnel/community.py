@@ -10,6 +10,9 @@ from Tribler.pyipv8.ipv8.messaging.anonymization.caches import ExtendRequestCach
 from twisted.internet.defer import inlineCallbacks, succeed, Deferred
 
 from Tribler.community.triblertunnel.dispatcher import TunnelDispatcher
+from Tribler.community.triblertunnel.scheduler import TrafficScheduler, TRAFFIC_CLASS_RELAY, TRAFFIC_CLASS_EXIT
+from Tribler.community.triblertunnel.sharding import get_circuit_shard, get_packet_circuit_id
+from Tribler.Core.Utilities.timer_wheel import TimerWheel
 from Tribler.Core.simpledefs import NTFY_TUNNEL, NTFY_IP_RECREATE, NTFY_REMOVE, NTFY_EXTENDED, NTFY_CREATED,\
     NTFY_JOINED, DLSTATUS_SEEDING, DLSTATUS_DOWNLOADING, DLSTATUS_STOPPED
 from Tribler.Core.Socks5.server import Socks5Server
@@ -22,6 +25,12 @@ from Tribler.pyipv8.ipv8.messaging.anonymization.tunnel import CIRCUIT_STATE_REA
     CIRCUIT_TYPE_DATA, CIRCUIT_TYPE_RENDEZVOUS, EXIT_NODE, RelayRoute
 from Tribler.pyipv8.ipv8.peer import Peer
 
+TIMER_DHT_LOOKUP = 0
+TIMER_INTRO_POINTS = 1
+
+# The number of seconds after which an introducing circuit that has not been established is recreated
+INTRO_POINT_TIMEOUT = 30
+
 
 class TriblerTunnelCommunity(HiddenTunnelCommunity):
     master_peer = Peer("3081a7301006072a8648ce3d020106052b81040027038192000402e1cd2a8158c078f5a048dd2caa4a868852e1758"
@@ -32,9 +41,16 @@ class TriblerTunnelCommunity(HiddenTunnelCommunity):
     def __init__(self, *args, **kwargs):
         self.tribler_session = kwargs.pop('tribler_session', None)
         self.triblerchain_community = kwargs.pop('triblerchain_community', None)
+
+        # When the circuits of this node are sharded over multiple processes, a tuple (shard index, number of shards)
+        self.circuit_shard = None
+        if self.tribler_session and self.tribler_session.config.get_tunnel_community_shards() > 1:
+            self.circuit_shard = (self.tribler_session.config.get_tunnel_community_shard_index(),
+                                  self.tribler_session.config.get_tunnel_community_shards())
         num_competing_slots = kwargs.pop('competing_slots', 15)
         num_random_slots = kwargs.pop('random_slots', 5)
         socks_listen_ports = kwargs.pop('socks_listen_ports', None)
+        socks_batched_udp = kwargs.pop('socks_batched_udp', False)
         super(TriblerTunnelCommunity, self).__init__(*args, **kwargs)
         self._use_main_thread = True
 
@@ -44,19 +60,28 @@ class TriblerTunnelCommunity(HiddenTunnelCommunity):
 
             if not socks_listen_ports:
                 socks_listen_ports = self.tribler_session.config.get_tunnel_community_socks5_listen_ports()
+            socks_batched_udp = self.tribler_session.config.get_tunnel_community_socks5_batched_udp()
         elif socks_listen_ports is None:
             socks_listen_ports = range(1080, 1085)
 
         self.bittorrent_peers = {}
         self.dispatcher = TunnelDispatcher(self)
+        self.traffic_scheduler = TrafficScheduler(super(TriblerTunnelCommunity, self).send_packet)
+        if self.tribler_session:
+            self.traffic_scheduler.set_rate_limits(
+                self.tribler_session.config.get_tunnel_community_max_circuit_rate() * 1024,
+                self.tribler_session.config.get_tunnel_community_max_relay_rate() * 1024,
+                self.tribler_session.config.get_tunnel_community_max_exit_rate() * 1024)
         self.download_states = {}
+        # The timers of the DHT lookups and introduction point checks of the downloads, see monitor_downloads
+        self.download_timers = TimerWheel(now=time.time())
         self.competing_slots = [(0, None)] * num_competing_slots  # 1st tuple item = token balance, 2nd = circuit id
         self.random_slots = [None] * num_random_slots
 
         # Start the SOCKS5 servers
         self.socks_servers = []
         for port in socks_listen_ports:
-            socks_server = Socks5Server(port, self.dispatcher)
+            socks_server = Socks5Server(port, self.dispatcher, batched_udp=socks_batched_udp)
             socks_server.start()
             self.socks_servers.append(socks_server)
 
@@ -362,6 +387,10 @@ class TriblerTunnelCommunity(HiddenTunnelCommunity):
 
         self.clean_from_slots(circuit_id)
 
+        self.traffic_scheduler.remove_circuit(circuit_id)
+        for removed_relay in removed_relays:
+            self.traffic_scheduler.remove_circuit(removed_relay.circuit_id)
+
         if self.tribler_session:
             for removed_relay in removed_relays:
                 self.tribler_session.notifier.notify(NTFY_TUNNEL, NTFY_REMOVE, removed_relay, removed_relay.sock_addr)
@@ -372,10 +401,44 @@ class TriblerTunnelCommunity(HiddenTunnelCommunity):
             self.tribler_session.notifier.notify(NTFY_TUNNEL, NTFY_REMOVE, exit_socket, exit_socket.sock_addr)
 
         self.clean_from_slots(circuit_id)
+        self.traffic_scheduler.remove_circuit(circuit_id)
 
         super(TriblerTunnelCommunity, self).remove_exit_socket(circuit_id, additional_info=additional_info,
                                                                remove_now=remove_now, destroy=destroy)
 
+    def send_packet(self, candidates, message_type, packet):
+        """
+        The packets of the circuits that we relay or exit are sent through the traffic scheduler, which enforces the
+        rate limits. The packets of our own circuits are sent right away.
+        """
+        circuit_id = get_packet_circuit_id(packet, self._prefix)
+        if circuit_id in self.relay_from_to:
+            traffic_class = TRAFFIC_CLASS_RELAY
+        elif circuit_id in self.exit_sockets:
+            traffic_class = TRAFFIC_CLASS_EXIT
+        else:
+            return super(TriblerTunnelCommunity, self).send_packet(candidates, message_type, packet)
+
+        return self.traffic_scheduler.send(circuit_id, traffic_class, candidates, message_type, packet)
+
+    def _generate_circuit_id(self, *args, **kwargs):
+        """
+        When the circuits are sharded over multiple processes, we only use circuit ids that are steered to our shard.
+        """
+        circuit_id = super(TriblerTunnelCommunity, self)._generate_circuit_id(*args, **kwargs)
+        if not self.circuit_shard:
+            return circuit_id
+
+        shard_index, num_shards = self.circuit_shard
+        while True:
+            circuit_id += shard_index - get_circuit_shard(circuit_id, num_shards)
+            if circuit_id >= 2 ** 32:
+                circuit_id -= num_shards
+            if circuit_id not in self.circuits and circuit_id not in self.relay_from_to \
+                    and circuit_id not in self.exit_sockets:
+                return circuit_id
+            circuit_id = super(TriblerTunnelCommunity, self)._generate_circuit_id(*args, **kwargs)
+
     def _ours_on_created_extended(self, circuit, payload):
         super(TriblerTunnelCommunity, self)._ours_on_created_extended(circuit, payload)
 
@@ -422,53 +485,90 @@ class TriblerTunnelCommunity(HiddenTunnelCommunity):
 
         self.hops = hops
 
-        for info_hash in set(new_states.keys() + self.download_states.keys()):
-            new_state = new_states.get(info_hash, None)
-            old_state = self.download_states.get(info_hash, None)
-            state_changed = new_state != old_state
+        # We only act on the downloads of which the state has changed, and on the timers that have expired
+        changed_states = {info_hash: new_state for info_hash, new_state in new_states.iteritems()
+                          if self.download_states.get(info_hash) != new_state}
+        for info_hash in self.download_states:
+            if info_hash not in new_states:
+                changed_states[info_hash] = None
+        self.download_states = new_states
 
+        stopped_info_hashes = set()
+        for info_hash, new_state in changed_states.iteritems():
             # Stop creating introduction points if the download doesn't exist anymore
-            if info_hash in self.infohash_ip_circuits and new_state is None:
-                del self.infohash_ip_circuits[info_hash]
-
-            # If the introducing circuit does not exist anymore or timed out: Build a new circuit
-            if info_hash in self.infohash_ip_circuits:
-                for (circuit_id, time_created) in self.infohash_ip_circuits[info_hash]:
-                    if circuit_id not in self.my_intro_points and time_created < time.time() - 30:
-                        self.infohash_ip_circuits[info_hash].remove((circuit_id, time_created))
-                        if self.tribler_session.notifier:
-                            self.tribler_session.notifier.notify(
-                                NTFY_TUNNEL, NTFY_IP_RECREATE, circuit_id, info_hash.encode('hex')[:6])
-                        self.logger.info('Recreate the introducing circuit for %s', info_hash.encode('hex'))
-                        self.create_introduction_point(info_hash)
-
-            time_elapsed = (time.time() - self.last_dht_lookup.get(info_hash, 0))
-            force_dht_lookup = time_elapsed >= self.settings.dht_lookup_interval
-            if (state_changed or force_dht_lookup) and \
-                    (new_state == DLSTATUS_SEEDING or new_state == DLSTATUS_DOWNLOADING):
-                self.logger.info('Do dht lookup to find hidden services peers for %s', info_hash.encode('hex'))
-                self.do_raw_dht_lookup(info_hash)
-
-            if state_changed and new_state == DLSTATUS_SEEDING:
+            if new_state is None:
+                self.infohash_ip_circuits.pop(info_hash, None)
+                self.download_timers.cancel((TIMER_INTRO_POINTS, info_hash))
+            else:
+                self.check_introduction_points(info_hash)
+
+            if new_state == DLSTATUS_SEEDING or new_state == DLSTATUS_DOWNLOADING:
+                self.do_periodic_dht_lookup(info_hash)
+            else:
+                self.download_timers.cancel((TIMER_DHT_LOOKUP, info_hash))
+
+            if new_state == DLSTATUS_SEEDING:
                 self.create_introduction_point(info_hash)
 
-            elif state_changed and new_state in [DLSTATUS_STOPPED, None]:
-                if info_hash in self.infohash_pex:
-                    self.infohash_pex.pop(info_hash)
+            elif new_state in [DLSTATUS_STOPPED, None]:
+                self.infohash_pex.pop(info_hash, None)
+                stopped_info_hashes.add(info_hash)
 
-                for cid, info_hash_hops in self.my_download_points.items():
-                    if info_hash_hops[0] == info_hash:
-                        self.remove_circuit(cid, 'download stopped', destroy=True)
+        if stopped_info_hashes:
+            self.remove_download_circuits(stopped_info_hashes)
 
-                for cid, info_hash_list in self.my_intro_points.items():
-                    for i in xrange(len(info_hash_list) - 1, -1, -1):
-                        if info_hash_list[i] == info_hash:
-                            info_hash_list.pop(i)
+        for timer, info_hash in self.download_timers.advance(time.time()):
+            if timer == TIMER_DHT_LOOKUP:
+                self.do_periodic_dht_lookup(info_hash)
+            elif timer == TIMER_INTRO_POINTS:
+                self.check_introduction_points(info_hash)
 
-                    if len(info_hash_list) == 0:
-                        self.remove_circuit(cid, 'all downloads stopped', destroy=True)
+    def do_periodic_dht_lookup(self, info_hash):
+        """
+        Do a DHT lookup to find the peers of a hidden service, and schedule the next lookup.
+        """
+        self.logger.info('Do dht lookup to find hidden services peers for %s', info_hash.encode('hex'))
+        self.do_raw_dht_lookup(info_hash)
+        self.download_timers.schedule((TIMER_DHT_LOOKUP, info_hash), time.time() + self.settings.dht_lookup_interval)
 
-        self.download_states = new_states
+    def check_introduction_points(self, info_hash):
+        """
+        Recreate the introducing circuits of a download that do not exist anymore or that timed out, and schedule the
+        next check.
+        """
+        ip_circuits = self.infohash_ip_circuits.get(info_hash)
+        if not ip_circuits:
+            return
+
+        now = time.time()
+        for (circuit_id, time_created) in list(ip_circuits):
+            if circuit_id not in self.my_intro_points and time_created < now - INTRO_POINT_TIMEOUT:
+                ip_circuits.remove((circuit_id, time_created))
+                if self.tribler_session.notifier:
+                    self.tribler_session.notifier.notify(
+                        NTFY_TUNNEL, NTFY_IP_RECREATE, circuit_id, info_hash.encode('hex')[:6])
+                self.logger.info('Recreate the introducing circuit for %s', info_hash.encode('hex'))
+                self.create_introduction_point(info_hash)
+
+        self.download_timers.schedule((TIMER_INTRO_POINTS, info_hash), now + INTRO_POINT_TIMEOUT)
+
+    def remove_download_circuits(self, info_hashes):
+        """
+        Remove the rendezvous and introduction points of the given stopped downloads. The circuits are indexed by
+        infohash once, so the cost does not depend on the number of stopped downloads.
+        """
+        download_point_circuits = {}
+        for cid, info_hash_hops in self.my_download_points.items():
+            download_point_circuits.setdefault(info_hash_hops[0], []).append(cid)
+
+        for info_hash in info_hashes:
+            for cid in download_point_circuits.get(info_hash, []):
+                self.remove_circuit(cid, 'download stopped', destroy=True)
+
+        for cid, info_hash_list in self.my_intro_points.items():
+            info_hash_list[:] = [info_hash for info_hash in info_hash_list if info_hash not in info_hashes]
+            if len(info_hash_list) == 0:
+                self.remove_circuit(cid, 'all downloads stopped', destroy=True)
 
     def get_download(self, lookup_info_hash):
         if not self.tribler_session:
@@ -484,6 +584,9 @@ class TriblerTunnelCommunity(HiddenTunnelCommunity):
             download.add_peer(('1.1.1.1', 1024))
         super(TriblerTunnelCommunity, self).create_introduction_point(info_hash, amount)
 
+        if (TIMER_INTRO_POINTS, info_hash) not in self.download_timers:
+            self.download_timers.schedule((TIMER_INTRO_POINTS, info_hash), time.time() + INTRO_POINT_TIMEOUT)
+
     def on_linked_e2e(self, source_address, data, circuit_id):
         _, payload = self._ez_unpack_noauth(LinkedE2EPayload, data)
         cache = self.request_cache.get(u"link-request", payload.identifier)
@@ -500,4 +603,5 @@ class TriblerTunnelCommunity(HiddenTunnelCommunity):
         for socks_server in self.socks_servers:
             yield socks_server.stop()
 
+        self.traffic_scheduler.shutdown()
         super(TriblerTunnelCommunity, self).unload()
@@ -5,6 +5,28 @@ from Tribler.pyipv8.ipv8.messaging.anonymization.tunnel import CIRCUIT_TYPE_REND
     CIRCUIT_ID_PORT, CIRCUIT_STATE_READY
 
 
+class CircuitCounters(object):
+    """
+    The number of packets and bytes that have been routed over a circuit by the dispatcher.
+    Up is the traffic from the SOCKS5 servers into the tunnels, down is the traffic from the tunnels to the SOCKS5
+    servers.
+    """
+
+    def __init__(self):
+        self.packets_up = 0
+        self.bytes_up = 0
+        self.packets_down = 0
+        self.bytes_down = 0
+
+    def to_dict(self):
+        return {
+            "packets_up": self.packets_up,
+            "bytes_up": self.bytes_up,
+            "packets_down": self.packets_down,
+            "bytes_down": self.bytes_down
+        }
+
+
 class TunnelDispatcher(object):
     """
     This class is responsible for dispatching SOCKS5 traffic to the right circuits and vice versa.
@@ -16,12 +38,56 @@ class TunnelDispatcher(object):
         self.tunnel_community = tunnel_community
         self.socks_servers = []
 
-        # Map to keep track of the circuits associated with each destination.
+        # Map to keep track of the circuits associated with each destination, per number of hops.
         self.destinations = {}
 
+        # The reverse of the destinations map: the destinations associated with each circuit, per number of hops.
+        # Both maps should only be modified with add_destination and remove_destination.
+        self.circuit_destinations = {}
+
+        # Map with the traffic counters of each circuit id
+        self.circuit_counters = {}
+
+        # The encoded SOCKS5 headers of the packets from the origins we dispatch traffic for
+        self.udp_headers = conversion.UdpHeaderCache()
+
     def set_socks_servers(self, socks_servers):
         self.socks_servers = socks_servers
         self.destinations = {(ind + 1): {} for ind, _ in enumerate(self.socks_servers)}
+        self.circuit_destinations = {(ind + 1): {} for ind, _ in enumerate(self.socks_servers)}
+
+    def add_destination(self, hops, destination, circuit):
+        """
+        Associate a destination with a circuit, replacing the circuit that was previously associated with it.
+        """
+        previous_circuit = self.destinations[hops].get(destination)
+        if previous_circuit is circuit:
+            return
+        if previous_circuit is not None:
+            self._remove_circuit_destination(hops, previous_circuit, destination)
+
+        self.destinations[hops][destination] = circuit
+        self.circuit_destinations[hops].setdefault(circuit, set()).add(destination)
+
+    def remove_destination(self, hops, destination):
+        circuit = self.destinations[hops].pop(destination, None)
+        if circuit is not None:
+            self._remove_circuit_destination(hops, circuit, destination)
+
+    def _remove_circuit_destination(self, hops, circuit, destination):
+        circuit_destinations = self.circuit_destinations[hops][circuit]
+        circuit_destinations.discard(destination)
+        if not circuit_destinations:
+            del self.circuit_destinations[hops][circuit]
+
+    def get_circuit_counters(self, circuit_id):
+        """
+        Return the traffic counters of a circuit, creating them if the circuit has no counters yet.
+        """
+        counters = self.circuit_counters.get(circuit_id)
+        if counters is None:
+            counters = self.circuit_counters[circuit_id] = CircuitCounters()
+        return counters
 
     def on_incoming_from_tunnel(self, community, circuit, origin, data, force=False):
         """
@@ -37,14 +103,15 @@ class TunnelDispatcher(object):
 
         sock_server = self.socks_servers[session_hops - 1]
 
-        destinations = self.destinations[session_hops]
-        if circuit in destinations.values() or force:
-            destinations[origin] = circuit
+        if circuit in self.circuit_destinations[session_hops] or force:
+            self.add_destination(session_hops, origin, circuit)
 
             for session in sock_server.sessions:
                 if session._udp_socket:
-                    socks5_data = conversion.encode_udp_packet(
-                        0, 0, conversion.ADDRESS_TYPE_IPV4, origin[0], origin[1], data)
+                    socks5_data = self.udp_headers.encode_udp_packet(origin[0], origin[1], data)
+                    counters = self.get_circuit_counters(circuit.circuit_id)
+                    counters.packets_down += 1
+                    counters.bytes_down += len(data)
                     return session._udp_socket.sendDatagram(socks5_data)
 
         return False
@@ -57,15 +124,14 @@ class TunnelDispatcher(object):
         hops = self.socks_servers.index(udp_connection.socksconnection.socksserver) + 1
 
         destination = request.destination
-        if destination not in self.destinations[hops]:
-            selected_circuit = self.tunnel_community.selection_strategy.select(destination, hops)
-            if not selected_circuit:
+        circuit = self.destinations[hops].get(destination)
+        if circuit is None:
+            circuit = self.tunnel_community.selection_strategy.select(destination, hops)
+            if not circuit:
                 return False
 
-            self.destinations[hops][destination] = selected_circuit
-            self._logger.debug("SELECT circuit %d for %s", self.destinations[hops][destination].circuit_id,
-                               destination)
-        circuit = self.destinations[hops][destination]
+            self.add_destination(hops, destination, circuit)
+            self._logger.debug("SELECT circuit %d for %s", circuit.circuit_id, destination)
 
         if circuit.state != CIRCUIT_STATE_READY:
             self._logger.debug(
@@ -73,27 +139,28 @@ class TunnelDispatcher(object):
             return False
 
         self._logger.debug("Sending data over circuit destined for %r:%r", *request.destination)
+        # The payload is a memoryview of the SOCKS5 packet, it is only copied when the data is actually sent
         self.tunnel_community.send_data([circuit.sock_addr], circuit.circuit_id, request.destination,
-                                        ('0.0.0.0', 0), request.payload)
+                                        ('0.0.0.0', 0), request.payload.tobytes())
+        counters = self.get_circuit_counters(circuit.circuit_id)
+        counters.packets_up += 1
+        counters.bytes_up += len(request.payload)
         return True
 
     def circuit_dead(self, broken_circuit):
         """
         When a circuit dies, we update the destinations dictionary and remove all peers that are affected.
         """
-        counter = 0
         affected_destinations = set()
-        for hops, destinations in self.destinations.iteritems():
-            new_affected_destinations = set(destination for destination, tunnel_circuit in destinations.iteritems()
-                                            if tunnel_circuit == broken_circuit)
-            for destination in new_affected_destinations:
-                if destination in self.destinations[hops]:
-                    del self.destinations[hops][destination]
-                    counter += 1
-
-            affected_destinations.update(new_affected_destinations)
-
-        if counter > 0:
-            self._logger.debug("Deleted %d peers from destination list", counter)
+        for hops, circuit_destinations in self.circuit_destinations.iteritems():
+            destinations = circuit_destinations.pop(broken_circuit, ())
+            for destination in destinations:
+                del self.destinations[hops][destination]
+            affected_destinations.update(destinations)
+
+        self.circuit_counters.pop(broken_circuit.circuit_id, None)
+
+        if affected_destinations:
+            self._logger.debug("Deleted %d peers from destination list", len(affected_destinations))
 
         return affected_destinations
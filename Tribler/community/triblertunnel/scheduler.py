@@ -0,0 +1,237 @@
+"""
+Rate limiting and fair queueing of the traffic that we relay and exit for other users.
+
+The traffic of every relayed or exited circuit passes through a token bucket of the circuit and a token bucket of its
+traffic class (relay or exit). Packets that exceed the rate limits are queued per circuit. The queues are drained with
+deficit round robin, so every circuit gets a fair share of the available bandwidth.
+"""
+import logging
+import time
+from collections import deque
+
+from twisted.internet import reactor
+
+TRAFFIC_CLASS_RELAY = "relay"
+TRAFFIC_CLASS_EXIT = "exit"
+TRAFFIC_CLASSES = (TRAFFIC_CLASS_RELAY, TRAFFIC_CLASS_EXIT)
+
+# The number of bytes that a circuit may send during every round of the deficit round robin
+QUANTUM = 2048
+
+# The number of seconds of traffic that a token bucket can save up
+BURST_INTERVAL = 0.1
+
+DRAIN_INTERVAL = 0.01
+
+MAX_QUEUE_SIZE = 256
+
+
+class TokenBucket(object):
+    """
+    A token bucket that is filled with rate tokens (bytes) per second. Sending a packet may bring the number of tokens
+    below zero, so packets that are larger than the bucket can still be sent.
+    """
+    __slots__ = ('rate', 'capacity', 'tokens', 'last_update')
+
+    def __init__(self, rate, now=None):
+        self.rate = rate
+        self.capacity = rate * BURST_INTERVAL
+        self.tokens = self.capacity
+        self.last_update = time.time() if now is None else now
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_update) * self.rate)
+        self.last_update = now
+
+
+class TrafficCounters(object):
+    """
+    The traffic that has been passed to the scheduler, for a circuit or for a traffic class.
+    """
+
+    def __init__(self):
+        self.packets_sent = 0
+        self.bytes_sent = 0
+        self.packets_delayed = 0
+        self.packets_dropped = 0
+        self.bytes_dropped = 0
+
+    def to_dict(self):
+        return {
+            "packets_sent": self.packets_sent,
+            "bytes_sent": self.bytes_sent,
+            "packets_delayed": self.packets_delayed,
+            "packets_dropped": self.packets_dropped,
+            "bytes_dropped": self.bytes_dropped
+        }
+
+
+class TrafficScheduler(object):
+    """
+    This class sits between the tunnel community and the endpoint and schedules the packets of the circuits that we
+    relay or exit. The traffic of our own circuits does not pass through the scheduler, so our own downloads are never
+    throttled. The rates are in bytes per second, a rate of 0 means that the traffic is not limited.
+    """
+
+    def __init__(self, send_callback, circuit_rate=0, relay_rate=0, exit_rate=0, max_queue_size=MAX_QUEUE_SIZE):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.send_callback = send_callback
+        self.max_queue_size = max_queue_size
+
+        self.circuit_rate = 0
+        self.circuit_buckets = {}
+        self.class_buckets = {}
+        self.set_rate_limits(circuit_rate, relay_rate, exit_rate)
+
+        self.queues = {}
+        self.deficits = {}
+        self.active_circuits = deque()
+        self.drain_call = None
+
+        self.circuit_classes = {}
+        self.circuit_counters = {}
+        self.class_counters = {traffic_class: TrafficCounters() for traffic_class in TRAFFIC_CLASSES}
+
+    def set_rate_limits(self, circuit_rate, relay_rate, exit_rate):
+        self.circuit_rate = circuit_rate
+        self.circuit_buckets = {}
+        self.class_buckets = {traffic_class: TokenBucket(rate) for traffic_class, rate
+                              in ((TRAFFIC_CLASS_RELAY, relay_rate), (TRAFFIC_CLASS_EXIT, exit_rate)) if rate}
+
+    @property
+    def rate_limited(self):
+        return bool(self.circuit_rate or self.class_buckets)
+
+    def _consume_tokens(self, circuit_id, traffic_class, size, now):
+        """
+        Take the tokens for a packet from the buckets of the circuit and its traffic class, if both have tokens left.
+        """
+        circuit_bucket = None
+        if self.circuit_rate:
+            circuit_bucket = self.circuit_buckets.get(circuit_id)
+            if circuit_bucket is None:
+                circuit_bucket = self.circuit_buckets[circuit_id] = TokenBucket(self.circuit_rate, now)
+        class_bucket = self.class_buckets.get(traffic_class)
+
+        for bucket in (circuit_bucket, class_bucket):
+            if bucket:
+                bucket.refill(now)
+                if bucket.tokens <= 0:
+                    return False
+
+        for bucket in (circuit_bucket, class_bucket):
+            if bucket:
+                bucket.tokens -= size
+        return True
+
+    def _get_counters(self, circuit_id, traffic_class):
+        counters = self.circuit_counters.get(circuit_id)
+        if counters is None:
+            counters = self.circuit_counters[circuit_id] = TrafficCounters()
+            self.circuit_classes[circuit_id] = traffic_class
+        return counters
+
+    def _send(self, circuit_id, traffic_class, candidates, message_type, packet):
+        counters = self._get_counters(circuit_id, traffic_class)
+        counters.packets_sent += 1
+        counters.bytes_sent += len(packet)
+        class_counters = self.class_counters[traffic_class]
+        class_counters.packets_sent += 1
+        class_counters.bytes_sent += len(packet)
+        return self.send_callback(candidates, message_type, packet)
+
+    def send(self, circuit_id, traffic_class, candidates, message_type, packet):
+        """
+        Send a packet of a relayed or exited circuit, or queue it if the circuit exceeds its rate limits.
+        :return: the number of bytes that have been sent or queued
+        """
+        if not self.rate_limited:
+            return self._send(circuit_id, traffic_class, candidates, message_type, packet)
+
+        queue = self.queues.get(circuit_id)
+        if queue is None:
+            # The packets of a circuit are sent in order, so we can only send right away if nothing is queued
+            if self._consume_tokens(circuit_id, traffic_class, len(packet), time.time()):
+                return self._send(circuit_id, traffic_class, candidates, message_type, packet)
+
+            queue = self.queues[circuit_id] = deque()
+            self.active_circuits.append(circuit_id)
+
+        counters = self._get_counters(circuit_id, traffic_class)
+        class_counters = self.class_counters[traffic_class]
+        if len(queue) >= self.max_queue_size:
+            counters.packets_dropped += 1
+            counters.bytes_dropped += len(packet)
+            class_counters.packets_dropped += 1
+            class_counters.bytes_dropped += len(packet)
+            return 0
+
+        counters.packets_delayed += 1
+        class_counters.packets_delayed += 1
+        queue.append((traffic_class, candidates, message_type, packet))
+        if not self.drain_call:
+            self.drain_call = reactor.callLater(DRAIN_INTERVAL, self.drain)
+        return len(packet)
+
+    def drain(self):
+        """
+        Send the queued packets that fit within the rate limits, using deficit round robin over the circuits.
+        """
+        self.drain_call = None
+        now = time.time()
+
+        progress = True
+        while progress and self.active_circuits:
+            progress = False
+            for _ in xrange(len(self.active_circuits)):
+                circuit_id = self.active_circuits.popleft()
+                queue = self.queues[circuit_id]
+                deficit = self.deficits.get(circuit_id, 0) + QUANTUM
+
+                while queue:
+                    traffic_class, candidates, message_type, packet = queue[0]
+                    if len(packet) > deficit or not self._consume_tokens(circuit_id, traffic_class, len(packet), now):
+                        break
+                    queue.popleft()
+                    deficit -= len(packet)
+                    progress = True
+                    self._send(circuit_id, traffic_class, candidates, message_type, packet)
+
+                if queue:
+                    # A circuit that is held back by the rate limits should not build up credit
+                    self.deficits[circuit_id] = min(deficit, QUANTUM)
+                    self.active_circuits.append(circuit_id)
+                else:
+                    del self.queues[circuit_id]
+                    self.deficits.pop(circuit_id, None)
+
+        if self.active_circuits:
+            self.drain_call = reactor.callLater(DRAIN_INTERVAL, self.drain)
+
+    def remove_circuit(self, circuit_id):
+        """
+        Forget the queued packets, the token bucket and the counters of a circuit that has been removed.
+        """
+        if self.queues.pop(circuit_id, None) is not None:
+            self.active_circuits.remove(circuit_id)
+        self.deficits.pop(circuit_id, None)
+        self.circuit_buckets.pop(circuit_id, None)
+        self.circuit_classes.pop(circuit_id, None)
+        self.circuit_counters.pop(circuit_id, None)
+
+    def get_statistics(self):
+        return {
+            "classes": {traffic_class: counters.to_dict() for traffic_class, counters
+                        in self.class_counters.iteritems()},
+            "circuits": [dict(counters.to_dict(), id=circuit_id, traffic_class=self.circuit_classes[circuit_id],
+                              queued=len(self.queues.get(circuit_id, ())))
+                         for circuit_id, counters in self.circuit_counters.iteritems()]
+        }
+
+    def shutdown(self):
+        if self.drain_call:
+            self.drain_call.cancel()
+            self.drain_call = None
+        self.queues = {}
+        self.deficits = {}
+        self.active_circuits.clear()
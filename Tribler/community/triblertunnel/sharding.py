@@ -0,0 +1,278 @@
+"""
+Sharding of the circuits of a tunnel helper over multiple worker processes that share one public identity.
+
+The front process owns the public IPv8 socket and steers every incoming packet to one of the workers. Packets of the
+tunnel community that belong to a circuit are steered by circuit id, all other packets by the address of the sender.
+The workers run a regular session on the loopback interface and exchange packets with the front process, wrapped in
+an envelope that contains the address of the remote peer. A worker only picks circuit ids that are steered to itself,
+so the replies for the circuits it extends are steered back to it.
+"""
+import logging
+import socket
+import struct
+from zlib import crc32
+
+from twisted.internet import reactor
+from twisted.internet.protocol import DatagramProtocol
+from twisted.internet.task import LoopingCall
+
+import Tribler.Core.Utilities.json_util as json
+from Tribler.pyipv8.ipv8.taskmanager import TaskManager
+
+MSG_PACKET = 0
+MSG_REGISTER = 1
+MSG_STATISTICS = 2
+
+PACKET_ENVELOPE_STRUCT = struct.Struct("!B4sH")
+WORKER_ENVELOPE_STRUCT = struct.Struct("!BB")
+
+# In the packets of the tunnel community, the message id is followed by the circuit id
+CIRCUIT_ID_OFFSET = 23
+CIRCUIT_ID_STRUCT = struct.Struct("!I")
+
+# The messages of the tunnel community that do not belong to a circuit: the payouts and the discovery messages
+ADDRESS_STEERED_MESSAGES = frozenset([chr(23), chr(245), chr(246), chr(249), chr(250)])
+
+STATISTICS_INTERVAL = 5
+STATISTICS_LOG_INTERVAL = 60
+
+# The maximum number of remote addresses for which the front remembers the worker that last sent a packet to it
+MAX_ADDRESS_WORKERS = 100000
+
+
+def get_circuit_shard(circuit_id, num_shards):
+    return circuit_id % num_shards
+
+
+def get_address_shard(address, num_shards):
+    # We use a checksum instead of hash(), since the result should not depend on the process
+    return (crc32("%s:%d" % address) & 0xffffffff) % num_shards
+
+
+def get_packet_circuit_id(packet, circuit_prefix):
+    """
+    Return the id of the circuit that a packet belongs to, or None if it is not a circuit packet of the tunnel
+    community with the given prefix.
+    """
+    if not packet.startswith(circuit_prefix) or len(packet) < CIRCUIT_ID_OFFSET + CIRCUIT_ID_STRUCT.size \
+            or packet[CIRCUIT_ID_OFFSET - 1] in ADDRESS_STEERED_MESSAGES:
+        return None
+    return CIRCUIT_ID_STRUCT.unpack_from(packet, CIRCUIT_ID_OFFSET)[0]
+
+
+def encode_packet(address, packet):
+    return PACKET_ENVELOPE_STRUCT.pack(MSG_PACKET, socket.inet_aton(address[0]), address[1]) + packet
+
+
+def decode_packet(data):
+    """
+    Decode a packet envelope.
+    :return: a tuple with the address of the remote peer and the packet
+    """
+    _, host, port = PACKET_ENVELOPE_STRUCT.unpack_from(data)
+    return (socket.inet_ntoa(host), port), data[PACKET_ENVELOPE_STRUCT.size:]
+
+
+def encode_register(worker_index, circuit_prefix):
+    return WORKER_ENVELOPE_STRUCT.pack(MSG_REGISTER, worker_index) + circuit_prefix
+
+
+def encode_statistics(worker_index, statistics):
+    return WORKER_ENVELOPE_STRUCT.pack(MSG_STATISTICS, worker_index) + json.dumps(statistics)
+
+
+def decode_worker_message(data):
+    """
+    Decode a registration or statistics envelope of a worker.
+    :return: a tuple with the index of the worker and the body of the message
+    """
+    _, worker_index = WORKER_ENVELOPE_STRUCT.unpack_from(data)
+    return worker_index, data[WORKER_ENVELOPE_STRUCT.size:]
+
+
+class CallbackProtocol(DatagramProtocol):
+    """
+    A datagram protocol that passes the received datagrams to a callback.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def datagramReceived(self, data, addr):
+        self.callback(data, addr)
+
+
+class ShardFront(TaskManager):
+    """
+    The front process of a sharded tunnel helper. It owns the public socket and relays packets from and to the
+    workers. The workers register themselves, together with the prefix of the tunnel community, at the internal port
+    of the front.
+
+    Packets that do not belong to a circuit are steered to the worker that last sent a packet to the remote peer, so
+    responses arrive at the worker that sent the request.
+    """
+
+    def __init__(self, num_workers):
+        super(ShardFront, self).__init__()
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.num_workers = num_workers
+        self.circuit_prefix = None
+        self.worker_addresses = [None] * num_workers
+        self.worker_indices = {}
+        self.address_workers = {}
+        self.worker_statistics = [{} for _ in xrange(num_workers)]
+        self.steered_packets = [0] * num_workers
+        self.dropped_packets = 0
+        self.public_port = None
+        self.internal_port = None
+
+    def start(self, public_port, public_address="0.0.0.0"):
+        self.public_port = reactor.listenUDP(public_port, CallbackProtocol(self.on_public_datagram),
+                                             interface=public_address)
+        self.internal_port = reactor.listenUDP(0, CallbackProtocol(self.on_internal_datagram), interface="127.0.0.1")
+        self.register_task("log_statistics", LoopingCall(self.log_statistics)).start(STATISTICS_LOG_INTERVAL,
+                                                                                        now=False)
+
+    def stop(self):
+        self.shutdown_task_manager()
+        if self.public_port:
+            self.public_port.stopListening()
+            self.public_port = None
+        if self.internal_port:
+            self.internal_port.stopListening()
+            self.internal_port = None
+
+    def get_internal_port(self):
+        return self.internal_port.getHost().port
+
+    def get_worker_index(self, packet, address):
+        """
+        Return the index of the worker that should handle a packet from the given address.
+        """
+        circuit_id = get_packet_circuit_id(packet, self.circuit_prefix) if self.circuit_prefix else None
+        if circuit_id is not None:
+            return get_circuit_shard(circuit_id, self.num_workers)
+
+        worker_index = self.address_workers.get(address)
+        if worker_index is None:
+            worker_index = get_address_shard(address, self.num_workers)
+        return worker_index
+
+    def on_public_datagram(self, data, address):
+        worker_index = self.get_worker_index(data, address)
+        worker_address = self.worker_addresses[worker_index]
+        if not worker_address:
+            # The worker has not registered itself yet
+            self.dropped_packets += 1
+            return
+
+        self.steered_packets[worker_index] += 1
+        self.internal_port.write(encode_packet(address, data), worker_address)
+
+    def on_internal_datagram(self, data, address):
+        if not data:
+            return
+
+        msg_type = ord(data[0])
+        if msg_type == MSG_PACKET:
+            worker_index = self.worker_indices.get(address)
+            if worker_index is None:
+                return
+
+            destination, packet = decode_packet(data)
+            if len(self.address_workers) >= MAX_ADDRESS_WORKERS:
+                self.address_workers.clear()
+            self.address_workers[destination] = worker_index
+
+            try:
+                self.public_port.write(packet, destination)
+            except socket.error as exc:
+                self._logger.debug("Unable to send packet to %s:%d (%s)", destination[0], destination[1], exc)
+            return
+
+        worker_index, body = decode_worker_message(data)
+        if worker_index >= self.num_workers:
+            self._logger.warning("Got a message from unknown worker %d", worker_index)
+        elif msg_type == MSG_REGISTER:
+            self.register_worker(worker_index, address, body)
+        elif msg_type == MSG_STATISTICS and self.worker_indices.get(address) == worker_index:
+            self.worker_statistics[worker_index] = json.loads(body)
+
+    def register_worker(self, worker_index, address, circuit_prefix):
+        if self.worker_addresses[worker_index] == address:
+            return
+
+        self._logger.info("Worker %d is listening at %s:%d", worker_index, address[0], address[1])
+        self.worker_indices.pop(self.worker_addresses[worker_index], None)
+        self.worker_addresses[worker_index] = address
+        self.worker_indices[address] = worker_index
+        self.circuit_prefix = circuit_prefix
+
+    def get_statistics(self):
+        """
+        Return the statistics of all workers, summed up.
+        """
+        statistics = {"workers": sum(1 for address in self.worker_addresses if address),
+                      "steered_packets": sum(self.steered_packets),
+                      "dropped_packets": self.dropped_packets}
+        for worker_statistics in self.worker_statistics:
+            for key, value in worker_statistics.iteritems():
+                statistics[key] = statistics.get(key, 0) + value
+        return statistics
+
+    def log_statistics(self):
+        self._logger.info("Statistics of %d workers: %s", self.num_workers, self.get_statistics())
+
+
+class ShardWorker(DatagramProtocol, TaskManager):
+    """
+    This class connects the IPv8 endpoint of a worker to the front process. It takes the place of the endpoint as
+    the protocol of the UDP port, and of the UDP port as the transport of the endpoint.
+    """
+
+    def __init__(self, worker_index, front_address, tunnel_community):
+        TaskManager.__init__(self)
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.worker_index = worker_index
+        self.front_address = front_address
+        self.tunnel_community = tunnel_community
+        self.endpoint = None
+        self.port = None
+
+    def install(self, endpoint):
+        self.endpoint = endpoint
+        self.port = endpoint.transport
+        self.port.protocol = self
+        endpoint.transport = self
+
+        self.register_task("send_statistics", LoopingCall(self.send_statistics)).start(STATISTICS_INTERVAL)
+
+    def stop(self):
+        self.shutdown_task_manager()
+
+    def datagramReceived(self, data, addr):
+        if addr != self.front_address or not data or ord(data[0]) != MSG_PACKET:
+            return
+
+        source, packet = decode_packet(data)
+        self.endpoint.datagramReceived(packet, source)
+
+    def write(self, packet, addr):
+        return self.port.write(encode_packet(addr, packet), self.front_address)
+
+    def getHost(self):
+        return self.port.getHost()
+
+    def get_statistics(self):
+        community = self.tunnel_community
+        return {"circuits": len(community.circuits),
+                "relays": len(community.relay_from_to),
+                "exit_sockets": len(community.exit_sockets),
+                "relay_bytes": sum(relay.bytes[0] + relay.bytes[1] for relay in community.relay_from_to.itervalues()),
+                "exit_bytes": sum(exit_socket.bytes_up + exit_socket.bytes_down
+                                  for exit_socket in community.exit_sockets.itervalues())}
+
+    def send_statistics(self):
+        # We register ourselves every time, in case the front process has been restarted
+        self.port.write(encode_register(self.worker_index, self.tunnel_community._prefix), self.front_address)
+        self.port.write(encode_statistics(self.worker_index, self.get_statistics()), self.front_address)
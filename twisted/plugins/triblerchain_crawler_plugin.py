@@ -5,7 +5,7 @@ import os
 import signal
 
 from Tribler.Core.Config.tribler_config import TriblerConfig
-from Tribler.community.triblerchain.community import TriblerChainCrawlerCommunity
+from Tribler.community.triblerchain.community import TriblerChainCrawlerCommunity, MAX_CRAWLS_IN_FLIGHT
 from Tribler.pyipv8.ipv8.peer import Peer
 from Tribler.pyipv8.ipv8.peerdiscovery.discovery import RandomWalk
 from twisted.application.service import MultiService, IServiceMaker
@@ -29,6 +29,8 @@ class Options(usage.Options):
         ["statedir", "s", None, "Use an alternate statedir", str],
         ["restapi", "p", 8085, "Use an alternate port for the REST API", int],
         ["ipv8", "d", -1, "Use an alternate port for IPv8", int],
+        ["walkers", "w", 4, "The number of concurrent random walkers", int],
+        ["crawls", "c", MAX_CRAWLS_IN_FLIGHT, "The maximum number of crawl requests waiting for a response", int],
     ]
 
 
@@ -107,9 +109,14 @@ class TriblerChainCrawlerServiceMaker(object):
                                                                        self.session.lm.ipv8.network,
                                                                        tribler_session=self.session,
                                                                        working_directory=self.session.config.
-                                                                       get_state_dir())
+                                                                       get_state_dir(),
+                                                                       max_crawls_in_flight=options["crawls"])
             self.session.lm.ipv8.overlays.append(self.triblerchain_community)
-            self.session.lm.ipv8.strategies.append((RandomWalk(self.triblerchain_community), -1))
+            for _ in xrange(max(options["walkers"], 1)):
+                self.session.lm.ipv8.strategies.append((RandomWalk(self.triblerchain_community), -1))
+
+            # Expose the statistics and the crawl rate on the REST API
+            self.session.lm.triblerchain_community = self.triblerchain_community
 
         self.session = Session(config)
         self.session.start().addCallback(on_tribler_started).addErrback(
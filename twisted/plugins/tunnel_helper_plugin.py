@@ -5,6 +5,7 @@ import logging.config
 import os
 import random
 import signal
+import sys
 import threading
 import re
 
@@ -12,6 +13,8 @@ import re
 from twisted.application.service import MultiService, IServiceMaker
 from twisted.conch import manhole_tap
 from twisted.internet import reactor
+from twisted.internet.defer import succeed
+from twisted.internet.protocol import ProcessProtocol
 from twisted.internet.stdio import StandardIO
 from twisted.internet.task import LoopingCall
 from twisted.plugin import IPlugin
@@ -21,9 +24,12 @@ from twisted.python.log import msg
 from zope.interface import implements
 from socket import inet_aton
 
+import Tribler.Core.permid as permid_module
 from Tribler.Core.Config.tribler_config import TriblerConfig
 from Tribler.Core.Session import Session
+from Tribler.Core.Utilities.network_utils import get_random_port
 from Tribler.Core.simpledefs import NTFY_TUNNEL, NTFY_REMOVE
+from Tribler.community.triblertunnel.sharding import ShardFront, ShardWorker
 from Tribler.dispersy.tool.clean_observers import clean_twisted_observers
 
 # Register yappi profiler
@@ -68,6 +74,13 @@ def check_ipv8_bootstrap_override(val):
     return ip, port
 check_ipv8_bootstrap_override.coerceDoc = "IPv8 bootstrap server address must be in ipv4_addr:port format"
 
+def check_workers(val):
+    workers = int(val)
+    if not 0 <= workers <= 255:
+        raise ValueError("Invalid number of workers")
+    return workers
+check_workers.coerceDoc = "The number of workers must be between 0 and 255."
+
 class Options(usage.Options):
     optFlags = [
         ["exit", "x", "Allow being an exit-node"],
@@ -78,7 +91,12 @@ class Options(usage.Options):
         ["socks5", "p", None, "Socks5 port", check_socks5_port],
         ["ipv8_port", "d", -1, 'IPv8 port', check_ipv8_port],
         ["ipv8_address", "i", "0.0.0.0", 'IPv8 listening address', check_ipv8_address],
-        ["ipv8_bootstrap_override", "b", "", "Force the usage of specific IPv8 bootstrap server (ip:port)", check_ipv8_bootstrap_override]
+        ["ipv8_bootstrap_override", "b", "", "Force the usage of specific IPv8 bootstrap server (ip:port)", check_ipv8_bootstrap_override],
+        ["workers", "w", 0, "Shard the circuits over this number of worker processes", check_workers],
+        # The following parameters are passed to the worker processes by the front process
+        ["worker_index", None, None, "The index of this worker process", int],
+        ["front_port", None, None, "The internal port of the front process", int],
+        ["shared_state_dir", None, None, "The state directory with the keys that are shared by the workers"]
     ]
 
 if not os.path.exists("logger.conf"):
@@ -106,6 +124,7 @@ class Tunnel(object):
         self.ipv8_address = ipv8_address
         self.session = None
         self.community = None
+        self.shard_worker = None
         self.clean_messages_lc = LoopingCall(self.clean_messages)
         self.clean_messages_lc.start(1800)
         self.clean_messages_lc = LoopingCall(self.periodic_bootstrap)
@@ -127,6 +146,11 @@ class Tunnel(object):
                     new_strategies.append((strategy, target_peers))
             self.session.lm.ipv8.strategies = new_strategies
 
+        if self.options["worker_index"] is not None:
+            self.shard_worker = ShardWorker(self.options["worker_index"], ("127.0.0.1", self.options["front_port"]),
+                                            self.session.lm.tunnel_community)
+            self.shard_worker.install(self.session.lm.ipv8.endpoint)
+
     def circuit_removed(self, _, __, ___, address):
         self.session.lm.ipv8.network.remove_by_address(address)
         self.session.lm.tunnel_community.bootstrap()
@@ -163,6 +187,18 @@ class Tunnel(object):
         if "ipv8_bootstrap_override" in self.options:
             config.set_ipv8_bootstrap_override(self.options["ipv8_bootstrap_override"])
 
+        if self.options["worker_index"] is not None:
+            # The workers share the identity of the front process and only communicate through it. Every worker has
+            # its own database, so TriblerChain is disabled to prevent the workers from forking the shared chain.
+            shared_config = TriblerConfig()
+            shared_config.set_state_dir(self.options["shared_state_dir"])
+            config.set_permid_keypair_filename(shared_config.get_permid_keypair_filename())
+            config.set_trustchain_permid_keypair_filename(shared_config.get_trustchain_permid_keypair_filename())
+            config.set_trustchain_enabled(False)
+            config.set_ipv8_address("127.0.0.1")
+            config.set_tunnel_community_shard_index(self.options["worker_index"])
+            config.set_tunnel_community_shards(self.options["workers"])
+
         self.session = Session(config)
         logger.info("Using IPv8 port %d" % self.session.config.get_dispersy_port())
 
@@ -175,11 +211,84 @@ class Tunnel(object):
             self.clean_messages_lc.stop()
             self.clean_messages_lc = None
 
+        if self.shard_worker:
+            self.shard_worker.stop()
+
         if self.session:
             logger.info("Going to shutdown session")
             return self.session.shutdown()
 
 
+class WorkerProcessProtocol(ProcessProtocol):
+
+    def __init__(self, worker_index):
+        self.worker_index = worker_index
+
+    def processEnded(self, reason):
+        logger.info("Worker %d has stopped: %s", self.worker_index, reason.getErrorMessage())
+
+
+class TunnelFront(object):
+    """
+    The front process of a tunnel helper that shards its circuits over multiple worker processes. The front process
+    owns the public IPv8 port and relays the packets from and to the workers, see ShardFront.
+    """
+
+    def __init__(self, options, ipv8_port=-1, ipv8_address="0.0.0.0"):
+        self.options = options
+        self.ipv8_port = ipv8_port if ipv8_port > 0 else get_random_port(socket_type="udp")
+        self.ipv8_address = ipv8_address
+        self.shard_front = ShardFront(options["workers"])
+        self.worker_processes = []
+
+    def create_shared_keys(self, state_dir):
+        """
+        Create the keys that are shared by the workers, before the workers are started.
+        """
+        config = TriblerConfig()
+        config.set_state_dir(state_dir)
+        if not os.path.exists(state_dir):
+            os.makedirs(state_dir)
+
+        permid_module.init()
+        if not os.path.exists(config.get_permid_keypair_filename()):
+            permid_module.save_keypair(permid_module.generate_keypair(), config.get_permid_keypair_filename())
+        if not os.path.exists(config.get_trustchain_permid_keypair_filename()):
+            permid_module.save_keypair_trustchain(permid_module.generate_keypair_trustchain(),
+                                                  config.get_trustchain_permid_keypair_filename())
+
+    def start(self):
+        state_dir = os.path.join(TriblerConfig().get_state_dir(), "tunnel-front-%d" % self.ipv8_port)
+        self.create_shared_keys(state_dir)
+
+        self.shard_front.start(self.ipv8_port, self.ipv8_address)
+        logger.info("Using IPv8 port %d with %d workers", self.ipv8_port, self.options["workers"])
+
+        for worker_index in xrange(self.options["workers"]):
+            args = [sys.executable, sys.argv[0], "--nodaemon", "--pidfile=", "tunnel_helper",
+                    "--workers", str(self.options["workers"]),
+                    "--worker_index", str(worker_index),
+                    "--front_port", str(self.shard_front.get_internal_port()),
+                    "--shared_state_dir", state_dir]
+            if self.options["socks5"] is not None:
+                args += ["--socks5", str(self.options["socks5"] + 5 * worker_index)]
+            if self.options["exit"]:
+                args.append("--exit")
+            if self.options["ipv8_bootstrap_override"]:
+                args += ["--ipv8_bootstrap_override", "%s:%d" % self.options["ipv8_bootstrap_override"]]
+
+            self.worker_processes.append(reactor.spawnProcess(WorkerProcessProtocol(worker_index), sys.executable,
+                                                              args, env=os.environ, childFDs={0: "w", 1: 1, 2: 2}))
+
+    def stop(self):
+        for worker_process in self.worker_processes:
+            if worker_process.pid:
+                worker_process.signalProcess("TERM")
+        self.worker_processes = []
+        self.shard_front.stop()
+        return succeed(None)
+
+
 class LineHandler(LineReceiver):
     delimiter = os.linesep
 
@@ -231,8 +340,11 @@ class TunnelHelperServiceMaker(object):
         Main method to startup a tunnel helper and add a signal handler.
         """
 
-        tunnel = Tunnel(options, options["ipv8_port"], options["ipv8_address"])
-        StandardIO(LineHandler(tunnel))
+        if options["workers"] > 1 and options["worker_index"] is None:
+            tunnel = TunnelFront(options, options["ipv8_port"], options["ipv8_address"])
+        else:
+            tunnel = Tunnel(options, options["ipv8_port"], options["ipv8_address"])
+            StandardIO(LineHandler(tunnel))
 
         def signal_handler(sig, _):
             msg("Received shut down signal %s" % sig)